@@ -0,0 +1,42 @@
+-- Migration: media テーブルにファイルの先頭から調べた形式・寸法の記録を追加
+-- 説明: 記事詳細ページ生成 Lambda が添付ファイル・アイキャッチ画像の先頭数KBだけを読み、
+--       実際の形式（mime_type）と画像の寸法（width / height）を記録します。
+--       probed_at が入っている行は以降の生成で調べ直しません。
+
+ALTER TABLE IF EXISTS public.media
+ADD COLUMN IF NOT EXISTS probed_at TIMESTAMP WITH TIME ZONE;
+
+COMMENT ON COLUMN public.media.probed_at IS 'ファイルの先頭から mime_type・width・height を調べた日時（NULL は未調査）';
+
+-- Lambda関数（service_role キー）から調べた結果を記録する関数
+-- まだ調べていない行の形式・寸法の列だけを更新する
+-- service_role は RLS の対象外のため、SECURITY DEFINER にはせず呼び出し元の権限で実行する
+CREATE OR REPLACE FUNCTION public.record_media_probes(probes JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY INVOKER
+SET search_path = public
+AS $$
+DECLARE
+  updated INTEGER;
+BEGIN
+  UPDATE public.media AS m
+  SET mime_type = COALESCE(p.mime_type, m.mime_type),
+      width = p.width,
+      height = p.height,
+      probed_at = CURRENT_TIMESTAMP
+  FROM jsonb_to_recordset(probes) AS p(id UUID, mime_type VARCHAR(100), width INTEGER, height INTEGER)
+  WHERE m.id = p.id
+    AND m.probed_at IS NULL
+    AND m.deleted_at IS NULL
+    AND (p.width IS NULL OR p.width BETWEEN 1 AND 65535)
+    AND (p.height IS NULL OR p.height BETWEEN 1 AND 65535);
+  GET DIAGNOSTICS updated = ROW_COUNT;
+  RETURN updated;
+END;
+$$;
+
+-- service_role にだけ実行を許可する（anon キーはブラウザに公開されているため、誰でも media を書き換えられてしまう）
+-- 関数の EXECUTE は既定で PUBLIC に付与され、Supabase は public スキーマの関数を anon / authenticated にも付与するため、明示的に取り消す
+REVOKE EXECUTE ON FUNCTION public.record_media_probes(JSONB) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.record_media_probes(JSONB) TO service_role;
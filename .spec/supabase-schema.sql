@@ -105,6 +105,7 @@ CREATE TABLE IF NOT EXISTS public.media (
   mime_type VARCHAR(100),
   width INTEGER,
   height INTEGER,
+  probed_at TIMESTAMP WITH TIME ZONE,
   created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
   deleted_at TIMESTAMP WITH TIME ZONE
 );
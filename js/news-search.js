@@ -0,0 +1,229 @@
+// お知らせ検索（news.html・過去のお知らせページ用）
+// news_detail_page_generator が生成する静的インデックス（news/search/）を必要な分だけ読み込んで検索する
+// 語の文書は「シャードの文書 − tail.json の removed」と「tail.json の文書」を合わせたもの
+// 正規化・バイグラム・シャードの決め方は terraform/lambda/news_detail_page_generator/search_index.py と同じにすること
+
+(function () {
+  const SEARCH_DIR = "news/search";
+  const MAX_RESULTS = 50;
+  const TOKEN_PATTERN = /[\p{L}\p{N}]+/gu;
+
+  let configPromise = null;
+  let tailPromise = null;
+  const shardCache = {};
+  const docsCache = {};
+
+  // CRC32（Python の zlib.crc32 と同じ値）
+  const CRC_TABLE = (function () {
+    const table = new Uint32Array(256);
+    for (let n = 0; n < 256; n++) {
+      let c = n;
+      for (let k = 0; k < 8; k++) {
+        c = c & 1 ? 0xedb88320 ^ (c >>> 1) : c >>> 1;
+      }
+      table[n] = c >>> 0;
+    }
+    return table;
+  })();
+
+  function crc32(text) {
+    const bytes = new TextEncoder().encode(text);
+    let crc = 0xffffffff;
+    for (let i = 0; i < bytes.length; i++) {
+      crc = CRC_TABLE[(crc ^ bytes[i]) & 0xff] ^ (crc >>> 8);
+    }
+    return (crc ^ 0xffffffff) >>> 0;
+  }
+
+  function queryBigrams(query) {
+    const grams = new Set();
+    const tokens = query.normalize("NFKC").toLowerCase().match(TOKEN_PATTERN) || [];
+    tokens.forEach(function (token) {
+      const chars = Array.from(token);
+      for (let i = 0; i < chars.length - 1; i++) {
+        grams.add(chars[i] + chars[i + 1]);
+      }
+    });
+    return Array.from(grams);
+  }
+
+  function fetchJson(path) {
+    return fetch(path).then(function (response) {
+      if (!response.ok) {
+        throw new Error("検索インデックスを読み込めません: " + path);
+      }
+      return response.json();
+    });
+  }
+
+  function loadConfig() {
+    if (!configPromise) {
+      configPromise = fetchJson(SEARCH_DIR + "/index.json");
+    }
+    return configPromise;
+  }
+
+  // シャードにまだ取り込んでいない文書（tail.json がない古いインデックスは空として扱う）
+  function loadTail() {
+    if (!tailPromise) {
+      tailPromise = fetch(SEARCH_DIR + "/tail.json").then(function (response) {
+        if (response.status === 404) {
+          return {};
+        }
+        if (!response.ok) {
+          throw new Error("検索インデックスを読み込めません: " + SEARCH_DIR + "/tail.json");
+        }
+        return response.json();
+      }).then(function (data) {
+        return { postings: data.postings || {}, removed: new Set(data.removed || []) };
+      });
+    }
+    return tailPromise;
+  }
+
+  function loadShard(shard) {
+    if (!shardCache[shard]) {
+      const name = String(shard).padStart(3, "0");
+      shardCache[shard] = fetchJson(SEARCH_DIR + "/shards/" + name + ".json").then(function (data) {
+        return data.postings || {};
+      });
+    }
+    return shardCache[shard];
+  }
+
+  function loadDocs(chunk) {
+    if (!docsCache[chunk]) {
+      docsCache[chunk] = fetchJson(SEARCH_DIR + "/docs/" + chunk + ".json").then(function (data) {
+        return data.docs || {};
+      });
+    }
+    return docsCache[chunk];
+  }
+
+  // 差分符号化された文書番号のリストを戻す
+  function decodePostings(gaps) {
+    const docs = [];
+    let doc = 0;
+    (gaps || []).forEach(function (gap) {
+      doc += gap;
+      docs.push(doc);
+    });
+    return docs;
+  }
+
+  function intersect(lists) {
+    lists.sort(function (a, b) {
+      return a.length - b.length;
+    });
+    let result = lists[0];
+    for (let i = 1; i < lists.length && result.length; i++) {
+      const other = new Set(lists[i]);
+      result = result.filter(function (doc) {
+        return other.has(doc);
+      });
+    }
+    return result;
+  }
+
+  function search(query) {
+    const grams = queryBigrams(query);
+    if (!grams.length) {
+      return Promise.resolve(null);
+    }
+    return Promise.all([loadConfig(), loadTail()]).then(function (loaded) {
+      const config = loaded[0];
+      const tail = loaded[1];
+      return Promise.all(
+        grams.map(function (gram) {
+          return loadShard(crc32(gram) % config.shards).then(function (postings) {
+            const docs = decodePostings(postings[gram]).filter(function (doc) {
+              return !tail.removed.has(doc);
+            });
+            return docs.concat(decodePostings(tail.postings[gram]));
+          });
+        })
+      ).then(function (lists) {
+        // 文書番号の大きい（新しく登録された）順
+        const docs = intersect(lists).sort(function (a, b) {
+          return b - a;
+        });
+        const shown = docs.slice(0, MAX_RESULTS);
+        return Promise.all(
+          shown.map(function (doc) {
+            return loadDocs(Math.floor(doc / config.docs_per_chunk)).then(function (chunk) {
+              return chunk[String(doc)];
+            });
+          })
+        ).then(function (records) {
+          return { total: docs.length, records: records.filter(Boolean) };
+        });
+      });
+    });
+  }
+
+  function escapeHtml(text) {
+    const div = document.createElement("div");
+    div.textContent = text || "";
+    return div.innerHTML;
+  }
+
+  function renderResults(container, result) {
+    if (!result.records.length) {
+      container.innerHTML = '<div class="text-center text-gray-500 py-8">該当するお知らせはありません</div>';
+      return;
+    }
+    let html = '<div class="text-sm text-gray-500 mb-4">' + result.total + "件見つかりました</div>";
+    result.records.forEach(function (record) {
+      html +=
+        '<a href="' + escapeHtml(record.u) + '" class="news-item">' +
+        '<div class="news-item-content">' +
+        '<div class="news-item-date">' + escapeHtml(record.d) + "</div>" +
+        '<div class="news-item-title">' + escapeHtml(record.t) + "</div>" +
+        "</div></a>";
+    });
+    container.innerHTML = html;
+  }
+
+  document.addEventListener("DOMContentLoaded", function () {
+    const input = document.getElementById("news-search-input");
+    const results = document.getElementById("news-search-results");
+    const newsList = document.getElementById("news-list");
+    if (!input || !results || !newsList) {
+      return;
+    }
+
+    let timer = null;
+    let latestQuery = "";
+    input.addEventListener("input", function () {
+      clearTimeout(timer);
+      timer = setTimeout(function () {
+        const query = input.value.trim();
+        latestQuery = query;
+        if (Array.from(query).length < 2) {
+          results.classList.add("hidden");
+          newsList.classList.remove("hidden");
+          return;
+        }
+        search(query)
+          .then(function (result) {
+            if (query !== latestQuery) {
+              return;
+            }
+            if (!result) {
+              results.classList.add("hidden");
+              newsList.classList.remove("hidden");
+              return;
+            }
+            renderResults(results, result);
+            results.classList.remove("hidden");
+            newsList.classList.add("hidden");
+          })
+          .catch(function (error) {
+            console.error(error);
+            results.innerHTML = '<div class="text-center text-gray-500 py-8">検索できませんでした</div>';
+            results.classList.remove("hidden");
+          });
+      }, 200);
+    });
+  });
+})();
@@ -0,0 +1,187 @@
+"""
+HTTP接続の再利用（http_pool）のベンチマーク（ネットワーク不要）
+ローカルに立てたTLSのHTTPサーバーに同じ回数のリクエストを送り、urllib.request.urlopen（毎回接続する）と
+http_pool.urlopen（接続を再利用する）の1リクエストあたりの時間とサーバーが受け付けた接続数を比べる
+
+使い方（リポジトリのルートで実行）:
+    python3 terraform/lambda/benchmarks/http_pool_benchmark.py
+    python3 terraform/lambda/benchmarks/http_pool_benchmark.py --requests 200 --latency-ms 20 --output bench.json
+
+自己署名の証明書は openssl コマンドで一時ディレクトリに作る
+--latency-ms は接続ごとにサーバーが応答を始めるまでの遅延（実際の回線の往復時間の代わり）
+"""
+import argparse
+import http.server
+import importlib.util
+import json
+import os
+import platform
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from datetime import datetime
+from typing import Any, Callable, Dict
+
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+HTTP_POOL_PATH = os.path.join(REPO_ROOT, 'terraform', 'lambda', 'news_detail_page_generator', 'http_pool.py')
+
+# 応答の本文（Supabase の1ページ分程度のJSON）
+RESPONSE_BODY = json.dumps([{'id': i, 'title': 'お知らせ' * 8} for i in range(50)], ensure_ascii=False).encode()
+
+
+def load_http_pool() -> Any:
+    """
+    http_pool モジュールを読み込む（各Lambdaに同じファイルがあるため、詳細ページ生成のものを使う）
+    """
+    spec = importlib.util.spec_from_file_location('http_pool', HTTP_POOL_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def create_certificate(directory: str) -> tuple:
+    """
+    localhost の自己署名証明書を作る。戻り値は (証明書のパス, 秘密鍵のパス)
+    """
+    cert_path = os.path.join(directory, 'cert.pem')
+    key_path = os.path.join(directory, 'key.pem')
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+         '-keyout', key_path, '-out', cert_path, '-subj', '/CN=localhost',
+         '-addext', 'subjectAltName=DNS:localhost,IP:127.0.0.1'],
+        check=True, capture_output=True
+    )
+    return cert_path, key_path
+
+
+class StandInServer(http.server.ThreadingHTTPServer):
+    """
+    keep-alive に対応したTLSのHTTPサーバー（受け付けた接続数を数える）
+    """
+    daemon_threads = True
+
+    def __init__(self, cert_path: str, key_path: str, latency: float):
+        super().__init__(('127.0.0.1', 0), StandInHandler)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert_path, key_path)
+        self.socket = context.wrap_socket(self.socket, server_side=True)
+        self.latency = latency
+        self.connections = 0
+        self.lock = threading.Lock()
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # ヘッダーと本文を別々に書き込むため、Nagle アルゴリズムで応答が遅れないようにする
+    disable_nagle_algorithm = True
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+    def do_GET(self) -> None:
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(RESPONSE_BODY)))
+        self.end_headers()
+        self.wfile.write(RESPONSE_BODY)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def measure(request: Callable[[], None], count: int) -> Dict[str, Any]:
+    """
+    count 回リクエストした時間（1リクエストあたりの中央値・平均・最大）
+    """
+    durations = []
+    for _ in range(count):
+        started = time.perf_counter()
+        request()
+        durations.append((time.perf_counter() - started) * 1000)
+    return {
+        'median_ms': round(statistics.median(durations), 3),
+        'mean_ms': round(statistics.mean(durations), 3),
+        'max_ms': round(max(durations), 3),
+        'total_ms': round(sum(durations), 1),
+    }
+
+
+def run_benchmark(count: int, repeat: int, latency_ms: float) -> Dict[str, Any]:
+    http_pool = load_http_pool()
+    with tempfile.TemporaryDirectory() as directory:
+        cert_path, key_path = create_certificate(directory)
+        server = StandInServer(cert_path, key_path, latency_ms / 1000)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        context = ssl.create_default_context(cafile=cert_path)
+        url = f'https://localhost:{server.server_address[1]}/rest/v1/articles?select=*'
+
+        def with_urllib() -> None:
+            with urllib.request.urlopen(urllib.request.Request(url), timeout=10, context=context) as response:
+                response.read()
+
+        def with_pool() -> None:
+            with http_pool.urlopen(urllib.request.Request(url), timeout=10, context=context) as response:
+                response.read()
+
+        results = {}
+        try:
+            for name, request in (('urllib', with_urllib), ('http_pool', with_pool)):
+                runs = []
+                for _ in range(repeat):
+                    http_pool.close_idle()
+                    connections = server.connections
+                    result = measure(request, count)
+                    result['connections'] = server.connections - connections
+                    runs.append(result)
+                # 中央値が中央の回の結果を使う
+                results[name] = sorted(runs, key=lambda r: r['median_ms'])[len(runs) // 2]
+                print(f'  {name}: {results[name]}')
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    results['saving_per_request_ms'] = round(results['urllib']['median_ms'] - results['http_pool']['median_ms'], 3)
+    results['speedup'] = round(results['urllib']['total_ms'] / results['http_pool']['total_ms'], 2)
+    print(f'  1リクエストあたりの短縮: {results["saving_per_request_ms"]}ms（{results["speedup"]}倍）')
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'openssl': ssl.OPENSSL_VERSION,
+        'requests': count,
+        'repeat': repeat,
+        'latency_ms': latency_ms,
+        'results': results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='HTTP接続の再利用のベンチマーク')
+    parser.add_argument('--requests', type=int, default=100, help='1回の計測のリクエスト数')
+    parser.add_argument('--repeat', type=int, default=3, help='計測の繰り返し回数')
+    parser.add_argument('--latency-ms', type=float, default=0, help='接続ごとに加える遅延（ミリ秒）')
+    parser.add_argument('--output', default='http_pool_benchmark.json', help='結果を保存するJSONファイル')
+    args = parser.parse_args()
+
+    try:
+        report = run_benchmark(max(1, args.requests), max(1, args.repeat), args.latency_ms)
+    except (OSError, subprocess.CalledProcessError) as e:
+        sys.exit(f'ベンチマークを実行できません（openssl コマンドが必要です）: {e}')
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f'結果を保存しました: {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,454 @@
+"""
+ページ生成処理のベンチマーク（ネットワーク不要）
+合成した記事・添付ファイルのデータで各レンダラーの処理時間とピークメモリを計測し、
+結果をJSONに保存する。コミット間で結果を比較して性能の劣化を確認するために使う
+
+使い方（リポジトリのルートで実行）:
+    python3 terraform/lambda/benchmarks/render_benchmark.py
+    python3 terraform/lambda/benchmarks/render_benchmark.py --sizes 10,1000 --repeat 5 --output bench.json
+
+テンプレートは news/news_template.html をディスクから読み込む
+"""
+import argparse
+import gzip
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Tuple
+
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+LAMBDA_DIR = os.path.join(REPO_ROOT, 'terraform', 'lambda')
+TEMPLATE_PATH = os.path.join(REPO_ROOT, 'news', 'news_template.html')
+
+DEFAULT_SIZES = [10, 1000, 10000]
+# 計測の基準日（結果を再現できるように固定）
+BASE_DATE = date(2025, 12, 1)
+
+TITLE_SUBJECTS = [
+    '夏祭り', '防災訓練', '資源ごみ回収', '子ども会クリスマス会', '町会総会', '商店街歳末セール',
+    '敬老の集い', '餅つき大会', '防犯パトロール', '地域清掃活動', '盆踊り大会', '献血のご協力',
+    '回覧板', 'AED講習会', '避難所開設訓練', '交通安全運動', '子育てサロン', '花壇の手入れ'
+]
+TITLE_SUFFIXES = [
+    'のお知らせ', '開催のご案内', '参加者募集', '実施報告', 'について', '日程変更のお知らせ',
+    'にご協力ください', '（雨天中止）'
+]
+BODY_SENTENCES = [
+    '地域の皆さまには日頃より町会活動にご理解とご協力をいただき、誠にありがとうございます。',
+    '当日は動きやすい服装でお越しください。',
+    '小さなお子さま連れの方も安心してご参加いただけます。',
+    '雨天の場合は旭丘地域集会所にて実施します。',
+    '詳細は回覧板または町会の掲示板をご確認ください。',
+    'ご不明な点がございましたら、町会役員までお気軽にお問い合わせください。',
+    '防災用品の点検も併せてお願いいたします。',
+    '参加費は無料です。事前申し込みは不要です。',
+]
+CATEGORIES = ['notice', 'event', 'disaster_safety', 'child_support', 'shopping_info', 'activity_report']
+ATTACHMENT_FILES = [
+    ('チラシ.pdf', 245760), ('申込書.docx', 48213), ('会場案内図.png', 532118),
+    ('当日の様子.jpg', 1843221), ('収支報告.xlsx', 30712), ('写真_{n}.jpeg', 912345)
+]
+
+# 説明文の抽出の最悪ケース（先頭に大きな表を貼り付けた本文）
+LARGE_TABLE_CONTENT = '<table>' + '<tr><td>項目</td><td style="mso-border-alt: solid">値&nbsp;</td></tr>' * 20000 + '</table>'
+
+
+def load_lambda_module(name: str, lambda_name: str) -> Any:
+    """
+    Lambda関数のモジュールをパスを指定して読み込む（両方とも lambda_function という名前のため）
+    """
+    lambda_path = os.path.join(LAMBDA_DIR, lambda_name)
+    sys.path.insert(0, lambda_path)
+    try:
+        # 同名の補助モジュール（publisher.py など）を取り違えないように読み直す
+        for module_name in (
+            'article_model', 'article_order', 'github_commit', 'html_text', 'http_pool', 'http_retry',
+            'image_derivatives', 'media_probe', 'metrics', 'publisher', 'refresh_queue', 'search_index',
+            'site_css', 'site_feeds', 'task_plan', 'template_engine'
+        ):
+            sys.modules.pop(module_name, None)
+        spec = importlib.util.spec_from_file_location(name, os.path.join(lambda_path, 'lambda_function.py'))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    finally:
+        sys.path.remove(lambda_path)
+
+
+def make_body(rng: random.Random) -> str:
+    """
+    本文HTMLを生成
+    """
+    parts = []
+    for _ in range(rng.randint(2, 5)):
+        sentences = ''.join(rng.choice(BODY_SENTENCES) for _ in range(rng.randint(2, 6)))
+        parts.append(f'<p>{sentences}</p>')
+    if rng.random() < 0.5:
+        parts.insert(1, '<h2>開催概要</h2>')
+        items = ''.join(f'<li>{rng.choice(BODY_SENTENCES)}</li>' for _ in range(rng.randint(2, 5)))
+        parts.insert(2, f'<ul>{items}</ul>')
+    if rng.random() < 0.3:
+        parts.append('<p><strong>持ち物:</strong> 筆記用具、飲み物<br>'
+                     '<a href="https://asahigaoka-nerima.tokyo/contact.html">お問い合わせはこちら</a></p>')
+    return ''.join(parts)
+
+
+def make_event_range(rng: random.Random, published: datetime) -> Tuple[Any, Any]:
+    """
+    イベント開始・終了日時を生成（時刻なし・時刻あり・複数日を混ぜる）
+    """
+    if rng.random() < 0.4:
+        return None, None
+    start_day = published.date() + timedelta(days=rng.randint(3, 45))
+    kind = rng.random()
+    if kind < 0.3:
+        start = f'{start_day.isoformat()}T00:00:00+09:00'
+        end = f'{start_day.isoformat()}T23:59:00+09:00'
+    elif kind < 0.8:
+        hour = rng.choice([9, 10, 13, 14, 18])
+        start = f'{start_day.isoformat()}T{hour:02d}:00:00+09:00'
+        end = f'{start_day.isoformat()}T{hour + 2:02d}:30:00+09:00'
+    else:
+        end_day = start_day + timedelta(days=rng.randint(1, 4))
+        start = f'{start_day.isoformat()}T10:00:00+09:00'
+        end = f'{end_day.isoformat()}T16:00:00+09:00'
+    return start, end
+
+
+def make_corpus(size: int, seed: int = 1) -> Tuple[List[Dict[str, Any]], Dict[str, List[Dict[str, Any]]]]:
+    """
+    合成した記事（新しい順）と記事IDごとの添付ファイルを Supabase の行と同じ形式で生成
+    """
+    rng = random.Random(seed + size)
+    articles = []
+    media_by_article: Dict[str, List[Dict[str, Any]]] = {}
+    start = datetime(BASE_DATE.year, BASE_DATE.month, BASE_DATE.day, 9, 0) - timedelta(days=3 * size)
+
+    for i in range(size):
+        article_id = f'{i:08x}-0000-4000-8000-{rng.getrandbits(48):012x}'
+        published = start + timedelta(days=3 * i, minutes=rng.randint(0, 600))
+        event_start, event_end = make_event_range(rng, published)
+        title = rng.choice(TITLE_SUBJECTS) + rng.choice(TITLE_SUFFIXES)
+        articles.append({
+            'id': article_id,
+            'slug': None,
+            'title': title,
+            'content': make_body(rng),
+            'category': rng.choice(CATEGORIES),
+            'featured_image_url': (
+                f'https://asahigaoka-nerima.tokyo/images/news_images/{article_id}.png'
+                if rng.random() < 0.6 else None
+            ),
+            'published_at': published.isoformat() + '+09:00',
+            'created_at': published.isoformat() + '+09:00',
+            'updated_at': (published + timedelta(hours=1)).isoformat() + '+09:00',
+            'event_start_datetime': event_start,
+            'event_end_datetime': event_end,
+            'meta_title': None,
+            'meta_description': None,
+            'meta_keywords': '町会,旭丘,' + title[:4],
+            'status': 'published',
+            'show_in_calendar': event_start is not None,
+            'show_in_news_list': True,
+            'generate_article_page': rng.random() < 0.8,
+            'line_published': rng.random() < 0.5,
+            'x_published': rng.random() < 0.3,
+        })
+
+        attachments = []
+        for n in range(rng.choice([0, 0, 0, 1, 2, 4])):
+            file_name, file_size = rng.choice(ATTACHMENT_FILES)
+            attachments.append({
+                'article_id': article_id,
+                'file_name': file_name.format(n=n),
+                'file_url': f'https://example.supabase.co/storage/v1/object/public/media/{article_id}/{n}',
+                'file_size': file_size,
+                'created_at': published.isoformat() + '+09:00',
+            })
+        if attachments:
+            media_by_article[article_id] = attachments
+
+    # 一覧と同じく新しい順に並べる
+    articles.reverse()
+    return articles, media_by_article
+
+
+def calendar_subset(articles: List[Dict[str, Any]], months: List[tuple]) -> List[Dict[str, Any]]:
+    """
+    カレンダーの表示期間に重なる記事（Supabase側の絞り込みと同じ条件）
+    """
+    first_year, first_month = months[0]
+    window_start = date(first_year, first_month, 1).isoformat()
+    window_end = (date(months[-1][0], months[-1][1], 28) + timedelta(days=5)).isoformat()
+    return [
+        a for a in articles
+        if a['show_in_calendar'] and a['event_start_datetime']
+        and a['event_start_datetime'][:10] < window_end
+        and (a['event_end_datetime'] or a['event_start_datetime'])[:10] >= window_start
+    ]
+
+
+def build_search_index(detail: Any, articles: List[Any]) -> Dict[str, str]:
+    """
+    全記事から検索インデックスを作る（文書番号は古い記事から振る）
+    """
+    shard_count = detail.SEARCH_SHARD_COUNT
+    documents = [detail.SearchDocument(doc, a, shard_count) for doc, a in enumerate(reversed(articles))]
+    return detail.build_index(documents, shard_count)
+
+
+def publish_to_search_index(detail: Any, files: Dict[str, str], article: Any, doc: int) -> Dict[str, str]:
+    """
+    1記事を公開したときのインデックスの更新（tail.json と文書チャンクだけを書き換える）
+    """
+    document = detail.SearchDocument(doc, article, detail.SEARCH_SHARD_COUNT)
+    return detail.update_index(
+        [(None, document)],
+        lambda paths: {path: files.get(path) for path in paths},
+        detail.SEARCH_SHARD_COUNT,
+        detail.SEARCH_TAIL_MAX_DOCS
+    )
+
+
+def search_index_size(files: Dict[str, str]) -> Dict[str, Any]:
+    """
+    検索インデックスの大きさ（gzip はサイトへ公開するときと同じ圧縮）
+    """
+    shard_sizes = [len(c.encode('utf-8')) for p, c in files.items() if '/shards/' in p]
+    return {
+        'files': len(files),
+        'total_kib': round(sum(len(c.encode('utf-8')) for c in files.values()) / 1024, 1),
+        'total_gzip_kib': round(sum(
+            len(gzip.compress(c.encode('utf-8'), compresslevel=9, mtime=0)) for c in files.values()
+        ) / 1024, 1),
+        'largest_shard_kib': round(max(shard_sizes, default=0) / 1024, 1),
+    }
+
+
+def build_stylesheet(module: Any, pages: List[str]) -> Dict[str, str]:
+    """
+    ページで使われているクラスを集めてスタイルシートを作る（マニフェストがない初回と同じ処理）
+    """
+    stylesheet = module.SiteStylesheet(None)
+    for html in pages:
+        stylesheet.add(html)
+    return stylesheet.files()
+
+
+def stylesheet_size(files: Dict[str, str]) -> Dict[str, Any]:
+    """
+    スタイルシートの大きさ（最小化後・gzip後）
+    """
+    css = next(content for path, content in files.items() if path.endswith('.css')).encode('utf-8')
+    return {
+        'kib': round(len(css) / 1024, 1),
+        'gzip_kib': round(len(gzip.compress(css)) / 1024, 1),
+    }
+
+
+def derived_images(detail: Any, rows: List[Dict[str, Any]], media_by_article: Dict[str, List[Dict[str, Any]]]) -> Any:
+    """
+    すべての画像の派生ファイルが作成済みの場合のマニフェスト（srcset 付きのHTMLの計測用）
+    """
+    urls = [row['featured_image_url'] for row in rows if row['featured_image_url']]
+    urls.extend(media['file_url'] for medias in media_by_article.values() for media in medias)
+    sources = {
+        url: {'hash': hashlib.sha256(url.encode('utf-8')).hexdigest()[:16], 'width': 1600, 'height': 1200,
+              'widths': [240, 480, 960, 1440]}
+        for url in urls
+    }
+    return detail.DerivedImages(json.dumps({'version': 1, 'sources': sources}))
+
+
+def render_renditions(derivatives: Any, data: bytes) -> Dict[str, bytes]:
+    """
+    1枚の写真から派生ファイルを作る（Pillow がある場合のみ計測）
+    """
+    image, width, height = derivatives.open_source(data)
+    return derivatives.render_renditions(image, width, height, derivatives.rendition_widths(width))
+
+
+def sample_photo(derivatives: Any) -> bytes:
+    """
+    計測用の写真（3000x2000 のグラデーションのJPEG）
+    """
+    image = derivatives.Image.linear_gradient('L').resize((3000, 2000)).convert('RGB')
+    out = io.BytesIO()
+    image.save(out, 'JPEG', quality=90)
+    return out.getvalue()
+
+
+def for_each(func: Callable[[Any], Any], items: Any) -> None:
+    """
+    1件ずつレンダリングして結果は保持しない（ピークメモリに全件分の出力を含めないため）
+    """
+    for item in items:
+        func(item)
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """
+    処理時間（repeat 回）とピークメモリ（tracemalloc を有効にした1回）を計測
+    """
+    func()  # ウォームアップ（テンプレートのコンパイルなど）
+
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'min_ms': round(min(durations), 3),
+        'median_ms': round(statistics.median(durations), 3),
+        'max_ms': round(max(durations), 3),
+        'peak_memory_kib': round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(sizes: List[int], repeat: int) -> Dict[str, Any]:
+    """
+    全レンダラーをコーパスのサイズごとに計測
+    """
+    news = load_lambda_module('news_page_generator_lambda', 'news_page_generator')
+    detail = load_lambda_module('news_detail_page_generator_lambda', 'news_detail_page_generator')
+
+    with open(TEMPLATE_PATH, encoding='utf-8') as f:
+        template = f.read()
+
+    derivatives = sys.modules[detail.DerivedImages.__module__]
+    photo = sample_photo(derivatives) if derivatives.Image is not None else None
+
+    months = news.calendar_months(BASE_DATE, news.CALENDAR_MONTHS)
+    results = {}
+    for size in sizes:
+        rows, media_by_article = make_corpus(size)
+        calendar_rows = calendar_subset(rows, months)
+        print(f'コーパス {size}件: カレンダー対象 {len(calendar_rows)}件, '
+              f'添付あり {len(media_by_article)}件')
+
+        # 各 Lambda と同じく取得時に1回だけモデルへ変換する
+        articles = [news.Article(row) for row in rows]
+        calendar_articles = [news.Article(row) for row in calendar_rows]
+        attachment_lists = [
+            [detail.Media(media) for media in media_by_article.get(row['id'], [])] for row in rows
+        ]
+
+        # 前回の出力がある場合（差分の書き直し）の計測用
+        previous_sitemap, _ = news.build_sitemap(articles, None)
+        search_files = build_search_index(detail, articles)
+        new_article = articles[0]
+        images = derived_images(detail, rows, media_by_article)
+        stylesheet_pages = [news.generate_news_html(BASE_DATE, calendar_articles, articles)] + [
+            html for path, html in news.build_archive_files(articles, None)[0].items() if path.endswith('.html')
+        ]
+
+        cases = {
+            'parse_articles': lambda: for_each(news.Article, rows),
+            'generate_news_html': lambda: news.generate_news_html(BASE_DATE, calendar_articles, articles),
+            'generate_news_page_html': lambda: detail.generate_news_page_html(BASE_DATE, calendar_articles, articles),
+            'build_archive_files': lambda: news.build_archive_files(articles, None),
+            'build_sitemap': lambda: news.build_sitemap(articles, None),
+            'patch_sitemap': lambda: news.build_sitemap(articles, previous_sitemap),
+            'build_feed': lambda: news.build_feed(articles, None),
+            'build_search_index': lambda: build_search_index(detail, articles),
+            'publish_to_search_index': lambda: publish_to_search_index(detail, search_files, new_article, size),
+            'generate_detail_html': lambda: for_each(
+                lambda pair: detail.generate_detail_html(template, pair[0], pair[1]),
+                zip(articles, attachment_lists)
+            ),
+            'generate_attachments_html': lambda: for_each(detail.generate_attachments_html, attachment_lists),
+            'extract_description': lambda: for_each(lambda a: detail.extract_description(a.content), articles),
+            'extract_description_large_table': lambda: detail.extract_description(LARGE_TABLE_CONTENT),
+            'generate_news_html_derived_images': lambda: news.generate_news_html(
+                BASE_DATE, calendar_articles, articles, images
+            ),
+            'generate_attachments_html_derived_images': lambda: for_each(
+                lambda attachments: detail.generate_attachments_html(attachments, images), attachment_lists
+            ),
+        }
+        cases['build_stylesheet'] = lambda: build_stylesheet(news, stylesheet_pages)
+        if photo is not None:
+            cases['render_renditions'] = lambda: render_renditions(derivatives, photo)
+
+        size_results = {}
+        for name, func in cases.items():
+            result = measure(func, repeat)
+            # 記事ごとに処理するレンダラーは1記事あたりの時間も記録
+            if name in (
+                'parse_articles', 'generate_detail_html', 'generate_attachments_html', 'build_archive_files',
+                'build_search_index', 'generate_attachments_html_derived_images', 'extract_description'
+            ):
+                result['per_article_us'] = round(result['median_ms'] * 1000 / size, 2)
+            size_results[name] = result
+            print(f'  {name}: {result}')
+        size_results['search_index_size'] = {
+            **search_index_size(search_files),
+            'files_per_publish': len(publish_to_search_index(detail, search_files, new_article, size)),
+        }
+        print(f'  search_index_size: {size_results["search_index_size"]}')
+        size_results['stylesheet_size'] = stylesheet_size(build_stylesheet(news, stylesheet_pages))
+        print(f'  stylesheet_size: {size_results["stylesheet_size"]}')
+        results[str(size)] = size_results
+
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': current_git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'template_sha1': hashlib.sha1(template.encode('utf-8')).hexdigest(),
+        'base_date': BASE_DATE.isoformat(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def current_git_commit() -> Any:
+    """
+    計測したコミット（git が使えない場合は None）
+    """
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='ページ生成処理のベンチマーク')
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help='コーパスの記事数（カンマ区切り）')
+    parser.add_argument('--repeat', type=int, default=3, help='計測の繰り返し回数')
+    parser.add_argument('--output', default='render_benchmark.json', help='結果を保存するJSONファイル')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    report = run_benchmarks(sizes, max(1, args.repeat))
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f'結果を保存しました: {args.output}')
+
+
+if __name__ == '__main__':
+    main()
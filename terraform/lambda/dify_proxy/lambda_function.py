@@ -8,7 +8,11 @@ import urllib.request
 import urllib.error
 from typing import Dict, Any
 
+import http_pool
+import metrics
 
+
+@metrics.handler('dify_proxy')
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Lambda ハンドラー関数
@@ -130,8 +134,8 @@ def call_dify_api(title: str, summary: str, date: str, date_to: str = None, intr
     )
 
     try:
-        with urllib.request.urlopen(req, timeout=30) as response:
-            response_data = json.loads(response.read().decode('utf-8'))
+        with metrics.phase('dify_call', len(data)) as phase, http_pool.urlopen(req, timeout=30) as response:
+            response_data = json.loads(phase.read(response).decode('utf-8'))
 
             # レスポンスからtext350とtext80を抽出
             if 'data' in response_data and 'outputs' in response_data['data']:
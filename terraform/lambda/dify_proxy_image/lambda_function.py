@@ -11,7 +11,11 @@ import uuid
 import boto3
 from typing import Dict, Any
 
+import http_pool
+import metrics
 
+
+@metrics.handler('dify_proxy_image')
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Lambda ハンドラー関数
@@ -141,8 +145,8 @@ def call_dify_api(request: str) -> Dict[str, Any]:
     )
 
     try:
-        with urllib.request.urlopen(req, timeout=60) as response:
-            response_data = json.loads(response.read().decode('utf-8'))
+        with metrics.phase('dify_call', len(data)) as phase, http_pool.urlopen(req, timeout=60) as response:
+            response_data = json.loads(phase.read(response).decode('utf-8'))
             print(f"Dify APIレスポンス: {json.dumps(response_data, ensure_ascii=False)}")
 
             # レスポンスからtext350とtext80を抽出
@@ -0,0 +1,15 @@
+#!/bin/sh
+# Pillow のレイヤーの内容を build/python に作る（terraform apply 時に main.tf から実行される）
+# 実行する環境に関係なく、Lambda ランタイム（python3.11 / x86_64）用のホイールを取得する
+set -eu
+cd "$(dirname "$0")"
+rm -rf build
+python3 -m pip install \
+  --requirement requirements.txt \
+  --target build/python \
+  --platform manylinux2014_x86_64 \
+  --implementation cp \
+  --python-version 3.11 \
+  --only-binary=:all: \
+  --no-compile \
+  --quiet
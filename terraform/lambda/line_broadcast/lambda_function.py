@@ -8,6 +8,9 @@ import urllib.parse
 import urllib.request
 from typing import Dict, List, Optional
 
+import http_pool
+import metrics
+
 LOGGER = logging.getLogger()
 LOGGER.setLevel(logging.INFO)
 
@@ -56,8 +59,8 @@ def _check_duplicate(article_id: str) -> bool:
     req = urllib.request.Request(url, headers=headers, method='GET')
 
     try:
-        with urllib.request.urlopen(req, timeout=10) as response:
-            data = json.loads(response.read().decode('utf-8'))
+        with metrics.phase('supabase_fetch') as phase, http_pool.urlopen(req, timeout=10) as response:
+            data = json.loads(phase.read(response).decode('utf-8'))
             if data and len(data) > 0:
                 LOGGER.info(f"LINE notification already sent for article {article_id}")
                 return True
@@ -100,7 +103,7 @@ def _record_notification(article_id: str, message: str, response_data: Dict) ->
     req = urllib.request.Request(endpoint, data=payload, headers=headers, method='POST')
 
     try:
-        with urllib.request.urlopen(req, timeout=10) as response:
+        with metrics.phase('supabase_write', len(payload)), http_pool.urlopen(req, timeout=10) as response:
             LOGGER.info(f"Notification recorded for article {article_id}")
     except urllib.error.HTTPError as e:
         error_body = e.read().decode('utf-8')
@@ -170,8 +173,8 @@ def _broadcast_to_line(message: str) -> Dict[str, str]:
     )
 
     try:
-        with urllib.request.urlopen(request, timeout=10) as response:
-            response_body = response.read().decode("utf-8")
+        with metrics.phase("line_broadcast", len(payload)) as phase, http_pool.urlopen(request, timeout=10) as response:
+            response_body = phase.read(response).decode("utf-8")
             return {
                 "status_code": str(response.getcode()),
                 "body": response_body if response_body else "{}",
@@ -225,6 +228,7 @@ def _extract_request_data(event: Dict) -> Dict:
     }
 
 
+@metrics.handler('line_broadcast')
 def lambda_handler(event, context):
     LOGGER.info("Received event: %s", json.dumps(event))
 
@@ -12,6 +12,9 @@ import urllib.error
 import urllib.request
 from typing import Any, Dict, Optional
 
+import http_pool
+import metrics
+
 LOGGER = logging.getLogger()
 LOGGER.setLevel(logging.INFO)
 
@@ -107,8 +110,8 @@ def call_dify_api(query: str, user_id: str, conversation_id: str = "") -> Dict[s
     )
 
     try:
-        with urllib.request.urlopen(req, timeout=25) as response:
-            response_data = json.loads(response.read().decode('utf-8'))
+        with metrics.phase('dify_call', len(data)) as phase, http_pool.urlopen(req, timeout=25) as response:
+            response_data = json.loads(phase.read(response).decode('utf-8'))
             LOGGER.info(f"Dify API response: {json.dumps(response_data, ensure_ascii=False)[:500]}")
 
             # 回答が空の場合はデフォルトメッセージを使用
@@ -187,7 +190,7 @@ def reply_to_line(reply_token: str, message: str) -> bool:
     )
 
     try:
-        with urllib.request.urlopen(req, timeout=10) as response:
+        with metrics.phase('line_reply', len(payload)), http_pool.urlopen(req, timeout=10) as response:
             LOGGER.info(f"LINE reply success: {response.getcode()}")
             return True
     except urllib.error.HTTPError as e:
@@ -225,8 +228,8 @@ def get_conversation_id(line_user_id: str) -> Optional[str]:
     req = urllib.request.Request(url, headers=headers, method='GET')
 
     try:
-        with urllib.request.urlopen(req, timeout=5) as response:
-            data = json.loads(response.read().decode('utf-8'))
+        with metrics.phase('supabase_fetch') as phase, http_pool.urlopen(req, timeout=5) as response:
+            data = json.loads(phase.read(response).decode('utf-8'))
             if data and len(data) > 0:
                 return data[0].get('dify_conversation_id')
             return None
@@ -283,12 +286,13 @@ def save_conversation(
     req = urllib.request.Request(endpoint, data=data, headers=headers, method='POST')
 
     try:
-        with urllib.request.urlopen(req, timeout=5) as response:
+        with metrics.phase('supabase_write', len(data)), http_pool.urlopen(req, timeout=5) as response:
             LOGGER.info(f"Conversation saved: {message_type}")
     except Exception as e:
         LOGGER.error(f"Failed to save conversation: {str(e)}")
 
 
+@metrics.handler('line_webhook')
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Lambda ハンドラー関数
@@ -0,0 +1,120 @@
+"""
+記事・添付ファイルのモデル
+Supabase（PostgREST）の行を取得時に1回だけ変換する。日時はJSTに正規化し、
+表示に使う日付・日本語の日付表記・時刻の有無をここで計算しておくため、
+各レンダラーは文字列を解析し直さずに属性を参照するだけで済む
+
+news_page_generator と news_detail_page_generator に同じファイルを置いている（変更時は両方を更新）
+"""
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+JST = timezone(timedelta(hours=9))
+WEEKDAYS_JP = ['月', '火', '水', '木', '金', '土', '日']
+
+
+def parse_jst(value: Optional[str]) -> Optional[datetime]:
+    """
+    ISO形式の日時文字列をJSTのdatetimeに変換（解析できない場合は None）
+    タイムゾーンのない値（管理画面が保存する「YYYY-MM-DD HH:MM:SS」）はJSTとみなす
+    """
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (TypeError, ValueError):
+        return None
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=JST)
+    return dt.astimezone(JST)
+
+
+def format_date_jp(value: date) -> str:
+    """
+    日付を「YYYY年M月D日（曜）」形式に変換
+    """
+    return f"{value.year}年{value.month}月{value.day}日（{WEEKDAYS_JP[value.weekday()]}）"
+
+
+class Media:
+    """
+    添付ファイル（media テーブルの1行）
+    probed_at があれば mime_type・width・height はファイルの先頭から調べた値（なければアップロード時の値）
+    """
+
+    __slots__ = ('id', 'article_id', 'file_name', 'file_url', 'file_size', 'mime_type', 'width', 'height', 'probed_at')
+
+    def __init__(self, row: Dict[str, Any]):
+        self.id = row.get('id')
+        self.article_id = row.get('article_id')
+        self.file_name = row.get('file_name') or ''
+        self.file_url = row.get('file_url') or ''
+        self.file_size = row.get('file_size') or 0
+        self.mime_type = row.get('mime_type')
+        self.width = row.get('width')
+        self.height = row.get('height')
+        self.probed_at = row.get('probed_at')
+
+
+class Article:
+    """
+    記事（articles テーブルの1行）
+    取得したカラムだけが値を持ち、それ以外は None になる
+    """
+
+    __slots__ = (
+        'id', 'slug', 'title', 'content', 'category', 'status', 'featured_image_url',
+        'meta_title', 'meta_description', 'meta_keywords',
+        'generate_article_page', 'line_published', 'x_published',
+        'published_at', 'updated_at',
+        'published', 'updated', 'event_start', 'event_end', 'event_start_date', 'event_end_date',
+        'has_start_time', 'has_end_time', 'published_date_jp', 'list_date_jp',
+    )
+
+    def __init__(self, row: Dict[str, Any]):
+        self.id = row.get('id')
+        self.slug = row.get('slug') or self.id
+        self.title = row.get('title') or ''
+        self.content = row.get('content') or ''
+        self.category = row.get('category')
+        self.status = row.get('status')
+        self.featured_image_url = row.get('featured_image_url')
+        self.meta_title = row.get('meta_title')
+        self.meta_description = row.get('meta_description')
+        self.meta_keywords = row.get('meta_keywords')
+        self.generate_article_page = bool(row.get('generate_article_page'))
+        self.line_published = bool(row.get('line_published'))
+        self.x_published = bool(row.get('x_published'))
+        # 元の文字列（<time datetime> とマニフェストの比較に使う）
+        self.published_at = row.get('published_at') or row.get('created_at') or ''
+        self.updated_at = row.get('updated_at')
+
+        self.published = parse_jst(self.published_at)
+        self.updated = parse_jst(self.updated_at)
+        self.event_start = parse_jst(row.get('event_start_datetime'))
+        self.event_end = parse_jst(row.get('event_end_datetime'))
+        self.event_start_date = self.event_start.date() if self.event_start else None
+        self.event_end_date = self.event_end.date() if self.event_end else None
+
+        # 時刻の有無: DBのフラグが立っていればそれに従い、なければ 00:00始まり/23:59終わりの慣例から判定
+        start, end = self.event_start, self.event_end
+        self.has_start_time = bool(row.get('has_start_time')) or bool(
+            start and (start.hour != 0 or start.minute != 0)
+        )
+        self.has_end_time = bool(row.get('has_end_time')) or bool(
+            end and not ((end.hour == 23 and end.minute == 59) or (end.hour == 0 and end.minute == 0))
+        )
+
+        self.published_date_jp = format_date_jp(self.published) if self.published else self.published_at
+        # 一覧に表示する日付（イベント開始日を優先）
+        if self.event_start:
+            self.list_date_jp = format_date_jp(self.event_start)
+        else:
+            self.list_date_jp = self.published_date_jp
+
+    @property
+    def detail_path(self) -> str:
+        """
+        詳細ページのパス
+        """
+        return f'news/{self.slug}.html'
@@ -0,0 +1,98 @@
+"""
+記事詳細ページの「前の記事」「次の記事」「同じカテゴリの記事」
+公開日時の順（published_at, id）に並べた索引を実行ごとに1回作り、各記事の前後は二分探索で引く（1記事あたり O(log n)）
+同じカテゴリの記事は、カテゴリごとの並びで前後に近い記事から選ぶ
+"""
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from article_model import Article
+
+
+# 同じカテゴリの記事として表示する件数
+RELATED_ARTICLES_COUNT = 3
+
+
+def order_key(article: Article) -> Tuple[str, str]:
+    """
+    並び順のキー（公開日時が同じ記事はIDの順）
+    """
+    return article.published_at or '', article.id or ''
+
+
+class ArticleOrder:
+    """
+    公開済み記事の並び（古い順）とカテゴリごとの並び
+    """
+
+    def __init__(self, articles: Iterable[Article]):
+        self._articles = sorted(articles, key=order_key)
+        self._keys = [order_key(a) for a in self._articles]
+        self._categories: Dict[str, Tuple[List[Tuple[str, str]], List[Article]]] = {}
+        for article, key in zip(self._articles, self._keys):
+            keys, items = self._categories.setdefault(article.category or 'notice', ([], []))
+            keys.append(key)
+            items.append(article)
+
+    def __len__(self) -> int:
+        return len(self._articles)
+
+    def neighbours(self, article: Article) -> Tuple[Optional[Article], Optional[Article]]:
+        """
+        前の記事（1つ古い記事）と次の記事（1つ新しい記事）。索引にない記事も公開日時の位置で引く
+        """
+        key = order_key(article)
+        before = bisect_left(self._keys, key)
+        after = bisect_right(self._keys, key)
+        prev_article = self._articles[before - 1] if before > 0 else None
+        next_article = self._articles[after] if after < len(self._articles) else None
+        return prev_article, next_article
+
+    def related(self, article: Article, exclude: Iterable[Optional[Article]] = ()) -> List[Article]:
+        """
+        同じカテゴリで公開日時が近い記事（RELATED_ARTICLES_COUNT 件まで、新しい順）
+        前後の記事として表示する記事は exclude で除く
+        """
+        keys, items = self._categories.get(article.category or 'notice', ([], []))
+        key = order_key(article)
+        skip = {a.id for a in exclude if a is not None}
+        skip.add(article.id)
+
+        older = bisect_left(keys, key) - 1
+        newer = bisect_right(keys, key)
+        related = []
+        # 新しい側と古い側から交互に、近い記事を選ぶ
+        while len(related) < RELATED_ARTICLES_COUNT and (older >= 0 or newer < len(items)):
+            if newer < len(items):
+                if items[newer].id not in skip:
+                    related.append(items[newer])
+                newer += 1
+            if older >= 0 and len(related) < RELATED_ARTICLES_COUNT:
+                if items[older].id not in skip:
+                    related.append(items[older])
+                older -= 1
+        return sorted(related, key=order_key, reverse=True)
+
+    def navigation(self, article: Article) -> Tuple[Optional[Article], Optional[Article], List[Article]]:
+        """
+        詳細ページに表示する (前の記事, 次の記事, 同じカテゴリの記事)
+        """
+        prev_article, next_article = self.neighbours(article)
+        return prev_article, next_article, self.related(article, (prev_article, next_article))
+
+    def pages_showing(self, article: Article) -> Set[str]:
+        """
+        article を前後の記事・同じカテゴリの記事として表示しうる記事のID（表示が変わるかは再生成して判定する）
+        """
+        prev_article, next_article = self.neighbours(article)
+        ids = {a.id for a in (prev_article, next_article) if a is not None}
+
+        # 同じカテゴリの記事は前後の記事を除いて選ぶため、除かれる2件分だけ広く見る
+        keys, items = self._categories.get(article.category or 'notice', ([], []))
+        key = order_key(article)
+        reach = RELATED_ARTICLES_COUNT + 2
+        start = max(0, bisect_left(keys, key) - reach)
+        end = min(len(items), bisect_right(keys, key) + reach)
+        ids.update(a.id for a in items[start:end])
+        ids.discard(article.id)
+        return ids
@@ -0,0 +1,154 @@
+"""
+GitHub へのコミット（Git Data API）
+1回の実行で変更する全ファイルをツリー → コミット → ブランチの参照の更新で1コミットにまとめる
+（Contents API のようにファイルごとにコミットしないため、途中で失敗しても一部のファイルだけが更新されることはない）
+
+参照は fast-forward でだけ進める。他の実行が先にコミットして参照の更新が競合した場合は、
+新しい先頭の上にコミットを作り直して再試行する。先にコミットされた変更に同じファイルが含まれていれば、
+呼び出し元の rebase で新しい先頭の内容から全ファイルを作り直す（マニフェストなどの変更を失わないため）
+GitHubの内容を読んで作るファイルは、読む前に branch_head で取得した先頭を parent_sha に渡す
+（読んだ後に取得した先頭の上にコミットすると、その間に他の実行がコミットした変更を上書きしてしまう）
+API の一時的なエラーとレート制限は http_retry で再試行する
+
+news_page_generator と news_detail_page_generator に同じファイルを置いている（変更時は両方を更新）
+"""
+import json
+import os
+import random
+import urllib.error
+import urllib.request
+from typing import Any, Callable, Dict, Optional, Set
+
+import http_retry
+
+# GitHub API のURL（テストではローカルの偽のサーバーを指す）
+GITHUB_API_URL = os.environ.get('GITHUB_API_URL', 'https://api.github.com')
+
+# 参照の更新が競合した場合の試行回数と待ち時間（試行ごとに倍にする）
+COMMIT_MAX_ATTEMPTS = 5
+COMMIT_RETRY_BASE_SECONDS = 0.5
+# 比較APIが返すファイル数の上限（これ以上変わっている場合は全ファイルが競合したものとみなす）
+COMPARE_MAX_FILES = 300
+
+
+def github_api_request(token: str, method: str, url: str, body: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    GitHub REST API を呼び出してJSONを返す
+    """
+    headers = {
+        'Authorization': f'token {token}',
+        'Accept': 'application/vnd.github.v3+json',
+        'Content-Type': 'application/json'
+    }
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    req = urllib.request.Request(url, data=data, headers=headers, method=method)
+    # ツリー・コミットは内容から決まり、参照は fast-forward でだけ進めるため、どのリクエストも送り直してよい
+    with http_retry.urlopen(req, timeout=30, idempotent=True) as response:
+        return json.loads(response.read().decode('utf-8'))
+
+
+def branch_head(token: str, repo: str, branch: str) -> str:
+    """
+    ブランチの先頭のコミットSHA
+    """
+    ref = github_api_request(token, 'GET', f"{GITHUB_API_URL}/repos/{repo}/git/ref/heads/{branch}")
+    return ref['object']['sha']
+
+
+def changed_paths(token: str, repo: str, base_sha: str, head_sha: str) -> Optional[Set[str]]:
+    """
+    base_sha から head_sha までに変更されたファイルのパス（分からない場合は None）
+    """
+    try:
+        compare = github_api_request(
+            token, 'GET', f"{GITHUB_API_URL}/repos/{repo}/compare/{base_sha}...{head_sha}"
+        )
+    except urllib.error.HTTPError as e:
+        print(f'コミットの比較に失敗: {e.code}')
+        return None
+    files = compare.get('files') or []
+    if len(files) >= COMPARE_MAX_FILES:
+        return None
+    paths = set()
+    for f in files:
+        paths.add(f['filename'])
+        if f.get('previous_filename'):
+            paths.add(f['previous_filename'])
+    return paths
+
+
+def commit_files_to_github(
+    token: str,
+    repo: str,
+    branch: str,
+    files: Dict[str, Optional[str]],
+    commit_message: str,
+    rebase: Optional[Callable[[], Dict[str, Optional[str]]]] = None,
+    parent_sha: Optional[str] = None
+) -> Optional[str]:
+    """
+    複数ファイルをGit Data API で1コミットにまとめてプッシュ
+    ツリーに内容を直接含めるため、ファイルごとのblob作成リクエストは発生しない
+    内容が None のファイルは削除する。変更がない場合はコミットせず None を返す
+
+    参照の更新が競合した場合は新しい先頭の上で再試行する。先にコミットされた変更に同じファイルがあり
+    rebase が指定されていれば、rebase() が返す内容で files を置き換える（呼び出し元は置き換え後の files を公開に使う）
+    rebase がない場合は同じファイルもこの実行の内容で上書きする
+    parent_sha はファイルを作る前に取得した先頭（省略時は現在の先頭の上にコミットする）
+    """
+    api_base = f"{GITHUB_API_URL}/repos/{repo}/git"
+    if parent_sha is None:
+        parent_sha = branch_head(token, repo, branch)
+
+    for attempt in range(1, COMMIT_MAX_ATTEMPTS + 1):
+        parent_commit = github_api_request(token, 'GET', f"{api_base}/commits/{parent_sha}")
+        base_tree_sha = parent_commit['tree']['sha']
+        tree = github_api_request(token, 'POST', f"{api_base}/trees", {
+            'base_tree': base_tree_sha,
+            'tree': [
+                {'path': path, 'mode': '100644', 'type': 'blob', 'content': content}
+                if content is not None else
+                {'path': path, 'mode': '100644', 'type': 'blob', 'sha': None}
+                for path, content in files.items()
+            ]
+        })
+
+        # ツリーが変わらなければ空コミットを作らない
+        if tree['sha'] == base_tree_sha:
+            print(f'変更なしのためコミットをスキップ: {len(files)}件')
+            return None
+
+        commit = github_api_request(token, 'POST', f"{api_base}/commits", {
+            'message': commit_message,
+            'tree': tree['sha'],
+            'parents': [parent_sha]
+        })
+
+        try:
+            github_api_request(token, 'PATCH', f"{api_base}/refs/heads/{branch}", {
+                'sha': commit['sha'],
+                'force': False
+            })
+            return commit['sha']
+        except urllib.error.HTTPError as e:
+            # 422（fast-forward でない）・409（競合）以外のエラーと、最後の試行はそのまま失敗にする
+            if e.code not in (409, 422) or attempt == COMMIT_MAX_ATTEMPTS:
+                raise
+            # 待ってから新しい先頭を取得する（同時に競合した実行が続けて競合しないよう待ち時間を揺らす）
+            # 待つと Lambda の期限を過ぎる場合は競合のエラーのまま失敗にする
+            delay = COMMIT_RETRY_BASE_SECONDS * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+            if not http_retry.sleep_before_retry(delay):
+                raise
+
+        head_sha = branch_head(token, repo, branch)
+        if head_sha == parent_sha:
+            raise Exception(f'ブランチの参照を更新できません: {branch}')
+
+        paths = changed_paths(token, repo, parent_sha, head_sha)
+        conflicts = set(files) if paths is None else paths & set(files)
+        print(f'参照の更新が競合: {parent_sha[:7]} → {head_sha[:7]}（同じファイル {len(conflicts)}件, 試行{attempt}回目）')
+        parent_sha = head_sha
+        if conflicts and rebase is not None:
+            rebased = dict(rebase())
+            files.clear()
+            files.update(rebased)
@@ -0,0 +1,222 @@
+"""
+Supabase・GitHub への呼び出しの再試行（一時的なエラーとレート制限）
+PostgREST の 502 や GitHub のセカンダリレート制限（403 / 429）が1回返っただけで公開全体が失敗しないよう、
+http_pool.urlopen を包んで指数バックオフ（ジッターあり）で再試行する
+
+- 再試行するのは冪等なリクエストのみ（GET / HEAD と、呼び出し側が idempotent=True を指定したもの）
+  POST などは、送り直しても結果が変わらない場合（内容から決まるGitHubのツリー・コミットの作成、
+  fast-forward のみの参照の更新、同じ値を書き込むRPC）に呼び出し側が指定する
+- Retry-After（秒またはHTTP日付）と、残り回数が 0 の場合の X-RateLimit-Reset（UNIX時刻）があれば、その時刻まで待つ
+- set_deadline で Lambda の残り時間から期限を決める。期限までに終わらない待ちはせずに元のエラーを返し、
+  各試行の timeout も期限までに切り詰める
+- 呼び出しは metrics の段階（supabase_fetch / supabase_write / github_get / github_write）として計る
+  所要時間は応答のヘッダーを受け取るまで（再試行の待ち時間を含む）、データ量は送った本文と読んだ本文の合計
+
+news_page_generator と news_detail_page_generator に同じファイルを置いている（変更時は両方を更新）
+"""
+import io
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+import http_pool
+import metrics
+
+RETRY_MAX_ATTEMPTS = 4
+# 待ち時間は試行ごとに倍にし（上限 RETRY_MAX_SECONDS）、0 からその値までの間で揺らす
+RETRY_BASE_SECONDS = 0.5
+RETRY_MAX_SECONDS = 8
+# サーバーが指定した待ち時間がこれより長い場合は待たずに失敗させる
+RETRY_AFTER_MAX_SECONDS = 60
+# Lambda のタイムアウトまでに残しておく時間（失敗を記録して応答を返すため）
+DEADLINE_MARGIN_SECONDS = 3
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+# 期限（time.monotonic() の値。None は期限なし）
+_deadline: Optional[float] = None
+_stats = {'retried': 0, 'gave_up': 0}
+_lock = threading.Lock()
+
+
+def set_deadline(context: Any) -> None:
+    """
+    Lambda の残り時間から期限を決め、再試行の集計をリセットする（context がない場合は期限なし）
+    """
+    global _deadline
+    get_remaining = getattr(context, 'get_remaining_time_in_millis', None)
+    _deadline = (
+        time.monotonic() + get_remaining() / 1000 - DEADLINE_MARGIN_SECONDS if get_remaining else None
+    )
+    _stats.update(retried=0, gave_up=0)
+
+
+def remaining_seconds() -> Optional[float]:
+    """
+    期限までの残り秒数（期限がない場合は None）
+    """
+    return None if _deadline is None else _deadline - time.monotonic()
+
+
+def within_deadline(seconds: float) -> bool:
+    """
+    seconds 待っても期限を過ぎないか
+    """
+    remaining = remaining_seconds()
+    return remaining is None or seconds < remaining
+
+
+def sleep_before_retry(seconds: float) -> bool:
+    """
+    再試行の前に待つ。待つと期限を過ぎる場合は待たずに False を返す
+    """
+    if not within_deadline(seconds):
+        return False
+    time.sleep(seconds)
+    return True
+
+
+def retry_stats() -> Dict[str, int]:
+    """
+    この実行で再試行した回数と、再試行を諦めた回数
+    """
+    with _lock:
+        return dict(_stats)
+
+
+def backoff_seconds(attempt: int) -> float:
+    """
+    attempt 回目の失敗の後に待つ時間（ジッターあり）
+    """
+    return random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** attempt))
+
+
+def server_delay(headers: Any) -> Optional[float]:
+    """
+    サーバーが指定した再試行までの秒数（Retry-After、残り回数が 0 の場合の X-RateLimit-Reset）
+    """
+    if headers is None:
+        return None
+    retry_after = headers.get('Retry-After')
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(0.0, (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+    reset = headers.get('X-RateLimit-Reset')
+    if reset and headers.get('X-RateLimit-Remaining') == '0':
+        try:
+            return max(0.0, int(reset) - time.time())
+        except ValueError:
+            pass
+    return None
+
+
+def _rate_limited(error: urllib.error.HTTPError, body: bytes) -> bool:
+    """
+    GitHub のレート制限による 403 か（それ以外の 403 は権限のエラーのため再試行しない）
+    """
+    headers = error.headers
+    return bool(
+        headers.get('Retry-After')
+        or headers.get('X-RateLimit-Remaining') == '0'
+        or b'rate limit' in body.lower()
+    )
+
+
+class MeteredResponse:
+    """
+    応答（読んだ本文の量を段階のデータ量に足す）
+    """
+
+    def __init__(self, response: Any, phase: Any):
+        self._response = response
+        self._phase = phase
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        data = self._response.read() if amt is None else self._response.read(amt)
+        self._phase.add_bytes(len(data))
+        return data
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._response, name)
+
+    def __enter__(self) -> 'MeteredResponse':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._response.close()
+
+
+def request_phase(req: urllib.request.Request) -> str:
+    """
+    呼び出しを計る段階の名前（Supabase の REST API か GitHub の API か、読み取りか書き込みか）
+    """
+    read = req.get_method() in IDEMPOTENT_METHODS
+    if '/rest/v1/' in urllib.parse.urlsplit(req.full_url).path:
+        return 'supabase_fetch' if read else 'supabase_write'
+    return 'github_get' if read else 'github_write'
+
+
+def urlopen(req: urllib.request.Request, timeout: float = 30, idempotent: Optional[bool] = None) -> Any:
+    """
+    http_pool.urlopen と同じように呼び出し、一時的なエラーとレート制限は期限までの範囲で再試行する
+    idempotent を省略した場合は GET / HEAD / OPTIONS のみ再試行する
+    """
+    if not metrics.METRICS_ENABLED:
+        return _urlopen(req, timeout, idempotent)
+    with metrics.phase(request_phase(req), len(req.data or b'')) as phase:
+        return MeteredResponse(_urlopen(req, timeout, idempotent), phase)
+
+
+def _urlopen(req: urllib.request.Request, timeout: float, idempotent: Optional[bool]) -> Any:
+    method = req.get_method()
+    if idempotent is None:
+        idempotent = method in IDEMPOTENT_METHODS
+    target = urllib.parse.urlsplit(req.full_url)
+    target = f'{target.hostname}{target.path}'
+
+    attempt = 0
+    while True:
+        attempt += 1
+        remaining = remaining_seconds()
+        if remaining is not None and remaining <= 0:
+            raise urllib.error.URLError(TimeoutError(f'deadline exceeded: {method} {target}'))
+        try:
+            return http_pool.urlopen(req, timeout=timeout if remaining is None else max(1.0, min(timeout, remaining)))
+        except urllib.error.HTTPError as e:
+            if not idempotent or attempt >= RETRY_MAX_ATTEMPTS or (e.code not in RETRY_STATUS_CODES and e.code != 403):
+                raise
+            # 本文は呼び出し側もエラーの記録に読むため、読み直せるようにして返す
+            body = e.read()
+            error = urllib.error.HTTPError(e.url, e.code, e.reason, e.headers, io.BytesIO(body))
+            if e.code == 403 and not _rate_limited(e, body):
+                raise error
+            reason = f'HTTP {e.code}'
+            delay = max(backoff_seconds(attempt), server_delay(e.headers) or 0)
+        except urllib.error.URLError as e:
+            if not idempotent or attempt >= RETRY_MAX_ATTEMPTS:
+                raise
+            error = e
+            reason = str(e.reason)
+            delay = backoff_seconds(attempt)
+
+        if delay > RETRY_AFTER_MAX_SECONDS or not within_deadline(delay):
+            print(f'期限までに再試行できないため失敗: {method} {target} ({reason}, 待ち時間 {delay:.1f}秒)')
+            with _lock:
+                _stats['gave_up'] += 1
+            raise error
+        print(f'再試行: {method} {target} ({reason}, {delay:.1f}秒後, {attempt}回目の失敗)')
+        with _lock:
+            _stats['retried'] += 1
+        time.sleep(delay)
@@ -2,14 +2,36 @@
 記事詳細ページ生成 Lambda関数
 記事IDと削除フラグを受け取り、詳細ページを生成/削除してGitHubにプッシュ
 """
+import calendar
 import json
 import os
 import base64
+import hashlib
+import time
 import urllib.request
 import urllib.error
 import urllib.parse
-from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+from article_model import Article, Media
+from article_order import ArticleOrder
+from github_commit import GITHUB_API_URL, branch_head, commit_files_to_github, github_api_request
+import http_retry
+from html_text import DESCRIPTION_LENGTH, summarize_html
+from image_derivatives import (
+    ATTACHMENT_SIZES, DERIVED_MANIFEST_PATH, FEATURED_SIZES, THUMBNAIL_SIZES,
+    DerivedImages, responsive_image_html
+)
+from media_probe import probe_media
+import metrics
+from publisher import create_publisher
+from refresh_queue import LocalRefreshQueue, create_refresh_queue
+from search_index import SEARCH_DIR, SearchDocument, build_index, next_doc_number, update_index
+from site_css import CSS_MANIFEST_PATH, STYLESHEET_PLACEHOLDER, SiteStylesheet, link_stylesheet
+from task_plan import TaskPlan
+from template_engine import compile_template
 
 
 # カテゴリ表示名マッピング
@@ -38,10 +60,92 @@ FILE_TYPE_ICONS = {
     'webp': ('image', 'image'),
 }
 
+# ファイルの先頭から調べた形式 → 表示に使う拡張子（ファイル名の拡張子より優先する）
+MIME_TYPE_EXTENSIONS = {
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/gif': 'gif',
+    'image/webp': 'webp',
+    'application/pdf': 'pdf',
+}
+
 # サイトベースURL
 SITE_BASE_URL = "https://asahigaoka-nerima.tokyo"
 
-
+# カレンダーに表示する月数（当月から）
+CALENDAR_MONTHS = int(os.environ.get('CALENDAR_MONTHS', '2'))
+# カレンダーの1日に表示するイベント数（超えた分は「+N件」）
+CALENDAR_MAX_EVENTS_PER_DAY = int(os.environ.get('CALENDAR_MAX_EVENTS_PER_DAY', '2'))
+
+# news.html の生成に必要なカラムのみ取得する（本文 content などは取得しない）
+NEWS_PAGE_COLUMNS = (
+    'id,slug,title,event_start_datetime,event_end_datetime,published_at,created_at,updated_at,'
+    'featured_image_url,generate_article_page,line_published,x_published'
+)
+# お知らせ一覧に表示する件数
+NEWS_LIST_LIMIT = int(os.environ.get('NEWS_LIST_LIMIT', '30'))
+# 過去のお知らせ（news/page/N.html）の1ページあたりの件数（ページ自体は news_page_generator が生成）
+ARCHIVE_PAGE_SIZE = int(os.environ.get('ARCHIVE_PAGE_SIZE', str(NEWS_LIST_LIMIT)))
+NEWS_PAGE_TITLE = 'お知らせ - 東京都練馬区旭丘一丁目町会'
+
+# テンプレートのパス
+TEMPLATE_PATH = 'news/news_template.html'
+
+# 生成済み詳細ページのマニフェスト（記事ID → updated_at / テンプレートSHA / 出力のblob SHA）
+# news_page_generator の定期実行がこれと比較して、古くなったページだけを再生成させる
+DETAIL_MANIFEST_PATH = 'news/manifest.json'
+DETAIL_MANIFEST_VERSION = 1
+
+# 検索インデックスのシャード数（変更した場合は rebuild: "all" で作り直す）
+SEARCH_SHARD_COUNT = 64
+# 検索インデックスのファイルを並行して取得する数
+SEARCH_FETCH_WORKERS = int(os.environ.get('SEARCH_FETCH_WORKERS', '8'))
+# 検索インデックスの tail.json に溜める文書数の上限（超えたらシャードに取り込む）
+SEARCH_TAIL_MAX_DOCS = int(os.environ.get('SEARCH_TAIL_MAX_DOCS', '32'))
+
+# テンプレートキャッシュの有効期間（秒）。期間内はGitHubへの再検証も行わない
+TEMPLATE_CACHE_TTL_SECONDS = int(os.environ.get('TEMPLATE_CACHE_TTL_SECONDS', '300'))
+
+# テンプレートキャッシュ（ウォームコンテナ間で保持される）
+# キー: (repo, branch) / 値: {'content', 'sha', 'etag', 'checked_at'}
+_TEMPLATE_CACHE: Dict[tuple, Dict[str, Any]] = {}
+_TEMPLATE_CACHE_STATS = {'hit': 0, 'revalidated': 0, 'miss': 0}
+
+# GitHubのblobの内容（blob SHA → 内容。SHA は内容から決まるため、ウォームコンテナ間で再検証せずに使う）
+_BLOB_CACHE: Dict[str, str] = {}
+BLOB_CACHE_MAX_ENTRIES = 256
+
+# news.html 更新キュー（未設定の場合は公開/削除のたびに同期的に更新）
+NEWS_REFRESH_QUEUE_URL = os.environ.get('NEWS_REFRESH_QUEUE_URL')
+NEWS_REFRESH_DELAY_SECONDS = int(os.environ.get('NEWS_REFRESH_DELAY_SECONDS', '30'))
+_NEWS_REFRESH_QUEUE = create_refresh_queue(NEWS_REFRESH_QUEUE_URL, NEWS_REFRESH_DELAY_SECONDS)
+
+# サイトのバケットへの直接公開（未設定の場合はGitHub経由のデプロイのみ）
+SITE_BUCKET = os.environ.get('SITE_BUCKET')
+CLOUDFRONT_DISTRIBUTION_ID = os.environ.get('CLOUDFRONT_DISTRIBUTION_ID')
+_SITE_PUBLISHER = create_publisher(SITE_BUCKET, CLOUDFRONT_DISTRIBUTION_ID)
+
+# 1回の実行で作成する画像の派生ファイルの数（残りはマニフェストに記録し、定期実行の再生成で作成）
+IMAGE_DERIVATIVES_PER_RUN = int(os.environ.get('IMAGE_DERIVATIVES_PER_RUN', '5'))
+
+# 一括再生成の設定
+REBUILD_MAX_WORKERS = int(os.environ.get('REBUILD_MAX_WORKERS', '8'))
+REBUILD_COMMIT_BATCH_SIZE = int(os.environ.get('REBUILD_COMMIT_BATCH_SIZE', '100'))
+
+# Supabaseの1リクエストあたりの取得件数（PostgRESTの max-rows 以下）
+SUPABASE_PAGE_SIZE = 1000
+# in.() フィルタ1回あたりのID数（URL長の上限対策）
+SUPABASE_IN_FILTER_CHUNK = 100
+# file_url で media を引くときに1回のリクエストに含めるURL数（URLが長いためIDより少なくする）
+SUPABASE_URL_FILTER_CHUNK = 20
+# 前後の記事・同じカテゴリの記事の索引に使うカラム（本文などは取得しない）
+ARTICLE_ORDER_COLUMNS = 'id,slug,title,category,published_at'
+# 記事と同じリクエストで取得する添付ファイル（PostgREST のリソース埋め込み。削除済みを除き、作成順に並べる）
+ATTACHMENTS_EMBED = 'media(*)'
+ATTACHMENTS_EMBED_PARAMS = 'media.deleted_at=is.null&media.order=created_at.asc'
+
+
+@metrics.handler('news_detail_page_generator')
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Lambda ハンドラー関数
@@ -49,6 +153,8 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     print('記事詳細ページ生成開始')
     print(f'Event: {json.dumps(event, ensure_ascii=False)}')
+    # Supabase・GitHub の呼び出しの再試行は Lambda のタイムアウトまでに終える
+    http_retry.set_deadline(context)
 
     # CORSヘッダー
     cors_headers = {
@@ -66,8 +172,21 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
 
         article_id = body.get('article_id')
         delete_flag = body.get('delete_flag', False)
+        rebuild = body.get('rebuild')
 
-        if not article_id:
+        if rebuild is not None and rebuild != 'all' and not (
+            isinstance(rebuild, list) and rebuild and all(isinstance(i, str) for i in rebuild)
+        ):
+            return {
+                'statusCode': 400,
+                'headers': cors_headers,
+                'body': json.dumps({
+                    'success': False,
+                    'error': 'rebuild must be "all" or a list of article ids'
+                }, ensure_ascii=False)
+            }
+
+        if not article_id and rebuild is None:
             return {
                 'statusCode': 400,
                 'headers': cors_headers,
@@ -80,6 +199,8 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         # 環境変数を取得
         supabase_url = os.environ.get('SUPABASE_URL')
         supabase_key = os.environ.get('SUPABASE_ANON_KEY')
+        # media の行への記録（record_media_probes）にだけ使う。他の問い合わせは anon キーで行う
+        supabase_service_role_key = os.environ.get('SUPABASE_SERVICE_ROLE_KEY')
         github_token = os.environ.get('GITHUB_TOKEN')
         github_repo = os.environ.get('GITHUB_REPO', 'asahigaoka/asahigaoka')
         github_branch = os.environ.get('GITHUB_BRANCH', 'main')
@@ -89,10 +210,62 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         if not github_token:
             raise ValueError('GITHUB_TOKEN is required')
 
+        # メモリ上のキュー（NEWS_REFRESH_QUEUE_URL=local）に残っている news.html の更新のうち、静かな時間が過ぎたものを先に行う
+        for result in run_due_news_page_refresh(supabase_url, supabase_key, github_token, github_repo, github_branch):
+            print(f'news.html 更新（キューに残っていた分）: {result}')
+
+        if rebuild is not None:
+            # 一括再生成モード
+            print(f'一括再生成: {rebuild if rebuild == "all" else f"{len(rebuild)}件"}')
+            rebuild_result = rebuild_detail_pages(
+                supabase_url,
+                supabase_key,
+                supabase_service_role_key,
+                github_token,
+                github_repo,
+                github_branch,
+                None if rebuild == 'all' else rebuild
+            )
+            return {
+                'statusCode': 200,
+                'headers': cors_headers,
+                'body': json.dumps({
+                    'success': True,
+                    'message': 'Detail pages rebuilt successfully',
+                    **rebuild_result
+                }, ensure_ascii=False)
+            }
+
         print(f'記事ID: {article_id}, 削除フラグ: {delete_flag}')
 
-        # 記事情報を取得
-        article = fetch_article_from_supabase(supabase_url, supabase_key, article_id)
+        # 互いに依存しない取得を並行に行う（記事の内容が必要なものは記事の取得後に開始する）
+        plan = TaskPlan('取得')
+        # 記事と添付ファイルは1回のリクエストで取得する（戻り値は (記事, 添付ファイル)）
+        plan.add('article', lambda: fetch_article_with_attachments_from_supabase(supabase_url, supabase_key, article_id))
+        plan.add('article_order', lambda: fetch_article_order_from_supabase(supabase_url, supabase_key))
+        # コミットの親はGitHubの内容を読む前に取得する（ファイルは取得がすべて終わってから作る）
+        plan.add('parent_sha', lambda: branch_head(github_token, github_repo, github_branch))
+        if _NEWS_REFRESH_QUEUE is None:
+            # キューがない場合は news.html を詳細ページと同じコミットで更新する
+            plan.add('news_articles', lambda: fetch_news_page_articles(supabase_url, supabase_key))
+        if not delete_flag:
+            plan.add('template', lambda: fetch_template_from_github(github_token, github_repo, github_branch))
+            plan.add('featured_media', lambda found: fetch_media_by_urls(
+                supabase_url, supabase_key, [found[0].featured_image_url] if found[0] and found[0].featured_image_url else []
+            ), 'article')
+            # 添付ファイル・アイキャッチ画像の形式と寸法（まだ調べていないものだけ先頭を読んで記録）
+            plan.add('probe', lambda found, featured_media: probe_media_metadata(
+                supabase_url, supabase_service_role_key, found[1] + list(featured_media.values())
+            ) if found[0] and found[0].status == 'published' else None, 'article', 'featured_media')
+        fetched = plan.run()
+        timings = dict(plan.timings)
+
+        article, attachments = fetched['article']
+        if not article and delete_flag:
+            # 非公開・削除済みの記事は anon キーでは取得できないため、マニフェストの記録（パス・検索・表示先）から削除する
+            # （news_page_generator の差分チェックが、マニフェストに残った記事の削除を依頼する場合）
+            print(f'記事を取得できないため、マニフェストの記録から削除します: {article_id}')
+            article = Article({'id': article_id})
         if not article:
             return {
                 'statusCode': 404,
@@ -103,41 +276,61 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 }, ensure_ascii=False)
             }
 
-        slug = article.get('slug') or article.get('id')
-        file_path = f'news/{slug}.html'
+        file_path = article.detail_path
 
         # 削除フラグが立っていない場合のみステータスチェック
         # ステータスが 'published' でない場合は詳細ページを生成しない
-        if not delete_flag and article.get('status') != 'published':
-            print(f'記事が公開状態ではありません: status={article.get("status")}')
+        if not delete_flag and article.status != 'published':
+            print(f'記事が公開状態ではありません: status={article.status}')
             return {
                 'statusCode': 400,
                 'headers': cors_headers,
                 'body': json.dumps({
                     'success': False,
-                    'error': f'Article is not published (status: {article.get("status")}). Only published articles can have detail pages.'
+                    'error': f'Article is not published (status: {article.status}). Only published articles can have detail pages.'
                 }, ensure_ascii=False)
             }
 
+        news_articles = fetched.get('news_articles')
+        parent_sha = fetched['parent_sha']
+
+        # 前後の記事・同じカテゴリの記事の索引（削除する記事は除き、生成する記事は最新の内容で入れる）
+        order = ArticleOrder(
+            [a for a in fetched['article_order'] if a.id != article_id]
+            + ([article] if not delete_flag and article.generate_article_page else [])
+        )
+
         if delete_flag:
-            # 削除処理
-            result = delete_from_github(
+            # 削除処理: ページの削除、検索インデックスとマニフェストの更新を1コミットにまとめる
+            # （他の実行と同じファイルのコミットが競合した場合は新しい先頭の内容から作り直す）
+            def build_files(search_ref: Optional[str] = None) -> Dict[str, Optional[str]]:
+                return build_delete_files(
+                    github_token, github_repo, github_branch, article, order, (supabase_url, supabase_key),
+                    news_articles, search_ref
+                )
+
+            started = time.perf_counter()
+            files = build_files(parent_sha)
+            timings['build'] = _elapsed_ms(started)
+            started = time.perf_counter()
+            commit_sha = commit_files_to_github(
                 github_token,
                 github_repo,
                 github_branch,
-                file_path
+                files,
+                f'Delete {file_path}',
+                rebase=build_files,
+                parent_sha=parent_sha
             )
-            print(f'GitHub 削除完了: {file_path}')
+            timings['commit'] = _elapsed_ms(started)
+            print(f'GitHub 削除完了: {file_path} ({commit_sha}, {len(files)}ファイル)')
 
-            # news.htmlも更新（削除時）
-            news_update_result = update_news_page(
-                supabase_url,
-                supabase_key,
-                github_token,
-                github_repo,
-                github_branch
-            )
-            print(f'news.html 更新完了: {news_update_result}')
+            # サイトへの公開と news.html の更新のリクエスト（同じコミットで更新した場合を除く）は並行に行う
+            site_publish, news_update_result = publish_after_commit(files, True, lambda: request_news_page_refresh(
+                f'delete {file_path}', supabase_url, supabase_key, github_token, github_repo, github_branch
+            ) if news_articles is None else None, timings)
+            print(f'news.html 更新リクエスト: {news_update_result}')
+            print(f'所要時間(ms): {timings}')
 
             return {
                 'statusCode': 200,
@@ -146,50 +339,59 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'success': True,
                     'message': 'Detail page deleted successfully',
                     'file_path': file_path,
-                    'news_page_updated': news_update_result.get('success', False)
+                    'site_publish': site_publish,
+                    'news_page_updated': news_update_result.get('success', False),
+                    'news_page_refresh': news_update_result.get('mode'),
+                    'timings_ms': timings,
+                    'upstream_retries': http_retry.retry_stats()
                 }, ensure_ascii=False)
             }
         else:
             # 生成処理
-            # テンプレートを取得
-            template = fetch_template_from_github(
-                github_token,
-                github_repo,
-                github_branch
-            )
-
-            # 添付ファイル情報を取得
-            attachments = fetch_attachments_from_supabase(
-                supabase_url,
-                supabase_key,
-                article_id
-            )
+            template = fetched['template']
+            featured_media = fetched['featured_media']
+            probe_summary = fetched['probe']
             print(f'添付ファイル数: {len(attachments)}')
+            print(f'ファイルの形式・寸法: {probe_summary}')
 
-            # HTMLを生成
-            html_content = generate_detail_html(template, article, attachments)
+            # 詳細ページ・派生画像・スタイルシート・検索インデックス・マニフェスト（と news.html）を1コミットにまとめる
+            # マニフェストと同じ内容なら何もしない。他の実行と同じファイルのコミットが競合した場合は新しい先頭の内容から作り直す
+            featured = featured_media.get(article.featured_image_url)
 
-            # GitHubにプッシュ
-            result = push_to_github(
-                github_token,
-                github_repo,
-                github_branch,
-                file_path,
-                html_content,
-                f'Update {file_path} - {article.get("title", "")[:30]}'
-            )
+            def build_files(search_ref: Optional[str] = None) -> tuple:
+                return build_detail_files(
+                    github_token, github_repo, github_branch, template, article, attachments, featured,
+                    order, (supabase_url, supabase_key), news_articles, search_ref
+                )
 
-            print(f'GitHub push 完了: {file_path}')
+            started = time.perf_counter()
+            files, changed, images_summary = build_files(parent_sha)
+            timings['build'] = _elapsed_ms(started)
+            if changed:
+                started = time.perf_counter()
+                commit_sha = commit_files_to_github(
+                    github_token,
+                    github_repo,
+                    github_branch,
+                    files,
+                    f'Update {file_path} - {article.title[:30]}',
+                    rebase=lambda: build_files()[0],
+                    parent_sha=parent_sha
+                )
+                timings['commit'] = _elapsed_ms(started)
+                changed = commit_sha is not None
+                print(f'GitHub commit 完了: {file_path} ({commit_sha}, {len(files)}ファイル)')
+            else:
+                print(f'変更なしのためスキップ: {file_path}')
+            template_cache_stats = get_template_cache_stats()
+            print(f'テンプレートキャッシュ統計: {template_cache_stats}')
 
-            # news.htmlも更新（公開時）
-            news_update_result = update_news_page(
-                supabase_url,
-                supabase_key,
-                github_token,
-                github_repo,
-                github_branch
-            )
-            print(f'news.html 更新完了: {news_update_result}')
+            # サイトへの公開と news.html の更新のリクエスト（同じコミットで更新した場合を除く）は並行に行う
+            site_publish, news_update_result = publish_after_commit(files, changed, lambda: request_news_page_refresh(
+                f'publish {file_path}', supabase_url, supabase_key, github_token, github_repo, github_branch
+            ) if news_articles is None else None, timings)
+            print(f'news.html 更新リクエスト: {news_update_result}')
+            print(f'所要時間(ms): {timings}')
 
             return {
                 'statusCode': 200,
@@ -198,7 +400,15 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'success': True,
                     'message': 'Detail page generated successfully',
                     'file_path': file_path,
-                    'news_page_updated': news_update_result.get('success', False)
+                    'changed': changed,
+                    'site_publish': site_publish,
+                    'news_page_updated': news_update_result.get('success', False),
+                    'news_page_refresh': news_update_result.get('mode'),
+                    'images': images_summary,
+                    'media_probe': probe_summary,
+                    'template_cache': template_cache_stats,
+                    'timings_ms': timings,
+                    'upstream_retries': http_retry.retry_stats()
                 }, ensure_ascii=False)
             }
 
@@ -216,277 +426,296 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         }
 
 
-def fetch_article_from_supabase(supabase_url: str, supabase_key: str, article_id: str) -> Optional[Dict[str, Any]]:
+def fetch_article_with_attachments_from_supabase(
+    supabase_url: str,
+    supabase_key: str,
+    article_id: str
+) -> Tuple[Optional[Article], List[Media]]:
     """
-    Supabaseから記事を取得
+    Supabaseから記事と添付ファイル（削除済みを除く）を1回のリクエストで取得
+    戻り値は (記事, 添付ファイル)。記事がない場合は (None, [])
     """
     endpoint = f"{supabase_url}/rest/v1/articles"
-    params = f"select=*&id=eq.{article_id}"
+    params = f"select=*,{ATTACHMENTS_EMBED}&id=eq.{article_id}&{ATTACHMENTS_EMBED_PARAMS}"
     url = f"{endpoint}?{params}"
 
-    headers = {
-        'apikey': supabase_key,
-        'Authorization': f'Bearer {supabase_key}',
-        'Content-Type': 'application/json'
-    }
-
-    req = urllib.request.Request(url, headers=headers, method='GET')
+    req = urllib.request.Request(url, headers=_supabase_headers(supabase_key), method='GET')
 
     try:
-        with urllib.request.urlopen(req, timeout=30) as response:
+        with http_retry.urlopen(req, timeout=30) as response:
             data = json.loads(response.read().decode('utf-8'))
-            return data[0] if data else None
+            return split_attachments(data[0]) if data else (None, [])
     except urllib.error.HTTPError as e:
         error_body = e.read().decode('utf-8')
         print(f'Supabase API HTTPエラー: {e.code} - {error_body}')
         raise Exception(f'Supabase API呼び出しエラー: {e.code}')
 
 
-def fetch_attachments_from_supabase(supabase_url: str, supabase_key: str, article_id: str) -> List[Dict[str, Any]]:
+def split_attachments(row: Dict[str, Any]) -> Tuple[Article, List[Media]]:
+    """
+    添付ファイルを埋め込んで取得した記事の行を (記事, 添付ファイル) に分ける
+    """
+    row = dict(row)
+    attachments = [Media(media) for media in row.pop('media', None) or []]
+    return Article(row), attachments
+
+
+def fetch_media_by_urls(supabase_url: str, supabase_key: str, urls: List[str]) -> Dict[str, Media]:
     """
-    Supabaseから添付ファイル情報を取得
+    file_url が一致する media の行（アイキャッチ画像のアップロード時に作られる行）を URL ごとに取得
     """
     endpoint = f"{supabase_url}/rest/v1/media"
-    params = f"select=*&article_id=eq.{article_id}&deleted_at=is.null&order=created_at.asc"
-    url = f"{endpoint}?{params}"
+    urls = sorted(set(urls))
+    media_by_url: Dict[str, Media] = {}
+
+    for i in range(0, len(urls), SUPABASE_URL_FILTER_CHUNK):
+        chunk = urls[i:i + SUPABASE_URL_FILTER_CHUNK]
+        values = ','.join('"' + url.replace('\\', '\\\\').replace('"', '\\"') + '"' for url in chunk)
+        params = (
+            f"select=*&file_url=in.({urllib.parse.quote(values, safe='')})&deleted_at=is.null"
+            f"&order=created_at.asc"
+        )
+        req = urllib.request.Request(
+            f"{endpoint}?{params}",
+            headers=_supabase_headers(supabase_key),
+            method='GET'
+        )
+        try:
+            with http_retry.urlopen(req, timeout=30) as response:
+                rows = json.loads(response.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            error_body = e.read().decode('utf-8')
+            print(f'Supabase media API HTTPエラー: {e.code} - {error_body}')
+            continue
 
-    headers = {
-        'apikey': supabase_key,
-        'Authorization': f'Bearer {supabase_key}',
-        'Content-Type': 'application/json'
-    }
+        for row in rows:
+            media_by_url.setdefault(row.get('file_url'), Media(row))
 
-    req = urllib.request.Request(url, headers=headers, method='GET')
+    return media_by_url
 
+
+def probe_media_metadata(
+    supabase_url: str,
+    service_role_key: Optional[str],
+    media: List[Media],
+    max_workers: int = 8
+) -> Dict[str, int]:
+    """
+    まだ調べていないファイルの形式と寸法を調べて media の行に記録する（記録できなくても生成は続ける）
+    record_media_probes は service_role にだけ実行を許可しているため、service_role キーで呼び出す
+    （キーが未設定の場合は、調べた結果をこの生成にだけ使い、次回また調べる）
+    """
+    records, summary = probe_media(media, max_workers)
+    if not records:
+        return summary
+    if not service_role_key:
+        print(f'SUPABASE_SERVICE_ROLE_KEY が未設定のため、ファイルの形式・寸法を記録しません: {len(records)}件')
+        return summary
+
+    req = urllib.request.Request(
+        f"{supabase_url}/rest/v1/rpc/record_media_probes",
+        data=json.dumps({'probes': records}).encode('utf-8'),
+        headers=_supabase_headers(service_role_key),
+        method='POST'
+    )
     try:
-        with urllib.request.urlopen(req, timeout=30) as response:
-            data = json.loads(response.read().decode('utf-8'))
-            return data
+        # 同じ値を書き込むだけのため、送り直してもよい
+        with http_retry.urlopen(req, timeout=30, idempotent=True) as response:
+            response.read()
     except urllib.error.HTTPError as e:
         error_body = e.read().decode('utf-8')
-        print(f'Supabase attachments API HTTPエラー: {e.code} - {error_body}')
-        return []
-    except Exception as e:
-        print(f'添付ファイル取得エラー: {str(e)}')
-        return []
+        print(f'Supabase record_media_probes HTTPエラー: {e.code} - {error_body}')
+    return summary
 
 
+@metrics.timed('template_fetch')
 def fetch_template_from_github(token: str, repo: str, branch: str) -> str:
     """
     GitHubからテンプレートを取得
+    ウォームコンテナではキャッシュを使い、TTL経過後は If-None-Match で再検証する
     """
-    api_url = f"https://api.github.com/repos/{repo}/contents/news/news_template.html"
+    cache_key = (repo, branch)
+    cached = _TEMPLATE_CACHE.get(cache_key)
+    now = time.monotonic()
+
+    if cached and now - cached['checked_at'] < TEMPLATE_CACHE_TTL_SECONDS:
+        _TEMPLATE_CACHE_STATS['hit'] += 1
+        print(f'テンプレートキャッシュ: hit (sha={cached["sha"]})')
+        return cached['content']
+
+    api_url = f"{GITHUB_API_URL}/repos/{repo}/contents/{TEMPLATE_PATH}"
     headers = {
         'Authorization': f'token {token}',
         'Accept': 'application/vnd.github.v3+json'
     }
+    if cached and cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
 
     req = urllib.request.Request(f"{api_url}?ref={branch}", headers=headers, method='GET')
 
     try:
-        with urllib.request.urlopen(req, timeout=30) as response:
+        with http_retry.urlopen(req, timeout=30) as response:
+            etag = response.headers.get('ETag')
             data = json.loads(response.read().decode('utf-8'))
-            content = base64.b64decode(data['content']).decode('utf-8')
-            return content
     except urllib.error.HTTPError as e:
+        if e.code == 304 and cached:
+            # 変更なし: 本文のダウンロードとデコードを省略
+            cached['checked_at'] = now
+            _TEMPLATE_CACHE_STATS['revalidated'] += 1
+            print(f'テンプレートキャッシュ: revalidated (sha={cached["sha"]})')
+            return cached['content']
         error_body = e.read().decode('utf-8')
         print(f'GitHub API HTTPエラー: {e.code} - {error_body}')
         raise Exception(f'テンプレート取得エラー: {e.code}')
 
+    sha = data.get('sha')
+    if cached and sha and cached['sha'] == sha:
+        # ETagが変わってもblobが同じならデコード済みの内容を使い回す
+        content = cached['content']
+    else:
+        content = base64.b64decode(data['content']).decode('utf-8')
+
+    _TEMPLATE_CACHE[cache_key] = {
+        'content': content,
+        'sha': sha,
+        'etag': etag,
+        'checked_at': now
+    }
+    _TEMPLATE_CACHE_STATS['miss'] += 1
+    print(f'テンプレートキャッシュ: miss (sha={sha})')
+    return content
 
-def generate_detail_html(template: str, article: Dict[str, Any], attachments: List[Dict[str, Any]]) -> str:
+
+def get_template_cache_stats() -> Dict[str, Any]:
     """
-    テンプレートに記事データを埋め込んでHTMLを生成
+    テンプレートキャッシュの利用状況を取得
     """
-    import re
+    total = sum(_TEMPLATE_CACHE_STATS.values())
+    hits = _TEMPLATE_CACHE_STATS['hit'] + _TEMPLATE_CACHE_STATS['revalidated']
+    return {
+        **_TEMPLATE_CACHE_STATS,
+        'hit_rate': round(hits / total, 3) if total else 0.0
+    }
+
 
-    slug = article.get('slug') or article.get('id')
-    title = escape_html(article.get('title') or '')
-    content = article.get('content') or ''
-    category = article.get('category') or 'notice'
+@metrics.timed('render')
+def generate_detail_html(
+    template: str,
+    article: Article,
+    attachments: List[Media],
+    images: Optional[DerivedImages] = None,
+    featured: Optional[Media] = None,
+    order: Optional[ArticleOrder] = None
+) -> str:
+    """
+    テンプレートに記事データを埋め込んでHTMLを生成
+    アイキャッチ画像と添付画像は派生ファイルがあれば srcset 付きで表示する
+    featured はアイキャッチ画像の media の行（寸法が分かっていれば <img> に付ける）
+    order があれば前後の記事と同じカテゴリの記事へのリンクを表示する
+    """
+    title = escape_html(article.title)
+    content = article.content
+    category = article.category or 'notice'
     category_label = CATEGORY_LABELS.get(category, 'お知らせ')
-    featured_image_url = article.get('featured_image_url') or ''
+    featured_image_url = article.featured_image_url or ''
 
     # 公開日
-    published_at = article.get('published_at') or article.get('created_at') or ''
-    published_at_formatted = format_date_jp(published_at) if published_at else ''
-
-    # イベント日時
-    event_start = article.get('event_start_datetime')
-    event_end = article.get('event_end_datetime')
-
-    # has_start_time / has_end_time フラグの判定
-    # DBカラムにあればそれを使う、なければ日時値から自動判定
-    # 00:00始まり = 時間情報なし, 23:59終わり = 時間情報なし
-    if 'has_start_time' in article:
-        has_start_time = bool(article.get('has_start_time'))
-    elif event_start:
-        try:
-            from datetime import datetime as _dt
-            _s = event_start.replace('Z', '+00:00').split('+')[0]
-            _sdt = _dt.fromisoformat(_s) if 'T' in _s else _dt.fromisoformat(_s + 'T00:00:00')
-            has_start_time = (_sdt.hour != 0 or _sdt.minute != 0)
-        except Exception:
-            has_start_time = False
-    else:
-        has_start_time = False
-
-    if 'has_end_time' in article:
-        has_end_time = bool(article.get('has_end_time'))
-    elif event_end:
-        try:
-            from datetime import datetime as _dt
-            _e = event_end.replace('Z', '+00:00').split('+')[0]
-            _edt = _dt.fromisoformat(_e) if 'T' in _e else _dt.fromisoformat(_e + 'T00:00:00')
-            has_end_time = not (_edt.hour == 23 and _edt.minute == 59) and \
-                           not (_edt.hour == 0 and _edt.minute == 0)
-        except Exception:
-            has_end_time = False
-    else:
-        has_end_time = False
+    published_at = article.published_at
+    published_at_formatted = article.published_date_jp
 
+    # イベント日時（時刻の有無は Article で判定済み）
     event_datetime_formatted = format_event_datetime(
-        event_start, event_end, has_start_time, has_end_time
-    ) if event_start else ''
+        article.event_start, article.event_end, article.has_start_time, article.has_end_time
+    ) if article.event_start else ''
 
     # SEO関連
-    meta_title = article.get('meta_title') or title
-    meta_description = article.get('meta_description') or extract_description(content)
-    meta_keywords = article.get('meta_keywords') or ''
+    meta_title = article.meta_title or title
+    meta_description = article.meta_description or extract_description(content)
+    meta_keywords = article.meta_keywords or ''
 
     # 記事URL
-    article_url = f"{SITE_BASE_URL}/news/{slug}.html"
+    article_url = f"{SITE_BASE_URL}/{article.detail_path}"
     article_url_encoded = urllib.parse.quote(article_url, safe='')
     title_encoded = urllib.parse.quote(title, safe='')
 
-    # 添付ファイルセクションを生成
-    attachments_html = generate_attachments_html(attachments)
-
-    # テンプレート置換
-    html = template
-
-    # 基本情報
-    html = html.replace('{{meta_title}}', escape_html(meta_title))
-    html = html.replace('{{meta_description}}', escape_html(meta_description))
-    html = html.replace('{{meta_keywords}}', escape_html(meta_keywords))
-    html = html.replace('{{featured_image_url}}', featured_image_url)
-    html = html.replace('{{article_url}}', article_url)
-    html = html.replace('{{title}}', title)
-    html = html.replace('{{category}}', category)
-    html = html.replace('{{category_label}}', category_label)
-    html = html.replace('{{published_at}}', published_at)
-    html = html.replace('{{published_at_formatted}}', published_at_formatted)
-    html = html.replace('{{event_datetime_formatted}}', event_datetime_formatted)
-    html = html.replace('{{content}}', content)
-    html = html.replace('{{article_url_encoded}}', article_url_encoded)
-    html = html.replace('{{title_encoded}}', title_encoded)
-
-    # 条件付きセクションの処理
-
-    # イベント日時セクション（コンテンツがない場合は削除）
-    if event_datetime_formatted:
-        html = re.sub(
-            r'<!-- \{\{#if event_datetime\}\} -->\s*',
-            '',
-            html
-        )
-        html = re.sub(
-            r'\s*<!-- \{\{/if event_datetime\}\} -->',
-            '',
-            html
-        )
-    else:
-        html = re.sub(
-            r'<!-- \{\{#if event_datetime\}\} -->.*?<!-- \{\{/if event_datetime\}\} -->',
-            '',
-            html,
-            flags=re.DOTALL
-        )
-
-    # アイキャッチ画像（コンテンツがない場合は削除）
-    if featured_image_url:
-        html = re.sub(
-            r'<!-- \{\{#if featured_image_url\}\} -->\s*',
-            '',
-            html
-        )
-        html = re.sub(
-            r'\s*<!-- \{\{/if featured_image_url\}\} -->',
-            '',
-            html
-        )
-    else:
-        html = re.sub(
-            r'<!-- \{\{#if featured_image_url\}\} -->.*?<!-- \{\{/if featured_image_url\}\} -->',
-            '',
-            html,
-            flags=re.DOTALL
-        )
-
-    # 添付ファイルセクション
-    if attachments:
-        html = re.sub(
-            r'<!-- \{\{#if attachments\}\} -->\s*',
-            '',
-            html
-        )
-        html = re.sub(
-            r'\s*<!-- \{\{/if attachments\}\} -->',
-            '',
-            html
-        )
-        html = html.replace('<!-- {{#each attachments}} -->', '')
-        html = html.replace('<!-- {{/each}} -->', '')
-        # 添付ファイルのプレースホルダーを実際のHTMLで置換
-        html = re.sub(
-            r'<a href="\{\{file_url\}\}"[^>]*>.*?</a>',
-            attachments_html,
-            html,
-            flags=re.DOTALL
-        )
-    else:
-        # 添付ファイルがない場合はセクション全体を削除
-        html = re.sub(
-            r'<!-- \{\{#if attachments\}\} -->.*?<!-- \{\{/if attachments\}\} -->',
-            '',
-            html,
-            flags=re.DOTALL
-        )
+    # アイキャッチ画像と添付ファイルセクションを生成
+    featured_image_html = responsive_image_html(
+        featured_image_url, images, title, FEATURED_SIZES, ' class="featured-image"', base='../',
+        width=featured.width if featured else None, height=featured.height if featured else None
+    ) if featured_image_url else ''
+    attachments_html = generate_attachments_html(attachments, images)
+    prev_article, next_article, related_articles = order.navigation(article) if order else (None, None, [])
+
+    # コンパイル済みテンプレートに1回の走査で埋め込む
+    compiled = compile_template(template)
+    return compiled.render({
+        'meta_title': escape_html(meta_title),
+        'meta_description': escape_html(meta_description),
+        'meta_keywords': escape_html(meta_keywords),
+        'featured_image_url': featured_image_url,
+        'featured_image': featured_image_html,
+        # スタイルシートのパスはページで使われているクラスから決まるため、生成後に置き換える
+        'stylesheet': STYLESHEET_PLACEHOLDER,
+        'article_url': article_url,
+        'title': title,
+        'category': category,
+        'category_label': category_label,
+        'published_at': published_at,
+        'published_at_formatted': published_at_formatted,
+        'event_datetime': event_datetime_formatted,
+        'event_datetime_formatted': event_datetime_formatted,
+        'content': content,
+        'article_url_encoded': article_url_encoded,
+        'title_encoded': title_encoded,
+        # 添付ファイルは生成済みHTMLを繰り返しブロックの本体として埋め込む
+        'attachments': attachments_html if attachments else '',
+        # 前後の記事と同じカテゴリの記事のナビゲーション
+        'prev_article': navigation_link(prev_article),
+        'next_article': navigation_link(next_article),
+        'related_articles': [navigation_link(a) for a in related_articles],
+    })
+
+
+def navigation_link(article: Optional[Article]) -> Optional[Dict[str, str]]:
+    """
+    ナビゲーションのリンクに埋め込む値（詳細ページからの相対パスで、リンク先も news/ にある）
+    """
+    if article is None:
+        return None
+    return {
+        'slug': escape_html(article.slug),
+        'title': escape_html(article.title),
+        'date': article.published_date_jp or '',
+        'category_label': CATEGORY_LABELS.get(article.category or 'notice', 'お知らせ'),
+    }
 
-    # 前後記事のナビゲーション（現時点では削除）
-    html = re.sub(
-        r'<!-- \{\{#if prev_article\}\} -->.*?<!-- \{\{/if prev_article\}\} -->',
-        '<div></div>',
-        html,
-        flags=re.DOTALL
-    )
-    html = re.sub(
-        r'<!-- \{\{#if next_article\}\} -->.*?<!-- \{\{/if next_article\}\} -->',
-        '',
-        html,
-        flags=re.DOTALL
-    )
 
-    # 残っているプレースホルダを削除（念のため）
-    html = re.sub(r'\{\{[^}]+\}\}', '', html)
+def navigation_ids(order: Optional[ArticleOrder], article: Article) -> List[str]:
+    """
+    詳細ページに表示する前後の記事・同じカテゴリの記事のID（マニフェストに記録する）
+    """
+    if order is None:
+        return []
+    prev_article, next_article, related_articles = order.navigation(article)
+    return [a.id for a in (prev_article, next_article, *related_articles) if a is not None]
 
-    # 古い形式の条件タグも削除（互換性のため）
-    html = re.sub(r'<!-- \{\{#if[^}]*\}\} -->', '', html)
-    html = re.sub(r'<!-- \{\{/if[^}]*\}\} -->', '', html)
-    html = re.sub(r'<!-- \{\{#each[^}]*\}\} -->', '', html)
-    html = re.sub(r'<!-- \{\{/each[^}]*\}\} -->', '', html)
-    html = re.sub(r'<!-- \{\{else\}\} -->', '', html)
 
-    return html
+IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif', 'webp'}
 
 
-IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif', 'webp'}
+def attachment_extension(att: Media) -> str:
+    """
+    添付ファイルの種類を表す拡張子（ファイルの先頭から調べた形式があればそれを、なければファイル名の拡張子）
+    """
+    if att.probed_at and att.mime_type in MIME_TYPE_EXTENSIONS:
+        return MIME_TYPE_EXTENSIONS[att.mime_type]
+    return att.file_name.lower().rsplit('.', 1)[-1] if '.' in att.file_name else ''
 
 
-def generate_attachments_html(attachments: List[Dict[str, Any]]) -> str:
+def generate_attachments_html(attachments: List[Media], images: Optional[DerivedImages] = None) -> str:
     """
     添付ファイル一覧のHTMLを生成
-    画像ファイルはグリッド表示、それ以外はリンク表示
+    画像ファイルはグリッド表示（派生ファイルがあれば srcset 付き）、それ以外はリンク表示
     """
     if not attachments:
         return ''
@@ -495,16 +724,20 @@ def generate_attachments_html(attachments: List[Dict[str, Any]]) -> str:
     file_parts = []
 
     for att in attachments:
-        file_name = escape_html(att.get('file_name', ''))
-        file_url = att.get('file_url', '')
-        file_size = att.get('file_size', 0)
+        file_name = escape_html(att.file_name)
+        file_url = att.file_url
+        file_size = att.file_size
 
-        ext = file_name.lower().split('.')[-1] if '.' in file_name else ''
+        ext = attachment_extension(att)
 
         if ext in IMAGE_EXTENSIONS:
+            image_html = responsive_image_html(
+                file_url, images, file_name, ATTACHMENT_SIZES, ' loading="lazy"', base='../',
+                width=att.width, height=att.height
+            )
             image_parts.append(f'''
               <a href="{file_url}" class="attachment-image-item" target="_blank">
-                <img src="{file_url}" alt="{file_name}" loading="lazy">
+                {image_html}
               </a>''')
         else:
             file_type, file_icon = FILE_TYPE_ICONS.get(ext, ('other', 'file'))
@@ -529,6 +762,225 @@ def generate_attachments_html(attachments: List[Dict[str, Any]]) -> str:
     return result
 
 
+def detail_image_urls(article: Article, attachments: List[Media]) -> List[str]:
+    """
+    詳細ページに表示する画像のURL（アイキャッチ画像と添付画像）
+    """
+    urls = [article.featured_image_url] if article.featured_image_url else []
+    urls.extend(
+        att.file_url for att in attachments
+        if att.file_url and attachment_extension(att) in IMAGE_EXTENSIONS
+    )
+    return urls
+
+
+def prepare_derived_images(urls: List[str], token: str, repo: str, branch: str) -> tuple:
+    """
+    画像の派生ファイルを用意する（IMAGE_DERIVATIVES_PER_RUN 件まで作成）
+    戻り値は (DerivedImages, マニフェストが変わった場合はそのファイル, 集計)
+    """
+    images = DerivedImages(fetch_github_text(token, repo, branch, DERIVED_MANIFEST_PATH))
+    summary = images.ensure(urls, _SITE_PUBLISHER, IMAGE_DERIVATIVES_PER_RUN)
+    files = {DERIVED_MANIFEST_PATH: images.serialize()} if images.changed else {}
+    return images, files, summary
+
+
+def link_site_stylesheet(pages: Dict[str, Optional[str]], token: str, repo: str, branch: str) -> tuple:
+    """
+    ページで使われているクラスをスタイルシートのマニフェストに加え、各ページをスタイルシートにリンクする
+    戻り値は (リンク済みのページ, クラスが増えた場合はスタイルシートとマニフェストのファイル)
+    """
+    stylesheet = SiteStylesheet(fetch_github_text(token, repo, branch, CSS_MANIFEST_PATH))
+    html_paths = [path for path, content in pages.items() if content and path.endswith('.html')]
+    for path in html_paths:
+        stylesheet.add(pages[path])
+    css_files = stylesheet.files()
+    if css_files:
+        print(f'スタイルシートを更新: {stylesheet.path} ({len(stylesheet.classes)}クラス)')
+    linked = dict(pages)
+    for path in html_paths:
+        linked[path] = link_stylesheet(pages[path], stylesheet.path)
+    return linked, css_files
+
+
+def build_detail_files(
+    token: str,
+    repo: str,
+    branch: str,
+    template: str,
+    article: Article,
+    attachments: List[Media],
+    featured: Optional[Media],
+    order: ArticleOrder,
+    supabase: tuple,
+    news_articles: Optional[tuple] = None,
+    search_ref: Optional[str] = None
+) -> tuple:
+    """
+    詳細ページを生成し、同じコミットに含めるファイル（派生画像とスタイルシートのマニフェスト、検索インデックス、
+    ナビゲーションが変わる前後の記事のページ、詳細ページのマニフェスト、news_articles があれば news.html）を
+    GitHubの現在の内容から作る。supabase は (URL, キー)
+    search_ref は検索インデックスを読むコミット（省略時はブランチの先頭）
+    戻り値は (ファイル, コミットが必要か, 派生画像の集計)
+    """
+    file_path = article.detail_path
+
+    # 画像の派生ファイル（まだない画像だけ作成してバケットに置く）と詳細ページのマニフェストの取得は並行に行う
+    image_urls = detail_image_urls(article, attachments)
+    plan = TaskPlan('生成の準備')
+    plan.add('images', lambda: prepare_derived_images(image_urls, token, repo, branch))
+    plan.add('manifest', lambda: fetch_detail_manifest(token, repo, branch))
+    prepared = plan.run()
+    images, image_files, images_summary = prepared['images']
+    manifest = prepared['manifest']
+    print(f'派生画像: {images_summary}')
+
+    pages = {file_path: generate_detail_html(template, article, attachments, images, featured, order)}
+    neighbours = render_neighbour_pages(supabase, template, images, order, manifest, article)
+    pages.update((a.detail_path, html) for a, html, _ in neighbours)
+    if news_articles is not None:
+        pages['news.html'] = generate_news_page_html(*news_articles, images=images)
+    pages, css_files = link_site_stylesheet(pages, token, repo, branch)
+
+    previous_entry = manifest['articles'].get(article.id) or {}
+    search_document = SearchDocument(
+        search_doc_number(previous_entry, manifest['articles']), article, SEARCH_SHARD_COUNT
+    )
+    entry = detail_manifest_entry(
+        article, file_path, template, pages[file_path], search_document, images.has_pending(image_urls),
+        navigation_ids(order, article)
+    )
+    changed = previous_entry != entry or bool(image_files) or bool(css_files)
+    files = {path: html for path, html in pages.items() if path == file_path or path == 'news.html'}
+    files.update(image_files)
+    files.update(css_files)
+    for neighbour, _, pending in neighbours:
+        if update_neighbour_entry(manifest, neighbour, template, pages[neighbour.detail_path], pending, order):
+            files[neighbour.detail_path] = pages[neighbour.detail_path]
+            changed = True
+    if changed:
+        manifest['articles'][article.id] = entry
+        files.update(update_search_index(
+            token, repo, search_ref or branch, [(previous_entry.get('search'), search_document)]
+        ))
+        files[DETAIL_MANIFEST_PATH] = serialize_detail_manifest(manifest)
+    # news.html は詳細ページに変更がなくてもコミットする（変わっていなければコミットされない）
+    return files, changed or news_articles is not None, images_summary
+
+
+def build_delete_files(
+    token: str,
+    repo: str,
+    branch: str,
+    article: Article,
+    order: ArticleOrder,
+    supabase: tuple,
+    news_articles: Optional[tuple] = None,
+    search_ref: Optional[str] = None
+) -> Dict[str, Optional[str]]:
+    """
+    詳細ページの削除と同じコミットに含めるファイル（検索インデックス、マニフェスト、削除した記事を表示していた
+    前後の記事のページ、news_articles があれば news.html）。supabase は (URL, キー)
+    search_ref は検索インデックスを読むコミット（省略時はブランチの先頭）
+    ページはマニフェストにある場合（ない場合はリポジトリにある場合）だけ削除する
+    （ページを生成しない記事や削除済みの記事で、存在しないパスを削除するとツリーの作成が 422 で失敗するため）
+    """
+    file_path = article.detail_path
+    plan = TaskPlan('削除の準備')
+    plan.add('manifest', lambda: fetch_detail_manifest(token, repo, branch))
+    plan.add('images', lambda: DerivedImages(fetch_github_text(token, repo, branch, DERIVED_MANIFEST_PATH)))
+    plan.add('template', lambda: fetch_template_from_github(token, repo, branch))
+    prepared = plan.run()
+    manifest, images, template = prepared['manifest'], prepared['images'], prepared['template']
+
+    previous_entry = manifest['articles'].pop(article.id, None) or {}
+    files: Dict[str, Optional[str]] = {}
+    if previous_entry.get('path'):
+        files[previous_entry['path']] = None
+    elif fetch_github_text(token, repo, branch, file_path) is not None:
+        files[file_path] = None
+    else:
+        print(f'削除するページがありません: {file_path}')
+    if previous_entry.get('search'):
+        files.update(update_search_index(token, repo, search_ref or branch, [(previous_entry['search'], None)]))
+
+    neighbours = render_neighbour_pages(supabase, template, images, order, manifest, article)
+    pages = {a.detail_path: html for a, html, _ in neighbours}
+    if news_articles is not None:
+        pages['news.html'] = generate_news_page_html(*news_articles, images=images)
+    if pages:
+        pages, css_files = link_site_stylesheet(pages, token, repo, branch)
+        files.update(css_files)
+        if 'news.html' in pages:
+            files['news.html'] = pages['news.html']
+    for neighbour, _, pending in neighbours:
+        if update_neighbour_entry(manifest, neighbour, template, pages[neighbour.detail_path], pending, order):
+            files[neighbour.detail_path] = pages[neighbour.detail_path]
+    files[DETAIL_MANIFEST_PATH] = serialize_detail_manifest(manifest)
+    return files
+
+
+def render_neighbour_pages(
+    supabase: tuple,
+    template: str,
+    images: DerivedImages,
+    order: ArticleOrder,
+    manifest: Dict[str, Any],
+    article: Article
+) -> List[tuple]:
+    """
+    article の公開・削除でナビゲーションが変わりうる詳細ページを再生成する
+    対象は、新しい並びで article の前後にある記事と、マニフェストで article を表示していると記録された記事
+    戻り値は [(記事, HTML, 派生画像が未作成か)]（スタイルシートへのリンクは呼び出し側で行う）
+    """
+    supabase_url, supabase_key = supabase
+    ids = order.pages_showing(article)
+    ids.update(i for i, entry in manifest['articles'].items() if article.id in (entry.get('nav') or ()))
+    ids = sorted(i for i in ids if i != article.id and i in manifest['articles'])
+    if not ids:
+        return []
+
+    plan = TaskPlan('前後の記事の取得')
+    # 記事と添付ファイルは1回のリクエストで取得する（戻り値は (記事の一覧, 記事IDごとの添付ファイル)）
+    plan.add('articles', lambda: fetch_published_articles_from_supabase(supabase_url, supabase_key, ids))
+    plan.add('featured_media', lambda found: fetch_media_by_urls(
+        supabase_url, supabase_key, [a.featured_image_url for a in found[0] if a.featured_image_url]
+    ), 'articles')
+    fetched = plan.run()
+    neighbours, attachments_by_article = fetched['articles']
+    featured_media = fetched['featured_media']
+    rendered = []
+    for neighbour in neighbours:
+        attachments = attachments_by_article.get(neighbour.id, [])
+        html = generate_detail_html(
+            template, neighbour, attachments, images, featured_media.get(neighbour.featured_image_url), order
+        )
+        rendered.append((neighbour, html, images.has_pending(detail_image_urls(neighbour, attachments))))
+    print(f'前後の記事として再生成した記事: {len(rendered)}件')
+    return rendered
+
+
+def update_neighbour_entry(
+    manifest: Dict[str, Any],
+    article: Article,
+    template: str,
+    html: str,
+    images_pending: bool,
+    order: ArticleOrder
+) -> bool:
+    """
+    再生成した前後の記事のマニフェストを更新し、ページの内容が変わったかを返す（検索インデックスの登録はそのまま）
+    """
+    previous = manifest['articles'].get(article.id) or {}
+    entry = detail_manifest_entry(
+        article, article.detail_path, template, html, None, images_pending, navigation_ids(order, article)
+    )
+    if previous.get('search'):
+        entry['search'] = previous['search']
+    manifest['articles'][article.id] = entry
+    return previous.get('output_sha') != entry['output_sha'] or previous.get('path') != entry['path']
+
+
 def format_file_size(size_bytes: int) -> str:
     """
     ファイルサイズを人間が読みやすい形式に変換
@@ -543,32 +995,9 @@ def format_file_size(size_bytes: int) -> str:
         return f"{size_bytes / (1024 * 1024 * 1024):.1f} GB"
 
 
-def format_date_jp(iso_date: str) -> str:
-    """
-    ISO形式の日付を日本語形式に変換
-    """
-    try:
-        date_part = iso_date.replace('Z', '+00:00')
-        if '+' in date_part:
-            date_part = date_part.split('+')[0]
-        if 'T' in date_part:
-            date_str = date_part.split('T')[0]
-        else:
-            date_str = date_part[:10]
-
-        year, month, day = date_str.split('-')
-        dt = datetime(int(year), int(month), int(day))
-        weekdays = ['月', '火', '水', '木', '金', '土', '日']
-        weekday = weekdays[dt.weekday()]
-
-        return f"{year}年{int(month)}月{int(day)}日（{weekday}）"
-    except Exception:
-        return iso_date
-
-
 def format_event_datetime(
-    start: str,
-    end: Optional[str],
+    start_dt: datetime,
+    end_dt: Optional[datetime],
     has_start_time: bool = False,
     has_end_time: bool = False,
 ) -> str:
@@ -576,48 +1005,17 @@ def format_event_datetime(
     イベント日時をフォーマット
 
     has_start_time/has_end_time が False の場合、対応する時刻部分（HH:MM）は出力しない。
-    DB側にフラグがない場合は 00:00/23:59 の慣例から自動判定する。
     """
-    try:
-        start_dt = parse_datetime(start)
-
-        if not has_start_time:
-            has_start_time = (start_dt.hour != 0 or start_dt.minute != 0)
-
-        formatted = format_datetime_jp(start_dt, include_time=has_start_time)
-
-        if end:
-            end_dt = parse_datetime(end)
-
-            if not has_end_time:
-                has_end_time = not (
-                    (end_dt.hour == 23 and end_dt.minute == 59)
-                    or (end_dt.hour == 0 and end_dt.minute == 0)
-                )
+    formatted = format_datetime_jp(start_dt, include_time=has_start_time)
 
-            if start_dt.date() == end_dt.date():
-                # 同日: 終了時刻フラグありなら「〜 HH:MM」のみ追記。フラグなしなら何も追記しない
-                if has_end_time:
-                    formatted += f" 〜 {end_dt.strftime('%H:%M')}"
-            else:
-                formatted += f" 〜 {format_datetime_jp(end_dt, include_time=has_end_time)}"
-        return formatted
-    except Exception:
-        return start
-
-
-def parse_datetime(iso_str: str) -> datetime:
-    """
-    ISO形式の日時文字列をdatetimeに変換
-    """
-    iso_str = iso_str.replace('Z', '+00:00')
-    if '+' in iso_str:
-        iso_str = iso_str.split('+')[0]
-
-    if 'T' in iso_str:
-        return datetime.fromisoformat(iso_str)
-    else:
-        return datetime.fromisoformat(iso_str + 'T00:00:00')
+    if end_dt:
+        if start_dt.date() == end_dt.date():
+            # 同日: 終了時刻フラグありなら「〜 HH:MM」のみ追記。フラグなしなら何も追記しない
+            if has_end_time:
+                formatted += f" 〜 {end_dt.strftime('%H:%M')}"
+        else:
+            formatted += f" 〜 {format_datetime_jp(end_dt, include_time=has_end_time)}"
+    return formatted
 
 
 def format_datetime_jp(dt: datetime, include_time: bool = True) -> str:
@@ -635,17 +1033,17 @@ def format_datetime_jp(dt: datetime, include_time: bool = True) -> str:
 
 def extract_description(content: str) -> str:
     """
-    HTMLコンテンツから説明文を抽出
+    HTMLコンテンツから説明文を抽出（先頭 DESCRIPTION_LENGTH 文字に達した時点で解析をやめる）
     """
-    import re
-    # HTMLタグを除去
-    text = re.sub(r'<[^>]+>', '', content)
-    # 連続する空白を1つに
-    text = re.sub(r'\s+', ' ', text).strip()
-    # 最初の160文字を取得
-    if len(text) > 160:
-        return text[:157] + '...'
-    return text
+    return summarize_html(content, DESCRIPTION_LENGTH)
+
+
+def latest_updated_at(articles: List[Article]) -> str:
+    """
+    記事データの最終更新日時を取得
+    生成日時ではなくデータから決めることで、データが変わらなければ同一のHTMLになる
+    """
+    return max((a.updated_at or '' for a in articles), default='')
 
 
 def escape_html(text: str) -> str:
@@ -662,142 +1060,679 @@ def escape_html(text: str) -> str:
             .replace("'", '&#39;'))
 
 
-def push_to_github(token: str, repo: str, branch: str, file_path: str, content: str, commit_message: str) -> Dict:
+def git_blob_sha(content: str) -> str:
     """
-    GitHubにファイルをプッシュ
+    gitのblob SHA-1をローカルで計算（GitHub contents API の sha と同じ値）
+    """
+    data = content.encode('utf-8')
+    return hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest()
+
+
+def fetch_detail_manifest(token: str, repo: str, branch: str) -> Dict[str, Any]:
     """
-    api_url = f"https://api.github.com/repos/{repo}/contents/{file_path}"
+    GitHubから詳細ページのマニフェストを取得（未作成・形式違いの場合は空のマニフェスト）
+    """
+    api_url = f"{GITHUB_API_URL}/repos/{repo}/contents/{DETAIL_MANIFEST_PATH}?ref={branch}"
     headers = {
         'Authorization': f'token {token}',
-        'Accept': 'application/vnd.github.v3+json',
-        'Content-Type': 'application/json'
+        'Accept': 'application/vnd.github.v3.raw'
     }
-
-    # 現在のファイルのSHAを取得
-    sha = None
+    req = urllib.request.Request(api_url, headers=headers, method='GET')
     try:
-        req = urllib.request.Request(f"{api_url}?ref={branch}", headers=headers, method='GET')
-        with urllib.request.urlopen(req, timeout=30) as response:
-            data = json.loads(response.read().decode('utf-8'))
-            sha = data.get('sha')
+        with http_retry.urlopen(req, timeout=30) as response:
+            manifest = json.loads(response.read().decode('utf-8'))
     except urllib.error.HTTPError as e:
         if e.code != 404:
             raise
+        manifest = None
+    except json.JSONDecodeError:
+        print('マニフェストを読み込めないため新規に作成します')
+        manifest = None
+
+    if not manifest or manifest.get('version') != DETAIL_MANIFEST_VERSION:
+        return {'version': DETAIL_MANIFEST_VERSION, 'articles': {}}
+    manifest.setdefault('articles', {})
+    return manifest
+
+
+def detail_manifest_entry(
+    article: Article,
+    file_path: str,
+    template: str,
+    html: str,
+    search_document: Optional[SearchDocument] = None,
+    images_pending: bool = False,
+    nav: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    マニフェストに記録する詳細ページの情報（検索インデックスに登録した内容のダイジェストを含む）
+    派生ファイルが未作成の画像がある場合は images_pending を記録し、定期実行で再生成させる
+    nav はページに表示している前後の記事・同じカテゴリの記事のID（その記事が変わったときに再生成するため）
+    """
+    entry = {
+        'path': file_path,
+        'updated_at': article.updated_at,
+        'template_sha': git_blob_sha(template),
+        'output_sha': git_blob_sha(html)
+    }
+    if search_document is not None:
+        entry['search'] = search_document.manifest_entry()
+    if images_pending:
+        entry['images_pending'] = True
+    if nav:
+        entry['nav'] = nav
+    return entry
 
-    # ファイルを更新（または作成）
-    content_base64 = base64.b64encode(content.encode('utf-8')).decode('utf-8')
 
-    body = {
-        'message': commit_message,
-        'content': content_base64,
-        'branch': branch
+def search_doc_number(previous_entry: Dict[str, Any], manifest_articles: Dict[str, Dict[str, Any]]) -> int:
+    """
+    記事の検索用の文書番号（登録済みならその番号、未登録なら新しい番号）
+    """
+    search = previous_entry.get('search')
+    if isinstance(search, dict):
+        return search['doc']
+    return next_doc_number(manifest_articles)
+
+
+def update_search_index(
+    token: str,
+    repo: str,
+    ref: str,
+    updates: List[tuple]
+) -> Dict[str, str]:
+    """
+    (前回のマニフェストの検索情報, 今回の文書) の組を検索インデックスに反映し、書き換えたファイルを返す
+    ref（コミットSHAまたはブランチ）の検索インデックスのツリーを1回取得し、必要なファイルだけをblobで取得する
+    """
+    tree = fetch_github_tree(token, repo, ref, SEARCH_DIR)
+
+    def read_files(paths: List[str]) -> Dict[str, Optional[str]]:
+        contents = fetch_github_blobs(token, repo, [tree[path] for path in paths if path in tree])
+        return {path: contents[tree[path]] if path in tree else None for path in paths}
+
+    files = update_index(updates, read_files, SEARCH_SHARD_COUNT, SEARCH_TAIL_MAX_DOCS)
+    print(f'検索インデックス更新: {len(files)}ファイル')
+    return files
+
+
+def rebase_search_index(
+    supabase_url: str,
+    supabase_key: str,
+    token: str,
+    repo: str,
+    branch: str,
+    documents: Dict[str, SearchDocument],
+    previous_entries: Dict[str, Dict[str, Any]],
+    current_entries: Dict[str, Dict[str, Any]],
+    full: bool
+) -> Dict[str, str]:
+    """
+    再生成のコミットが他の実行のコミットと競合した場合に、検索インデックスを新しい先頭の内容から作り直す
+    documents は記事ID → この再生成の文書。文書番号は新しい先頭のマニフェストに合わせる
+    （他の実行が同じ番号を振った新しい記事があれば、この再生成の側を振り直す）
+    全件の場合は、他の実行が登録・更新した記事を Supabase から取得して作り直すインデックスに含める
+    """
+    taken = {
+        entry['search']['doc']: article_id for article_id, entry in current_entries.items()
+        if isinstance(entry.get('search'), dict)
     }
+    next_doc = max([next_doc_number(current_entries)] + [d.doc + 1 for d in documents.values()])
+    for article_id, document in documents.items():
+        search = (current_entries.get(article_id) or {}).get('search')
+        if isinstance(search, dict):
+            document.doc = search['doc']
+        elif taken.get(document.doc, article_id) != article_id:
+            document.doc = next_doc
+            next_doc += 1
+
+    if not full:
+        return update_search_index(token, repo, branch, [
+            ((current_entries.get(article_id) or {}).get('search'), document)
+            for article_id, document in documents.items()
+        ])
+
+    others = [
+        article_id for article_id, entry in current_entries.items()
+        if article_id not in documents and isinstance(entry.get('search'), dict)
+        and entry['search'] != (previous_entries.get(article_id) or {}).get('search')
+    ]
+    extra = []
+    if others:
+        articles, _ = fetch_published_articles_from_supabase(supabase_url, supabase_key, others)
+        extra = [SearchDocument(current_entries[a.id]['search']['doc'], a, SEARCH_SHARD_COUNT) for a in articles]
+        print(f'他の実行が登録した記事を検索インデックスに追加: {len(extra)}件')
+    return build_index(list(documents.values()) + extra, SEARCH_SHARD_COUNT)
+
+
+def fetch_github_text(token: str, repo: str, branch: str, file_path: str) -> Optional[str]:
+    """
+    GitHubからファイルの内容を取得（存在しない場合は None）
+    """
+    api_url = f"{GITHUB_API_URL}/repos/{repo}/contents/{file_path}?ref={branch}"
+    headers = {
+        'Authorization': f'token {token}',
+        'Accept': 'application/vnd.github.v3.raw'
+    }
+    req = urllib.request.Request(api_url, headers=headers, method='GET')
+    try:
+        with http_retry.urlopen(req, timeout=30) as response:
+            return response.read().decode('utf-8')
+    except urllib.error.HTTPError as e:
+        if e.code != 404:
+            raise
+        return None
+
+
+def fetch_github_tree(token: str, repo: str, ref: str, directory: str) -> Dict[str, str]:
+    """
+    ref（コミットSHAまたはブランチ）の directory 以下のファイルのパス → blob SHA（ディレクトリがない場合は空）
+    """
+    url = f"{GITHUB_API_URL}/repos/{repo}/git/trees/{ref}:{directory}?recursive=1"
+    try:
+        tree = github_api_request(token, 'GET', url)
+    except urllib.error.HTTPError as e:
+        if e.code != 404:
+            raise
+        return {}
+    return {f"{directory}/{entry['path']}": entry['sha'] for entry in tree.get('tree', []) if entry['type'] == 'blob'}
 
-    if sha:
-        body['sha'] = sha
 
-    data = json.dumps(body).encode('utf-8')
-    req = urllib.request.Request(api_url, data=data, headers=headers, method='PUT')
+def fetch_github_blobs(token: str, repo: str, shas: List[str]) -> Dict[str, str]:
+    """
+    blob SHA → 内容（取得済みのblobは再利用し、残りは並行して取得する）
+    """
+    contents = {sha: _BLOB_CACHE[sha] for sha in shas if sha in _BLOB_CACHE}
+    missing = [sha for sha in dict.fromkeys(shas) if sha not in contents]
+
+    def fetch(sha: str) -> str:
+        req = urllib.request.Request(
+            f"{GITHUB_API_URL}/repos/{repo}/git/blobs/{sha}",
+            headers={'Authorization': f'token {token}', 'Accept': 'application/vnd.github.v3.raw'},
+            method='GET'
+        )
+        with http_retry.urlopen(req, timeout=30) as response:
+            return response.read().decode('utf-8')
 
-    with urllib.request.urlopen(req, timeout=30) as response:
-        return json.loads(response.read().decode('utf-8'))
+    if missing:
+        with ThreadPoolExecutor(max_workers=SEARCH_FETCH_WORKERS) as executor:
+            for sha, content in zip(missing, executor.map(fetch, missing)):
+                while len(_BLOB_CACHE) >= BLOB_CACHE_MAX_ENTRIES:
+                    _BLOB_CACHE.pop(next(iter(_BLOB_CACHE)))
+                _BLOB_CACHE[sha] = contents[sha] = content
+    return contents
 
 
-def delete_from_github(token: str, repo: str, branch: str, file_path: str) -> Dict:
+def serialize_detail_manifest(manifest: Dict[str, Any]) -> str:
     """
-    GitHubからファイルを削除
+    マニフェストをJSON文字列に変換（キー順を固定して差分を最小にする）
     """
-    api_url = f"https://api.github.com/repos/{repo}/contents/{file_path}"
-    headers = {
-        'Authorization': f'token {token}',
-        'Accept': 'application/vnd.github.v3+json',
-        'Content-Type': 'application/json'
+    return json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True) + '\n'
+
+
+def publish_after_commit(
+    files: Dict[str, Optional[str]],
+    publish: bool,
+    news_refresh: Callable[[], Optional[Dict[str, Any]]],
+    timings: Dict[str, int]
+) -> tuple:
+    """
+    コミットしたファイルのサイトへの公開（publish が True の場合）と news.html の更新のリクエストを並行に行う
+    news_refresh が None を返す場合は news.html を同じコミットで更新済み。所要時間は timings に加える
+    戻り値は (公開の集計, news.html の更新の結果)
+    """
+    plan = TaskPlan('公開')
+    plan.add('site_publish', lambda: publish_to_site(files) if publish else None)
+    plan.add('news_refresh', news_refresh)
+    results = plan.run()
+    timings.update(plan.timings)
+    return results['site_publish'], results['news_refresh'] or {'success': True, 'mode': 'commit'}
+
+
+@metrics.timed('site_publish')
+def publish_to_site(files: Dict[str, Optional[str]]) -> Optional[Dict[str, Any]]:
+    """
+    変更したページをサイトのバケットへ直接公開し、1件の無効化にまとめる（未設定の場合は何もしない）
+    内容が None のページは削除する。マニフェストはGitHubにだけ置く
+    """
+    if _SITE_PUBLISHER is None:
+        return None
+
+    uploaded = deleted = 0
+    for path, content in files.items():
+        if path.endswith('manifest.json'):
+            continue
+        if content is None:
+            _SITE_PUBLISHER.delete(path)
+            deleted += 1
+        else:
+            _SITE_PUBLISHER.put(path, content)
+            uploaded += 1
+
+    return {
+        'uploaded': uploaded,
+        'deleted': deleted,
+        'invalidation_id': _SITE_PUBLISHER.flush()
     }
 
-    # 現在のファイルのSHAを取得
-    try:
-        req = urllib.request.Request(f"{api_url}?ref={branch}", headers=headers, method='GET')
-        with urllib.request.urlopen(req, timeout=30) as response:
-            data = json.loads(response.read().decode('utf-8'))
-            sha = data.get('sha')
-    except urllib.error.HTTPError as e:
-        if e.code == 404:
-            # ファイルが存在しない場合は成功として扱う
-            return {'message': 'File not found, nothing to delete'}
-        raise
-
-    # ファイルを削除
-    body = {
-        'message': f'Delete {file_path}',
-        'sha': sha,
-        'branch': branch
+
+def rebuild_detail_pages(
+    supabase_url: str,
+    supabase_key: str,
+    supabase_service_role_key: Optional[str],
+    github_token: str,
+    github_repo: str,
+    github_branch: str,
+    article_ids: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    公開済み記事の詳細ページを一括で再生成
+    記事と添付ファイルを1回の取得（記事のページごとに1リクエスト）でまとめて取得し、スレッドプールで並列にレンダリングして、
+    REBUILD_COMMIT_BATCH_SIZE 件ごとに1コミットでGitHubに反映する
+    マニフェストは各コミットに含めるため、途中で失敗してもコミット済みのページと一致する
+    （他の実行のコミットと競合した場合は、その時点のマニフェストにこの再生成のエントリを重ねて再試行する）
+    検索インデックスは最初のコミットに含める（マニフェストより先に更新されていれば、次回の再生成で同じ更新を
+    やり直すだけで済む）。全件の場合は作り直し、記事を指定した場合は tail.json に追記する
+    画像の派生ファイルのマニフェストとスタイルシートも最初のコミットに含める
+    （最初のコミットが競合した場合は、これらも新しい先頭の内容から作り直す。他の実行の更新を上書きしないため）
+    """
+    timings = {}
+
+    started = time.perf_counter()
+    articles, attachments_by_article = fetch_published_articles_from_supabase(supabase_url, supabase_key, article_ids)
+    timings['fetch_articles'] = _elapsed_ms(started)
+    print(f'再生成対象: {len(articles)}件')
+
+    # 添付ファイル・アイキャッチ画像の形式と寸法（まだ調べていないものだけ）
+    started = time.perf_counter()
+    featured_media = fetch_media_by_urls(
+        supabase_url, supabase_key, [a.featured_image_url for a in articles if a.featured_image_url]
+    )
+    probe_summary = probe_media_metadata(
+        supabase_url,
+        supabase_service_role_key,
+        [m for attachments in attachments_by_article.values() for m in attachments] + list(featured_media.values()),
+        REBUILD_MAX_WORKERS
+    )
+    timings['probe'] = _elapsed_ms(started)
+    print(f'ファイルの形式・寸法: {probe_summary}')
+
+    started = time.perf_counter()
+    template = fetch_template_from_github(github_token, github_repo, github_branch)
+    timings['fetch_template'] = _elapsed_ms(started)
+
+    # マニフェストなどを読む前の先頭（最初のコミットの親。以降はこの再生成のコミットを親にする）
+    started = time.perf_counter()
+    parent_sha = branch_head(github_token, github_repo, github_branch)
+    manifest = fetch_detail_manifest(github_token, github_repo, github_branch)
+    timings['fetch_manifest'] = _elapsed_ms(started)
+
+    # 画像の派生ファイル（新しい記事の画像から IMAGE_DERIVATIVES_PER_RUN 件まで作成）
+    started = time.perf_counter()
+    image_urls = {
+        a.id: detail_image_urls(a, attachments_by_article.get(a.id, []))
+        for a in sorted(articles, key=lambda a: (a.published_at, a.id), reverse=True)
     }
+    images, image_files, images_summary = prepare_derived_images(
+        [url for urls in image_urls.values() for url in urls], github_token, github_repo, github_branch
+    )
+    timings['images'] = _elapsed_ms(started)
+    print(f'派生画像: {images_summary}')
 
-    data = json.dumps(body).encode('utf-8')
-    req = urllib.request.Request(api_url, data=data, headers=headers, method='DELETE')
+    # 前後の記事・同じカテゴリの記事の索引（全件の場合は取得した記事から作る）
+    started = time.perf_counter()
+    order = ArticleOrder(
+        articles if article_ids is None else fetch_article_order_from_supabase(supabase_url, supabase_key)
+    )
+    timings['order'] = _elapsed_ms(started)
+
+    # 検索用の文書番号（登録済みの記事は同じ番号を使い、未登録の記事には公開日時の古い順に振る）
+    doc_numbers = {}
+    next_doc = next_doc_number(manifest['articles'])
+    for article in sorted(articles, key=lambda a: (a.published_at, a.id)):
+        search = (manifest['articles'].get(article.id) or {}).get('search')
+        if isinstance(search, dict):
+            doc_numbers[article.id] = search['doc']
+        else:
+            doc_numbers[article.id] = next_doc
+            next_doc += 1
 
-    with urllib.request.urlopen(req, timeout=30) as response:
-        return json.loads(response.read().decode('utf-8'))
+    def render(article: Article) -> tuple:
+        html = generate_detail_html(
+            template, article, attachments_by_article.get(article.id, []), images,
+            featured_media.get(article.featured_image_url), order
+        )
+        document = SearchDocument(doc_numbers[article.id], article, SEARCH_SHARD_COUNT)
+        return article.id, article.detail_path, html, document
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=REBUILD_MAX_WORKERS) as executor:
+        rendered = list(executor.map(render, articles))
+    timings['render'] = _elapsed_ms(started)
+
+    started = time.perf_counter()
+    raw_pages = {file_path: html for _, file_path, html, _ in rendered}
+    pages, css_files = link_site_stylesheet(raw_pages, github_token, github_repo, github_branch)
+    rendered = [
+        (article_id, file_path, pages[file_path], document)
+        for article_id, file_path, _, document in rendered
+    ]
+    files = pages
+    timings['stylesheet'] = _elapsed_ms(started)
+
+    started = time.perf_counter()
+    if article_ids is None:
+        search_files = build_index([document for _, _, _, document in rendered], SEARCH_SHARD_COUNT)
+    else:
+        search_files = update_search_index(github_token, github_repo, parent_sha, [
+            ((manifest['articles'].get(article_id) or {}).get('search'), document)
+            for article_id, _, _, document in rendered
+        ])
+    timings['search_index'] = _elapsed_ms(started)
+
+    started = time.perf_counter()
+    commits = []
+    original_entries = dict(manifest['articles'])
+    articles_by_id = {a.id: a for a in articles}
+    rebuilt_ids = []
+
+    def build_batch(i: int) -> Dict[str, Optional[str]]:
+        # i 番目からのページとマニフェスト（最初のコミットには検索インデックス・派生画像とスタイルシートも含める）
+        batch = {**search_files, **image_files, **css_files} if i == 0 else {}
+        for article_id, file_path, html, document in rendered[i:i + REBUILD_COMMIT_BATCH_SIZE]:
+            batch[file_path] = html
+            manifest['articles'][article_id] = detail_manifest_entry(
+                articles_by_id[article_id], file_path, template, html, document,
+                images.has_pending(image_urls[article_id]), navigation_ids(order, articles_by_id[article_id])
+            )
+            if article_id not in rebuilt_ids:
+                rebuilt_ids.append(article_id)
+        batch[DETAIL_MANIFEST_PATH] = serialize_detail_manifest(manifest)
+        return batch
+
+    def rebase_batch(i: int) -> Dict[str, Optional[str]]:
+        # 他の実行が先にコミットした場合は、その時点のマニフェストにこの再生成のエントリを重ねる
+        # 最初のコミットは、検索インデックス・派生画像とスタイルシートも新しい先頭の内容から作り直す
+        nonlocal rendered, search_files, image_files, css_files
+        current = fetch_detail_manifest(github_token, github_repo, github_branch)
+        if i == 0:
+            current_images = DerivedImages(fetch_github_text(github_token, github_repo, github_branch, DERIVED_MANIFEST_PATH))
+            current_images.merge(images.sources)
+            image_files = {DERIVED_MANIFEST_PATH: current_images.serialize()} if current_images.changed else {}
+
+            pages, css_files = link_site_stylesheet(raw_pages, github_token, github_repo, github_branch)
+            rendered = [
+                (article_id, file_path, pages[file_path], document)
+                for article_id, file_path, _, document in rendered
+            ]
+            search_files = rebase_search_index(
+                supabase_url, supabase_key, github_token, github_repo, github_branch,
+                {article_id: document for article_id, _, _, document in rendered},
+                original_entries, current['articles'], full=article_ids is None
+            )
+        manifest['articles'] = {
+            **current['articles'], **{article_id: manifest['articles'][article_id] for article_id in rebuilt_ids}
+        }
+        return build_batch(i)
+
+    for i in range(0, len(rendered) or 1, REBUILD_COMMIT_BATCH_SIZE):
+        batch = build_batch(i)
+        batch_no = i // REBUILD_COMMIT_BATCH_SIZE + 1
+        page_count = len(rendered[i:i + REBUILD_COMMIT_BATCH_SIZE])
+        commit_sha = commit_files_to_github(
+            github_token,
+            github_repo,
+            github_branch,
+            batch,
+            f'Rebuild news detail pages ({batch_no}: {page_count} pages)',
+            rebase=lambda i=i: rebase_batch(i),
+            parent_sha=parent_sha
+        )
+        if commit_sha:
+            parent_sha = commit_sha
+            commits.append(commit_sha)
+            print(f'GitHub コミット完了: {commit_sha} ({page_count}件)')
+    timings['commit'] = _elapsed_ms(started)
+
+    # 内容が変わったページ（前回のマニフェストと比べる）と、検索インデックスなどの共有のファイル
+    changed_files = {**search_files, **image_files, **css_files}
+    for article_id, file_path, html, _ in rendered:
+        previous = original_entries.get(article_id) or {}
+        entry = manifest['articles'][article_id]
+        if previous.get('output_sha') != entry['output_sha'] or previous.get('path') != file_path:
+            changed_files[file_path] = html
+
+    # 内容が変わったページと検索インデックスだけをサイトへ直接公開（無効化は1件にまとめる）
+    started = time.perf_counter()
+    site_publish = publish_to_site(changed_files)
+    timings['site_publish'] = _elapsed_ms(started)
+
+    # 指定された記事のうち見つからないもの（詳細ページを生成しない記事は分けて返す）
+    missing, opted_out = [], []
+    if article_ids:
+        found = {a.id for a in articles}
+        missing = [i for i in article_ids if i not in found]
+        if missing:
+            opted_out = fetch_opted_out_article_ids(supabase_url, supabase_key, missing)
+            missing = [i for i in missing if i not in opted_out]
+
+    print(f'一括再生成完了: {len(files)}件, コミット{len(commits)}件, 所要時間(ms): {timings}')
+
+    return {
+        'rebuilt_count': len(files),
+        'missing_article_ids': missing,
+        'opted_out_article_ids': opted_out,
+        'commits': commits,
+        'site_publish': site_publish,
+        'images': images_summary,
+        'media_probe': probe_summary,
+        'timings_ms': timings,
+        'template_cache': get_template_cache_stats(),
+        'upstream_retries': http_retry.retry_stats()
+    }
 
 
-def update_news_page(supabase_url: str, supabase_key: str, github_token: str, github_repo: str, github_branch: str) -> Dict[str, Any]:
+def _elapsed_ms(started: float) -> int:
     """
-    news.htmlを更新する
-    記事詳細ページの生成/削除時に呼び出され、カレンダーと一覧を最新状態に更新する
+    経過時間（ミリ秒）
     """
-    import calendar
+    return int((time.perf_counter() - started) * 1000)
 
-    try:
-        print('news.html 更新開始...')
 
-        # 日本時間の今日の日付を取得
-        jst_now = datetime.utcnow() + timedelta(hours=9)
-        today = jst_now.date()
-        print(f'基準日: {today}')
+def _supabase_headers(supabase_key: str) -> Dict[str, str]:
+    """
+    Supabase REST API 用のヘッダー
+    """
+    return {
+        'apikey': supabase_key,
+        'Authorization': f'Bearer {supabase_key}',
+        'Content-Type': 'application/json'
+    }
 
-        # Supabaseから公開済み記事を取得
-        endpoint = f"{supabase_url}/rest/v1/articles"
-        params = "select=*&status=eq.published&deleted_at=is.null&order=event_start_datetime.desc.nullsfirst,published_at.desc"
-        url = f"{endpoint}?{params}"
 
-        headers = {
-            'apikey': supabase_key,
-            'Authorization': f'Bearer {supabase_key}',
-            'Content-Type': 'application/json'
-        }
+def fetch_published_articles_from_supabase(
+    supabase_url: str,
+    supabase_key: str,
+    article_ids: Optional[List[str]] = None
+) -> Tuple[List[Article], Dict[str, List[Media]]]:
+    """
+    Supabaseから詳細ページを生成する公開済み記事と添付ファイル（削除済みを除く）をまとめて取得
+    添付ファイルは記事の行に埋め込むため、記事のページごとに1回のリクエストで済む
+    article_ids を指定した場合はその記事のみ。件数が多い場合はページングする
+    戻り値は (記事の一覧, 記事IDごとの添付ファイル)
+    """
+    endpoint = f"{supabase_url}/rest/v1/articles"
+    base_params = (
+        f"select=*,{ATTACHMENTS_EMBED}&status=eq.published&deleted_at=is.null&generate_article_page=is.true"
+        f"&order=id.asc&{ATTACHMENTS_EMBED_PARAMS}"
+    )
+
+    filters = ['']
+    if article_ids:
+        filters = [
+            '&id=in.(' + ','.join(article_ids[i:i + SUPABASE_IN_FILTER_CHUNK]) + ')'
+            for i in range(0, len(article_ids), SUPABASE_IN_FILTER_CHUNK)
+        ]
+
+    articles = []
+    attachments_by_article: Dict[str, List[Media]] = {}
+    for id_filter in filters:
+        offset = 0
+        while True:
+            url = f"{endpoint}?{base_params}{id_filter}&limit={SUPABASE_PAGE_SIZE}&offset={offset}"
+            req = urllib.request.Request(url, headers=_supabase_headers(supabase_key), method='GET')
+            try:
+                with http_retry.urlopen(req, timeout=30) as response:
+                    page = json.loads(response.read().decode('utf-8'))
+            except urllib.error.HTTPError as e:
+                error_body = e.read().decode('utf-8')
+                print(f'Supabase API HTTPエラー: {e.code} - {error_body}')
+                raise Exception(f'Supabase API呼び出しエラー: {e.code}')
+
+            for row in page:
+                article, attachments = split_attachments(row)
+                articles.append(article)
+                if attachments:
+                    attachments_by_article[article.id] = attachments
+            if len(page) < SUPABASE_PAGE_SIZE:
+                break
+            offset += SUPABASE_PAGE_SIZE
+
+    return articles, attachments_by_article
+
+
+def fetch_opted_out_article_ids(supabase_url: str, supabase_key: str, article_ids: List[str]) -> List[str]:
+    """
+    公開済みで詳細ページを生成しない（generate_article_page が false の）記事のID
+    """
+    opted_out = set()
+    for i in range(0, len(article_ids), SUPABASE_IN_FILTER_CHUNK):
+        params = (
+            'select=id&status=eq.published&deleted_at=is.null&generate_article_page=is.false'
+            f"&id=in.({','.join(article_ids[i:i + SUPABASE_IN_FILTER_CHUNK])})"
+        )
+        opted_out.update(row['id'] for row in fetch_articles_from_supabase(supabase_url, supabase_key, params))
+    return [i for i in article_ids if i in opted_out]
 
-        req = urllib.request.Request(url, headers=headers, method='GET')
-        with urllib.request.urlopen(req, timeout=30) as response:
-            articles = json.loads(response.read().decode('utf-8'))
 
-        print(f'取得した記事数: {len(articles)}')
+def fetch_article_order_from_supabase(supabase_url: str, supabase_key: str) -> List[Article]:
+    """
+    前後の記事・同じカテゴリの記事の索引に使う記事（一覧からリンクする公開済み記事の並びに必要なカラムのみ）
+    """
+    endpoint = f"{supabase_url}/rest/v1/articles"
+    params = (
+        f"select={ARTICLE_ORDER_COLUMNS}&status=eq.published&deleted_at=is.null"
+        f"&generate_article_page=is.true&order=published_at.asc,id.asc"
+    )
+    articles = []
+    offset = 0
+    while True:
+        req = urllib.request.Request(
+            f"{endpoint}?{params}&limit={SUPABASE_PAGE_SIZE}&offset={offset}",
+            headers=_supabase_headers(supabase_key),
+            method='GET'
+        )
+        try:
+            with http_retry.urlopen(req, timeout=30) as response:
+                page = json.loads(response.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            error_body = e.read().decode('utf-8')
+            print(f'Supabase API HTTPエラー: {e.code} - {error_body}')
+            raise Exception(f'Supabase API呼び出しエラー: {e.code}')
+
+        articles.extend(Article(row) for row in page)
+        if len(page) < SUPABASE_PAGE_SIZE:
+            break
+        offset += SUPABASE_PAGE_SIZE
+    return articles
+
+
+def request_news_page_refresh(
+    reason: str,
+    supabase_url: str,
+    supabase_key: str,
+    github_token: str,
+    github_repo: str,
+    github_branch: str
+) -> Dict[str, Any]:
+    """
+    news.htmlの更新をリクエスト
+    キューが設定されていれば「要更新」として送信するだけで、再生成は
+    news_page_generator がまとめて行う。未設定の場合は従来どおり同期的に更新する
+    メモリ上のキュー（local）の場合は静かな時間が過ぎていればこの実行で更新し（mode: local）、
+    過ぎていなければ次の実行に残す
+    """
+    if _NEWS_REFRESH_QUEUE is None:
+        result = update_news_page(supabase_url, supabase_key, github_token, github_repo, github_branch)
+        return {**result, 'mode': 'sync'}
+
+    try:
+        queued = _NEWS_REFRESH_QUEUE.mark_dirty('news.html', reason)
+        refreshed = run_due_news_page_refresh(supabase_url, supabase_key, github_token, github_repo, github_branch)
+        if refreshed:
+            return {**refreshed[-1], 'mode': 'local'}
+        return {'success': True, 'mode': 'queued', **queued}
+    except Exception as e:
+        # キューに送れない場合は同期更新にフォールバック
+        print(f'news.html 更新キュー送信エラー: {str(e)}')
+        result = update_news_page(supabase_url, supabase_key, github_token, github_repo, github_branch)
+        return {**result, 'mode': 'sync'}
+
+
+def run_due_news_page_refresh(
+    supabase_url: str,
+    supabase_key: str,
+    github_token: str,
+    github_repo: str,
+    github_branch: str
+) -> List[Dict[str, Any]]:
+    """
+    メモリ上のキュー（LocalRefreshQueue）で静かな時間が過ぎた news.html の更新を行い、その結果を返す
+    SQS のキューは news_page_generator が受信して処理するため、ここでは何もしない
+    """
+    if not isinstance(_NEWS_REFRESH_QUEUE, LocalRefreshQueue):
+        return []
+    results = []
+    _NEWS_REFRESH_QUEUE.run_due(lambda target, reasons: results.append(
+        update_news_page(supabase_url, supabase_key, github_token, github_repo, github_branch)
+    ))
+    return results
 
-        # カレンダー表示用の記事をフィルタ
-        calendar_articles = [a for a in articles if a.get('show_in_calendar')]
-        print(f'カレンダー表示対象: {len(calendar_articles)}件')
 
-        # 一覧表示用の記事をフィルタ
-        news_list_articles = [a for a in articles if a.get('show_in_news_list')]
-        print(f'一覧表示対象: {len(news_list_articles)}件')
+def update_news_page(supabase_url: str, supabase_key: str, github_token: str, github_repo: str, github_branch: str) -> Dict[str, Any]:
+    """
+    news.htmlを更新する
+    記事詳細ページの生成/削除時に呼び出され、カレンダーと一覧を最新状態に更新する
+    """
+    try:
+        print('news.html 更新開始...')
+        news_articles = fetch_news_page_articles(supabase_url, supabase_key)
+        today, calendar_articles, news_list_articles, _ = news_articles
 
-        # news.htmlを生成
-        html_content = generate_news_page_html(today, calendar_articles, news_list_articles)
+        # スタイルシートが変わった場合は news.html と1コミットにまとめる
+        def build_files() -> Dict[str, Optional[str]]:
+            return build_news_page_files(github_token, github_repo, github_branch, news_articles)
 
-        # GitHubにプッシュ
-        result = push_to_github(
+        parent_sha = branch_head(github_token, github_repo, github_branch)
+        files = build_files()
+        commit_sha = commit_files_to_github(
             github_token,
             github_repo,
             github_branch,
-            'news.html',
-            html_content,
-            f'Update news.html - {today.isoformat()}'
+            files,
+            f'Update news.html - {today.isoformat()}',
+            rebase=build_files,
+            parent_sha=parent_sha
         )
+        changed = commit_sha is not None
 
         print(f'news.html GitHub push 完了')
+        site_publish = publish_to_site(files) if changed else None
 
         return {
             'success': True,
-            'articles_count': len(articles),
+            'changed': changed,
+            'site_publish': site_publish,
+            'articles_count': len({a.id for a in calendar_articles + news_list_articles}),
             'calendar_articles': len(calendar_articles),
             'news_list_articles': len(news_list_articles)
         }
@@ -812,94 +1747,240 @@ def update_news_page(supabase_url: str, supabase_key: str, github_token: str, gi
         }
 
 
-def generate_news_page_html(today, calendar_articles: List[Dict], news_list_articles: List[Dict]) -> str:
+def fetch_news_page_articles(supabase_url: str, supabase_key: str) -> tuple:
     """
-    news.htmlの完全なHTMLを生成
+    news.html に表示する記事を取得する
+    戻り値は (日本時間の今日, カレンダーの記事, 一覧の記事, 一覧に表示する記事の総数)
     """
-    import calendar as cal_module
+    # 日本時間の今日の日付を取得
+    jst_now = datetime.utcnow() + timedelta(hours=9)
+    today = jst_now.date()
+    print(f'基準日: {today}')
+
+    # Supabaseから記事データを取得（表示に必要なカラム・期間・件数のみ。カレンダーと一覧は並行に取得する）
+    plan = TaskPlan('news.html の記事の取得', max_workers=2)
+    plan.add('calendar', lambda: fetch_calendar_articles_from_supabase(
+        supabase_url, supabase_key, calendar_months(today, CALENDAR_MONTHS)
+    ))
+    plan.add('news_list', lambda: fetch_news_list_articles_from_supabase(supabase_url, supabase_key))
+    fetched = plan.run()
+    calendar_articles = fetched['calendar']
+    news_list_articles, news_list_total = fetched['news_list']
+    print(f'カレンダー表示対象: {len(calendar_articles)}件')
+    print(f'一覧表示対象: {len(news_list_articles)}件（全{news_list_total}件）')
+    print(f'取得した記事数: {len({a.id for a in calendar_articles + news_list_articles})}')
+    return today, calendar_articles, news_list_articles, news_list_total
+
+
+def build_news_page_files(token: str, repo: str, branch: str, news_articles: tuple) -> Dict[str, Optional[str]]:
+    """
+    news.html と、使われているクラスが増えた場合はスタイルシートのファイル
+    アイキャッチ画像の派生ファイルは news_page_generator が作成したものを使う
+    """
+    images = DerivedImages(fetch_github_text(token, repo, branch, DERIVED_MANIFEST_PATH))
+    html_content = generate_news_page_html(*news_articles, images=images)
+    pages, css_files = link_site_stylesheet({'news.html': html_content}, token, repo, branch)
+    return {**pages, **css_files}
 
-    current_year = today.year
-    current_month = today.month
 
-    if current_month == 12:
-        next_year = current_year + 1
-        next_month = 1
-    else:
-        next_year = current_year
-        next_month = current_month + 1
+def fetch_articles_from_supabase(supabase_url: str, supabase_key: str, params: str) -> List[Dict[str, Any]]:
+    """
+    Supabaseから記事を取得
+    """
+    url = f"{supabase_url}/rest/v1/articles?{params}"
+    req = urllib.request.Request(url, headers=_supabase_headers(supabase_key), method='GET')
+    with http_retry.urlopen(req, timeout=30) as response:
+        return json.loads(response.read().decode('utf-8'))
 
-    current_calendar_html = generate_calendar_grid_html(
-        current_year, current_month, today, calendar_articles
+
+def fetch_calendar_articles_from_supabase(supabase_url: str, supabase_key: str, months: List[tuple]) -> List[Article]:
+    """
+    Supabaseからカレンダーの表示期間に重なるイベント記事のみ取得
+    タイムゾーンの差を吸収するため期間の前後1日を含めて取得する（日付への振り分け時に期間外は除かれる）
+    """
+    first_year, first_month = months[0]
+    last_year, last_month = months[-1]
+    window_start = date(first_year, first_month, 1) - timedelta(days=1)
+    window_end = date(last_year, last_month, calendar.monthrange(last_year, last_month)[1]) + timedelta(days=2)
+    start_param = urllib.parse.quote(f'{window_start.isoformat()}T00:00:00+09:00')
+    end_param = urllib.parse.quote(f'{window_end.isoformat()}T00:00:00+09:00')
+
+    params = (
+        f"select={NEWS_PAGE_COLUMNS}&status=eq.published&deleted_at=is.null&show_in_calendar=is.true"
+        f"&event_start_datetime=lt.{end_param}"
+        f"&or=(event_end_datetime.gte.{start_param},event_start_datetime.gte.{start_param})"
+        "&order=event_start_datetime.asc"
+    )
+    return [Article(row) for row in fetch_articles_from_supabase(supabase_url, supabase_key, params)]
+
+
+def fetch_news_list_articles_from_supabase(supabase_url: str, supabase_key: str) -> Tuple[List[Article], int]:
+    """
+    Supabaseからお知らせ一覧の先頭 NEWS_LIST_LIMIT 件を新しい順に取得し、一覧に表示する記事の総数と合わせて返す
+    総数は過去のお知らせページへのリンクに使う（Prefer: count=exact の Content-Range から得るため、全件は取得しない）
+    """
+    params = (
+        f"select={NEWS_PAGE_COLUMNS}&status=eq.published&deleted_at=is.null&show_in_news_list=is.true"
+        f"&order=event_start_datetime.desc.nullsfirst,published_at.desc,id.asc&limit={NEWS_LIST_LIMIT}"
+    )
+    req = urllib.request.Request(
+        f"{supabase_url}/rest/v1/articles?{params}",
+        headers={**_supabase_headers(supabase_key), 'Prefer': 'count=exact'},
+        method='GET'
     )
-    next_calendar_html = generate_calendar_grid_html(
-        next_year, next_month, today, calendar_articles
+    with http_retry.urlopen(req, timeout=30) as response:
+        rows = json.loads(response.read().decode('utf-8'))
+        content_range = response.headers.get('Content-Range') or ''
+
+    # Content-Range は「0-29/123」（該当なしは「*/0」）
+    total = content_range.rpartition('/')[2]
+    return [Article(row) for row in rows], int(total) if total.isdigit() else len(rows)
+
+
+@metrics.timed('render')
+def generate_news_page_html(
+    today,
+    calendar_articles: List[Article],
+    news_list_articles: List[Article],
+    news_list_total: Optional[int] = None,
+    images: Optional[DerivedImages] = None
+) -> str:
+    """
+    news.htmlの完全なHTMLを生成
+    news_list_total は一覧に表示する記事の総数（省略時は news_list_articles の件数）
+    """
+    # 当月から CALENDAR_MONTHS ヶ月分のカレンダーを生成（記事の日付インデックスは1回だけ作る）
+    months = calendar_months(today, CALENDAR_MONTHS)
+    calendar_index = build_calendar_index(calendar_articles, months)
+
+    calendars_html = '\n\n            '.join(
+        CALENDAR_BLOCK_TEMPLATE.format(
+            title=f"{year}年{month}月",
+            grid=generate_calendar_grid_html(year, month, today, calendar_index[(year, month)])
+        )
+        for year, month in months
     )
 
-    news_list_html = generate_news_list_items_html(news_list_articles)
+    # ニュース一覧HTMLを生成（先頭 NEWS_LIST_LIMIT 件。残りは過去のお知らせページへのリンク）
+    latest_articles = news_list_articles[:NEWS_LIST_LIMIT]
+    news_list_html = generate_news_list_items_html(latest_articles, images)
 
+    # テンプレートに埋め込み
     html = NEWS_PAGE_TEMPLATE.format(
-        current_month_title=f"{current_year}年{current_month}月",
-        current_month_calendar=current_calendar_html,
-        next_month_title=f"{next_year}年{next_month}月",
-        next_month_calendar=next_calendar_html,
+        page_title=NEWS_PAGE_TITLE,
+        head_extra='',
+        stylesheet=STYLESHEET_PLACEHOLDER,
+        calendar_section=CALENDAR_SECTION_TEMPLATE.format(calendars=calendars_html),
+        list_title='お知らせ一覧',
         news_list=news_list_html,
-        generated_at=datetime.utcnow().isoformat() + 'Z'
+        pager=archive_link_html(len(news_list_articles) if news_list_total is None else news_list_total),
+        data_updated_at=latest_updated_at(calendar_articles + latest_articles)
     )
 
     return html
 
 
-def generate_calendar_grid_html(year: int, month: int, today, articles: List[Dict]) -> str:
+def archive_link_html(total: int) -> str:
     """
-    カレンダーグリッドのHTMLを生成
+    news.html から過去のお知らせページへのリンク
+    ページは古い記事から詰めて番号を振るため、news.html に表示しきれなかった最初の記事を含むページにリンクする
+    （news_page_generator の archive_link_html と同じ結果にすること）
     """
-    import calendar as cal_module
+    if total <= NEWS_LIST_LIMIT:
+        return ''
+    page = (total - 1 - NEWS_LIST_LIMIT) // ARCHIVE_PAGE_SIZE + 1
+    return ARCHIVE_LINK_TEMPLATE.format(href=f'news/page/{page}.html')
+
 
-    cal = cal_module.Calendar(firstweekday=6)  # 日曜始まり
+def calendar_months(today, count: int) -> List[tuple]:
+    """
+    表示する月の一覧（当月から count ヶ月分の (年, 月)）
+    """
+    months = []
+    year, month = today.year, today.month
+    for _ in range(max(1, count)):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def build_calendar_index(articles: List[Article], months: List[tuple]) -> Dict[tuple, Dict[int, List[Article]]]:
+    """
+    カレンダー表示用に記事を 月 → 日 → 記事リスト に振り分ける
+    複数日にわたるイベントは期間中の各日に展開する。表示期間外の日は展開しないため、
+    計算量は記事数 + 表示期間の日数（に比例する出力量）で済む
+    """
+    index: Dict[tuple, Dict[int, List[Article]]] = {ym: {} for ym in months}
+    if not months:
+        return index
+
+    first_year, first_month = months[0]
+    last_year, last_month = months[-1]
+    window_start = date(first_year, first_month, 1)
+    window_end = date(last_year, last_month, calendar.monthrange(last_year, last_month)[1])
+
+    for article in articles:
+        start = article.event_start_date
+        if not start:
+            continue
+        end = article.event_end_date or start
+        if end < start:
+            end = start
+
+        day = max(start, window_start)
+        last = min(end, window_end)
+        while day <= last:
+            index[(day.year, day.month)].setdefault(day.day, []).append(article)
+            day += timedelta(days=1)
+
+    # 同じ日のイベントは開始日時順
+    for buckets in index.values():
+        for day_articles in buckets.values():
+            day_articles.sort(key=lambda a: a.event_start)
+
+    return index
+
+
+def generate_calendar_grid_html(year: int, month: int, today, day_index: Dict[int, List[Article]]) -> str:
+    """
+    カレンダーグリッドのHTMLを生成
+    day_index は build_calendar_index で作成した当月分（日 → 記事リスト）
+    """
+    cal = calendar.Calendar(firstweekday=6)  # 日曜始まり
     month_days = list(cal.itermonthdays2(year, month))
 
+    # 曜日ヘッダー
     day_headers = ['日', '月', '火', '水', '木', '金', '土']
     html = ''
     for day in day_headers:
         html += f'<div class="calendar-day-header">{day}</div>'
 
-    # 記事を日付でマッピング
-    article_by_date = {}
-    for article in articles:
-        event_date = article.get('event_start_datetime')
-        if event_date:
-            date_str = event_date[:10]
-            if date_str not in article_by_date:
-                article_by_date[date_str] = []
-            article_by_date[date_str].append(article)
-
+    # 日付セルを生成
     for day, weekday in month_days:
         if day == 0:
+            # 前月・次月の日付（空欄として表示）
             html += '<div class="calendar-day other-month"></div>'
         else:
-            date_obj = datetime(year, month, day).date()
+            # 今月の日付
+            date_obj = date(year, month, day)
             date_str = date_obj.isoformat()
 
             is_today = (date_obj == today)
             today_class = 'today' if is_today else ''
 
-            day_articles = article_by_date.get(date_str, [])
+            # その日のイベントを取得（表示しきれない分は「+N件」）
+            day_articles = day_index.get(day, [])
             has_event = len(day_articles) > 0
             event_class = 'has-event' if has_event else ''
+            if len(day_articles) > 1:
+                event_class += ' multi-event'
 
-            event_html = ''
-            if has_event:
-                article = day_articles[0]
-                slug = article.get('slug') or article.get('id')
-                title = article.get('title', '')
-                title_escaped = escape_html(title)
-                # generate_article_pageフラグがtrueの場合のみリンクを生成
-                if article.get('generate_article_page'):
-                    detail_url = f"news/{slug}.html"
-                    event_html = f'<div class="calendar-day-event" onclick="event.stopPropagation(); window.location.href=\'{detail_url}\'" title="{title_escaped}">{title_escaped}</div>'
-                else:
-                    # リンクなしのイベント表示
-                    event_html = f'<div class="calendar-day-event calendar-day-event-nolink" title="{title_escaped}">{title_escaped}</div>'
+            shown = day_articles[:CALENDAR_MAX_EVENTS_PER_DAY]
+            event_html = ''.join(calendar_event_html(article, date_str) for article in shown)
+            hidden = day_articles[len(shown):]
+            if hidden:
+                hidden_titles = escape_html('、'.join(a.title for a in hidden))
+                event_html += f'<div class="calendar-day-more" title="{hidden_titles}">+{len(hidden)}件</div>'
 
             html += f'''<div class="calendar-day {today_class} {event_class}">
                 <span class="calendar-day-number">{day}</span>
@@ -909,41 +1990,57 @@ def generate_calendar_grid_html(year: int, month: int, today, articles: List[Dic
     return html
 
 
-def generate_news_list_items_html(articles: List[Dict]) -> str:
+def calendar_event_html(article: Article, date_str: str) -> str:
+    """
+    カレンダーの1イベント分のHTMLを生成
+    """
+    title_escaped = escape_html(article.title)
+
+    classes = 'calendar-day-event'
+    # 複数日イベントの2日目以降
+    if article.event_start_date.isoformat() != date_str:
+        classes += ' calendar-day-event-continued'
+
+    # generate_article_pageフラグがtrueの場合のみリンクを生成
+    if article.generate_article_page:
+        detail_url = article.detail_path
+        return f'<div class="{classes}" onclick="event.stopPropagation(); window.location.href=\'{detail_url}\'" title="{title_escaped}">{title_escaped}</div>'
+    # リンクなしのイベント表示
+    return f'<div class="{classes} calendar-day-event-nolink" title="{title_escaped}">{title_escaped}</div>'
+
+
+def generate_news_list_items_html(articles: List[Article], images: Optional[DerivedImages] = None) -> str:
     """
     ニュース一覧のHTMLを生成
+    アイキャッチ画像は派生ファイルがあれば srcset 付きで表示する
     """
     if not articles:
         return '<div class="text-center text-gray-500 py-8">お知らせはありません</div>'
 
     html = ''
-    for article in articles[:30]:
-        slug = article.get('slug') or article.get('id')
-        title = escape_html(article.get('title', ''))
+    for article in articles:
+        title = escape_html(article.title)
 
         # イベント開始日を優先して表示
-        event_date = article.get('event_start_datetime')
-        if event_date:
-            date_str = format_date_jp(event_date)
-        else:
-            published_at = article.get('published_at') or article.get('created_at')
-            date_str = format_date_jp(published_at) if published_at else ''
+        date_str = article.list_date_jp
 
-        featured_image = article.get('featured_image_url')
+        featured_image = article.featured_image_url
         if featured_image:
-            image_html = f'<img src="{featured_image}" alt="{title}" class="news-item-image">'
+            image_html = responsive_image_html(
+                featured_image, images, title, THUMBNAIL_SIZES, ' class="news-item-image"'
+            )
         else:
             image_html = '<div class="news-item-image bg-gray-200 flex items-center justify-center text-gray-400 text-sm">画像なし</div>'
 
         icons_html = ''
-        if article.get('line_published'):
+        if article.line_published:
             icons_html += '<div class="news-item-icon line" title="LINEで配信済み"><i class="ri-line-fill text-xs"></i></div>'
-        if article.get('x_published'):
+        if article.x_published:
             icons_html += '<div class="news-item-icon x" title="Xで投稿済み"><i class="ri-twitter-x-line text-xs"></i></div>'
 
         # generate_article_pageフラグがtrueの場合のみリンクを生成
-        if article.get('generate_article_page'):
-            detail_url = f"news/{slug}.html"
+        if article.generate_article_page:
+            detail_url = article.detail_path
             html += f'''
             <a href="{detail_url}" class="news-item">
                 {image_html}
@@ -980,29 +2077,8 @@ NEWS_PAGE_TEMPLATE = '''<!DOCTYPE html>
   <head>
     <meta charset="UTF-8" />
     <meta name="viewport" content="width=device-width, initial-scale=1.0" />
-    <title>お知らせ - 東京都練馬区旭丘一丁目町会</title>
-    <script src="https://cdn.tailwindcss.com/3.4.16"></script>
-    <script>
-      tailwind.config = {{
-        theme: {{
-          extend: {{
-            colors: {{ primary: "#57b5e7", secondary: "#8dd3c7" }},
-            borderRadius: {{
-              none: "0px",
-              sm: "4px",
-              DEFAULT: "8px",
-              md: "12px",
-              lg: "16px",
-              xl: "20px",
-              "2xl": "24px",
-              "3xl": "32px",
-              full: "9999px",
-              button: "8px",
-            }},
-          }},
-        }},
-      }};
-    </script>
+    <title>{page_title}</title>{head_extra}
+    <link rel="alternate" type="application/atom+xml" title="お知らせ" href="news/feed.xml" />
     <link rel="preconnect" href="https://fonts.googleapis.com" />
     <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin />
     <link
@@ -1014,265 +2090,8 @@ NEWS_PAGE_TEMPLATE = '''<!DOCTYPE html>
       rel="stylesheet"
     />
     <link rel="stylesheet" href="css/template.css" />
-    <style>
-      :where([class^="ri-"])::before {{ content: "\\f3c2"; }}
-
-      /* カレンダースタイル */
-      .calendar {{
-        background: white;
-        border-radius: 12px;
-        padding: 20px;
-        box-shadow: 0 1px 3px 0 rgba(0, 0, 0, 0.1);
-      }}
-
-      .calendar-header {{
-        display: flex;
-        justify-content: space-between;
-        align-items: center;
-        margin-bottom: 16px;
-        padding-bottom: 12px;
-        border-bottom: 2px solid #e5e7eb;
-      }}
-
-      .calendar-title {{
-        font-size: 1.25rem;
-        font-weight: bold;
-        color: #111827;
-      }}
-
-      .calendar-grid {{
-        display: grid;
-        grid-template-columns: repeat(7, 1fr);
-        gap: 1px;
-        border: 1px solid #e5e7eb;
-        border-radius: 8px;
-        overflow: hidden;
-      }}
-
-      .calendar-day-header {{
-        text-align: center;
-        font-size: 0.75rem;
-        font-weight: 600;
-        color: #6b7280;
-        padding: 8px 4px;
-        background: #f9fafb;
-        border-right: 1px solid #e5e7eb;
-        border-bottom: 1px solid #e5e7eb;
-      }}
-
-      .calendar-day-header:last-child {{
-        border-right: none;
-      }}
-
-      .calendar-day {{
-        display: flex;
-        flex-direction: column;
-        align-items: flex-start;
-        justify-content: flex-start;
-        font-size: 0.875rem;
-        color: #374151;
-        cursor: pointer;
-        transition: background 0.2s;
-        padding: 4px;
-        height: 80px;
-        border-right: 1px solid #e5e7eb;
-        border-bottom: 1px solid #e5e7eb;
-        overflow: hidden;
-        box-sizing: border-box;
-      }}
-
-      .calendar-day:nth-child(7n) {{
-        border-right: none;
-      }}
-
-      .calendar-day:hover {{
-        background: #f3f4f6;
-      }}
-
-      .calendar-day.other-month {{
-        color: #d1d5db;
-        background: #fafafa;
-      }}
-
-      .calendar-day.today {{
-        background: #57b5e7;
-        color: white;
-        font-weight: bold;
-      }}
-
-      .calendar-day-number {{
-        font-weight: 600;
-        margin-bottom: 2px;
-        flex-shrink: 0;
-        width: 100%;
-        text-align: left;
-      }}
-
-      .calendar-day-event {{
-        font-size: 0.65rem;
-        line-height: 1.3;
-        text-align: left;
-        width: 100%;
-        padding: 2px 4px;
-        margin-top: auto;
-        background: #fef3c7;
-        color: #92400e;
-        border-radius: 3px;
-        overflow: hidden;
-        white-space: normal;
-        word-break: break-word;
-        cursor: pointer;
-        transition: all 0.2s;
-        flex: 1;
-        display: -webkit-box;
-        -webkit-line-clamp: 2;
-        -webkit-box-orient: vertical;
-        min-height: 0;
-      }}
-
-      .calendar-day.today .calendar-day-event {{
-        background: rgba(255, 255, 255, 0.3);
-        color: white;
-      }}
-
-      .calendar-day-event:hover {{
-        background: #fde68a;
-      }}
-
-      .calendar-day.today .calendar-day-event:hover {{
-        background: rgba(255, 255, 255, 0.5);
-      }}
-
-      .calendar-day.has-event {{
-        position: relative;
-      }}
-
-      .calendar-day-event-nolink {{
-        cursor: default;
-      }}
-
-      .calendar-day-event-nolink:hover {{
-        background: #fef3c7;
-      }}
-
-      .calendar-day.today .calendar-day-event-nolink:hover {{
-        background: rgba(255, 255, 255, 0.3);
-      }}
-
-      /* お知らせ一覧スタイル */
-      .news-item {{
-        display: flex;
-        align-items: center;
-        gap: 16px;
-        padding: 20px 0;
-        border-bottom: 1px dashed #d1d5db;
-        transition: background 0.2s;
-        text-decoration: none;
-        color: inherit;
-      }}
-
-      .news-item:hover {{
-        background: #f9fafb;
-        padding-left: 8px;
-        padding-right: 8px;
-        margin-left: -8px;
-        margin-right: -8px;
-        border-radius: 8px;
-      }}
-
-      .news-item-image {{
-        width: 120px;
-        height: 80px;
-        object-fit: cover;
-        border-radius: 8px;
-        flex-shrink: 0;
-      }}
-
-      .news-item-content {{
-        flex: 1;
-        min-width: 0;
-      }}
-
-      .news-item-date {{
-        font-size: 0.875rem;
-        color: #6b7280;
-        margin-bottom: 4px;
-      }}
-
-      .news-item-title {{
-        font-size: 1rem;
-        font-weight: 600;
-        color: #111827;
-        margin-bottom: 8px;
-        line-height: 1.5;
-      }}
-
-      .news-item-icons {{
-        display: flex;
-        gap: 8px;
-        align-items: center;
-      }}
-
-      .news-item-icon {{
-        width: 20px;
-        height: 20px;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        border-radius: 4px;
-      }}
-
-      .news-item-icon.line {{
-        background: #00C300;
-        color: white;
-      }}
-
-      .news-item-icon.x {{
-        background: #000000;
-        color: white;
-      }}
-
-      .news-item-nolink {{
-        cursor: default;
-      }}
-
-      .news-item-nolink:hover {{
-        background: transparent;
-        padding-left: 0;
-        padding-right: 0;
-        margin-left: 0;
-        margin-right: 0;
-        border-radius: 0;
-      }}
-
-      @media (max-width: 768px) {{
-        .news-item {{
-          flex-direction: column;
-          align-items: flex-start;
-        }}
-
-        .news-item-image {{
-          width: 100%;
-          height: 200px;
-        }}
-
-        .calendar-grid {{
-          gap: 1px;
-        }}
-
-        .calendar-day {{
-          font-size: 0.75rem;
-          height: 60px;
-          padding: 2px;
-        }}
-
-        .calendar-day-event {{
-          font-size: 0.6rem;
-          padding: 1px 2px;
-        }}
-      }}
-    </style>
-    <!-- Generated at: {generated_at} -->
+    <link rel="stylesheet" href="{stylesheet}" />
+    <!-- Data updated at: {data_updated_at} -->
   </head>
   <body class="bg-white">
     <!-- ヘッダー -->
@@ -1384,36 +2203,25 @@ NEWS_PAGE_TEMPLATE = '''<!DOCTYPE html>
     <main>
       <section class="py-16">
         <div class="max-w-6xl mx-auto px-6">
-          <!-- カレンダーセクション -->
-          <div class="grid md:grid-cols-2 gap-6 mb-12">
-            <!-- 今月のカレンダー -->
-            <div class="calendar">
-              <div class="calendar-header">
-                <h3 class="calendar-title">{current_month_title}</h3>
-              </div>
-              <div class="calendar-grid">
-                {current_month_calendar}
-              </div>
-            </div>
-
-            <!-- 来月のカレンダー -->
-            <div class="calendar">
-              <div class="calendar-header">
-                <h3 class="calendar-title">{next_month_title}</h3>
-              </div>
-              <div class="calendar-grid">
-                {next_month_calendar}
-              </div>
-            </div>
-          </div>
+          {calendar_section}
 
           <!-- お知らせ一覧 -->
           <div class="bg-white rounded-xl shadow-sm p-6 md:p-8">
-            <h3 class="text-2xl font-bold text-gray-900 mb-8">お知らせ一覧</h3>
+            <h3 class="text-2xl font-bold text-gray-900 mb-8">{list_title}</h3>
+
+            <div class="mb-6">
+              <input
+                type="search"
+                id="news-search-input"
+                placeholder="お知らせを検索（2文字以上）"
+                class="w-full border border-gray-300 rounded-lg px-4 py-2 text-sm focus:outline-none focus:border-primary"
+              />
+            </div>
+            <div id="news-search-results" class="hidden"></div>
 
             <div id="news-list">
               {news_list}
-            </div>
+            </div>{pager}
           </div>
         </div>
       </section>
@@ -1532,16 +2340,33 @@ NEWS_PAGE_TEMPLATE = '''<!DOCTYPE html>
       id="t7gW8m8CMAZ2rcNw"
       defer
     ></script>
-    <style>
-      #dify-chatbot-bubble-button {{
-        background-color: #1C64F2 !important;
-      }}
-      #dify-chatbot-bubble-window {{
-        width: 24rem !important;
-        height: 40rem !important;
-      }}
-    </style>
 
+    <script src="js/news-search.js" defer></script>
   </body>
 </html>
 '''
+
+
+# カレンダー1ヶ月分のテンプレート
+CALENDAR_BLOCK_TEMPLATE = '''<div class="calendar">
+              <div class="calendar-header">
+                <h3 class="calendar-title">{title}</h3>
+              </div>
+              <div class="calendar-grid">
+                {grid}
+              </div>
+            </div>'''
+
+
+# カレンダーセクションのテンプレート
+CALENDAR_SECTION_TEMPLATE = '''<!-- カレンダーセクション -->
+          <div class="grid md:grid-cols-2 gap-6 mb-12">
+            {calendars}
+          </div>'''
+
+
+# news.html から過去のお知らせページへのリンク
+ARCHIVE_LINK_TEMPLATE = '''
+            <div class="text-center mt-8">
+              <a href="{href}" class="inline-block px-6 py-3 border border-primary text-primary rounded-button hover:bg-primary hover:text-white transition-colors">過去のお知らせを見る</a>
+            </div>'''
@@ -0,0 +1,215 @@
+"""
+添付ファイル・アイキャッチ画像の先頭だけを読んで、実際の形式（MIMEタイプ）と画像の寸法を調べる
+HTTP の Range で先頭 PROBE_BYTES バイトだけを取得してマジックバイトから判定する
+（JPEG で EXIF などが大きく寸法が見つからない場合だけ MAX_PROBE_BYTES まで読み足す）
+
+結果は media テーブルの行（mime_type・width・height・probed_at）に記録し、以降の生成では調べ直さない
+"""
+import http.client
+import struct
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from article_model import Media
+import http_pool
+
+
+PROBE_BYTES = 4096
+MAX_PROBE_BYTES = 65536
+PROBE_TIMEOUT_SECONDS = 10
+
+# JPEG のフレーム開始マーカー（寸法を持つ）。DHT(C4)・JPG(C8)・DAC(CC) は除く
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# ISO BMFF（AVIF / HEIC）のブランド
+HEIF_BRANDS = {b'avif': 'image/avif', b'avis': 'image/avif', b'heic': 'image/heic', b'heix': 'image/heic',
+               b'mif1': 'image/heic'}
+
+# 記録する結果: (MIMEタイプ, 幅, 高さ)。形式が分からない場合は MIMEタイプが None
+ProbeResult = Tuple[Optional[str], Optional[int], Optional[int]]
+
+
+def _jpeg_orientation(segment: bytes) -> int:
+    """
+    APP1 の EXIF から向き（0x0112）を読む（ない場合は 1）
+    """
+    if not segment.startswith(b'Exif\x00\x00'):
+        return 1
+    tiff = segment[6:]
+    if tiff[:2] == b'II':
+        order = '<'
+    elif tiff[:2] == b'MM':
+        order = '>'
+    else:
+        return 1
+    try:
+        (ifd,) = struct.unpack_from(order + 'I', tiff, 4)
+        (count,) = struct.unpack_from(order + 'H', tiff, ifd)
+        for i in range(count):
+            tag, _, _, value = struct.unpack_from(order + 'HHIH', tiff, ifd + 2 + i * 12)
+            if tag == 0x0112:
+                return value
+    except struct.error:
+        pass
+    return 1
+
+
+def _jpeg_size(data: bytes) -> Tuple[Optional[int], Optional[int]]:
+    """
+    JPEG のフレームヘッダーから寸法を読む（EXIFの向きが90度回転なら縦横を入れ替える）
+    読み込んだ範囲に見つからない場合は (None, None)
+    """
+    orientation = 1
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return None, None
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        (length,) = struct.unpack_from('>H', data, pos + 2)
+        if marker == 0xE1 and pos + 2 + length <= len(data):
+            orientation = _jpeg_orientation(data[pos + 4:pos + 2 + length])
+        if marker in JPEG_SOF_MARKERS:
+            if pos + 9 > len(data):
+                return None, None
+            height, width = struct.unpack_from('>HH', data, pos + 5)
+            if orientation in (5, 6, 7, 8):
+                width, height = height, width
+            return width, height
+        pos += 2 + length
+    return None, None
+
+
+def _webp_size(data: bytes) -> Tuple[Optional[int], Optional[int]]:
+    """
+    WebP の最初のチャンク（VP8 / VP8L / VP8X）から寸法を読む
+    """
+    chunk = data[12:16]
+    try:
+        if chunk == b'VP8X':
+            width = int.from_bytes(data[24:27], 'little') + 1
+            height = int.from_bytes(data[27:30], 'little') + 1
+            return width, height
+        if chunk == b'VP8L' and data[20] == 0x2F:
+            (bits,) = struct.unpack_from('<I', data, 21)
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b'VP8 ' and data[23:26] == b'\x9d\x01\x2a':
+            width, height = struct.unpack_from('<HH', data, 26)
+            return width & 0x3FFF, height & 0x3FFF
+    except (IndexError, struct.error):
+        pass
+    return None, None
+
+
+def _heif_size(data: bytes) -> Tuple[Optional[int], Optional[int]]:
+    """
+    AVIF / HEIC の画像の寸法（ispe ボックス）
+    """
+    pos = data.find(b'ispe')
+    if pos < 0 or pos + 16 > len(data):
+        return None, None
+    return struct.unpack_from('>II', data, pos + 8)
+
+
+def probe_head(data: bytes) -> ProbeResult:
+    """
+    ファイルの先頭のバイト列から形式と寸法を判定する
+    ZIP や OLE（Office 文書）のように先頭だけでは種類が決まらない形式は None（アップロード時の値を使う）
+    """
+    if data.startswith(b'\xff\xd8\xff'):
+        return ('image/jpeg', *_jpeg_size(data))
+    if data.startswith(b'\x89PNG\r\n\x1a\n') and data[12:16] == b'IHDR':
+        return ('image/png', *struct.unpack_from('>II', data, 16))
+    if data[:6] in (b'GIF87a', b'GIF89a') and len(data) >= 10:
+        return ('image/gif', *struct.unpack_from('<HH', data, 6))
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return ('image/webp', *_webp_size(data))
+    if data[4:8] == b'ftyp' and data[8:12] in HEIF_BRANDS:
+        return (HEIF_BRANDS[data[8:12]], *_heif_size(data))
+    if data.startswith(b'%PDF-'):
+        return 'application/pdf', None, None
+    return None, None, None
+
+
+def read_range(url: str, start: int, end: int) -> bytes:
+    """
+    ファイルの start から end の手前までを読む（Range に対応しないサーバー・file:// は先頭から読み飛ばす）
+    """
+    req = urllib.request.Request(url, headers={
+        'Range': f'bytes={start}-{end - 1}',
+        'User-Agent': 'asahigaoka-media-probe'
+    })
+    with http_pool.urlopen(req, timeout=PROBE_TIMEOUT_SECONDS) as response:
+        if start and getattr(response, 'status', None) != 206:
+            response.read(start)
+        return response.read(end - start)
+
+
+def probe_url(url: str) -> ProbeResult:
+    """
+    URLのファイルの形式と寸法を調べる
+    """
+    head = read_range(url, 0, PROBE_BYTES)
+    result = probe_head(head)
+    if result[0] == 'image/jpeg' and result[1] is None and len(head) >= PROBE_BYTES:
+        head += read_range(url, PROBE_BYTES, MAX_PROBE_BYTES)
+        result = probe_head(head)
+    return result
+
+
+def _probe_or_none(url: str, probe) -> Optional[ProbeResult]:
+    """
+    調べた結果。ファイルがない場合（404・410）は形式不明として記録し、一時的なエラーは None（次回再試行）
+    403 も一時的なエラーとして扱う（署名付きURL・バケットポリシーの反映待ち・WAF のレート制限などで一時的に返るため）
+    """
+    try:
+        return probe(url)
+    except urllib.error.HTTPError as e:
+        if e.code in (404, 410):
+            return None, None, None
+        print(f'ファイルの先頭を取得できません（次回再試行）: {url} ({e.code})')
+    except (urllib.error.URLError, http.client.HTTPException, OSError, ValueError) as e:
+        print(f'ファイルの先頭を取得できません（次回再試行）: {url} ({e})')
+    return None
+
+
+def probe_media(media: Iterable[Media], max_workers: int = 8, probe=probe_url) -> Tuple[List[Dict], Dict[str, int]]:
+    """
+    まだ調べていない添付ファイルの形式と寸法を並列に調べ、Media に反映する
+    戻り値は (media テーブルに記録する内容, 集計)
+    """
+    # 同じ行（添付ファイルとアイキャッチ画像の両方で使われている画像など）は1回だけ調べて全てに反映する
+    by_id: Dict[str, List[Media]] = {}
+    for m in media:
+        if m.id and m.file_url and not m.probed_at:
+            by_id.setdefault(m.id, []).append(m)
+    targets = [items[0] for items in by_id.values()]
+    summary = {'probed': 0, 'failed': 0}
+    if not targets:
+        return [], summary
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(lambda m: _probe_or_none(m.file_url, probe), targets))
+
+    probed_at = datetime.now(timezone.utc).isoformat()
+    records = []
+    for item, result in zip(targets, results):
+        if result is None:
+            summary['failed'] += 1
+            continue
+        mime_type, width, height = result
+        for same in by_id[item.id]:
+            if mime_type:
+                same.mime_type = mime_type
+            same.width, same.height = width, height
+            same.probed_at = probed_at
+        records.append({'id': item.id, 'mime_type': mime_type, 'width': width, 'height': height})
+        summary['probed'] += 1
+    return records, summary
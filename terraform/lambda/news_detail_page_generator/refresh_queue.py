@@ -0,0 +1,99 @@
+"""
+news.html 再生成リクエストのキュー
+記事の公開/削除ごとに news.html を「要更新」としてマークし、再生成は静かな時間が
+一定時間続いた後に1回だけ実行する（連続公開時の再生成・コミットをまとめる）
+
+本番: SQS に送信し、news_page_generator がバッチウィンドウでまとめて受信する
+ローカル/テスト: LocalRefreshQueue がメモリ上で同じ振る舞いをする
+（受信する側がないため、news_detail_page_generator が各実行の最初と要求の直後に run_due で処理する）
+"""
+import json
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+
+class SqsRefreshQueue:
+    """
+    SQS を使った再生成キュー
+    """
+
+    def __init__(self, queue_url: str, delay_seconds: int = 30, client: Any = None):
+        self.queue_url = queue_url
+        # SQS の DelaySeconds は最大900秒
+        self.delay_seconds = max(0, min(delay_seconds, 900))
+        self._client = client
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            import boto3
+            self._client = boto3.client('sqs')
+        return self._client
+
+    def mark_dirty(self, target: str, reason: str) -> Dict[str, Any]:
+        """
+        再生成リクエストを送信
+        """
+        response = self.client.send_message(
+            QueueUrl=self.queue_url,
+            MessageBody=json.dumps({
+                'target': target,
+                'reason': reason,
+                'requested_at': datetime.utcnow().isoformat() + 'Z'
+            }, ensure_ascii=False),
+            DelaySeconds=self.delay_seconds
+        )
+        return {'queued': True, 'message_id': response.get('MessageId')}
+
+
+class LocalRefreshQueue:
+    """
+    メモリ上の再生成キュー（ローカル実行・テスト用）
+    最後のリクエストから quiet_seconds 経過したターゲットだけを1回ずつ処理する
+    """
+
+    def __init__(self, quiet_seconds: float = 30, clock: Callable[[], float] = time.monotonic):
+        self.quiet_seconds = quiet_seconds
+        self.clock = clock
+        self._pending: Dict[str, Dict[str, Any]] = {}
+
+    def mark_dirty(self, target: str, reason: str) -> Dict[str, Any]:
+        """
+        再生成リクエストを登録（同じターゲットは1件にまとめる）
+        """
+        entry = self._pending.setdefault(target, {'reasons': [], 'last_marked': 0.0})
+        entry['reasons'].append(reason)
+        entry['last_marked'] = self.clock()
+        return {'queued': True, 'pending': len(entry['reasons'])}
+
+    def pending(self) -> List[str]:
+        """
+        未処理のターゲット一覧
+        """
+        return list(self._pending)
+
+    def run_due(self, handler: Callable[[str, List[str]], Any], force: bool = False) -> int:
+        """
+        静かな時間が経過したターゲットを処理し、処理件数を返す
+        """
+        now = self.clock()
+        due = [
+            target for target, entry in self._pending.items()
+            if force or now - entry['last_marked'] >= self.quiet_seconds
+        ]
+        for target in due:
+            entry = self._pending.pop(target)
+            handler(target, entry['reasons'])
+        return len(due)
+
+
+def create_refresh_queue(queue_url: Optional[str], delay_seconds: int) -> Optional[Any]:
+    """
+    設定に応じたキューを生成（未設定の場合は None = 同期更新）
+    """
+    if not queue_url:
+        return None
+    if queue_url == 'local':
+        return LocalRefreshQueue(quiet_seconds=delay_seconds)
+    return SqsRefreshQueue(queue_url, delay_seconds)
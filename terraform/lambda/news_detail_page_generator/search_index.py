@@ -0,0 +1,421 @@
+"""
+お知らせ検索用の静的インデックス
+タイトル・キーワード・本文の文字バイグラムから転置インデックスを作り、ブラウザが検索語に必要な
+シャードだけを読み込めるように、バイグラムのハッシュでシャードに分けたJSONとして出力する
+（検索のたびに Supabase へ問い合わせない。ブラウザ側は js/news-search.js）
+
+ファイル構成（news/search/）:
+    index.json          シャード数・文書チャンクの大きさなどの設定
+    shards/NNN.json     バイグラム → 文書番号のリスト（昇順・差分符号化）
+    tail.json           シャードにまだ取り込んでいない文書のポスティングと、シャードのポスティングが古くなった文書
+    docs/N.json         文書番号 → 表示用の情報（タイトル・URL・日付）
+
+記事ごとに「シャード番号 → そのシャードに入るバイグラムのダイジェスト」を詳細ページの
+マニフェストに記録し、1記事の公開では内容が変わった場合だけ tail.json に追記する（シャードは書き換えない）
+検索結果は「シャードの文書 − tail.json の removed」と「tail.json の文書」を合わせたもの
+tail.json の文書が一定数を超えたらシャードに取り込んで空にする（1回の公開で書き換えるファイル数を抑えるため）
+"""
+import hashlib
+import json
+import re
+import sys
+import unicodedata
+import zlib
+from bisect import bisect_left, insort
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from article_model import Article
+from html_text import html_to_text
+
+
+SEARCH_DIR = 'news/search'
+SEARCH_CONFIG_PATH = f'{SEARCH_DIR}/index.json'
+SEARCH_TAIL_PATH = f'{SEARCH_DIR}/tail.json'
+SEARCH_FORMAT_VERSION = 1
+# 1つの文書チャンクに入れる文書数
+SEARCH_DOCS_PER_CHUNK = 500
+
+TOKEN_PATTERN = re.compile(r'[^\W_]+')
+
+
+def shard_path(shard: int) -> str:
+    """
+    シャードのパス
+    """
+    return f'{SEARCH_DIR}/shards/{shard:03d}.json'
+
+
+def docs_chunk_of(doc: int) -> int:
+    """
+    文書番号が入る文書チャンクの番号
+    """
+    return doc // SEARCH_DOCS_PER_CHUNK
+
+
+def docs_chunk_path(chunk: int) -> str:
+    """
+    文書チャンクのパス
+    """
+    return f'{SEARCH_DIR}/docs/{chunk}.json'
+
+
+def normalize_text(text: str) -> str:
+    """
+    検索用に正規化（全角英数・半角カナを NFKC でそろえ、小文字にする）
+    ブラウザ側でも同じ正規化をしてから検索する
+    """
+    return unicodedata.normalize('NFKC', text).lower()
+
+
+def text_bigrams(text: str) -> Set[str]:
+    """
+    文字バイグラムの集合（記号・空白で区切った語の中だけで作る）
+    """
+    grams = set()
+    for token in TOKEN_PATTERN.findall(normalize_text(text)):
+        grams.update(map(str.__add__, token, token[1:]))
+    return grams
+
+
+@lru_cache(maxsize=None)
+def shard_of(gram: str, shard_count: int) -> int:
+    """
+    バイグラムが入るシャード番号（ブラウザ側と同じ CRC32 で決める）
+    バイグラムの種類は記事数ほど増えないため、計算結果をキャッシュする
+    """
+    return zlib.crc32(gram.encode('utf-8')) % shard_count
+
+
+def article_search_text(article: Article) -> str:
+    """
+    インデックスの対象にする文字列（タイトル・キーワード・本文の表示されるテキスト）
+    """
+    body = html_to_text(article.content)
+    return '\n'.join([article.title, article.meta_keywords or '', body])
+
+
+def search_record(article: Article) -> Dict[str, str]:
+    """
+    検索結果の表示に使う文書の情報
+    """
+    return {
+        't': article.title,
+        'u': article.detail_path,
+        'd': article.published_date_jp
+    }
+
+
+def grams_by_shard(grams: Iterable[str], shard_count: int) -> Dict[int, List[str]]:
+    """
+    バイグラムをシャードごとに振り分ける
+    """
+    shards: Dict[int, List[str]] = {}
+    for gram in grams:
+        # 全記事分を保持する再生成時のメモリを抑えるため、同じバイグラムは1つの文字列を共有する
+        shards.setdefault(shard_of(gram, shard_count), []).append(sys.intern(gram))
+    for shard_grams in shards.values():
+        shard_grams.sort()
+    return shards
+
+
+def digest(value: Any) -> str:
+    """
+    マニフェストに記録する短いダイジェスト
+    """
+    data = value if isinstance(value, str) else json.dumps(value, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()[:12]
+
+
+class SearchDocument:
+    """
+    インデックスに登録する1記事分のデータ
+    """
+
+    __slots__ = ('doc', 'record', 'shards')
+
+    def __init__(self, doc: int, article: Article, shard_count: int):
+        self.doc = doc
+        self.record = search_record(article)
+        self.shards = grams_by_shard(text_bigrams(article_search_text(article)), shard_count)
+
+    def manifest_entry(self) -> Dict[str, Any]:
+        """
+        マニフェストに記録する情報（次回の公開で変わったシャードを判定する）
+        """
+        return {
+            'doc': self.doc,
+            'record': digest(self.record),
+            'shards': {str(shard): digest('\n'.join(grams)) for shard, grams in self.shards.items()}
+        }
+
+
+def next_doc_number(manifest_articles: Dict[str, Dict[str, Any]]) -> int:
+    """
+    まだ使われていない文書番号（削除した記事の番号は再利用しない）
+    """
+    docs = [
+        entry['search']['doc'] for entry in manifest_articles.values()
+        if isinstance(entry.get('search'), dict)
+    ]
+    return max(docs, default=-1) + 1
+
+
+def affected_files(previous: Optional[Dict[str, Any]], current: Optional[Dict[str, Any]]) -> Tuple[bool, Set[int]]:
+    """
+    前回と今回のマニフェスト情報から、(ポスティングの書き換えが必要か, 書き換えが必要な文書チャンク番号) を求める
+    """
+    postings_changed = (
+        (previous or {}).get('shards') != (current or {}).get('shards')
+        or (previous is not None and current is not None and previous['doc'] != current['doc'])
+    )
+
+    chunks = set()
+    if previous and (not current or previous['doc'] != current['doc'] or previous['record'] != current['record']):
+        chunks.add(docs_chunk_of(previous['doc']))
+    if current and (not previous or previous['doc'] != current['doc'] or previous['record'] != current['record']):
+        chunks.add(docs_chunk_of(current['doc']))
+    return postings_changed, chunks
+
+
+def decode_shard(content: Optional[str]) -> Dict[str, List[int]]:
+    """
+    シャードのJSONをバイグラム → 文書番号のリスト（昇順）に戻す
+    """
+    if not content:
+        return {}
+    data = json.loads(content)
+    if data.get('version') != SEARCH_FORMAT_VERSION:
+        return {}
+    postings = {}
+    for gram, gaps in data.get('postings', {}).items():
+        doc = 0
+        docs = []
+        for gap in gaps:
+            doc += gap
+            docs.append(doc)
+        postings[gram] = docs
+    return postings
+
+
+def encode_shard(postings: Dict[str, List[int]]) -> str:
+    """
+    シャードをJSONに変換（文書番号は差分で持ち、空のリストは除く）
+    """
+    encoded = {}
+    for gram in sorted(postings):
+        docs = postings[gram]
+        if not docs:
+            continue
+        encoded[gram] = [docs[0]] + [docs[i] - docs[i - 1] for i in range(1, len(docs))]
+    return json.dumps(
+        {'version': SEARCH_FORMAT_VERSION, 'postings': encoded},
+        ensure_ascii=False,
+        separators=(',', ':')
+    ) + '\n'
+
+
+def decode_tail(content: Optional[str]) -> Tuple[Dict[str, List[int]], Set[int]]:
+    """
+    tail.json を (バイグラム → 文書番号のリスト, シャードのポスティングが古くなった文書番号) に戻す
+    """
+    if not content:
+        return {}, set()
+    data = json.loads(content)
+    if data.get('version') != SEARCH_FORMAT_VERSION:
+        return {}, set()
+    return decode_shard(content), set(data.get('removed', []))
+
+
+def encode_tail(postings: Dict[str, List[int]], removed: Set[int]) -> str:
+    """
+    tail.json に変換（ポスティングはシャードと同じ形式）
+    """
+    data = json.loads(encode_shard(postings))
+    data['removed'] = sorted(removed)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def tail_docs(postings: Dict[str, List[int]], removed: Set[int]) -> Set[int]:
+    """
+    tail.json に載っている文書番号
+    """
+    docs = set(removed)
+    for doc_list in postings.values():
+        docs.update(doc_list)
+    return docs
+
+
+def decode_docs_chunk(content: Optional[str]) -> Dict[str, Dict[str, str]]:
+    """
+    文書チャンクのJSONを文書番号（文字列） → 表示用の情報に戻す
+    """
+    if not content:
+        return {}
+    data = json.loads(content)
+    if data.get('version') != SEARCH_FORMAT_VERSION:
+        return {}
+    return data.get('docs', {})
+
+
+def encode_docs_chunk(docs: Dict[str, Dict[str, str]]) -> str:
+    """
+    文書チャンクをJSONに変換
+    """
+    ordered = {key: docs[key] for key in sorted(docs, key=int)}
+    return json.dumps(
+        {'version': SEARCH_FORMAT_VERSION, 'docs': ordered},
+        ensure_ascii=False,
+        separators=(',', ':')
+    ) + '\n'
+
+
+def encode_config(shard_count: int) -> str:
+    """
+    ブラウザが最初に読み込む設定
+    """
+    return json.dumps({
+        'version': SEARCH_FORMAT_VERSION,
+        'shards': shard_count,
+        'docs_per_chunk': SEARCH_DOCS_PER_CHUNK
+    }, separators=(',', ':')) + '\n'
+
+
+def remove_doc(postings: Dict[str, List[int]], doc: int) -> None:
+    """
+    シャードから文書を取り除く（前回のバイグラムは記録していないため全リストを探す）
+    """
+    for docs in postings.values():
+        i = bisect_left(docs, doc)
+        if i < len(docs) and docs[i] == doc:
+            del docs[i]
+
+
+def add_doc(postings: Dict[str, List[int]], doc: int, grams: List[str]) -> None:
+    """
+    シャードに文書を追加
+    """
+    for gram in grams:
+        docs = postings.setdefault(gram, [])
+        i = bisect_left(docs, doc)
+        if i == len(docs) or docs[i] != doc:
+            insort(docs, doc)
+
+
+def apply_updates(
+    updates: List[Tuple[Optional[Dict[str, Any]], Optional[SearchDocument]]],
+    tail: Dict[str, List[int]],
+    removed: Set[int],
+    chunks: Dict[int, Dict[str, Dict[str, str]]]
+) -> bool:
+    """
+    (前回のマニフェスト情報, 今回の文書) の組を tail.json のポスティングと文書チャンクに反映する
+    tail / removed / chunks はその場で書き換える（chunks には affected_files で求めた分を読み込んで渡す）
+    今回の文書が None の場合は削除。ポスティングを書き換えた場合は True を返す
+    """
+    postings_changed = False
+    for previous, document in updates:
+        current = document.manifest_entry() if document else None
+        changed, chunk_numbers = affected_files(previous, current)
+        if changed:
+            postings_changed = True
+            if previous:
+                # シャードに残っている前回のポスティングは検索結果から除き、tail にある分は消す
+                remove_doc(tail, previous['doc'])
+                removed.add(previous['doc'])
+            if document:
+                for grams in document.shards.values():
+                    add_doc(tail, document.doc, grams)
+        for chunk in chunk_numbers:
+            docs = chunks[chunk]
+            if previous:
+                docs.pop(str(previous['doc']), None)
+            if document and docs_chunk_of(document.doc) == chunk:
+                docs[str(document.doc)] = document.record
+    return postings_changed
+
+
+def merge_tail(
+    shards: Dict[int, Dict[str, List[int]]],
+    tail: Dict[str, List[int]],
+    removed: Set[int],
+    shard_count: int
+) -> None:
+    """
+    tail.json の内容を全シャードに取り込む（shards はその場で書き換える）
+    """
+    for postings in shards.values():
+        for gram, docs in postings.items():
+            if removed.intersection(docs):
+                postings[gram] = [doc for doc in docs if doc not in removed]
+    for gram, docs in tail.items():
+        postings = shards[shard_of(gram, shard_count)]
+        for doc in docs:
+            add_doc(postings, doc, [gram])
+
+
+def build_index(documents: List[SearchDocument], shard_count: int) -> Dict[str, str]:
+    """
+    全文書からインデックスを作り直す（パス → 内容）。空になるシャードも空のファイルとして出力し、tail.json は空にする
+    """
+    shards: Dict[int, Dict[str, List[int]]] = {shard: {} for shard in range(shard_count)}
+    chunks: Dict[int, Dict[str, Dict[str, str]]] = {}
+    for document in sorted(documents, key=lambda d: d.doc):
+        for shard, grams in document.shards.items():
+            postings = shards[shard]
+            for gram in grams:
+                postings.setdefault(gram, []).append(document.doc)
+        chunks.setdefault(docs_chunk_of(document.doc), {})[str(document.doc)] = document.record
+
+    files = {SEARCH_CONFIG_PATH: encode_config(shard_count), SEARCH_TAIL_PATH: encode_tail({}, set())}
+    for shard, postings in shards.items():
+        files[shard_path(shard)] = encode_shard(postings)
+    for chunk, docs in chunks.items():
+        files[docs_chunk_path(chunk)] = encode_docs_chunk(docs)
+    return files
+
+
+def update_index(
+    updates: List[Tuple[Optional[Dict[str, Any]], Optional[SearchDocument]]],
+    read_files: Callable[[List[str]], Dict[str, Optional[str]]],
+    shard_count: int,
+    tail_max_docs: int
+) -> Dict[str, str]:
+    """
+    (前回のマニフェスト情報, 今回の文書) の組をインデックスに反映し、書き換えたファイル（パス → 内容）を返す
+    read_files には必要なファイルだけをまとめて渡す（存在しないファイルは None を返す）
+    書き換えるのは tail.json と変わった文書チャンクだけ。tail.json の文書が tail_max_docs を超えた場合は
+    全シャードを読み込んで取り込み、内容が変わったシャードも書き換える
+    """
+    chunk_numbers: Set[int] = set()
+    for previous, document in updates:
+        chunk_numbers |= affected_files(previous, document.manifest_entry() if document else None)[1]
+
+    paths = [SEARCH_CONFIG_PATH, SEARCH_TAIL_PATH]
+    paths += [docs_chunk_path(chunk) for chunk in sorted(chunk_numbers)]
+    contents = read_files(paths)
+
+    tail, removed = decode_tail(contents[SEARCH_TAIL_PATH])
+    chunks = {chunk: decode_docs_chunk(contents[docs_chunk_path(chunk)]) for chunk in chunk_numbers}
+    postings_changed = apply_updates(updates, tail, removed, chunks)
+
+    files = {}
+    if contents[SEARCH_CONFIG_PATH] is None:
+        files[SEARCH_CONFIG_PATH] = encode_config(shard_count)
+    for chunk, docs in chunks.items():
+        files[docs_chunk_path(chunk)] = encode_docs_chunk(docs)
+    if not postings_changed:
+        return files
+
+    if len(tail_docs(tail, removed)) > tail_max_docs:
+        shard_paths = [shard_path(shard) for shard in range(shard_count)]
+        shard_contents = read_files(shard_paths)
+        shards = {shard: decode_shard(shard_contents[shard_path(shard)]) for shard in range(shard_count)}
+        merge_tail(shards, tail, removed, shard_count)
+        for shard, postings in shards.items():
+            content = encode_shard(postings)
+            if content != shard_contents[shard_path(shard)]:
+                files[shard_path(shard)] = content
+        tail, removed = {}, set()
+    files[SEARCH_TAIL_PATH] = encode_tail(tail, removed)
+    return files
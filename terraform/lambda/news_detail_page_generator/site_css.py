@@ -0,0 +1,791 @@
+"""
+生成ページ用のスタイルシート（Tailwind CDN の代わりに生成時に作る）
+出力したHTMLの class 属性から使われているユーティリティクラスを集め、使われているルールだけを
+Tailwind のリセット（preflight）・お知らせ一覧の共通スタイルと合わせて1つのファイルにする
+
+ファイル名は内容のハッシュ（css/site.<ハッシュ>.css）で、置いた後に内容が変わらないため長期間キャッシュできる
+ページは生成時にプレースホルダーでリンクしておき、スタイルシートを決めてから置き換える
+
+使われたクラスの一覧は GitHub のマニフェスト（css/manifest.json）に記録し、新しいクラスが
+使われた場合（またはこのファイルを変更した場合）だけスタイルシートを作り直す
+一覧は追加するだけなので、以前のスタイルシートを参照しているページもそのまま表示できる
+
+変換表は tailwind.config（primary / secondary の色・角丸）と Tailwind v3 の既定値に合わせている
+表にないクラスは出力しない（ページ独自のクラスや Remix Icon のクラスと区別しない）
+
+news_page_generator と news_detail_page_generator に同じファイルを置いている（変更時は両方を更新）
+"""
+import hashlib
+import json
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+
+CSS_DIR = 'css'
+CSS_MANIFEST_PATH = f'{CSS_DIR}/manifest.json'
+CSS_MANIFEST_VERSION = 1
+
+# ページのテンプレートに埋め込み、スタイルシートのパスに置き換える
+STYLESHEET_PLACEHOLDER = '__SITE_STYLESHEET__'
+
+CLASS_ATTR_PATTERN = re.compile(r'\bclass="([^"]*)"')
+# スクリプトで付け外しするクラス（classList.toggle("hidden") など）
+CLASS_LIST_PATTERN = re.compile(r'classList\.(?:add|remove|toggle)\(\s*["\']([^"\']+)["\']')
+
+
+# Tailwind v3 の preflight（CDN 版が先頭に挿入していたもの）
+PREFLIGHT_CSS = r'''
+*, ::before, ::after { box-sizing: border-box; border-width: 0; border-style: solid; border-color: #e5e7eb; }
+html, :host {
+  line-height: 1.5; -webkit-text-size-adjust: 100%; -moz-tab-size: 4; tab-size: 4;
+  font-family: ui-sans-serif, system-ui, sans-serif, "Apple Color Emoji", "Segoe UI Emoji", "Segoe UI Symbol", "Noto Color Emoji";
+  font-feature-settings: normal; font-variation-settings: normal; -webkit-tap-highlight-color: transparent;
+}
+body { margin: 0; line-height: inherit; }
+hr { height: 0; color: inherit; border-top-width: 1px; }
+abbr:where([title]) { text-decoration: underline dotted; }
+h1, h2, h3, h4, h5, h6 { font-size: inherit; font-weight: inherit; }
+a { color: inherit; text-decoration: inherit; }
+b, strong { font-weight: bolder; }
+code, kbd, samp, pre {
+  font-family: ui-monospace, SFMono-Regular, Menlo, Monaco, Consolas, "Liberation Mono", "Courier New", monospace;
+  font-feature-settings: normal; font-variation-settings: normal; font-size: 1em;
+}
+small { font-size: 80%; }
+sub, sup { font-size: 75%; line-height: 0; position: relative; vertical-align: baseline; }
+sub { bottom: -0.25em; }
+sup { top: -0.5em; }
+table { text-indent: 0; border-color: inherit; border-collapse: collapse; }
+button, input, optgroup, select, textarea {
+  font-family: inherit; font-feature-settings: inherit; font-variation-settings: inherit; font-size: 100%;
+  font-weight: inherit; line-height: inherit; letter-spacing: inherit; color: inherit; margin: 0; padding: 0;
+}
+button, select { text-transform: none; }
+button, input:where([type="button"]), input:where([type="reset"]), input:where([type="submit"]) {
+  -webkit-appearance: button; background-color: transparent; background-image: none;
+}
+:-moz-focusring { outline: auto; }
+:-moz-ui-invalid { box-shadow: none; }
+progress { vertical-align: baseline; }
+::-webkit-inner-spin-button, ::-webkit-outer-spin-button { height: auto; }
+[type="search"] { -webkit-appearance: textfield; outline-offset: -2px; }
+::-webkit-search-decoration { -webkit-appearance: none; }
+::-webkit-file-upload-button { -webkit-appearance: button; font: inherit; }
+summary { display: list-item; }
+blockquote, dl, dd, h1, h2, h3, h4, h5, h6, hr, figure, p, pre { margin: 0; }
+fieldset { margin: 0; padding: 0; }
+legend { padding: 0; }
+ol, ul, menu { list-style: none; margin: 0; padding: 0; }
+dialog { padding: 0; }
+textarea { resize: vertical; }
+input::placeholder, textarea::placeholder { opacity: 1; color: #9ca3af; }
+button, [role="button"] { cursor: pointer; }
+:disabled { cursor: default; }
+img, svg, video, canvas, audio, iframe, embed, object { display: block; vertical-align: middle; }
+img, video { max-width: 100%; height: auto; }
+[hidden]:where(:not([hidden="until-found"])) { display: none; }
+'''
+
+
+# お知らせ一覧（news.html・過去のお知らせページ）の共通スタイル（以前はページごとに <style> で埋め込んでいた）
+NEWS_PAGE_CSS = r'''
+:where([class^="ri-"])::before { content: "\f3c2"; }
+
+/* カレンダースタイル */
+.calendar {
+  background: white;
+  border-radius: 12px;
+  padding: 20px;
+  box-shadow: 0 1px 3px 0 rgba(0, 0, 0, 0.1);
+}
+
+.calendar-header {
+  display: flex;
+  justify-content: space-between;
+  align-items: center;
+  margin-bottom: 16px;
+  padding-bottom: 12px;
+  border-bottom: 2px solid #e5e7eb;
+}
+
+.calendar-title {
+  font-size: 1.25rem;
+  font-weight: bold;
+  color: #111827;
+}
+
+.calendar-grid {
+  display: grid;
+  grid-template-columns: repeat(7, 1fr);
+  gap: 1px;
+  border: 1px solid #e5e7eb;
+  border-radius: 8px;
+  overflow: hidden;
+}
+
+.calendar-day-header {
+  text-align: center;
+  font-size: 0.75rem;
+  font-weight: 600;
+  color: #6b7280;
+  padding: 8px 4px;
+  background: #f9fafb;
+  border-right: 1px solid #e5e7eb;
+  border-bottom: 1px solid #e5e7eb;
+}
+
+.calendar-day-header:last-child {
+  border-right: none;
+}
+
+.calendar-day {
+  display: flex;
+  flex-direction: column;
+  align-items: flex-start;
+  justify-content: flex-start;
+  font-size: 0.875rem;
+  color: #374151;
+  cursor: pointer;
+  transition: background 0.2s;
+  padding: 4px;
+  height: 80px;
+  border-right: 1px solid #e5e7eb;
+  border-bottom: 1px solid #e5e7eb;
+  overflow: hidden;
+  box-sizing: border-box;
+}
+
+.calendar-day:nth-child(7n) {
+  border-right: none;
+}
+
+.calendar-day:hover {
+  background: #f3f4f6;
+}
+
+.calendar-day.other-month {
+  color: #d1d5db;
+  background: #fafafa;
+}
+
+.calendar-day.today {
+  background: #57b5e7;
+  color: white;
+  font-weight: bold;
+}
+
+.calendar-day-number {
+  font-weight: 600;
+  margin-bottom: 2px;
+  flex-shrink: 0;
+  width: 100%;
+  text-align: left;
+}
+
+.calendar-day-event {
+  font-size: 0.65rem;
+  line-height: 1.3;
+  text-align: left;
+  width: 100%;
+  padding: 2px 4px;
+  margin-top: auto;
+  background: #fef3c7;
+  color: #92400e;
+  border-radius: 3px;
+  overflow: hidden;
+  white-space: normal;
+  word-break: break-word;
+  cursor: pointer;
+  transition: all 0.2s;
+  flex: 1;
+  display: -webkit-box;
+  -webkit-line-clamp: 2;
+  -webkit-box-orient: vertical;
+  min-height: 0;
+}
+
+.calendar-day.today .calendar-day-event {
+  background: rgba(255, 255, 255, 0.3);
+  color: white;
+}
+
+.calendar-day-event:hover {
+  background: #fde68a;
+}
+
+.calendar-day.today .calendar-day-event:hover {
+  background: rgba(255, 255, 255, 0.5);
+}
+
+.calendar-day.has-event {
+  position: relative;
+}
+
+.calendar-day-event-nolink {
+  cursor: default;
+}
+
+.calendar-day-event-nolink:hover {
+  background: #fef3c7;
+}
+
+.calendar-day.today .calendar-day-event-nolink:hover {
+  background: rgba(255, 255, 255, 0.3);
+}
+
+/* 同じ日に複数のイベントがある場合は1行ずつ表示 */
+.calendar-day.multi-event .calendar-day-event {
+  flex: 0 0 auto;
+  margin-top: 2px;
+  -webkit-line-clamp: 1;
+}
+
+.calendar-day-event-continued {
+  border-left: 2px solid #f59e0b;
+}
+
+.calendar-day-more {
+  font-size: 0.6rem;
+  line-height: 1.2;
+  color: #6b7280;
+  margin-top: 1px;
+}
+
+.calendar-day.today .calendar-day-more {
+  color: white;
+}
+
+/* お知らせ一覧スタイル */
+.news-item {
+  display: flex;
+  align-items: center;
+  gap: 16px;
+  padding: 20px 0;
+  border-bottom: 1px dashed #d1d5db;
+  transition: background 0.2s;
+  text-decoration: none;
+  color: inherit;
+}
+
+.news-item:hover {
+  background: #f9fafb;
+  padding-left: 8px;
+  padding-right: 8px;
+  margin-left: -8px;
+  margin-right: -8px;
+  border-radius: 8px;
+}
+
+.news-item-image {
+  width: 120px;
+  height: 80px;
+  object-fit: cover;
+  border-radius: 8px;
+  flex-shrink: 0;
+}
+
+/* 派生画像の <picture> はレイアウトに影響させない（中の img に .news-item-image を付ける） */
+.news-item picture {
+  display: contents;
+}
+
+.news-item-content {
+  flex: 1;
+  min-width: 0;
+}
+
+.news-item-date {
+  font-size: 0.875rem;
+  color: #6b7280;
+  margin-bottom: 4px;
+}
+
+.news-item-title {
+  font-size: 1rem;
+  font-weight: 600;
+  color: #111827;
+  margin-bottom: 8px;
+  line-height: 1.5;
+}
+
+.news-item-icons {
+  display: flex;
+  gap: 8px;
+  align-items: center;
+}
+
+.news-item-icon {
+  width: 20px;
+  height: 20px;
+  display: flex;
+  align-items: center;
+  justify-content: center;
+  border-radius: 4px;
+}
+
+.news-item-icon.line {
+  background: #00C300;
+  color: white;
+}
+
+.news-item-icon.x {
+  background: #000000;
+  color: white;
+}
+
+.news-item-nolink {
+  cursor: default;
+}
+
+.news-item-nolink:hover {
+  background: transparent;
+  padding-left: 0;
+  padding-right: 0;
+  margin-left: 0;
+  margin-right: 0;
+  border-radius: 0;
+}
+
+@media (max-width: 768px) {
+  .news-item {
+    flex-direction: column;
+    align-items: flex-start;
+  }
+
+  .news-item-image {
+    width: 100%;
+    height: 200px;
+  }
+
+  .calendar-grid {
+    gap: 1px;
+  }
+
+  .calendar-day {
+    font-size: 0.75rem;
+    height: 60px;
+    padding: 2px;
+  }
+
+  .calendar-day-event {
+    font-size: 0.6rem;
+    padding: 1px 2px;
+  }
+}
+
+/* チャットボット */
+#dify-chatbot-bubble-button {
+  background-color: #1C64F2 !important;
+}
+#dify-chatbot-bubble-window {
+  width: 24rem !important;
+  height: 40rem !important;
+}
+'''
+
+
+# ---- 変換表（tailwind.config と Tailwind v3 の既定値） ----
+
+SCREENS = {'sm': '640px', 'md': '768px', 'lg': '1024px', 'xl': '1280px', '2xl': '1536px'}
+# 状態のバリアント（出力順は Tailwind と同じ）
+PSEUDO_VARIANTS = {
+    'first': ':first-child',
+    'last': ':last-child',
+    'odd': ':nth-child(odd)',
+    'even': ':nth-child(even)',
+    'focus-within': ':focus-within',
+    'hover': ':hover',
+    'focus': ':focus',
+    'focus-visible': ':focus-visible',
+    'active': ':active',
+    'disabled': ':disabled',
+}
+
+_PALETTE = {
+    'gray': ('#f9fafb', '#f3f4f6', '#e5e7eb', '#d1d5db', '#9ca3af', '#6b7280', '#4b5563', '#374151', '#1f2937', '#111827'),
+    'red': ('#fef2f2', '#fee2e2', '#fecaca', '#fca5a5', '#f87171', '#ef4444', '#dc2626', '#b91c1c', '#991b1b', '#7f1d1d'),
+    'orange': ('#fff7ed', '#ffedd5', '#fed7aa', '#fdba74', '#fb923c', '#f97316', '#ea580c', '#c2410c', '#9a3412', '#7c2d12'),
+    'yellow': ('#fefce8', '#fef9c3', '#fef08a', '#fde047', '#facc15', '#eab308', '#ca8a04', '#a16207', '#854d0e', '#713f12'),
+    'green': ('#f0fdf4', '#dcfce7', '#bbf7d0', '#86efac', '#4ade80', '#22c55e', '#16a34a', '#15803d', '#166534', '#14532d'),
+    'blue': ('#eff6ff', '#dbeafe', '#bfdbfe', '#93c5fd', '#60a5fa', '#3b82f6', '#2563eb', '#1d4ed8', '#1e40af', '#1e3a8a'),
+}
+COLORS = {
+    'inherit': 'inherit',
+    'current': 'currentColor',
+    'transparent': 'transparent',
+    'black': '#000',
+    'white': '#fff',
+    'primary': '#57b5e7',
+    'secondary': '#8dd3c7',
+}
+for _name, _shades in _PALETTE.items():
+    for _step, _value in zip((50, 100, 200, 300, 400, 500, 600, 700, 800, 900), _shades):
+        COLORS[f'{_name}-{_step}'] = _value
+
+SPACING = {'0': '0px', 'px': '1px'}
+for _step in (0.5, 1, 1.5, 2, 2.5, 3, 3.5, 4, 5, 6, 7, 8, 9, 10, 11, 12, 14, 16, 20, 24, 28, 32, 36, 40, 44, 48,
+              52, 56, 60, 64, 72, 80, 96):
+    SPACING[f'{_step:g}'] = f'{_step / 4:g}rem'
+
+FRACTIONS = {'1/2': '50%', '1/3': '33.333333%', '2/3': '66.666667%', '1/4': '25%', '3/4': '75%'}
+SIZES = {**SPACING, **FRACTIONS, 'auto': 'auto', 'full': '100%'}
+INSETS = {**SPACING, **FRACTIONS, 'auto': 'auto', 'full': '100%'}
+
+BORDER_RADIUS = {
+    'none': '0px', 'sm': '4px', '': '8px', 'md': '12px', 'lg': '16px', 'xl': '20px',
+    '2xl': '24px', '3xl': '32px', 'full': '9999px', 'button': '8px',
+}
+BORDER_WIDTHS = {'': '1px', '0': '0px', '2': '2px', '4': '4px', '8': '8px'}
+FONT_SIZES = {
+    'xs': ('0.75rem', '1rem'), 'sm': ('0.875rem', '1.25rem'), 'base': ('1rem', '1.5rem'),
+    'lg': ('1.125rem', '1.75rem'), 'xl': ('1.25rem', '1.75rem'), '2xl': ('1.5rem', '2rem'),
+    '3xl': ('1.875rem', '2.25rem'), '4xl': ('2.25rem', '2.5rem'), '5xl': ('3rem', '1'), '6xl': ('3.75rem', '1'),
+}
+FONT_WEIGHTS = {
+    'thin': '100', 'extralight': '200', 'light': '300', 'normal': '400', 'medium': '500',
+    'semibold': '600', 'bold': '700', 'extrabold': '800', 'black': '900',
+}
+LINE_HEIGHTS = {
+    'none': '1', 'tight': '1.25', 'snug': '1.375', 'normal': '1.5', 'relaxed': '1.625', 'loose': '2',
+    **{str(n): f'{n / 4:g}rem' for n in range(3, 11)},
+}
+MAX_WIDTHS = {
+    'none': 'none', 'xs': '20rem', 'sm': '24rem', 'md': '28rem', 'lg': '32rem', 'xl': '36rem', '2xl': '42rem',
+    '3xl': '48rem', '4xl': '56rem', '5xl': '64rem', '6xl': '72rem', '7xl': '80rem', 'full': '100%', 'prose': '65ch',
+}
+SHADOWS = {
+    'sm': '0 1px 2px 0 rgb(0 0 0 / 0.05)',
+    '': '0 1px 3px 0 rgb(0 0 0 / 0.1), 0 1px 2px -1px rgb(0 0 0 / 0.1)',
+    'md': '0 4px 6px -1px rgb(0 0 0 / 0.1), 0 2px 4px -2px rgb(0 0 0 / 0.1)',
+    'lg': '0 10px 15px -3px rgb(0 0 0 / 0.1), 0 4px 6px -4px rgb(0 0 0 / 0.1)',
+    'xl': '0 20px 25px -5px rgb(0 0 0 / 0.1), 0 8px 10px -6px rgb(0 0 0 / 0.1)',
+    'none': '0 0 #0000',
+}
+TRANSITION_TIMING = 'transition-timing-function: cubic-bezier(0.4, 0, 0.2, 1); transition-duration: 150ms'
+TRANSITIONS = {
+    '': 'color, background-color, border-color, text-decoration-color, fill, stroke, opacity, box-shadow, transform, filter, backdrop-filter',
+    'all': 'all',
+    'colors': 'color, background-color, border-color, text-decoration-color, fill, stroke',
+    'opacity': 'opacity',
+    'shadow': 'box-shadow',
+    'transform': 'transform',
+}
+GRID_COUNTS = {str(n): str(n) for n in range(1, 13)}
+Z_INDEXES = {'0': '0', '10': '10', '20': '20', '30': '30', '40': '40', '50': '50', 'auto': 'auto'}
+OPACITIES = {str(n): f'{n / 100:g}' for n in (0, 5, 10, 20, 25, 30, 40, 50, 60, 70, 75, 80, 90, 95, 100)}
+DURATIONS = {str(n): f'{n}ms' for n in (75, 100, 150, 200, 300, 500, 700, 1000)}
+
+
+
+def _properties(*names: str) -> Callable[[str], str]:
+    """
+    値を指定したプロパティすべてに設定する宣言
+    """
+    return lambda value: '; '.join(f'{name}: {value}' for name in names)
+
+
+def _sides(prefix: str, property_name: str) -> List[Tuple[str, Tuple[str, ...]]]:
+    """
+    全体・左右・上下・各辺の接頭辞とプロパティ（後のものほど優先されるよう Tailwind と同じ順）
+    """
+    return [
+        (prefix, (property_name,)),
+        (f'{prefix}x', (f'{property_name}-left', f'{property_name}-right')),
+        (f'{prefix}y', (f'{property_name}-top', f'{property_name}-bottom')),
+        (f'{prefix}t', (f'{property_name}-top',)),
+        (f'{prefix}r', (f'{property_name}-right',)),
+        (f'{prefix}b', (f'{property_name}-bottom',)),
+        (f'{prefix}l', (f'{property_name}-left',)),
+    ]
+
+
+# ユーティリティの一覧（出力順。Tailwind のプラグインの順に並べ、後のものほど優先される）
+# 値を取らないクラス: (None, {クラス名: 宣言})
+# 値を取るクラス: (接頭辞, {値: CSSの値}, 値 → 宣言, 子要素のセレクタ, 負の値を使えるか)
+# 値の表の '' は接頭辞だけのクラス（rounded / border / shadow など）
+UTILITIES: List[Tuple] = []
+
+
+def _static(**declarations: str) -> None:
+    UTILITIES.append((None, {name.replace('_', '-'): value for name, value in declarations.items()}))
+
+
+def _scale(prefix: str, values: Dict[str, Any], declare: Callable[[Any], str], child: str = '',
+           negative: bool = False) -> None:
+    UTILITIES.append((prefix, values, declare, child, negative))
+
+
+_static(sr_only='position: absolute; width: 1px; height: 1px; padding: 0; margin: -1px; overflow: hidden; '
+                'clip: rect(0, 0, 0, 0); white-space: nowrap; border-width: 0')
+_static(visible='visibility: visible', invisible='visibility: hidden')
+_static(static='position: static', fixed='position: fixed', absolute='position: absolute',
+        relative='position: relative', sticky='position: sticky')
+_scale('inset', INSETS, _properties('inset'), negative=True)
+_scale('inset-x', INSETS, _properties('left', 'right'), negative=True)
+_scale('inset-y', INSETS, _properties('top', 'bottom'), negative=True)
+for _side in ('top', 'right', 'bottom', 'left'):
+    _scale(_side, INSETS, _properties(_side), negative=True)
+_scale('z', Z_INDEXES, _properties('z-index'))
+_scale('col-span', GRID_COUNTS, lambda v: f'grid-column: span {v} / span {v}')
+_static(col_span_full='grid-column: 1 / -1')
+for _prefix, _names in _sides('m', 'margin'):
+    _scale(_prefix, {**SPACING, 'auto': 'auto'}, _properties(*_names), negative=True)
+_static(block='display: block', inline_block='display: inline-block', inline='display: inline',
+        flex='display: flex', inline_flex='display: inline-flex', table='display: table', grid='display: grid',
+        inline_grid='display: inline-grid', contents='display: contents', hidden='display: none')
+_scale('h', {**SIZES, 'screen': '100vh'}, _properties('height'))
+_scale('min-h', {'0': '0px', 'full': '100%', 'screen': '100vh'}, _properties('min-height'))
+_scale('w', {**SIZES, 'screen': '100vw'}, _properties('width'))
+_scale('max-w', MAX_WIDTHS, _properties('max-width'))
+_static(flex_1='flex: 1 1 0%', flex_auto='flex: 1 1 auto', flex_none='flex: none')
+_static(shrink_0='flex-shrink: 0', flex_shrink_0='flex-shrink: 0', grow='flex-grow: 1', flex_grow='flex-grow: 1')
+_static(cursor_pointer='cursor: pointer', cursor_default='cursor: default')
+_static(list_inside='list-style-position: inside')
+_static(list_none='list-style-type: none', list_disc='list-style-type: disc', list_decimal='list-style-type: decimal')
+_scale('grid-cols', {**GRID_COUNTS, 'none': 'none'},
+       lambda v: f'grid-template-columns: {v if v == "none" else f"repeat({v}, minmax(0, 1fr))"}')
+_static(flex_row='flex-direction: row', flex_row_reverse='flex-direction: row-reverse',
+        flex_col='flex-direction: column', flex_col_reverse='flex-direction: column-reverse')
+_static(flex_wrap='flex-wrap: wrap', flex_nowrap='flex-wrap: nowrap')
+_static(items_start='align-items: flex-start', items_end='align-items: flex-end', items_center='align-items: center',
+        items_baseline='align-items: baseline', items_stretch='align-items: stretch')
+_static(justify_start='justify-content: flex-start', justify_end='justify-content: flex-end',
+        justify_center='justify-content: center', justify_between='justify-content: space-between',
+        justify_around='justify-content: space-around', justify_evenly='justify-content: space-evenly')
+_scale('gap', SPACING, _properties('gap'))
+_scale('gap-x', SPACING, _properties('column-gap'))
+_scale('gap-y', SPACING, _properties('row-gap'))
+_scale('space-x', SPACING, _properties('margin-left'), ' > :not([hidden]) ~ :not([hidden])')
+_scale('space-y', SPACING, _properties('margin-top'), ' > :not([hidden]) ~ :not([hidden])')
+_static(self_start='align-self: flex-start', self_end='align-self: flex-end', self_center='align-self: center')
+_static(overflow_auto='overflow: auto', overflow_hidden='overflow: hidden', overflow_visible='overflow: visible',
+        overflow_x_auto='overflow-x: auto', overflow_y_auto='overflow-y: auto', overflow_x_hidden='overflow-x: hidden')
+_static(truncate='overflow: hidden; text-overflow: ellipsis; white-space: nowrap')
+_static(whitespace_normal='white-space: normal', whitespace_nowrap='white-space: nowrap',
+        whitespace_pre_wrap='white-space: pre-wrap')
+_static(break_words='overflow-wrap: break-word', break_all='word-break: break-all')
+_scale('rounded', BORDER_RADIUS, _properties('border-radius'))
+for _side, _corners in (('t', ('top-left', 'top-right')), ('r', ('top-right', 'bottom-right')),
+                        ('b', ('bottom-right', 'bottom-left')), ('l', ('top-left', 'bottom-left'))):
+    _scale(f'rounded-{_side}', BORDER_RADIUS, _properties(*(f'border-{c}-radius' for c in _corners)))
+for _prefix, _names in _sides('border-', 'border'):
+    _scale(_prefix.rstrip('-'), BORDER_WIDTHS, _properties(*(f'{n}-width' for n in _names)))
+_static(border_solid='border-style: solid', border_dashed='border-style: dashed',
+        border_dotted='border-style: dotted', border_none='border-style: none')
+_scale('border', COLORS, _properties('border-color'))
+_scale('bg', COLORS, _properties('background-color'))
+_static(object_contain='object-fit: contain', object_cover='object-fit: cover')
+for _prefix, _names in _sides('p', 'padding'):
+    _scale(_prefix, SPACING, _properties(*_names))
+_static(text_left='text-align: left', text_center='text-align: center', text_right='text-align: right',
+        text_justify='text-align: justify')
+_static(align_middle='vertical-align: middle')
+_scale('text', FONT_SIZES, lambda v: f'font-size: {v[0]}; line-height: {v[1]}')
+_scale('font', FONT_WEIGHTS, _properties('font-weight'))
+_static(uppercase='text-transform: uppercase')
+_static(italic='font-style: italic')
+_scale('leading', LINE_HEIGHTS, _properties('line-height'))
+_static(tracking_tight='letter-spacing: -0.025em', tracking_wide='letter-spacing: 0.025em',
+        tracking_wider='letter-spacing: 0.05em')
+_scale('text', COLORS, _properties('color'))
+_static(underline='text-decoration-line: underline', line_through='text-decoration-line: line-through',
+        no_underline='text-decoration-line: none')
+_scale('opacity', OPACITIES, _properties('opacity'))
+_scale('shadow', SHADOWS, _properties('box-shadow'))
+_static(outline_none='outline: 2px solid transparent; outline-offset: 2px')
+_scale('transition', TRANSITIONS, lambda v: f'transition-property: {v}; {TRANSITION_TIMING}')
+_scale('duration', DURATIONS, _properties('transition-duration'))
+_static(ease_in='transition-timing-function: cubic-bezier(0.4, 0, 1, 1)',
+        ease_out='transition-timing-function: cubic-bezier(0, 0, 0.2, 1)',
+        ease_in_out='transition-timing-function: cubic-bezier(0.4, 0, 0.2, 1)')
+
+
+def _lookup_utility(name: str) -> Optional[Tuple[int, str, str]]:
+    """
+    バリアントを除いたクラス名から (出力順, 宣言, 子要素のセレクタ) を求める（表にない場合は None）
+    """
+    negative = name.startswith('-')
+    base = name[1:] if negative else name
+    for order, entry in enumerate(UTILITIES):
+        prefix, values = entry[0], entry[1]
+        if prefix is None:
+            if not negative and base in values:
+                return order, values[base], ''
+            continue
+        declare, child, allow_negative = entry[2:]
+        if negative and not allow_negative:
+            continue
+        if base == prefix:
+            key = ''
+        elif base.startswith(prefix + '-'):
+            key = base[len(prefix) + 1:]
+        else:
+            continue
+        if key not in values:
+            continue
+        value = values[key]
+        if negative:
+            if not isinstance(value, str) or not value[0].isdigit() or value == '0px':
+                continue
+            value = f'-{value}'
+        return order, declare(value), child
+    return None
+
+
+def _escape_class(name: str) -> str:
+    """
+    クラス名をCSSのセレクタ用にエスケープ（md:flex → md\\:flex、w-1/2 → w-1\\/2）
+    """
+    escaped = re.sub(r'([^a-zA-Z0-9_-])', r'\\\1', name)
+    if escaped[0].isdigit():
+        escaped = f'\\3{escaped[0]} {escaped[1:]}'
+    return escaped
+
+
+def utility_rule(class_name: str) -> Optional[Tuple[Tuple[int, ...], Optional[str], str]]:
+    """
+    クラスのルール: (並び順のキー, メディアクエリ, ルール)。ユーティリティでないクラスは None
+    """
+    *variants, name = class_name.split(':')
+    found = _lookup_utility(name)
+    if found is None:
+        return None
+    order, declarations, child = found
+
+    screen = None
+    pseudo = ''
+    pseudo_orders = []
+    for variant in variants:
+        if variant in SCREENS and screen is None and not pseudo:
+            screen = variant
+        elif variant in PSEUDO_VARIANTS:
+            pseudo += PSEUDO_VARIANTS[variant]
+            pseudo_orders.append(list(PSEUDO_VARIANTS).index(variant) + 1)
+        else:
+            return None
+
+    media = f'@media (min-width: {SCREENS[screen]})' if screen else None
+    screen_order = list(SCREENS).index(screen) + 1 if screen else 0
+    key = (screen_order, *sorted(pseudo_orders, reverse=True), 0, order)
+    rule = f'.{_escape_class(class_name)}{pseudo}{child} {{ {declarations} }}'
+    return key, media, rule
+
+
+def used_classes(html: str) -> Set[str]:
+    """
+    HTMLで使われているクラス（class 属性とスクリプトの classList）
+    """
+    classes = set()
+    for match in CLASS_ATTR_PATTERN.finditer(html):
+        classes.update(match.group(1).split())
+    for match in CLASS_LIST_PATTERN.finditer(html):
+        classes.update(match.group(1).split())
+    return classes
+
+
+def minify_css(css: str) -> str:
+    """
+    コメントと不要な空白を除く（引用符の中は変えない）
+    """
+    parts = re.split(r'("(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\')', css)
+    for i in range(0, len(parts), 2):
+        text = re.sub(r'/\*.*?\*/', '', parts[i], flags=re.S)
+        text = re.sub(r'\s+', ' ', text)
+        text = re.sub(r'\s*([{};,>~])\s*', r'\1', text)
+        text = re.sub(r':\s+', ':', text)
+        parts[i] = text.replace(';}', '}')
+    return ''.join(parts).strip()
+
+
+def build_stylesheet(classes: Iterable[str]) -> str:
+    """
+    preflight・共通スタイル・使われているユーティリティをまとめた最小化済みのスタイルシート
+    """
+    rules = sorted(filter(None, map(utility_rule, set(classes))), key=lambda r: (r[0], r[2]))
+    parts = [PREFLIGHT_CSS, NEWS_PAGE_CSS]
+    media = None
+    for _, rule_media, rule in rules:
+        if rule_media != media:
+            if media:
+                parts.append('}')
+            if rule_media:
+                parts.append(rule_media + ' {')
+            media = rule_media
+        parts.append(rule)
+    if media:
+        parts.append('}')
+    return minify_css('\n'.join(parts)) + '\n'
+
+
+def stylesheet_path(css: str) -> str:
+    """
+    スタイルシートのパス（内容のハッシュを含む）
+    """
+    return f'{CSS_DIR}/site.{hashlib.sha256(css.encode("utf-8")).hexdigest()[:12]}.css'
+
+
+def stylesheet_build_version() -> str:
+    """
+    変換表・共通スタイルのバージョン（このファイルの内容が変わったら作り直す）
+    """
+    with open(__file__, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+def link_stylesheet(html: str, path: str) -> str:
+    """
+    ページのプレースホルダーをスタイルシートのパスに置き換える
+    """
+    return html.replace(STYLESHEET_PLACEHOLDER, path)
+
+
+class SiteStylesheet:
+    """
+    使われたユーティリティクラスのマニフェストとスタイルシート
+    """
+
+    def __init__(self, content: Optional[str]):
+        manifest = None
+        if content:
+            try:
+                manifest = json.loads(content)
+            except json.JSONDecodeError:
+                print('スタイルシートのマニフェストを読み込めないため新規に作成します')
+        if not manifest or manifest.get('version') != CSS_MANIFEST_VERSION:
+            manifest = {'version': CSS_MANIFEST_VERSION, 'classes': []}
+        self.classes: Set[str] = set(manifest.get('classes', []))
+        self.path: Optional[str] = manifest.get('path')
+        self.build = stylesheet_build_version()
+        self.changed = manifest.get('build') != self.build or not self.path
+
+    def add(self, html: str) -> None:
+        """
+        ページで使われているユーティリティクラスを一覧に加える
+        """
+        new = {c for c in used_classes(html) - self.classes if utility_rule(c) is not None}
+        if new:
+            self.classes |= new
+            self.changed = True
+
+    def files(self) -> Dict[str, str]:
+        """
+        コミットするファイル（クラスが増えた場合だけスタイルシートとマニフェスト）。path も更新する
+        """
+        if not self.changed:
+            return {}
+        css = build_stylesheet(self.classes)
+        self.path = stylesheet_path(css)
+        self.changed = False
+        return {self.path: css, CSS_MANIFEST_PATH: self.serialize()}
+
+    def serialize(self) -> str:
+        """
+        マニフェストをJSON文字列に変換
+        """
+        manifest = {
+            'version': CSS_MANIFEST_VERSION,
+            'build': self.build,
+            'path': self.path,
+            'classes': sorted(self.classes),
+        }
+        return json.dumps(manifest, ensure_ascii=False, indent=2) + '\n'
@@ -0,0 +1,69 @@
+"""
+互いに依存しない処理（Supabase・GitHub の呼び出しなど）を小さなスレッドプールで並行に実行する
+各処理には依存する処理の名前を指定し、依存先がすべて終わった時点で開始する
+（公開にかかる時間を、全呼び出しの合計ではなく依存関係で決まる最長の経路に近づけるため）
+処理ごとの所要時間をログに出し、timings に残す
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Tuple
+
+TASK_PLAN_MAX_WORKERS = 6
+
+
+class TaskPlan:
+    """
+    依存関係つきの処理の一覧（add で登録し、run で実行する）
+    """
+
+    def __init__(self, name: str, max_workers: int = TASK_PLAN_MAX_WORKERS):
+        self.name = name
+        self.max_workers = max_workers
+        self.timings: Dict[str, int] = {}
+        self._tasks: Dict[str, Tuple[Callable[..., Any], Tuple[str, ...]]] = {}
+
+    def add(self, name: str, func: Callable[..., Any], *depends_on: str) -> None:
+        """
+        処理を登録する。func には depends_on の処理の結果がその順に渡される
+        依存先は先に登録しておく（循環する依存を作らないため）
+        """
+        unknown = [d for d in depends_on if d not in self._tasks]
+        if unknown:
+            raise ValueError(f'{name} が依存する処理が登録されていません: {unknown}')
+        self._tasks[name] = (func, depends_on)
+
+    def run(self) -> Dict[str, Any]:
+        """
+        すべての処理を実行して、名前 → 結果 を返す
+        いずれかが失敗した場合は、まだ始まっていない処理を取り消してその例外を送出する
+        """
+        started = time.perf_counter()
+        results: Dict[str, Any] = {}
+        pending = dict(self._tasks)
+        running: Dict[Future, str] = {}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while pending or running:
+                for name, (func, depends_on) in list(pending.items()):
+                    if all(d in results for d in depends_on):
+                        del pending[name]
+                        args = [results[d] for d in depends_on]
+                        running[executor.submit(self._timed, name, func, args)] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[running.pop(future)] = future.result()
+        finally:
+            # 失敗した場合は実行中の処理の終了を待たない
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        elapsed = round((time.perf_counter() - started) * 1000)
+        print(f'{self.name}: {elapsed}ms（各処理の合計 {sum(self.timings.values())}ms）')
+        return results
+
+    def _timed(self, name: str, func: Callable[..., Any], args: List[Any]) -> Any:
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.timings[name] = round((time.perf_counter() - started) * 1000)
+            print(f'{self.name}/{name}: {self.timings[name]}ms')
@@ -0,0 +1,208 @@
+"""
+記事詳細テンプレートのコンパイル・レンダリング
+news/news_template.html を一度だけ解析して、リテラル・スロット・条件/繰り返しブロックの
+ノード列に変換する。レンダリングはノード列を1回走査して連結するだけで済む。
+
+サポートする記法:
+    {{name}} / {{prev_article.title}}       スロット（値はそのまま埋め込む。エスケープは呼び出し側）
+    <!-- {{#if name}} --> ... <!-- {{else}} --> ... <!-- {{/if name}} -->
+    <!-- {{#each name}} --> ... <!-- {{/each}} -->
+"""
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# マーカーとスロットを1つの正規表現でトークン化する
+_TOKEN_RE = re.compile(
+    r'<!-- \{\{(?P<block>#if|/if|#each|/each|else)(?:\s+(?P<block_name>[^}\s]+))?\s*\}\} -->'
+    r'|\{\{(?P<slot>[^}#/][^}]*)\}\}'
+)
+
+# ノード種別
+_TEXT = 0
+_SLOT = 1
+_IF = 2
+_EACH = 3
+
+
+class CompiledTemplate:
+    """
+    コンパイル済みテンプレート
+    """
+
+    __slots__ = ('nodes', 'slot_names')
+
+    def __init__(self, nodes: List[Tuple], slot_names: frozenset):
+        self.nodes = nodes
+        self.slot_names = slot_names
+
+    def render(self, context: Dict[str, Any]) -> str:
+        """
+        コンテキストを埋め込んでHTMLを生成
+        """
+        parts: List[str] = []
+        _render_nodes(self.nodes, context, parts)
+        return ''.join(parts)
+
+
+@lru_cache(maxsize=8)
+def compile_template(source: str) -> CompiledTemplate:
+    """
+    テンプレート文字列をコンパイル（同一テンプレートは再解析しない）
+    """
+    root: List[Tuple] = []
+    # (ノードリスト, 開始ブロック情報) のスタック
+    stack: List[Tuple[List[Tuple], Optional[Dict[str, Any]]]] = [(root, None)]
+    slot_names = set()
+    pos = 0
+
+    for match in _TOKEN_RE.finditer(source):
+        if match.start() > pos:
+            stack[-1][0].append((_TEXT, source[pos:match.start()]))
+        pos = match.end()
+
+        slot = match.group('slot')
+        if slot is not None:
+            slot = slot.strip()
+            slot_names.add(slot)
+            stack[-1][0].append((_SLOT, tuple(slot.split('.'))))
+            continue
+
+        block = match.group('block')
+        name = match.group('block_name') or ''
+
+        if block in ('#if', '#each'):
+            frame = {'kind': block, 'name': name, 'then': [], 'else': None}
+            stack.append((frame['then'], frame))
+        elif block == 'else':
+            frame = stack[-1][1]
+            if frame is not None and frame['kind'] == '#if' and frame['else'] is None:
+                frame['else'] = []
+                stack[-1] = (frame['else'], frame)
+        else:
+            # 対応する開始ブロックがない終了マーカーは読み捨てる
+            frame = stack[-1][1]
+            if frame is not None and block == '/' + frame['kind'][1:]:
+                stack.pop()
+                stack[-1][0].append(_close_block(frame))
+
+    if pos < len(source):
+        stack[-1][0].append((_TEXT, source[pos:]))
+
+    # 閉じられていないブロックはテンプレート末尾で閉じる
+    while len(stack) > 1:
+        _, frame = stack.pop()
+        stack[-1][0].append(_close_block(frame))
+
+    return CompiledTemplate(_merge_text(root), frozenset(slot_names))
+
+
+def _close_block(frame: Dict[str, Any]) -> Tuple:
+    """
+    ブロックをノードに変換
+    条件ブロックはマーカー直後・直前の空白を取り除く（表示時にマーカー行が残らないように）
+    """
+    name = tuple(frame['name'].split('.'))
+    if frame['kind'] == '#each':
+        body = _merge_text(frame['then'])
+        lead, body, trail = _split_outer_whitespace(body)
+        return (_EACH, name, body, lead, trail)
+
+    then_nodes = _strip_block_whitespace(_merge_text(frame['then']))
+    else_nodes = _strip_block_whitespace(_merge_text(frame['else'])) if frame['else'] is not None else []
+    return (_IF, name, then_nodes, else_nodes)
+
+
+def _merge_text(nodes: List[Tuple]) -> List[Tuple]:
+    """
+    隣接するテキストノードを結合
+    """
+    merged: List[Tuple] = []
+    for node in nodes:
+        if node[0] == _TEXT and merged and merged[-1][0] == _TEXT:
+            merged[-1] = (_TEXT, merged[-1][1] + node[1])
+        else:
+            merged.append(node)
+    return merged
+
+
+def _strip_block_whitespace(nodes: List[Tuple]) -> List[Tuple]:
+    """
+    ブロック先頭と末尾の空白を除去
+    """
+    nodes = list(nodes)
+    if nodes and nodes[0][0] == _TEXT:
+        nodes[0] = (_TEXT, nodes[0][1].lstrip())
+    if nodes and nodes[-1][0] == _TEXT:
+        nodes[-1] = (_TEXT, nodes[-1][1].rstrip())
+    return [node for node in nodes if node[0] != _TEXT or node[1]]
+
+
+def _split_outer_whitespace(nodes: List[Tuple]) -> Tuple[str, List[Tuple], str]:
+    """
+    繰り返しブロック本体の前後の空白（インデント）を切り出す
+    """
+    lead = trail = ''
+    nodes = list(nodes)
+    if nodes and nodes[0][0] == _TEXT:
+        text = nodes[0][1]
+        stripped = text.lstrip()
+        lead = text[:len(text) - len(stripped)]
+        nodes[0] = (_TEXT, stripped)
+    if nodes and nodes[-1][0] == _TEXT:
+        text = nodes[-1][1]
+        stripped = text.rstrip()
+        trail = text[len(stripped):]
+        nodes[-1] = (_TEXT, stripped)
+    return lead, [node for node in nodes if node[0] != _TEXT or node[1]], trail
+
+
+def _lookup(path: Tuple[str, ...], context: Dict[str, Any]) -> Any:
+    """
+    ドット区切りのパスで値を取得
+    """
+    value: Any = context
+    for key in path:
+        if isinstance(value, dict):
+            value = value.get(key)
+        else:
+            value = getattr(value, key, None)
+        if value is None:
+            return None
+    return value
+
+
+def _render_nodes(nodes: List[Tuple], context: Dict[str, Any], parts: List[str]) -> None:
+    """
+    ノード列を走査して出力を追記
+    """
+    append = parts.append
+    for node in nodes:
+        kind = node[0]
+        if kind == _TEXT:
+            append(node[1])
+        elif kind == _SLOT:
+            value = _lookup(node[1], context)
+            if value is not None and value is not False:
+                append(value if isinstance(value, str) else str(value))
+        elif kind == _IF:
+            if _lookup(node[1], context):
+                _render_nodes(node[2], context, parts)
+            elif node[3]:
+                _render_nodes(node[3], context, parts)
+        else:
+            value = _lookup(node[1], context)
+            if not value:
+                continue
+            append(node[3])
+            if isinstance(value, str):
+                # 呼び出し側でレンダリング済みのHTMLはブロック本体の代わりに埋め込む
+                append(value)
+            else:
+                for item in value:
+                    item_context = dict(context)
+                    if isinstance(item, dict):
+                        item_context.update(item)
+                    _render_nodes(node[2], item_context, parts)
+            append(node[4])
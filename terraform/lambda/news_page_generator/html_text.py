@@ -0,0 +1,103 @@
+"""
+記事本文（HTML）から表示されるテキストを取り出す
+html.parser で先頭から少しずつ解析し、文字参照を展開して script / style などの表示されない要素を除く。
+必要な文字数に達した時点で解析をやめるため、大きな表や貼り付けた Word の HTML でも全体を処理しない
+
+説明文（meta description）・フィードの要約・検索インデックスで使う
+news_page_generator と news_detail_page_generator に同じファイルを置いている（変更時は両方を更新）
+"""
+from html.parser import HTMLParser
+from typing import Optional
+
+
+# 中のテキストを表示しない要素
+SKIP_ELEMENTS = {'script', 'style', 'template', 'noscript', 'head', 'title', 'iframe', 'object', 'svg'}
+# 前後で語が区切られる要素（タグを除いたときに前後の文字がつながらないよう空白を入れる）
+BLOCK_ELEMENTS = {
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'figcaption', 'figure',
+    'footer', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre',
+    'section', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'ul', 'img',
+}
+# 文字数の上限がある場合に1回に解析する文字数（最初は小さく、足りなければ倍にしていく）
+INITIAL_CHUNK_SIZE = 256
+MAX_CHUNK_SIZE = 65536
+
+DESCRIPTION_LENGTH = 160
+
+
+class TextExtractor(HTMLParser):
+    """
+    表示されるテキストを連続する空白を1つにまとめながら集める（limit 文字に達したら以降は無視する）
+    """
+
+    def __init__(self, limit: Optional[int] = None):
+        super().__init__(convert_charrefs=True)
+        self.limit = limit
+        self.parts = []
+        self.length = 0
+        self.full = False
+        self._space = False
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_ELEMENTS:
+            self._skip_depth += 1
+        elif tag in BLOCK_ELEMENTS:
+            self._space = True
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_ELEMENTS:
+            if self._skip_depth:
+                self._skip_depth -= 1
+        elif tag in BLOCK_ELEMENTS:
+            self._space = True
+
+    def handle_data(self, data):
+        if self._skip_depth or self.full:
+            return
+        text = ' '.join(data.split())
+        if not text:
+            self._space = self._space or bool(data)
+            return
+        if self.length and (self._space or data[0].isspace()):
+            text = ' ' + text
+        if self.limit is not None and self.length + len(text) >= self.limit:
+            text = text[:self.limit - self.length]
+            self.full = True
+        self.parts.append(text)
+        self.length += len(text)
+        self._space = data[-1].isspace()
+
+    def text(self) -> str:
+        return ''.join(self.parts)
+
+
+def html_to_text(content: Optional[str], limit: Optional[int] = None) -> str:
+    """
+    HTMLの表示されるテキスト（空白はまとめる）。limit を指定すると先頭の limit 文字まで
+    """
+    if not content:
+        return ''
+    extractor = TextExtractor(limit)
+    if limit is None:
+        extractor.feed(content)
+    else:
+        start, size = 0, INITIAL_CHUNK_SIZE
+        while start < len(content):
+            extractor.feed(content[start:start + size])
+            if extractor.full:
+                return extractor.text()
+            start += size
+            size = min(size * 2, MAX_CHUNK_SIZE)
+    extractor.close()
+    return extractor.text()
+
+
+def summarize_html(content: Optional[str], max_length: int = DESCRIPTION_LENGTH) -> str:
+    """
+    HTMLの先頭から max_length 文字までの要約（超える場合は末尾を「...」にする）
+    """
+    text = html_to_text(content, max_length + 1)
+    if len(text) > max_length:
+        return text[:max_length - 3] + '...'
+    return text
@@ -0,0 +1,292 @@
+"""
+外部APIへのHTTP接続をホストごとに保持して再利用する（keep-alive）
+urllib.request.urlopen は呼び出しごとに名前解決・TCP接続・TLSハンドシェイクを行い、応答後に接続を閉じる
+同じホスト（Supabase、GitHub、LINE、Dify、X）への呼び出しが続く処理では、その分だけ待ち時間が増える
+接続はモジュールのスコープに置くため、Lambda のウォームスタートでは前回の実行の接続も再利用される
+
+urlopen は urllib.request.urlopen と同じように使える（Request を渡し、2xx 以外は urllib.error.HTTPError、
+接続できない場合は urllib.error.URLError）。リダイレクトは GET / HEAD のみ追う
+http / https 以外（file:// など）は urllib.request.urlopen に任せる
+timeout は応答を待つ時間の上限で、呼び出し側が接続先ごとに決める（接続の確立は CONNECT_TIMEOUT_SECONDS まで）
+
+保持している間にサーバーが閉じた接続は使う前に捨てる。それでも再利用した接続で送信に失敗した場合は、
+新しい接続で1回だけ送り直す（POST は送信前に失敗した場合のみ。二重に投稿しないため）
+
+dify_proxy, dify_proxy_image, line_broadcast, line_webhook, news_page_generator, news_detail_page_generator,
+x_post に同じファイルを置いている（変更時は全てを更新）
+"""
+import http.client
+import io
+import select
+import ssl
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# 使っていない接続を保持する時間（多くのサーバーは 60 秒前後で keep-alive の接続を閉じる）
+IDLE_TIMEOUT_SECONDS = 50
+# ホストごとに保持する使っていない接続の上限（並列に呼び出す処理の同時実行数に合わせる）
+MAX_IDLE_PER_HOST = 8
+# 接続（TCP・TLS）の確立を待つ時間の上限
+CONNECT_TIMEOUT_SECONDS = 10
+DEFAULT_TIMEOUT_SECONDS = 30
+MAX_REDIRECTS = 5
+
+REDIRECT_CODES = {301, 302, 303, 307, 308}
+# 送信後に失敗しても送り直してよいメソッド
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'}
+USER_AGENT = f'Python-urllib/{urllib.request.__version__}'
+
+_SSL_CONTEXT = ssl.create_default_context()
+
+# (スキーム, ホスト, ポート) → [(接続, 戻した時刻)]
+_idle: Dict[Tuple[str, str, int], List[Tuple[http.client.HTTPConnection, float]]] = {}
+_lock = threading.Lock()
+_stats = {'requests': 0, 'connections': 0, 'reused': 0, 'retried': 0}
+
+
+class _SendError(Exception):
+    """
+    再利用した接続での送信の失敗（新しい接続で送り直せる）
+    """
+
+    def __init__(self, error: OSError):
+        super().__init__(str(error))
+        self.error = error
+
+
+class PooledResponse:
+    """
+    応答（http.client.HTTPResponse を包み、本文を読み終えたら接続をプールに戻す）
+    """
+
+    def __init__(self, key: Tuple[str, str, int], conn: http.client.HTTPConnection,
+                 response: http.client.HTTPResponse, url: str):
+        self._key = key
+        self._conn = conn
+        self._response = response
+        self.url = url
+        self.status = response.status
+        self.code = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+        self.msg = response.headers
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        data = self._response.read(amt)
+        if self._response.isclosed():
+            self.close()
+        return data
+
+    def getcode(self) -> int:
+        return self.status
+
+    def geturl(self) -> str:
+        return self.url
+
+    def getheader(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        return self._response.getheader(name, default)
+
+    def close(self) -> None:
+        """
+        本文を読み終えていれば接続をプールに戻し、途中なら接続を閉じる
+        """
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        if self._response.isclosed() and not self._response.will_close:
+            _release(self._key, conn)
+        else:
+            self._response.close()
+            conn.close()
+
+    def __enter__(self) -> 'PooledResponse':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def _dropped(conn: http.client.HTTPConnection) -> bool:
+    """
+    保持している間にサーバーが閉じた接続か（使っていない接続が読み取り可能なのは切断された場合）
+    """
+    try:
+        readable, _, _ = select.select([conn.sock], [], [], 0)
+    except (OSError, ValueError):
+        return True
+    return bool(readable)
+
+
+def _acquire(key: Tuple[str, str, int], context: Optional[ssl.SSLContext]) -> Tuple[http.client.HTTPConnection, bool]:
+    """
+    使っていない接続を取り出す（なければ新しい接続）。戻り値は (接続, 再利用か)
+    """
+    now = time.monotonic()
+    with _lock:
+        idle = _idle.get(key, [])
+        while idle:
+            conn, released_at = idle.pop()
+            if conn.sock is not None and now - released_at < IDLE_TIMEOUT_SECONDS and not _dropped(conn):
+                _stats['reused'] += 1
+                return conn, True
+            conn.close()
+
+    scheme, host, port = key
+    if scheme == 'https':
+        conn = http.client.HTTPSConnection(host, port, context=context or _SSL_CONTEXT)
+    else:
+        conn = http.client.HTTPConnection(host, port)
+    return conn, False
+
+
+def _release(key: Tuple[str, str, int], conn: http.client.HTTPConnection) -> None:
+    """
+    応答を読み終えた接続をプールに戻す（上限を超える分は閉じる）
+    """
+    if conn.sock is None:
+        return
+    with _lock:
+        idle = _idle.setdefault(key, [])
+        if len(idle) < MAX_IDLE_PER_HOST:
+            idle.append((conn, time.monotonic()))
+            return
+    conn.close()
+
+
+def _send(
+    conn: http.client.HTTPConnection,
+    reused: bool,
+    method: str,
+    selector: str,
+    body: Optional[bytes],
+    headers: Dict[str, str],
+    timeout: float
+) -> http.client.HTTPResponse:
+    """
+    リクエストを送って応答のヘッダーまで読む
+    """
+    if conn.sock is None:
+        conn.timeout = min(CONNECT_TIMEOUT_SECONDS, timeout)
+        conn.connect()
+        with _lock:
+            _stats['connections'] += 1
+    conn.sock.settimeout(timeout)
+    try:
+        conn.request(method, selector, body=body, headers=headers)
+    except (ConnectionError, http.client.HTTPException) as e:
+        if reused:
+            raise _SendError(e)
+        raise
+    try:
+        return conn.getresponse()
+    except (ConnectionError, http.client.BadStatusLine) as e:
+        # 応答が1バイトも返らずに切れた場合（サーバーが閉じかけていた接続）
+        if reused and method in IDEMPOTENT_METHODS:
+            raise _SendError(e)
+        raise
+
+
+def _open(
+    url: str,
+    method: str,
+    body: Optional[bytes],
+    headers: Dict[str, str],
+    timeout: float,
+    context: Optional[ssl.SSLContext]
+) -> PooledResponse:
+    """
+    1回のリクエスト（リダイレクトは追わない）
+    """
+    parts = urllib.parse.urlsplit(url)
+    scheme = parts.scheme.lower()
+    port = parts.port or (443 if scheme == 'https' else 80)
+    key = (scheme, parts.hostname, port)
+    selector = urllib.parse.urlunsplit(('', '', parts.path or '/', parts.query, ''))
+    headers = {'Host': parts.netloc, **headers}
+
+    with _lock:
+        _stats['requests'] += 1
+    # 送り直すのは再利用した接続で失敗した場合のみ（新しい接続での失敗はそのまま返す）
+    while True:
+        conn, reused = _acquire(key, context)
+        try:
+            response = _send(conn, reused, method, selector, body, headers, timeout)
+            return PooledResponse(key, conn, response, url)
+        except _SendError as e:
+            conn.close()
+            print(f'再利用した接続が切れていたため再接続: {parts.hostname} ({e.error!r})')
+            with _lock:
+                _stats['retried'] += 1
+        except OSError as e:
+            conn.close()
+            raise urllib.error.URLError(e)
+        except BaseException:
+            conn.close()
+            raise
+
+
+def urlopen(
+    req: Union[str, urllib.request.Request],
+    data: Optional[bytes] = None,
+    timeout: float = DEFAULT_TIMEOUT_SECONDS,
+    context: Optional[ssl.SSLContext] = None
+) -> Any:
+    """
+    urllib.request.urlopen の代わりに、ホストごとに保持した接続でリクエストする
+    context はTLSの検証に使うコンテキスト（省略時はシステムの証明書）
+    """
+    if isinstance(req, str):
+        req = urllib.request.Request(req, data=data)
+    elif data is not None:
+        req.data = data
+    if req.type not in ('http', 'https'):
+        return urllib.request.urlopen(req, timeout=timeout)
+
+    method = req.get_method()
+    body = req.data
+    headers = {'User-Agent': USER_AGENT, 'Accept-Encoding': 'identity'}
+    if body is not None:
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+    headers.update((name.title(), value) for name, value in req.header_items())
+
+    timeout = timeout or DEFAULT_TIMEOUT_SECONDS
+    url = req.full_url
+    for _ in range(MAX_REDIRECTS + 1):
+        response = _open(url, method, body, headers, timeout, context)
+        if 200 <= response.status < 300:
+            return response
+
+        # エラーの本文は読み切って接続を戻し、urllib と同じ HTTPError にする
+        content = response.read()
+        response.close()
+        location = response.headers.get('Location')
+        if response.status in REDIRECT_CODES and method in ('GET', 'HEAD') and location:
+            redirect_url = urllib.parse.urljoin(url, location)
+            if urllib.parse.urlsplit(redirect_url).scheme in ('http', 'https'):
+                url = redirect_url
+                continue
+        raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, io.BytesIO(content))
+    raise urllib.error.HTTPError(url, response.status, 'too many redirects', response.headers, io.BytesIO(b''))
+
+
+def pool_stats() -> Dict[str, int]:
+    """
+    プロセスを起動してからのリクエスト数・新しく確立した接続数・再利用した数・送り直した数
+    """
+    with _lock:
+        return dict(_stats, idle=sum(len(idle) for idle in _idle.values()))
+
+
+def close_idle() -> None:
+    """
+    保持している接続をすべて閉じる
+    """
+    with _lock:
+        connections = [conn for idle in _idle.values() for conn, _ in idle]
+        _idle.clear()
+    for conn in connections:
+        conn.close()
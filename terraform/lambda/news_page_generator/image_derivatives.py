@@ -0,0 +1,282 @@
+"""
+レスポンシブ画像の派生ファイル（WebP / JPEG を数種類の幅で）の生成と表示用のHTML
+アイキャッチ画像・添付画像の元ファイルを公開時に1回だけ縮小し、サイトのバケットの
+images/derived/<元ファイルのハッシュ>/<幅>.<形式> に置く。キーは元ファイルの内容から決まるため、
+同じ画像が別のURLで登録されても作り直さず、置いた後に内容が変わることもない（無効化は不要）
+
+元URL → ハッシュ・寸法・作成した幅の対応は GitHub のマニフェスト（images/derived/manifest.json）に保存する
+派生ファイルがまだない画像は元のURLのまま表示する（1回の実行で作る数には上限がある）
+
+Pillow は Lambda ランタイムに含まれないため、レイヤー（terraform/lambda/layers/pillow）で追加する
+（読み込めない場合は派生ファイルを作らないが、マニフェストにある画像は派生ファイルで表示する）
+
+news_page_generator と news_detail_page_generator に同じファイルを置いている（変更時は両方を更新）
+"""
+import hashlib
+import http.client
+import io
+import json
+import math
+import urllib.error
+import urllib.request
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import http_pool
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+    ImageOps = None
+
+
+DERIVED_DIR = 'images/derived'
+DERIVED_MANIFEST_PATH = f'{DERIVED_DIR}/manifest.json'
+DERIVED_MANIFEST_VERSION = 1
+
+# 作成する幅（元画像より大きい幅は作らず、代わりに元画像の幅で1つ作る）
+RENDITION_WIDTHS = (240, 480, 960, 1440)
+# srcset に対応しないブラウザ向けの src に使う幅の上限
+FALLBACK_WIDTH = 960
+# 形式（拡張子 → Pillow の形式名, 保存オプション）。<picture> では先頭の形式を優先する
+RENDITION_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# 派生ファイルを作る元画像の形式（GIF はアニメーションが失われるため元のまま表示する）
+SOURCE_FORMATS = {'JPEG', 'PNG', 'WEBP'}
+# ダウンロードする元画像の上限
+MAX_SOURCE_BYTES = 20 * 1024 * 1024
+
+# 表示領域の幅（<img sizes>）。各ページのCSSに合わせる
+THUMBNAIL_SIZES = '(max-width: 768px) 100vw, 120px'
+ATTACHMENT_SIZES = '(max-width: 480px) 100vw, (max-width: 768px) 50vw, 290px'
+FEATURED_SIZES = '(max-width: 896px) 100vw, 848px'
+
+
+def source_hash(data: bytes) -> str:
+    """
+    元ファイルのハッシュ（派生ファイルのディレクトリ名）
+    """
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def rendition_path(digest: str, width: int, extension: str) -> str:
+    """
+    派生ファイルのパス
+    """
+    return f'{DERIVED_DIR}/{digest}/{width}.{extension}'
+
+
+def rendition_widths(width: int) -> List[int]:
+    """
+    元画像の幅から作成する幅の一覧（昇順）
+    """
+    return sorted({w for w in RENDITION_WIDTHS if w < width} | {min(width, RENDITION_WIDTHS[-1])})
+
+
+def download_source(url: str) -> bytes:
+    """
+    元画像をダウンロード（file:// のURLも読める）
+    """
+    req = urllib.request.Request(url, headers={'User-Agent': 'asahigaoka-image-derivatives'})
+    with http_pool.urlopen(req, timeout=30) as response:
+        data = response.read(MAX_SOURCE_BYTES + 1)
+    if len(data) > MAX_SOURCE_BYTES:
+        raise ValueError(f'too large: {len(data)} bytes')
+    return data
+
+
+def open_source(data: bytes) -> Tuple[Any, int, int]:
+    """
+    元画像を開き、EXIFの向きを反映した寸法と合わせて返す（ヘッダーのみ読み込む）
+    """
+    image = Image.open(io.BytesIO(data))
+    if image.format not in SOURCE_FORMATS:
+        raise ValueError(f'unsupported format: {image.format}')
+    width, height = image.size
+    # 向き 5〜8 は90度回転（縦横が入れ替わる）
+    if image.getexif().get(0x0112) in (5, 6, 7, 8):
+        width, height = height, width
+    return image, width, height
+
+
+def render_renditions(image: Any, width: int, height: int, widths: List[int]) -> Dict[str, bytes]:
+    """
+    派生ファイル（幅.拡張子 → 内容）を作る
+    JPEG は必要な大きさまで縮小しながらデコードし、透過部分は白で塗る
+    """
+    scale = widths[-1] / width
+    image.draft('RGB', (math.ceil(image.size[0] * scale), math.ceil(image.size[1] * scale)))
+    image = ImageOps.exif_transpose(image)
+    if image.mode != 'RGB':
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+
+    renditions = {}
+    for w in widths:
+        h = max(1, round(w * height / width))
+        resized = image if image.size == (w, h) else image.resize((w, h), Image.LANCZOS, reducing_gap=2.0)
+        for extension, (format_name, options) in RENDITION_FORMATS.items():
+            out = io.BytesIO()
+            resized.save(out, format_name, **options)
+            renditions[f'{w}.{extension}'] = out.getvalue()
+    return renditions
+
+
+class DerivedImages:
+    """
+    派生ファイルのマニフェスト（元URL → ハッシュ・寸法・作成した幅）
+    """
+
+    def __init__(self, content: Optional[str]):
+        manifest = None
+        if content:
+            try:
+                manifest = json.loads(content)
+            except json.JSONDecodeError:
+                print('派生画像のマニフェストを読み込めないため新規に作成します')
+        if not manifest or manifest.get('version') != DERIVED_MANIFEST_VERSION:
+            manifest = {'version': DERIVED_MANIFEST_VERSION, 'sources': {}}
+        self.sources: Dict[str, Dict[str, Any]] = manifest.get('sources', {})
+        self.changed = False
+
+    def get(self, url: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        元URLの派生ファイルの情報（作成済みでなければ None）
+        """
+        entry = self.sources.get(url) if url else None
+        if entry and entry.get('widths'):
+            return entry
+        return None
+
+    def has_pending(self, urls: Iterable[Optional[str]]) -> bool:
+        """
+        まだ処理していない（次回以降に派生ファイルを作る）画像があるか
+        """
+        return any(url and url not in self.sources for url in urls)
+
+    def ensure(
+        self,
+        urls: Iterable[Optional[str]],
+        publisher: Any,
+        limit: int,
+        fetch=download_source
+    ) -> Dict[str, int]:
+        """
+        マニフェストにない画像の派生ファイルを作成してバケットに置く（limit 件まで。残りは次回）
+        同じ内容の画像が作成済みの場合（マニフェスト、またはバケット上の派生ファイル）は作り直さない
+        取得できない画像のうち、ないもの（404・410）だけを対象外として記録する（403 などは次回再試行）
+        """
+        summary = {'created': 0, 'reused': 0, 'skipped': 0, 'failed': 0, 'pending': 0}
+        pending = [url for url in dict.fromkeys(u for u in urls if u) if url not in self.sources]
+        if not pending:
+            return summary
+        if publisher is None or Image is None:
+            summary['pending'] = len(pending)
+            return summary
+
+        by_hash = {e['hash']: e for e in self.sources.values() if e.get('widths')}
+        for index, url in enumerate(pending):
+            if index >= limit:
+                summary['pending'] = len(pending) - limit
+                break
+            try:
+                data = fetch(url)
+            except urllib.error.HTTPError as e:
+                if e.code not in (404, 410):
+                    print(f'画像を取得できません（次回再試行）: {url} ({e.code})')
+                    summary['failed'] += 1
+                    continue
+                self._set(url, {'skipped': f'HTTP {e.code}'})
+                summary['skipped'] += 1
+                continue
+            except (urllib.error.URLError, http.client.HTTPException, OSError, ValueError) as e:
+                print(f'画像を取得できません（次回再試行）: {url} ({e})')
+                summary['failed'] += 1
+                continue
+
+            digest = source_hash(data)
+            if digest in by_hash:
+                self._set(url, dict(by_hash[digest]))
+                summary['reused'] += 1
+                continue
+            try:
+                image, width, height = open_source(data)
+                widths = rendition_widths(width)
+                entry = {'hash': digest, 'width': width, 'height': height, 'widths': widths}
+                # 最後に置くファイルがあれば、以前の実行で作成済み（マニフェストのコミット前に失敗した場合など）
+                last_path = rendition_path(digest, widths[-1], list(RENDITION_FORMATS)[-1])
+                if publisher.exists(last_path):
+                    summary['reused'] += 1
+                else:
+                    for name, body in render_renditions(image, width, height, widths).items():
+                        publisher.put_asset(f'{DERIVED_DIR}/{digest}/{name}', body)
+                    summary['created'] += 1
+            except (OSError, ValueError, Image.DecompressionBombError) as e:
+                print(f'派生画像を作成できない画像: {url} ({e})')
+                self._set(url, {'hash': digest, 'skipped': str(e)})
+                summary['skipped'] += 1
+                continue
+            self._set(url, entry)
+            by_hash[digest] = entry
+        return summary
+
+    def merge(self, sources: Dict[str, Dict[str, Any]]) -> None:
+        """
+        他のマニフェストの画像のうち、このマニフェストにないものを加える
+        （他の実行のコミットと競合した場合に、新しい先頭のマニフェストにこの実行の分を重ねる）
+        """
+        for url, entry in sources.items():
+            if url not in self.sources:
+                self._set(url, entry)
+
+    def _set(self, url: str, entry: Dict[str, Any]) -> None:
+        self.sources[url] = entry
+        self.changed = True
+
+    def serialize(self) -> str:
+        """
+        マニフェストをJSON文字列に変換（キー順を固定して差分を最小にする）
+        """
+        manifest = {'version': DERIVED_MANIFEST_VERSION, 'sources': self.sources}
+        return json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True) + '\n'
+
+
+def responsive_image_html(
+    url: str,
+    images: Optional[DerivedImages],
+    alt: str,
+    sizes: str,
+    attrs: str = '',
+    base: str = '',
+    width: Optional[int] = None,
+    height: Optional[int] = None
+) -> str:
+    """
+    画像のHTML。派生ファイルがあれば <picture>（WebP / JPEG の srcset と width/height）、なければ元のURLの <img>
+    attrs は <img> に付ける属性、base は派生ファイルのパスの前に付ける相対パス（詳細ページは「../」）
+    width / height は元の画像の寸法（分かっていれば派生ファイルがない場合の <img> にも付ける）
+    """
+    entry = images.get(url) if images else None
+    if not entry:
+        size = f' width="{width}" height="{height}"' if width and height else ''
+        return f'<img src="{url}"{size} alt="{alt}"{attrs}>'
+
+    digest, widths = entry['hash'], entry['widths']
+    srcsets = {
+        extension: ', '.join(f'{base}{rendition_path(digest, w, extension)} {w}w' for w in widths)
+        for extension in RENDITION_FORMATS
+    }
+    fallback = max((w for w in widths if w <= FALLBACK_WIDTH), default=widths[0])
+    # width/height は縦横比を伝えるためのもの（表示サイズはCSSで決まる）
+    width = widths[-1]
+    height = max(1, round(width * entry['height'] / entry['width']))
+    return (
+        f'<picture><source type="image/webp" srcset="{srcsets["webp"]}" sizes="{sizes}">'
+        f'<img src="{base}{rendition_path(digest, fallback, "jpg")}" srcset="{srcsets["jpg"]}" sizes="{sizes}" '
+        f'width="{width}" height="{height}" alt="{alt}"{attrs}></picture>'
+    )
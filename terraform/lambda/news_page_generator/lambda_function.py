@@ -2,15 +2,29 @@
 news.html 静的ページ生成 Lambda関数
 Supabaseから記事データを取得し、カレンダーと一覧を更新してGitHubにプッシュ
 """
+import calendar
 import json
 import os
-import base64
+import hashlib
 import urllib.request
 import urllib.error
-from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+import urllib.parse
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Any, List, Optional
 import re
 
+from article_model import Article
+from github_commit import GITHUB_API_URL, branch_head, commit_files_to_github
+import http_retry
+from html_text import summarize_html
+from image_derivatives import (
+    DERIVED_MANIFEST_PATH, THUMBNAIL_SIZES, DerivedImages, responsive_image_html
+)
+import metrics
+from publisher import create_publisher
+from site_css import CSS_MANIFEST_PATH, STYLESHEET_PLACEHOLDER, SiteStylesheet, link_stylesheet
+from site_feeds import FEED_PATH, SITEMAP_PATH, build_feed, build_sitemap
+
 
 # カテゴリ表示名マッピング
 CATEGORY_LABELS = {
@@ -32,13 +46,74 @@ CATEGORY_CSS_CLASSES = {
     'activity_report': 'category-activity_report'
 }
 
-
+# カレンダーに表示する月数（当月から）
+CALENDAR_MONTHS = int(os.environ.get('CALENDAR_MONTHS', '2'))
+# カレンダーの1日に表示するイベント数（超えた分は「+N件」）
+CALENDAR_MAX_EVENTS_PER_DAY = int(os.environ.get('CALENDAR_MAX_EVENTS_PER_DAY', '2'))
+
+# news.html の生成に必要なカラムのみ取得する（本文 content などは取得しない）
+NEWS_PAGE_COLUMNS = (
+    'id,slug,title,event_start_datetime,event_end_datetime,published_at,created_at,updated_at,'
+    'featured_image_url,generate_article_page,line_published,x_published'
+)
+# お知らせ一覧に表示する件数
+NEWS_LIST_LIMIT = int(os.environ.get('NEWS_LIST_LIMIT', '30'))
+# Supabaseから一度に取得する最大件数（PostgRESTの上限に合わせてページングする）
+SUPABASE_PAGE_SIZE = 1000
+
+# 過去のお知らせ（news/page/N.html）の1ページあたりの件数
+ARCHIVE_PAGE_SIZE = int(os.environ.get('ARCHIVE_PAGE_SIZE', str(NEWS_LIST_LIMIT)))
+ARCHIVE_DIR = 'news/page'
+# 各ページに含まれる記事を記録するマニフェスト（変更のあったページだけ再生成するため）
+ARCHIVE_MANIFEST_PATH = f'{ARCHIVE_DIR}/manifest.json'
+ARCHIVE_MANIFEST_VERSION = 1
+
+NEWS_PAGE_TITLE = 'お知らせ - 東京都練馬区旭丘一丁目町会'
+
+# 詳細ページのマニフェスト（news_detail_page_generator が記録する）と再生成の依頼先
+DETAIL_MANIFEST_PATH = 'news/manifest.json'
+DETAIL_MANIFEST_VERSION = 1
+DETAIL_TEMPLATE_PATH = 'news/news_template.html'
+DETAIL_PAGE_GENERATOR_FUNCTION = os.environ.get('DETAIL_PAGE_GENERATOR_FUNCTION')
+# 1回の呼び出しで再生成を依頼する記事数（詳細ページ生成Lambdaのタイムアウト対策）
+DETAIL_REBUILD_CHUNK = int(os.environ.get('DETAIL_REBUILD_CHUNK', '100'))
+
+# Lambdaクライアント（ウォームコンテナ間で再利用）
+_LAMBDA_CLIENT = None
+
+# サイトのバケットへの直接公開（未設定の場合はGitHub経由のデプロイのみ）
+SITE_BUCKET = os.environ.get('SITE_BUCKET')
+CLOUDFRONT_DISTRIBUTION_ID = os.environ.get('CLOUDFRONT_DISTRIBUTION_ID')
+_SITE_PUBLISHER = create_publisher(SITE_BUCKET, CLOUDFRONT_DISTRIBUTION_ID)
+
+# 1回の実行で作成するアイキャッチ画像の派生ファイルの数（残りは次回の実行で作成）
+IMAGE_DERIVATIVES_PER_RUN = int(os.environ.get('IMAGE_DERIVATIVES_PER_RUN', '5'))
+
+
+@metrics.handler('news_page_generator')
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Lambda ハンドラー関数
     EventBridgeから毎日日本時間0:05に呼び出される
+    記事の公開/削除時はSQS経由で呼び出され、バッチ内のリクエストを1回の再生成にまとめる
     """
     print('news.html 静的ページ生成開始')
+    # Supabase・GitHub の呼び出しの再試行は Lambda のタイムアウトまでに終える
+    http_retry.set_deadline(context)
+
+    # SQSからの呼び出し（記事詳細ページ生成時の更新リクエスト）
+    queue_records = [
+        r for r in (event or {}).get('Records', [])
+        if r.get('eventSource') == 'aws:sqs'
+    ]
+    if queue_records:
+        reasons = []
+        for record in queue_records:
+            try:
+                reasons.append(json.loads(record.get('body') or '{}').get('reason'))
+            except json.JSONDecodeError:
+                reasons.append(None)
+        print(f'news.html 更新リクエスト: {len(queue_records)}件をまとめて処理 {reasons}')
 
     try:
         # 環境変数を取得
@@ -58,42 +133,70 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         today = jst_now.date()
         print(f'基準日: {today}')
 
-        # Supabaseから記事データを取得
-        articles = fetch_articles_from_supabase(supabase_url, supabase_key)
-        print(f'取得した記事数: {len(articles)}')
-
-        # カレンダー表示用の記事をフィルタ
-        calendar_articles = [a for a in articles if a.get('show_in_calendar')]
+        # Supabaseから記事データを取得（表示に必要なカラム・期間・件数のみ）
+        calendar_articles = fetch_calendar_articles_from_supabase(
+            supabase_url, supabase_key, calendar_months(today, CALENDAR_MONTHS)
+        )
         print(f'カレンダー表示対象: {len(calendar_articles)}件')
 
-        # 一覧表示用の記事をフィルタ
-        news_list_articles = [a for a in articles if a.get('show_in_news_list')]
+        # 一覧は過去のお知らせページ分もまとめて1回で取得する
+        news_list_articles = fetch_news_list_articles_from_supabase(supabase_url, supabase_key)
         print(f'一覧表示対象: {len(news_list_articles)}件')
 
-        # news.htmlを生成
-        html_content = generate_news_html(today, calendar_articles, news_list_articles)
+        articles_count = len({a.id for a in calendar_articles + news_list_articles})
+        print(f'取得した記事数: {articles_count}')
+
+        # news.html・過去のお知らせ・フィードなどを作り、変更のあったファイルと1コミットにまとめる
+        # （他の実行と同じファイルのコミットが競合した場合は新しい先頭の内容から作り直す）
+        def build_files() -> tuple:
+            return build_news_files(
+                today, calendar_articles, news_list_articles,
+                supabase_url, supabase_key, github_token, github_repo, github_branch
+            )
 
-        # GitHubにプッシュ
-        result = push_to_github(
+        parent_sha = branch_head(github_token, github_repo, github_branch)
+        files, summary = build_files()
+        commit_sha = commit_files_to_github(
             github_token,
             github_repo,
             github_branch,
-            'news.html',
-            html_content,
-            f'Update news.html - {today.isoformat()}'
+            files,
+            f'Update news.html, archive pages and feeds - {today.isoformat()}' if len(files) > 1
+            else f'Update news.html - {today.isoformat()}',
+            rebase=lambda: build_files()[0],
+            parent_sha=parent_sha
         )
-
-        print(f'GitHub push 完了: {result}')
+        changed = commit_sha is not None
+        print(f'GitHub commit 完了: {commit_sha} ({len(files)}ファイル)')
+        site_publish = publish_to_site(files) if changed else None
+        if site_publish:
+            print(f'サイトへ直接公開: {site_publish}')
+
+        # 定期実行時は古くなった詳細ページの再生成を依頼する（公開失敗などによるずれも修復される）
+        detail_pages = None
+        if not queue_records and DETAIL_PAGE_GENERATOR_FUNCTION:
+            detail_pages = sync_detail_pages(
+                supabase_url, supabase_key, github_token, github_repo, github_branch
+            )
+            print(f'詳細ページの差分チェック: {detail_pages}')
 
         return {
             'statusCode': 200,
             'body': json.dumps({
                 'success': True,
                 'message': 'news.html updated successfully',
+                'changed': changed,
                 'date': today.isoformat(),
-                'articles_count': len(articles),
+                'articles_count': articles_count,
                 'calendar_articles': len(calendar_articles),
-                'news_list_articles': len(news_list_articles)
+                'news_list_articles': len(news_list_articles),
+                'archive': summary['archive'],
+                'feeds': summary['feeds'],
+                'images': summary['images'],
+                'detail_pages': detail_pages,
+                'site_publish': site_publish,
+                'coalesced_requests': len(queue_records),
+                'upstream_retries': http_retry.retry_stats()
             }, ensure_ascii=False)
         }
 
@@ -101,6 +204,9 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         print(f'エラー: {str(e)}')
         import traceback
         traceback.print_exc()
+        if queue_records:
+            # SQSに再試行させるため例外をそのまま返す
+            raise
         return {
             'statusCode': 500,
             'body': json.dumps({
@@ -110,15 +216,12 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         }
 
 
-def fetch_articles_from_supabase(supabase_url: str, supabase_key: str) -> List[Dict[str, Any]]:
+def fetch_articles_from_supabase(supabase_url: str, supabase_key: str, params: str) -> List[Dict[str, Any]]:
     """
-    Supabaseから公開済み記事を取得
+    Supabaseから記事を取得
     """
     # REST APIエンドポイント
     endpoint = f"{supabase_url}/rest/v1/articles"
-
-    # クエリパラメータ: status=published, deleted_at=null, 日付降順
-    params = "select=*&status=eq.published&deleted_at=is.null&order=event_start_datetime.desc.nullsfirst,published_at.desc"
     url = f"{endpoint}?{params}"
 
     headers = {
@@ -130,7 +233,7 @@ def fetch_articles_from_supabase(supabase_url: str, supabase_key: str) -> List[D
     req = urllib.request.Request(url, headers=headers, method='GET')
 
     try:
-        with urllib.request.urlopen(req, timeout=30) as response:
+        with http_retry.urlopen(req, timeout=30) as response:
             data = json.loads(response.read().decode('utf-8'))
             return data
     except urllib.error.HTTPError as e:
@@ -142,50 +245,416 @@ def fetch_articles_from_supabase(supabase_url: str, supabase_key: str) -> List[D
         raise Exception('Supabaseへの接続に失敗しました')
 
 
-def generate_news_html(today, calendar_articles: List[Dict], news_list_articles: List[Dict]) -> str:
+def fetch_calendar_articles_from_supabase(supabase_url: str, supabase_key: str, months: List[tuple]) -> List[Article]:
     """
-    news.htmlの完全なHTMLを生成
+    Supabaseからカレンダーの表示期間に重なるイベント記事のみ取得
+    タイムゾーンの差を吸収するため期間の前後1日を含めて取得する（日付への振り分け時に期間外は除かれる）
     """
-    # 当月と来月のカレンダーを生成
-    current_year = today.year
-    current_month = today.month
+    first_year, first_month = months[0]
+    last_year, last_month = months[-1]
+    window_start = date(first_year, first_month, 1) - timedelta(days=1)
+    window_end = date(last_year, last_month, calendar.monthrange(last_year, last_month)[1]) + timedelta(days=2)
+    start_param = urllib.parse.quote(f'{window_start.isoformat()}T00:00:00+09:00')
+    end_param = urllib.parse.quote(f'{window_end.isoformat()}T00:00:00+09:00')
+
+    params = (
+        f"select={NEWS_PAGE_COLUMNS}&status=eq.published&deleted_at=is.null&show_in_calendar=is.true"
+        f"&event_start_datetime=lt.{end_param}"
+        f"&or=(event_end_datetime.gte.{start_param},event_start_datetime.gte.{start_param})"
+        "&order=event_start_datetime.asc"
+    )
+    return [Article(row) for row in fetch_articles_from_supabase(supabase_url, supabase_key, params)]
 
-    if current_month == 12:
-        next_year = current_year + 1
-        next_month = 1
-    else:
-        next_year = current_year
-        next_month = current_month + 1
 
-    current_calendar_html = generate_calendar_html(
-        current_year, current_month, today, calendar_articles
+def fetch_news_list_articles_from_supabase(supabase_url: str, supabase_key: str) -> List[Article]:
+    """
+    Supabaseからお知らせ一覧に表示する記事を新しい順にすべて取得
+    news.html は先頭 NEWS_LIST_LIMIT 件、残りは過去のお知らせページで使う
+    """
+    params = (
+        f"select={NEWS_PAGE_COLUMNS}&status=eq.published&deleted_at=is.null&show_in_news_list=is.true"
+        "&order=event_start_datetime.desc.nullsfirst,published_at.desc,id.asc"
     )
-    next_calendar_html = generate_calendar_html(
-        next_year, next_month, today, calendar_articles
+
+    articles = []
+    offset = 0
+    while True:
+        page = fetch_articles_from_supabase(
+            supabase_url, supabase_key, f"{params}&limit={SUPABASE_PAGE_SIZE}&offset={offset}"
+        )
+        articles.extend(Article(row) for row in page)
+        if len(page) < SUPABASE_PAGE_SIZE:
+            return articles
+        offset += SUPABASE_PAGE_SIZE
+
+
+@metrics.timed('render')
+def generate_news_html(
+    today,
+    calendar_articles: List[Article],
+    news_list_articles: List[Article],
+    images: Optional[DerivedImages] = None
+) -> str:
+    """
+    news.htmlの完全なHTMLを生成
+    """
+    # 当月から CALENDAR_MONTHS ヶ月分のカレンダーを生成（記事の日付インデックスは1回だけ作る）
+    months = calendar_months(today, CALENDAR_MONTHS)
+    calendar_index = build_calendar_index(calendar_articles, months)
+
+    calendars_html = '\n\n            '.join(
+        CALENDAR_BLOCK_TEMPLATE.format(
+            title=f"{year}年{month}月",
+            grid=generate_calendar_html(year, month, today, calendar_index[(year, month)])
+        )
+        for year, month in months
     )
 
-    # ニュース一覧HTMLを生成
-    news_list_html = generate_news_list_html(news_list_articles)
+    # ニュース一覧HTMLを生成（先頭 NEWS_LIST_LIMIT 件。残りは過去のお知らせページへのリンク）
+    latest_articles = news_list_articles[:NEWS_LIST_LIMIT]
+    news_list_html = generate_news_list_html(latest_articles, images)
 
     # テンプレートに埋め込み
     html = NEWS_HTML_TEMPLATE.format(
-        current_month_title=f"{current_year}年{current_month}月",
-        current_month_calendar=current_calendar_html,
-        next_month_title=f"{next_year}年{next_month}月",
-        next_month_calendar=next_calendar_html,
+        page_title=NEWS_PAGE_TITLE,
+        head_extra='',
+        stylesheet=STYLESHEET_PLACEHOLDER,
+        calendar_section=CALENDAR_SECTION_TEMPLATE.format(calendars=calendars_html),
+        list_title='お知らせ一覧',
         news_list=news_list_html,
-        generated_at=datetime.utcnow().isoformat() + 'Z'
+        pager=archive_link_html(len(news_list_articles)),
+        data_updated_at=latest_updated_at(calendar_articles + latest_articles)
     )
 
     return html
 
 
-def generate_calendar_html(year: int, month: int, today, articles: List[Dict]) -> str:
+def archive_page_count(total: int) -> int:
     """
-    カレンダーグリッドのHTMLを生成
+    過去のお知らせのページ数
+    """
+    return (total + ARCHIVE_PAGE_SIZE - 1) // ARCHIVE_PAGE_SIZE
+
+
+def paginate_archive(articles: List[Article]) -> Dict[int, List[Article]]:
+    """
+    新しい順の記事リストを過去のお知らせページに振り分ける（ページ番号 → 記事リスト）
+    ページは古い記事から詰めて番号を振る（1ページ目が最も古い）。新しい記事が公開されても
+    最新のページにしか影響しないため、既存ページの構成が変わらない
     """
-    import calendar
+    total = len(articles)
+    pages = {}
+    for page in range(1, archive_page_count(total) + 1):
+        end = total - (page - 1) * ARCHIVE_PAGE_SIZE
+        pages[page] = articles[max(0, end - ARCHIVE_PAGE_SIZE):end]
+    return pages
+
+
+def archive_page_for_index(total: int, index: int) -> int:
+    """
+    新しい順で index 番目の記事が含まれるページ番号
+    """
+    return (total - 1 - index) // ARCHIVE_PAGE_SIZE + 1
+
+
+def archive_page_path(page: int) -> str:
+    """
+    過去のお知らせページのパス
+    """
+    return f'{ARCHIVE_DIR}/{page}.html'
+
+
+def archive_link_html(total: int) -> str:
+    """
+    news.html から過去のお知らせページへのリンク
+    news.html に表示しきれなかった最初の記事を含むページにリンクする
+    """
+    if total <= NEWS_LIST_LIMIT:
+        return ''
+    return ARCHIVE_LINK_TEMPLATE.format(
+        href=archive_page_path(archive_page_for_index(total, NEWS_LIST_LIMIT))
+    )
+
+
+def archive_pager_html(page: int, page_count: int) -> str:
+    """
+    過去のお知らせページの前後ページへのリンク
+    """
+    if page < page_count:
+        newer = f'<a href="{archive_page_path(page + 1)}" class="text-primary hover:underline">&larr; 新しいお知らせ</a>'
+    else:
+        newer = '<a href="news.html" class="text-primary hover:underline">&larr; 最新のお知らせ</a>'
+    older = ''
+    if page > 1:
+        older = f'<a href="{archive_page_path(page - 1)}" class="text-primary hover:underline">過去のお知らせ &rarr;</a>'
+    return ARCHIVE_PAGER_TEMPLATE.format(newer=newer, older=older)
+
+
+@metrics.timed('render')
+def generate_archive_page_html(
+    page: int,
+    page_count: int,
+    articles: List[Article],
+    images: Optional[DerivedImages] = None
+) -> str:
+    """
+    過去のお知らせページ（news/page/N.html）のHTMLを生成
+    news.html と同じテンプレートを使い、<base> でリンクをサイトのルート基準にする
+    """
+    return NEWS_HTML_TEMPLATE.format(
+        page_title=f'お知らせ一覧（{page}ページ） - 東京都練馬区旭丘一丁目町会',
+        head_extra='\n    <base href="../../" />',
+        stylesheet=STYLESHEET_PLACEHOLDER,
+        calendar_section='',
+        list_title=f'お知らせ一覧（{page}ページ）',
+        news_list=generate_news_list_html(articles, images),
+        pager=archive_pager_html(page, page_count),
+        data_updated_at=latest_updated_at(articles)
+    )
+
+
+def archive_template_version() -> str:
+    """
+    ページのレイアウトのバージョン（テンプレートが変わったら全ページを再生成する）
+    """
+    source = NEWS_HTML_TEMPLATE + ARCHIVE_PAGER_TEMPLATE
+    return hashlib.sha1(source.encode('utf-8')).hexdigest()[:12]
+
+
+def archive_page_entry(
+    page: int,
+    page_count: int,
+    articles: List[Article],
+    images: Optional[DerivedImages] = None
+) -> Dict[str, Any]:
+    """
+    マニフェストに記録するページの情報
+    fingerprint は一覧部分のHTMLから計算するため、タイトル変更や派生画像の作成などでも変わる
+    """
+    fingerprint = hashlib.sha1(generate_news_list_html(articles, images).encode('utf-8')).hexdigest()
+    return {
+        'ids': [a.id for a in articles],
+        'fingerprint': fingerprint,
+        'latest': page == page_count
+    }
+
+
+def build_archive_files(
+    articles: List[Article],
+    manifest: Optional[Dict[str, Any]],
+    images: Optional[DerivedImages] = None
+) -> tuple:
+    """
+    過去のお知らせページのうち、前回のマニフェストから変わったページだけを生成する
+    戻り値は (パス → 内容の辞書（削除するページは None）, 集計)
+    """
+    pages = paginate_archive(articles)
+    page_count = len(pages)
+    version = archive_template_version()
+
+    previous_pages = {}
+    if (manifest
+            and manifest.get('version') == ARCHIVE_MANIFEST_VERSION
+            and manifest.get('template') == version
+            and manifest.get('page_size') == ARCHIVE_PAGE_SIZE):
+        previous_pages = manifest.get('pages', {})
+
+    files: Dict[str, Optional[str]] = {}
+    new_pages = {}
+    regenerated = []
+    for page, page_articles in pages.items():
+        entry = archive_page_entry(page, page_count, page_articles, images)
+        new_pages[str(page)] = entry
+        if previous_pages.get(str(page)) != entry:
+            files[archive_page_path(page)] = generate_archive_page_html(page, page_count, page_articles, images)
+            regenerated.append(page)
+
+    # 記事の削除でページ数が減った場合は余ったページを削除
+    removed = sorted(int(p) for p in (manifest or {}).get('pages', {}) if int(p) > page_count)
+    for page in removed:
+        files[archive_page_path(page)] = None
+
+    new_manifest = {
+        'version': ARCHIVE_MANIFEST_VERSION,
+        'template': version,
+        'page_size': ARCHIVE_PAGE_SIZE,
+        'total': len(articles),
+        'pages': new_pages
+    }
+    if files or new_manifest != manifest:
+        files[ARCHIVE_MANIFEST_PATH] = json.dumps(new_manifest, ensure_ascii=False, indent=2, sort_keys=True) + '\n'
+
+    summary = {
+        'pages': page_count,
+        'regenerated': regenerated,
+        'removed': removed
+    }
+    return files, summary
+
+
+def build_feed_files(
+    articles: List[Article],
+    token: str,
+    repo: str,
+    branch: str,
+    feed_summary: Optional[Callable[[Article], str]] = None
+) -> tuple:
+    """
+    sitemap.xml と news/feed.xml のうち、前回の内容から変わったものだけを返す
+    戻り値は (パス → 内容の辞書, 集計)
+    """
+    files = {}
+    summary = {}
+    builders = (
+        (SITEMAP_PATH, build_sitemap),
+        (FEED_PATH, lambda articles, previous: build_feed(articles, previous, feed_summary)),
+    )
+    for path, build in builders:
+        previous = fetch_github_text(token, repo, branch, path)
+        content, summary[path] = build(articles, previous)
+        if content != previous:
+            files[path] = content
+    return files, summary
+
+
+def fetch_feed_summary(supabase_url: str, supabase_key: str, article: Article) -> str:
+    """
+    フィードに載せる記事の要約（SEO用の説明文、なければ本文の先頭）
+    一覧の取得では本文を取得しないため、フィードの行を書き直す記事の分だけ取得する
+    """
+    params = f"select=content,meta_description&id=eq.{urllib.parse.quote(article.id)}"
+    rows = fetch_articles_from_supabase(supabase_url, supabase_key, params)
+    if not rows:
+        return ''
+    return rows[0].get('meta_description') or summarize_html(rows[0].get('content'))
+
+
+def build_news_files(
+    today: date,
+    calendar_articles: List[Article],
+    news_list_articles: List[Article],
+    supabase_url: str,
+    supabase_key: str,
+    token: str,
+    repo: str,
+    branch: str
+) -> tuple:
+    """
+    news.html と、変更のあった過去のお知らせページ・フィード・派生画像とスタイルシートのマニフェストを作る
+    各マニフェストはGitHubの現在の内容から作るため、コミットが競合した場合は呼び直して作り直す
+    戻り値は (ファイル, 集計)
+    """
+    # アイキャッチ画像の派生ファイル: まだない画像だけ作成してバケットに置く
+    images, image_files, images_summary = prepare_derived_images(news_list_articles, token, repo, branch)
+    print(f'派生画像: {images_summary}')
+
+    # news.htmlを生成
+    html_content = generate_news_html(today, calendar_articles, news_list_articles, images)
+
+    # 過去のお知らせページ: 記事の構成が変わったページだけ再生成する
+    manifest = fetch_archive_manifest(token, repo, branch)
+    archive_files, archive_summary = build_archive_files(news_list_articles, manifest, images)
+    print(f'過去のお知らせ: {archive_summary}')
+
+    # サイトマップとフィード: 前回の内容から変わったエントリだけを書き直す
+    feed_files, feeds_summary = build_feed_files(
+        news_list_articles, token, repo, branch,
+        lambda article: fetch_feed_summary(supabase_url, supabase_key, article)
+    )
+    print(f'サイトマップ・フィード: {feeds_summary}')
 
+    # スタイルシート: ページで使われているユーティリティクラスが増えた場合だけ作り直す
+    pages, css_files = link_site_stylesheet({'news.html': html_content, **archive_files}, token, repo, branch)
+
+    files = {**pages, **feed_files, **image_files, **css_files}
+    return files, {'images': images_summary, 'archive': archive_summary, 'feeds': feeds_summary}
+
+
+def prepare_derived_images(articles: List[Article], token: str, repo: str, branch: str) -> tuple:
+    """
+    一覧に表示するアイキャッチ画像の派生ファイルを用意する（新しい記事から IMAGE_DERIVATIVES_PER_RUN 件まで作成）
+    戻り値は (DerivedImages, マニフェストが変わった場合はそのファイル, 集計)
+    """
+    images = DerivedImages(fetch_github_text(token, repo, branch, DERIVED_MANIFEST_PATH))
+    summary = images.ensure(
+        (a.featured_image_url for a in articles), _SITE_PUBLISHER, IMAGE_DERIVATIVES_PER_RUN
+    )
+    files = {DERIVED_MANIFEST_PATH: images.serialize()} if images.changed else {}
+    return images, files, summary
+
+
+def link_site_stylesheet(pages: Dict[str, Optional[str]], token: str, repo: str, branch: str) -> tuple:
+    """
+    ページで使われているクラスをスタイルシートのマニフェストに加え、各ページをスタイルシートにリンクする
+    戻り値は (リンク済みのページ, クラスが増えた場合はスタイルシートとマニフェストのファイル)
+    """
+    stylesheet = SiteStylesheet(fetch_github_text(token, repo, branch, CSS_MANIFEST_PATH))
+    html_paths = [path for path, content in pages.items() if content and path.endswith('.html')]
+    for path in html_paths:
+        stylesheet.add(pages[path])
+    css_files = stylesheet.files()
+    if css_files:
+        print(f'スタイルシートを更新: {stylesheet.path} ({len(stylesheet.classes)}クラス)')
+    linked = dict(pages)
+    for path in html_paths:
+        linked[path] = link_stylesheet(pages[path], stylesheet.path)
+    return linked, css_files
+
+
+def calendar_months(today, count: int) -> List[tuple]:
+    """
+    表示する月の一覧（当月から count ヶ月分の (年, 月)）
+    """
+    months = []
+    year, month = today.year, today.month
+    for _ in range(max(1, count)):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def build_calendar_index(articles: List[Article], months: List[tuple]) -> Dict[tuple, Dict[int, List[Article]]]:
+    """
+    カレンダー表示用に記事を 月 → 日 → 記事リスト に振り分ける
+    複数日にわたるイベントは期間中の各日に展開する。表示期間外の日は展開しないため、
+    計算量は記事数 + 表示期間の日数（に比例する出力量）で済む
+    """
+    index: Dict[tuple, Dict[int, List[Article]]] = {ym: {} for ym in months}
+    if not months:
+        return index
+
+    first_year, first_month = months[0]
+    last_year, last_month = months[-1]
+    window_start = date(first_year, first_month, 1)
+    window_end = date(last_year, last_month, calendar.monthrange(last_year, last_month)[1])
+
+    for article in articles:
+        start = article.event_start_date
+        if not start:
+            continue
+        end = article.event_end_date or start
+        if end < start:
+            end = start
+
+        day = max(start, window_start)
+        last = min(end, window_end)
+        while day <= last:
+            index[(day.year, day.month)].setdefault(day.day, []).append(article)
+            day += timedelta(days=1)
+
+    # 同じ日のイベントは開始日時順
+    for buckets in index.values():
+        for day_articles in buckets.values():
+            day_articles.sort(key=lambda a: a.event_start)
+
+    return index
+
+
+def generate_calendar_html(year: int, month: int, today, day_index: Dict[int, List[Article]]) -> str:
+    """
+    カレンダーグリッドのHTMLを生成
+    day_index は build_calendar_index で作成した当月分（日 → 記事リスト）
+    """
     cal = calendar.Calendar(firstweekday=6)  # 日曜始まり
     month_days = list(cal.itermonthdays2(year, month))
 
@@ -195,17 +664,6 @@ def generate_calendar_html(year: int, month: int, today, articles: List[Dict]) -
     for day in day_headers:
         html += f'<div class="calendar-day-header">{day}</div>'
 
-    # 記事を日付でマッピング
-    article_by_date = {}
-    for article in articles:
-        event_date = article.get('event_start_datetime')
-        if event_date:
-            # ISO形式からdateを抽出
-            date_str = event_date[:10]  # YYYY-MM-DD
-            if date_str not in article_by_date:
-                article_by_date[date_str] = []
-            article_by_date[date_str].append(article)
-
     # 日付セルを生成
     for day, weekday in month_days:
         if day == 0:
@@ -213,31 +671,25 @@ def generate_calendar_html(year: int, month: int, today, articles: List[Dict]) -
             html += '<div class="calendar-day other-month"></div>'
         else:
             # 今月の日付
-            date_obj = datetime(year, month, day).date()
+            date_obj = date(year, month, day)
             date_str = date_obj.isoformat()
 
             is_today = (date_obj == today)
             today_class = 'today' if is_today else ''
 
-            # その日のイベントを取得
-            day_articles = article_by_date.get(date_str, [])
+            # その日のイベントを取得（表示しきれない分は「+N件」）
+            day_articles = day_index.get(day, [])
             has_event = len(day_articles) > 0
             event_class = 'has-event' if has_event else ''
+            if len(day_articles) > 1:
+                event_class += ' multi-event'
 
-            event_html = ''
-            if has_event:
-                article = day_articles[0]
-                slug = article.get('slug') or article.get('id')
-                title = article.get('title', '')
-                # タイトルをエスケープ
-                title_escaped = escape_html(title)
-                # generate_article_pageフラグがtrueの場合のみリンクを生成
-                if article.get('generate_article_page'):
-                    detail_url = f"news/{slug}.html"
-                    event_html = f'<div class="calendar-day-event" onclick="event.stopPropagation(); window.location.href=\'{detail_url}\'" title="{title_escaped}">{title_escaped}</div>'
-                else:
-                    # リンクなしのイベント表示
-                    event_html = f'<div class="calendar-day-event calendar-day-event-nolink" title="{title_escaped}">{title_escaped}</div>'
+            shown = day_articles[:CALENDAR_MAX_EVENTS_PER_DAY]
+            event_html = ''.join(calendar_event_html(article, date_str) for article in shown)
+            hidden = day_articles[len(shown):]
+            if hidden:
+                hidden_titles = escape_html('、'.join(a.title for a in hidden))
+                event_html += f'<div class="calendar-day-more" title="{hidden_titles}">+{len(hidden)}件</div>'
 
             html += f'''<div class="calendar-day {today_class} {event_class}">
                 <span class="calendar-day-number">{day}</span>
@@ -247,44 +699,59 @@ def generate_calendar_html(year: int, month: int, today, articles: List[Dict]) -
     return html
 
 
-def generate_news_list_html(articles: List[Dict]) -> str:
+def calendar_event_html(article: Article, date_str: str) -> str:
+    """
+    カレンダーの1イベント分のHTMLを生成
+    """
+    title_escaped = escape_html(article.title)
+
+    classes = 'calendar-day-event'
+    # 複数日イベントの2日目以降
+    if article.event_start_date.isoformat() != date_str:
+        classes += ' calendar-day-event-continued'
+
+    # generate_article_pageフラグがtrueの場合のみリンクを生成
+    if article.generate_article_page:
+        detail_url = article.detail_path
+        return f'<div class="{classes}" onclick="event.stopPropagation(); window.location.href=\'{detail_url}\'" title="{title_escaped}">{title_escaped}</div>'
+    # リンクなしのイベント表示
+    return f'<div class="{classes} calendar-day-event-nolink" title="{title_escaped}">{title_escaped}</div>'
+
+
+def generate_news_list_html(articles: List[Article], images: Optional[DerivedImages] = None) -> str:
     """
     ニュース一覧のHTMLを生成
+    アイキャッチ画像は派生ファイルがあれば srcset 付きで表示する
     """
     if not articles:
         return '<div class="text-center text-gray-500 py-8">お知らせはありません</div>'
 
     html = ''
-    for article in articles[:30]:  # 最大30件表示
-        slug = article.get('slug') or article.get('id')
-
-        title = escape_html(article.get('title', ''))
+    for article in articles:
+        title = escape_html(article.title)
 
         # イベント開始日を優先して表示
-        event_date = article.get('event_start_datetime')
-        if event_date:
-            date_str = format_date_jp(event_date)
-        else:
-            published_at = article.get('published_at') or article.get('created_at')
-            date_str = format_date_jp(published_at) if published_at else ''
+        date_str = article.list_date_jp
 
         # アイキャッチ画像
-        featured_image = article.get('featured_image_url')
+        featured_image = article.featured_image_url
         if featured_image:
-            image_html = f'<img src="{featured_image}" alt="{title}" class="news-item-image">'
+            image_html = responsive_image_html(
+                featured_image, images, title, THUMBNAIL_SIZES, ' class="news-item-image"'
+            )
         else:
             image_html = '<div class="news-item-image bg-gray-200 flex items-center justify-center text-gray-400 text-sm">画像なし</div>'
 
         # SNSアイコン
         icons_html = ''
-        if article.get('line_published'):
+        if article.line_published:
             icons_html += '<div class="news-item-icon line" title="LINEで配信済み"><i class="ri-line-fill text-xs"></i></div>'
-        if article.get('x_published'):
+        if article.x_published:
             icons_html += '<div class="news-item-icon x" title="Xで投稿済み"><i class="ri-twitter-x-line text-xs"></i></div>'
 
         # generate_article_pageフラグがtrueの場合のみリンクを生成
-        if article.get('generate_article_page'):
-            detail_url = f"news/{slug}.html"
+        if article.generate_article_page:
+            detail_url = article.detail_path
             html += f'''
             <a href="{detail_url}" class="news-item">
                 {image_html}
@@ -315,30 +782,12 @@ def generate_news_list_html(articles: List[Dict]) -> str:
     return html
 
 
-def format_date_jp(iso_date: str) -> str:
+def latest_updated_at(articles: List[Article]) -> str:
     """
-    ISO形式の日付を日本語形式に変換
+    記事データの最終更新日時を取得
+    生成日時ではなくデータから決めることで、データが変わらなければ同一のHTMLになる
     """
-    try:
-        # タイムゾーン情報を除去
-        date_part = iso_date.replace('Z', '+00:00')
-        if '+' in date_part:
-            date_part = date_part.split('+')[0]
-        if 'T' in date_part:
-            date_str = date_part.split('T')[0]
-        else:
-            date_str = date_part[:10]
-
-        year, month, day = date_str.split('-')
-
-        # 曜日を計算
-        dt = datetime(int(year), int(month), int(day))
-        weekdays = ['月', '火', '水', '木', '金', '土', '日']
-        weekday = weekdays[dt.weekday()]
-
-        return f"{year}年{int(month)}月{int(day)}日（{weekday}）"
-    except Exception:
-        return iso_date
+    return max((a.updated_at or '' for a in articles), default='')
 
 
 def escape_html(text: str) -> str:
@@ -355,347 +804,254 @@ def escape_html(text: str) -> str:
             .replace("'", '&#39;'))
 
 
-def push_to_github(token: str, repo: str, branch: str, file_path: str, content: str, commit_message: str) -> Dict:
+def fetch_github_text(token: str, repo: str, branch: str, file_path: str) -> Optional[str]:
     """
-    GitHubにファイルをプッシュ
+    GitHubからファイルの内容を取得（存在しない場合は None）
     """
-    # まず現在のファイルのSHAを取得（存在する場合）
-    api_url = f"https://api.github.com/repos/{repo}/contents/{file_path}"
+    api_url = f"{GITHUB_API_URL}/repos/{repo}/contents/{file_path}?ref={branch}"
     headers = {
         'Authorization': f'token {token}',
-        'Accept': 'application/vnd.github.v3+json',
-        'Content-Type': 'application/json'
+        'Accept': 'application/vnd.github.v3.raw'
     }
-
-    sha = None
+    req = urllib.request.Request(api_url, headers=headers, method='GET')
     try:
-        req = urllib.request.Request(f"{api_url}?ref={branch}", headers=headers, method='GET')
-        with urllib.request.urlopen(req, timeout=30) as response:
-            data = json.loads(response.read().decode('utf-8'))
-            sha = data.get('sha')
+        with http_retry.urlopen(req, timeout=30) as response:
+            return response.read().decode('utf-8')
     except urllib.error.HTTPError as e:
         if e.code != 404:
             raise
-        # 404の場合は新規ファイル
+        return None
 
-    # ファイルを更新（または作成）
-    content_base64 = base64.b64encode(content.encode('utf-8')).decode('utf-8')
 
-    body = {
-        'message': commit_message,
-        'content': content_base64,
-        'branch': branch
+def fetch_archive_manifest(token: str, repo: str, branch: str) -> Optional[Dict[str, Any]]:
+    """
+    GitHubから過去のお知らせページのマニフェストを取得（未作成・破損時は None = 全ページ生成）
+    """
+    api_url = f"{GITHUB_API_URL}/repos/{repo}/contents/{ARCHIVE_MANIFEST_PATH}?ref={branch}"
+    headers = {
+        'Authorization': f'token {token}',
+        'Accept': 'application/vnd.github.v3.raw'
     }
+    req = urllib.request.Request(api_url, headers=headers, method='GET')
+    try:
+        with http_retry.urlopen(req, timeout=30) as response:
+            return json.loads(response.read().decode('utf-8'))
+    except urllib.error.HTTPError as e:
+        if e.code != 404:
+            raise
+        return None
+    except json.JSONDecodeError:
+        print('マニフェストを読み込めないため全ページを再生成します')
+        return None
 
-    if sha:
-        body['sha'] = sha
-
-    data = json.dumps(body).encode('utf-8')
-    req = urllib.request.Request(api_url, data=data, headers=headers, method='PUT')
-
-    with urllib.request.urlopen(req, timeout=30) as response:
-        return json.loads(response.read().decode('utf-8'))
-
-
-# news.html テンプレート
-NEWS_HTML_TEMPLATE = '''<!DOCTYPE html>
-<html lang="ja">
-  <head>
-    <meta charset="UTF-8" />
-    <meta name="viewport" content="width=device-width, initial-scale=1.0" />
-    <title>お知らせ - 東京都練馬区旭丘一丁目町会</title>
-    <script src="https://cdn.tailwindcss.com/3.4.16"></script>
-    <script>
-      tailwind.config = {{
-        theme: {{
-          extend: {{
-            colors: {{ primary: "#57b5e7", secondary: "#8dd3c7" }},
-            borderRadius: {{
-              none: "0px",
-              sm: "4px",
-              DEFAULT: "8px",
-              md: "12px",
-              lg: "16px",
-              xl: "20px",
-              "2xl": "24px",
-              "3xl": "32px",
-              full: "9999px",
-              button: "8px",
-            }},
-          }},
-        }},
-      }};
-    </script>
-    <link rel="preconnect" href="https://fonts.googleapis.com" />
-    <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin />
-    <link
-      href="https://fonts.googleapis.com/css2?family=Pacifico&display=swap"
-      rel="stylesheet"
-    />
-    <link
-      href="https://cdnjs.cloudflare.com/ajax/libs/remixicon/4.6.0/remixicon.min.css"
-      rel="stylesheet"
-    />
-    <link rel="stylesheet" href="css/template.css" />
-    <style>
-      :where([class^="ri-"])::before {{ content: "\\f3c2"; }}
-
-      /* カレンダースタイル */
-      .calendar {{
-        background: white;
-        border-radius: 12px;
-        padding: 20px;
-        box-shadow: 0 1px 3px 0 rgba(0, 0, 0, 0.1);
-      }}
-
-      .calendar-header {{
-        display: flex;
-        justify-content: space-between;
-        align-items: center;
-        margin-bottom: 16px;
-        padding-bottom: 12px;
-        border-bottom: 2px solid #e5e7eb;
-      }}
-
-      .calendar-title {{
-        font-size: 1.25rem;
-        font-weight: bold;
-        color: #111827;
-      }}
-
-      .calendar-grid {{
-        display: grid;
-        grid-template-columns: repeat(7, 1fr);
-        gap: 1px;
-        border: 1px solid #e5e7eb;
-        border-radius: 8px;
-        overflow: hidden;
-      }}
-
-      .calendar-day-header {{
-        text-align: center;
-        font-size: 0.75rem;
-        font-weight: 600;
-        color: #6b7280;
-        padding: 8px 4px;
-        background: #f9fafb;
-        border-right: 1px solid #e5e7eb;
-        border-bottom: 1px solid #e5e7eb;
-      }}
-
-      .calendar-day-header:last-child {{
-        border-right: none;
-      }}
-
-      .calendar-day {{
-        display: flex;
-        flex-direction: column;
-        align-items: flex-start;
-        justify-content: flex-start;
-        font-size: 0.875rem;
-        color: #374151;
-        cursor: pointer;
-        transition: background 0.2s;
-        padding: 4px;
-        height: 80px;
-        border-right: 1px solid #e5e7eb;
-        border-bottom: 1px solid #e5e7eb;
-        overflow: hidden;
-        box-sizing: border-box;
-      }}
-
-      .calendar-day:nth-child(7n) {{
-        border-right: none;
-      }}
-
-      .calendar-day:hover {{
-        background: #f3f4f6;
-      }}
-
-      .calendar-day.other-month {{
-        color: #d1d5db;
-        background: #fafafa;
-      }}
-
-      .calendar-day.today {{
-        background: #57b5e7;
-        color: white;
-        font-weight: bold;
-      }}
-
-      .calendar-day-number {{
-        font-weight: 600;
-        margin-bottom: 2px;
-        flex-shrink: 0;
-        width: 100%;
-        text-align: left;
-      }}
-
-      .calendar-day-event {{
-        font-size: 0.65rem;
-        line-height: 1.3;
-        text-align: left;
-        width: 100%;
-        padding: 2px 4px;
-        margin-top: auto;
-        background: #fef3c7;
-        color: #92400e;
-        border-radius: 3px;
-        overflow: hidden;
-        white-space: normal;
-        word-break: break-word;
-        cursor: pointer;
-        transition: all 0.2s;
-        flex: 1;
-        display: -webkit-box;
-        -webkit-line-clamp: 2;
-        -webkit-box-orient: vertical;
-        min-height: 0;
-      }}
-
-      .calendar-day.today .calendar-day-event {{
-        background: rgba(255, 255, 255, 0.3);
-        color: white;
-      }}
-
-      .calendar-day-event:hover {{
-        background: #fde68a;
-      }}
 
-      .calendar-day.today .calendar-day-event:hover {{
-        background: rgba(255, 255, 255, 0.5);
-      }}
+@metrics.timed('site_publish')
+def publish_to_site(files: Dict[str, Optional[str]]) -> Optional[Dict[str, Any]]:
+    """
+    変更したページをサイトのバケットへ直接公開し、1件の無効化にまとめる（未設定の場合は何もしない）
+    内容が None のページは削除する。マニフェストはGitHubにだけ置く
+    """
+    if _SITE_PUBLISHER is None:
+        return None
+
+    uploaded = deleted = 0
+    for path, content in files.items():
+        if path.endswith('manifest.json'):
+            continue
+        if content is None:
+            _SITE_PUBLISHER.delete(path)
+            deleted += 1
+        else:
+            _SITE_PUBLISHER.put(path, content)
+            uploaded += 1
 
-      .calendar-day.has-event {{
-        position: relative;
-      }}
+    return {
+        'uploaded': uploaded,
+        'deleted': deleted,
+        'invalidation_id': _SITE_PUBLISHER.flush()
+    }
 
-      .calendar-day-event-nolink {{
-        cursor: default;
-      }}
 
-      .calendar-day-event-nolink:hover {{
-        background: #fef3c7;
-      }}
+def sync_detail_pages(supabase_url: str, supabase_key: str, github_token: str, github_repo: str, github_branch: str) -> Dict[str, Any]:
+    """
+    詳細ページのマニフェストを記事データ（id, updated_at）とテンプレートのSHAと比較し、
+    古くなったページだけを news_detail_page_generator に再生成させる
+    マニフェストに残っている公開中でない記事（非公開・削除済み・詳細ページを生成しない記事）のページは削除させる
+    """
+    try:
+        # マニフェストは記事データより先に読む（間に公開された記事を、マニフェストにあって公開中でない記事と誤らないため）
+        manifest = fetch_detail_manifest(github_token, github_repo, github_branch)
+        states = fetch_detail_page_states_from_supabase(supabase_url, supabase_key)
+        template_sha = fetch_github_file_sha(github_token, github_repo, github_branch, DETAIL_TEMPLATE_PATH)
 
-      .calendar-day.today .calendar-day-event-nolink:hover {{
-        background: rgba(255, 255, 255, 0.3);
-      }}
+        stale = find_stale_detail_pages(states, manifest['articles'], template_sha)
+        published_ids = {a['id'] for a in states}
+        orphaned = sorted(i for i in manifest['articles'] if i not in published_ids)
 
-      /* お知らせ一覧スタイル */
-      .news-item {{
-        display: flex;
-        align-items: center;
-        gap: 16px;
-        padding: 20px 0;
-        border-bottom: 1px dashed #d1d5db;
-        transition: background 0.2s;
-        text-decoration: none;
-        color: inherit;
-      }}
+        if stale:
+            invoke_detail_page_rebuild(stale)
+        if orphaned:
+            invoke_detail_page_delete(orphaned)
 
-      .news-item:hover {{
-        background: #f9fafb;
-        padding-left: 8px;
-        padding-right: 8px;
-        margin-left: -8px;
-        margin-right: -8px;
-        border-radius: 8px;
-      }}
+        return {
+            'success': True,
+            'checked': len(states),
+            'stale': len(stale),
+            'orphaned': orphaned
+        }
 
-      .news-item-image {{
-        width: 120px;
-        height: 80px;
-        object-fit: cover;
-        border-radius: 8px;
-        flex-shrink: 0;
-      }}
+    except Exception as e:
+        print(f'詳細ページの差分チェックエラー: {str(e)}')
+        import traceback
+        traceback.print_exc()
+        return {
+            'success': False,
+            'error': str(e)
+        }
 
-      .news-item-content {{
-        flex: 1;
-        min-width: 0;
-      }}
 
-      .news-item-date {{
-        font-size: 0.875rem;
-        color: #6b7280;
-        margin-bottom: 4px;
-      }}
+def fetch_detail_page_states_from_supabase(supabase_url: str, supabase_key: str) -> List[Dict[str, Any]]:
+    """
+    Supabaseから詳細ページを持つ公開記事の id と updated_at だけを取得
+    """
+    params = (
+        "select=id,updated_at&status=eq.published&deleted_at=is.null&generate_article_page=is.true"
+        "&order=id.asc"
+    )
 
-      .news-item-title {{
-        font-size: 1rem;
-        font-weight: 600;
-        color: #111827;
-        margin-bottom: 8px;
-        line-height: 1.5;
-      }}
+    articles = []
+    offset = 0
+    while True:
+        page = fetch_articles_from_supabase(
+            supabase_url, supabase_key, f"{params}&limit={SUPABASE_PAGE_SIZE}&offset={offset}"
+        )
+        articles.extend(page)
+        if len(page) < SUPABASE_PAGE_SIZE:
+            return articles
+        offset += SUPABASE_PAGE_SIZE
 
-      .news-item-icons {{
-        display: flex;
-        gap: 8px;
-        align-items: center;
-      }}
 
-      .news-item-icon {{
-        width: 20px;
-        height: 20px;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        border-radius: 4px;
-      }}
+def fetch_detail_manifest(token: str, repo: str, branch: str) -> Dict[str, Any]:
+    """
+    GitHubから詳細ページのマニフェストを取得（未作成・形式違いの場合は空のマニフェスト）
+    """
+    api_url = f"{GITHUB_API_URL}/repos/{repo}/contents/{DETAIL_MANIFEST_PATH}?ref={branch}"
+    headers = {
+        'Authorization': f'token {token}',
+        'Accept': 'application/vnd.github.v3.raw'
+    }
+    req = urllib.request.Request(api_url, headers=headers, method='GET')
+    try:
+        with http_retry.urlopen(req, timeout=30) as response:
+            manifest = json.loads(response.read().decode('utf-8'))
+    except urllib.error.HTTPError as e:
+        if e.code != 404:
+            raise
+        manifest = None
+    except json.JSONDecodeError:
+        manifest = None
 
-      .news-item-icon.line {{
-        background: #00C300;
-        color: white;
-      }}
+    if not manifest or manifest.get('version') != DETAIL_MANIFEST_VERSION:
+        return {'version': DETAIL_MANIFEST_VERSION, 'articles': {}}
+    manifest.setdefault('articles', {})
+    return manifest
 
-      .news-item-icon.x {{
-        background: #000000;
-        color: white;
-      }}
 
-      .news-item-nolink {{
-        cursor: default;
-      }}
+def fetch_github_file_sha(token: str, repo: str, branch: str, file_path: str) -> Optional[str]:
+    """
+    GitHub上のファイルのblob SHAを取得（存在しない場合は None）
+    """
+    api_url = f"{GITHUB_API_URL}/repos/{repo}/contents/{file_path}?ref={branch}"
+    headers = {
+        'Authorization': f'token {token}',
+        'Accept': 'application/vnd.github.v3+json'
+    }
+    req = urllib.request.Request(api_url, headers=headers, method='GET')
+    try:
+        with http_retry.urlopen(req, timeout=30) as response:
+            return json.loads(response.read().decode('utf-8')).get('sha')
+    except urllib.error.HTTPError as e:
+        if e.code != 404:
+            raise
+        return None
 
-      .news-item-nolink:hover {{
-        background: transparent;
-        padding-left: 0;
-        padding-right: 0;
-        margin-left: 0;
-        margin-right: 0;
-        border-radius: 0;
-      }}
 
-      @media (max-width: 768px) {{
-        .news-item {{
-          flex-direction: column;
-          align-items: flex-start;
-        }}
+def find_stale_detail_pages(states: List[Dict[str, Any]], manifest_articles: Dict[str, Dict[str, Any]], template_sha: Optional[str]) -> List[str]:
+    """
+    再生成が必要な記事IDの一覧
+    マニフェストにない記事、記事データが更新された記事、別のテンプレートで生成された記事、
+    検索インデックスに未登録の記事、派生ファイルが未作成の画像がある記事が対象
+    """
+    stale = []
+    for state in states:
+        entry = manifest_articles.get(state['id'])
+        if (entry is None
+                or entry.get('updated_at') != state.get('updated_at')
+                or entry.get('template_sha') != template_sha
+                or 'search' not in entry
+                or entry.get('images_pending')):
+            stale.append(state['id'])
+    return stale
+
+
+def invoke_detail_page_rebuild(article_ids: List[str]) -> None:
+    """
+    news_detail_page_generator を非同期で呼び出して詳細ページを再生成させる
+    """
+    global _LAMBDA_CLIENT
+    if _LAMBDA_CLIENT is None:
+        import boto3
+        _LAMBDA_CLIENT = boto3.client('lambda')
+
+    for i in range(0, len(article_ids), DETAIL_REBUILD_CHUNK):
+        chunk = article_ids[i:i + DETAIL_REBUILD_CHUNK]
+        _LAMBDA_CLIENT.invoke(
+            FunctionName=DETAIL_PAGE_GENERATOR_FUNCTION,
+            InvocationType='Event',
+            Payload=json.dumps({'rebuild': chunk}).encode('utf-8')
+        )
+        print(f'詳細ページの再生成を依頼: {len(chunk)}件')
 
-        .news-item-image {{
-          width: 100%;
-          height: 200px;
-        }}
 
-        .calendar-grid {{
-          gap: 1px;
-        }}
+def invoke_detail_page_delete(article_ids: List[str]) -> None:
+    """
+    news_detail_page_generator を非同期で呼び出して詳細ページを削除させる（記事ごとに1回。削除は1件ずつ受け付けるため）
+    """
+    global _LAMBDA_CLIENT
+    if _LAMBDA_CLIENT is None:
+        import boto3
+        _LAMBDA_CLIENT = boto3.client('lambda')
+
+    for article_id in article_ids:
+        _LAMBDA_CLIENT.invoke(
+            FunctionName=DETAIL_PAGE_GENERATOR_FUNCTION,
+            InvocationType='Event',
+            Payload=json.dumps({'article_id': article_id, 'delete_flag': True}).encode('utf-8')
+        )
+    print(f'詳細ページの削除を依頼: {len(article_ids)}件')
 
-        .calendar-day {{
-          font-size: 0.75rem;
-          height: 60px;
-          padding: 2px;
-        }}
 
-        .calendar-day-event {{
-          font-size: 0.6rem;
-          padding: 1px 2px;
-        }}
-      }}
-    </style>
-    <!-- Generated at: {generated_at} -->
+# news.html テンプレート
+NEWS_HTML_TEMPLATE = '''<!DOCTYPE html>
+<html lang="ja">
+  <head>
+    <meta charset="UTF-8" />
+    <meta name="viewport" content="width=device-width, initial-scale=1.0" />
+    <title>{page_title}</title>{head_extra}
+    <link rel="alternate" type="application/atom+xml" title="お知らせ" href="news/feed.xml" />
+    <link rel="preconnect" href="https://fonts.googleapis.com" />
+    <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin />
+    <link
+      href="https://fonts.googleapis.com/css2?family=Pacifico&display=swap"
+      rel="stylesheet"
+    />
+    <link
+      href="https://cdnjs.cloudflare.com/ajax/libs/remixicon/4.6.0/remixicon.min.css"
+      rel="stylesheet"
+    />
+    <link rel="stylesheet" href="css/template.css" />
+    <link rel="stylesheet" href="{stylesheet}" />
+    <!-- Data updated at: {data_updated_at} -->
   </head>
   <body class="bg-white">
     <!-- ヘッダー -->
@@ -807,36 +1163,25 @@ NEWS_HTML_TEMPLATE = '''<!DOCTYPE html>
     <main>
       <section class="py-16">
         <div class="max-w-6xl mx-auto px-6">
-          <!-- カレンダーセクション -->
-          <div class="grid md:grid-cols-2 gap-6 mb-12">
-            <!-- 今月のカレンダー -->
-            <div class="calendar">
-              <div class="calendar-header">
-                <h3 class="calendar-title">{current_month_title}</h3>
-              </div>
-              <div class="calendar-grid">
-                {current_month_calendar}
-              </div>
-            </div>
-
-            <!-- 来月のカレンダー -->
-            <div class="calendar">
-              <div class="calendar-header">
-                <h3 class="calendar-title">{next_month_title}</h3>
-              </div>
-              <div class="calendar-grid">
-                {next_month_calendar}
-              </div>
-            </div>
-          </div>
+          {calendar_section}
 
           <!-- お知らせ一覧 -->
           <div class="bg-white rounded-xl shadow-sm p-6 md:p-8">
-            <h3 class="text-2xl font-bold text-gray-900 mb-8">お知らせ一覧</h3>
+            <h3 class="text-2xl font-bold text-gray-900 mb-8">{list_title}</h3>
+
+            <div class="mb-6">
+              <input
+                type="search"
+                id="news-search-input"
+                placeholder="お知らせを検索（2文字以上）"
+                class="w-full border border-gray-300 rounded-lg px-4 py-2 text-sm focus:outline-none focus:border-primary"
+              />
+            </div>
+            <div id="news-search-results" class="hidden"></div>
 
             <div id="news-list">
               {news_list}
-            </div>
+            </div>{pager}
           </div>
         </div>
       </section>
@@ -955,16 +1300,41 @@ NEWS_HTML_TEMPLATE = '''<!DOCTYPE html>
       id="t7gW8m8CMAZ2rcNw"
       defer
     ></script>
-    <style>
-      #dify-chatbot-bubble-button {{
-        background-color: #1C64F2 !important;
-      }}
-      #dify-chatbot-bubble-window {{
-        width: 24rem !important;
-        height: 40rem !important;
-      }}
-    </style>
 
+    <script src="js/news-search.js" defer></script>
   </body>
 </html>
 '''
+
+
+# カレンダー1ヶ月分のテンプレート
+CALENDAR_BLOCK_TEMPLATE = '''<div class="calendar">
+              <div class="calendar-header">
+                <h3 class="calendar-title">{title}</h3>
+              </div>
+              <div class="calendar-grid">
+                {grid}
+              </div>
+            </div>'''
+
+
+# カレンダーセクションのテンプレート（過去のお知らせページでは表示しない）
+CALENDAR_SECTION_TEMPLATE = '''<!-- カレンダーセクション -->
+          <div class="grid md:grid-cols-2 gap-6 mb-12">
+            {calendars}
+          </div>'''
+
+
+# news.html から過去のお知らせページへのリンク
+ARCHIVE_LINK_TEMPLATE = '''
+            <div class="text-center mt-8">
+              <a href="{href}" class="inline-block px-6 py-3 border border-primary text-primary rounded-button hover:bg-primary hover:text-white transition-colors">過去のお知らせを見る</a>
+            </div>'''
+
+
+# 過去のお知らせページの前後ページへのリンク
+ARCHIVE_PAGER_TEMPLATE = '''
+            <nav class="flex justify-between items-center mt-8 pt-6 border-t">
+              <div>{newer}</div>
+              <div>{older}</div>
+            </nav>'''
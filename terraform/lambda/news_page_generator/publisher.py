@@ -0,0 +1,261 @@
+"""
+生成したページをサイトのS3バケットへ直接公開するパブリッシャー
+GitHub へのコミット → デプロイ（S3同期）を待たずに、変更したページだけを即時に反映する
+GitHub へのコミットは従来どおり行い、履歴の保存と各マニフェストの保管に使う
+
+本番: S3Publisher が圧縮済みの内容をアップロードし、1回の実行で変更したパスを
+      まとめて1件の CloudFront 無効化にする
+ローカル/テスト: LocalPublisher がディレクトリに同じ内容を書き出す
+
+news_page_generator と news_detail_page_generator に同じファイルを置いている（変更時は両方を更新）
+"""
+import gzip
+import mimetypes
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+
+# ブラウザは短く、CloudFront は長くキャッシュする（公開時に無効化するため）
+HTML_CACHE_CONTROL = 'public, max-age=300, s-maxage=86400'
+DEFAULT_CACHE_CONTROL = 'public, max-age=3600'
+# 内容からキーが決まるファイル（派生画像・スタイルシート）は内容が変わらないため長期間キャッシュする
+ASSET_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# ファイル名に内容のハッシュを含むファイル（css/site.<ハッシュ>.css）
+HASHED_ASSET_PATTERN = re.compile(r'\.[0-9a-f]{12}\.(?:css|js)$')
+
+# 1回の無効化に含めるパス数の上限（超えた場合はワイルドカード1件にまとめる）
+MAX_INVALIDATION_PATHS = 1000
+
+# 実行環境の mime.types に依存しないよう、公開するファイルの種類は固定で決める
+CONTENT_TYPES = {
+    '.html': 'text/html',
+    '.css': 'text/css',
+    '.xml': 'application/xml',
+    '.json': 'application/json',
+    '.jpg': 'image/jpeg',
+    '.webp': 'image/webp',
+}
+
+
+def content_type_for(path: str) -> str:
+    """
+    パスから Content-Type を決める
+    """
+    extension = os.path.splitext(path)[1]
+    content_type = CONTENT_TYPES.get(extension) or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    if content_type.startswith('text/') or content_type in ('application/json', 'application/xml'):
+        content_type += '; charset=utf-8'
+    return content_type
+
+
+def cache_control_for(path: str) -> str:
+    """
+    パスから Cache-Control を決める
+    """
+    if path.endswith('.html'):
+        return HTML_CACHE_CONTROL
+    if HASHED_ASSET_PATTERN.search(path):
+        return ASSET_CACHE_CONTROL
+    return DEFAULT_CACHE_CONTROL
+
+
+def gzip_content(data: bytes) -> bytes:
+    """
+    gzip 済みの内容（mtime を固定して、同じ内容からは同じバイト列を作る）
+    """
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+class S3Publisher:
+    """
+    S3 + CloudFront へ公開するパブリッシャー
+    gzip 済みの内容を Content-Encoding: gzip で置く（CloudFront はそのまま配信する）
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        distribution_id: Optional[str] = None,
+        client: Any = None,
+        cloudfront_client: Any = None
+    ):
+        self.bucket = bucket
+        self.distribution_id = distribution_id
+        self._client = client
+        self._cloudfront_client = cloudfront_client
+        self._changed_paths: List[str] = []
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            import boto3
+            self._client = boto3.client('s3')
+        return self._client
+
+    @property
+    def cloudfront_client(self) -> Any:
+        if self._cloudfront_client is None:
+            import boto3
+            self._cloudfront_client = boto3.client('cloudfront')
+        return self._cloudfront_client
+
+    def put(self, path: str, content: str) -> None:
+        """
+        ファイルをアップロード（無効化は flush でまとめて行う）
+        """
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=path,
+            Body=gzip_content(content.encode('utf-8')),
+            ContentType=content_type_for(path),
+            ContentEncoding='gzip',
+            CacheControl=cache_control_for(path)
+        )
+        # ファイル名に内容のハッシュを含むファイルは以前の内容がキャッシュされていないため無効化しない
+        if not HASHED_ASSET_PATTERN.search(path):
+            self._changed_paths.append(path)
+
+    def put_asset(self, path: str, body: bytes) -> None:
+        """
+        内容からキーが決まるファイルをそのままアップロード（同じキーの内容は変わらないため無効化しない）
+        """
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=path,
+            Body=body,
+            ContentType=content_type_for(path),
+            CacheControl=ASSET_CACHE_CONTROL
+        )
+
+    def exists(self, path: str) -> bool:
+        """
+        ファイルがバケットにあるか
+        """
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=path)
+        except ClientError as e:
+            # ListBucket 権限がない場合、存在しないキーは 403 になる
+            if e.response.get('Error', {}).get('Code') in ('403', '404', 'NoSuchKey'):
+                return False
+            raise
+        return True
+
+    def delete(self, path: str) -> None:
+        """
+        ファイルを削除
+        """
+        self.client.delete_object(Bucket=self.bucket, Key=path)
+        self._changed_paths.append(path)
+
+    def flush(self) -> Optional[str]:
+        """
+        変更したパスを1件の CloudFront 無効化にまとめて送信し、無効化IDを返す
+        """
+        paths = invalidation_paths(self._changed_paths)
+        self._changed_paths = []
+        if not paths or not self.distribution_id:
+            return None
+
+        response = self.cloudfront_client.create_invalidation(
+            DistributionId=self.distribution_id,
+            InvalidationBatch={
+                'Paths': {'Quantity': len(paths), 'Items': paths},
+                'CallerReference': f'{time.time_ns()}-{len(paths)}'
+            }
+        )
+        return response['Invalidation']['Id']
+
+
+class LocalPublisher:
+    """
+    ローカルディレクトリへ公開するパブリッシャー（ローカル実行・テスト用）
+    S3Publisher と同じキーに同じ内容を書き出し、メタデータと無効化はメモリに記録する
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        self.metadata: Dict[str, Dict[str, str]] = {}
+        self.invalidations: List[List[str]] = []
+        self._changed_paths: List[str] = []
+
+    def put(self, path: str, content: str) -> None:
+        """
+        ファイルを書き出す
+        """
+        full_path = os.path.join(self.root_dir, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'wb') as f:
+            f.write(gzip_content(content.encode('utf-8')))
+        self.metadata[path] = {
+            'ContentType': content_type_for(path),
+            'ContentEncoding': 'gzip',
+            'CacheControl': cache_control_for(path)
+        }
+        # ファイル名に内容のハッシュを含むファイルは以前の内容がキャッシュされていないため無効化しない
+        if not HASHED_ASSET_PATTERN.search(path):
+            self._changed_paths.append(path)
+
+    def put_asset(self, path: str, body: bytes) -> None:
+        """
+        内容からキーが決まるファイルをそのまま書き出す（無効化の対象にしない）
+        """
+        full_path = os.path.join(self.root_dir, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'wb') as f:
+            f.write(body)
+        self.metadata[path] = {
+            'ContentType': content_type_for(path),
+            'CacheControl': ASSET_CACHE_CONTROL
+        }
+
+    def exists(self, path: str) -> bool:
+        """
+        ファイルがあるか
+        """
+        return os.path.exists(os.path.join(self.root_dir, path))
+
+    def delete(self, path: str) -> None:
+        """
+        ファイルを削除
+        """
+        full_path = os.path.join(self.root_dir, path)
+        if os.path.exists(full_path):
+            os.remove(full_path)
+        self.metadata.pop(path, None)
+        self._changed_paths.append(path)
+
+    def flush(self) -> Optional[str]:
+        """
+        無効化の代わりにパスを記録する
+        """
+        paths = invalidation_paths(self._changed_paths)
+        self._changed_paths = []
+        if not paths:
+            return None
+        self.invalidations.append(paths)
+        return f'local-{len(self.invalidations)}'
+
+
+def invalidation_paths(changed_paths: List[str]) -> List[str]:
+    """
+    無効化するパスの一覧（重複を除き、多すぎる場合はワイルドカードにまとめる）
+    """
+    paths = sorted({'/' + path.lstrip('/') for path in changed_paths})
+    if len(paths) > MAX_INVALIDATION_PATHS:
+        return ['/*']
+    return paths
+
+
+def create_publisher(bucket: Optional[str], distribution_id: Optional[str]) -> Optional[Any]:
+    """
+    設定に応じたパブリッシャーを生成（未設定の場合は None = GitHub経由のデプロイのみ）
+    bucket に「local:ディレクトリ」を指定するとローカルに書き出す
+    """
+    if not bucket:
+        return None
+    if bucket.startswith('local:'):
+        return LocalPublisher(bucket[len('local:'):])
+    return S3Publisher(bucket, distribution_id)
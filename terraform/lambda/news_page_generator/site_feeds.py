@@ -0,0 +1,235 @@
+"""
+サイトマップ（sitemap.xml）と Atom フィード（news/feed.xml）の生成
+news.html と同じ取得結果（Article）から作る
+
+前回の出力を渡すと、URL（フィードはエントリID）と更新日時が前回と同じエントリは前回の行を
+そのまま使い、変わったエントリだけを書き直す。1エントリを1行で出力するのは、この差し替えのため
+出力に生成日時を含めないので、データが変わらなければ同じバイト列になり、コミットも公開も行われない
+（S3 の ETag / Last-Modified が変わらないため、クローラーやフィードリーダーの条件付きGETは304になる）
+"""
+import re
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from article_model import Article
+
+
+SITE_BASE_URL = 'https://asahigaoka-nerima.tokyo'
+
+SITEMAP_PATH = 'sitemap.xml'
+FEED_PATH = 'news/feed.xml'
+# フィードに含める記事数（公開日時の新しい順）
+FEED_ENTRY_LIMIT = 20
+FEED_TITLE = 'お知らせ - 東京都練馬区旭丘一丁目町会'
+
+# 出力形式のバージョン（行の形式を変えたら上げる。前回の行を再利用しなくなる）
+SITEMAP_FORMAT = 'sitemap-format:1'
+FEED_FORMAT = '2'
+
+# サイトマップに載せる固定ページ（記事データから更新日時が分からないため lastmod は付けない）
+SITEMAP_STATIC_PAGES = [
+    '',
+    'town.html',
+    'antidisaster_index.html',
+    'antidisaster-preparedness.html',
+    'antidisaster-evacuation.html',
+    'antidisaster-equipment.html',
+    'antidisaster-action.html',
+    'gc_points.html',
+    'paper_rules.html',
+    'reports.html',
+    'contact.html',
+]
+
+CATEGORY_LABELS = {
+    'notice': 'お知らせ',
+    'event': 'イベント',
+    'disaster_safety': '防災・防犯',
+    'child_support': '子育て支援',
+    'shopping_info': '商店街情報',
+    'activity_report': '活動レポート'
+}
+
+SITEMAP_LINE_PATTERN = re.compile(r'^  <url><loc>([^<]*)</loc>(?:<lastmod>([^<]*)</lastmod>)?</url>$')
+FEED_LINE_PATTERN = re.compile(r'^  <entry><id>([^<]*)</id>.*<updated>([^<]*)</updated>.*</entry>$')
+
+
+def xml_escape(text: str) -> str:
+    """
+    XMLエスケープ
+    """
+    if not text:
+        return ''
+    return (text
+            .replace('&', '&amp;')
+            .replace('<', '&lt;')
+            .replace('>', '&gt;')
+            .replace('"', '&quot;'))
+
+
+def w3c_datetime(value: Optional[datetime]) -> str:
+    """
+    datetime を W3C/RFC 3339 形式（秒まで）に変換
+    """
+    return value.isoformat(timespec='seconds') if value else ''
+
+
+def article_url(article: Article) -> str:
+    """
+    記事のURL（詳細ページがない記事は news.html）
+    """
+    if article.generate_article_page:
+        return f'{SITE_BASE_URL}/{article.detail_path}'
+    return f'{SITE_BASE_URL}/news.html'
+
+
+def previous_lines(previous: Optional[str], format_marker: str, pattern: re.Pattern) -> Dict[str, Tuple[str, str]]:
+    """
+    前回の出力からエントリの行を取り出す（キー → (更新日時, 行)）
+    形式のバージョンが違う場合は再利用しない
+    """
+    if not previous or format_marker not in previous:
+        return {}
+    lines = {}
+    for line in previous.splitlines():
+        match = pattern.match(line)
+        if match:
+            lines[match.group(1)] = (match.group(2) or '', line)
+    return lines
+
+
+def patch_entries(
+    entries: List[Tuple[str, str, Any]],
+    previous: Dict[str, Tuple[str, str]],
+    render: Callable[[Any], str]
+) -> Tuple[List[str], Dict[str, int]]:
+    """
+    エントリ（キー, 更新日時, 描画する値）を行に変換する
+    キーと更新日時が前回と同じエントリは前回の行を使い、それ以外だけを描画する
+    """
+    lines = []
+    summary = {'reused': 0, 'rendered': 0, 'removed': 0}
+    for key, stamp, value in entries:
+        cached = previous.get(key)
+        if cached and cached[0] == stamp:
+            lines.append(cached[1])
+            summary['reused'] += 1
+        else:
+            lines.append(render(value))
+            summary['rendered'] += 1
+    summary['removed'] = len(previous.keys() - {key for key, _, _ in entries})
+    return lines, summary
+
+
+def sitemap_entry(loc: str, lastmod: Optional[datetime]) -> Tuple[str, str, Tuple[str, str]]:
+    """
+    サイトマップのエントリ（キー, 更新日時, 描画する値）
+    """
+    lastmod_str = w3c_datetime(lastmod)
+    return xml_escape(loc), lastmod_str, (loc, lastmod_str)
+
+
+def sitemap_url_line(value: Tuple[str, str]) -> str:
+    """
+    サイトマップの1URL分の行
+    """
+    loc, lastmod = value
+    lastmod_xml = f'<lastmod>{lastmod}</lastmod>' if lastmod else ''
+    return f'  <url><loc>{xml_escape(loc)}</loc>{lastmod_xml}</url>'
+
+
+def build_sitemap(articles: List[Article], previous: Optional[str]) -> Tuple[str, Dict[str, int]]:
+    """
+    sitemap.xml を生成する（固定ページ、news.html、詳細ページのある記事）
+    戻り値は (内容, 集計)
+    """
+    entries = [sitemap_entry(f'{SITE_BASE_URL}/{page}', None) for page in SITEMAP_STATIC_PAGES]
+    news_lastmod = max((a.updated for a in articles if a.updated), default=None)
+    entries.append(sitemap_entry(f'{SITE_BASE_URL}/news.html', news_lastmod))
+    # 詳細ページはURL順に並べ、一覧の並び替えで行が動かないようにする
+    entries.extend(sorted(
+        (sitemap_entry(article_url(a), a.updated) for a in articles if a.generate_article_page),
+        key=lambda entry: entry[0]
+    ))
+
+    lines, stats = patch_entries(
+        entries,
+        previous_lines(previous, SITEMAP_FORMAT, SITEMAP_LINE_PATTERN),
+        sitemap_url_line
+    )
+    content = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<!-- {SITEMAP_FORMAT} -->\n'
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        + ''.join(line + '\n' for line in lines)
+        + '</urlset>\n'
+    )
+    return content, stats
+
+
+def feed_entry_id(article: Article) -> str:
+    """
+    フィードのエントリID（スラッグが変わっても同じになるよう記事IDから作る）
+    """
+    return f'urn:uuid:{article.id}'
+
+
+def feed_entry_line(article: Article, summary: str = '') -> str:
+    """
+    フィードの1記事分の行
+    """
+    category = article.category or 'notice'
+    category_xml = ''
+    if category in CATEGORY_LABELS:
+        category_xml = f'<category term="{category}" label="{CATEGORY_LABELS[category]}"/>'
+    summary_xml = f'<summary>{xml_escape(summary)}</summary>' if summary else ''
+    return (
+        f'  <entry><id>{xml_escape(feed_entry_id(article))}</id>'
+        f'<title>{xml_escape(article.title)}</title>'
+        f'<link rel="alternate" type="text/html" href="{xml_escape(article_url(article))}"/>'
+        f'<published>{w3c_datetime(article.published)}</published>'
+        f'<updated>{w3c_datetime(article.updated or article.published)}</updated>'
+        f'{summary_xml}{category_xml}</entry>'
+    )
+
+
+def build_feed(
+    articles: List[Article],
+    previous: Optional[str],
+    summary: Optional[Callable[[Article], str]] = None
+) -> Tuple[str, Dict[str, int]]:
+    """
+    news/feed.xml（Atom）を生成する。公開日時の新しい FEED_ENTRY_LIMIT 件
+    summary は記事の要約を返す関数（書き直すエントリだけで呼ばれるため、本文の取得はその記事の分だけで済む）
+    戻り値は (内容, 集計)
+    """
+    latest = sorted(
+        (a for a in articles if a.published),
+        key=lambda a: (a.published, a.id),
+        reverse=True
+    )[:FEED_ENTRY_LIMIT]
+    entries = [
+        (xml_escape(feed_entry_id(a)), w3c_datetime(a.updated or a.published), a)
+        for a in latest
+    ]
+    feed_updated = max((stamp for _, stamp, _ in entries), default='')
+
+    lines, stats = patch_entries(
+        entries,
+        previous_lines(previous, f'<generator version="{FEED_FORMAT}">', FEED_LINE_PATTERN),
+        lambda article: feed_entry_line(article, summary(article) if summary else '')
+    )
+    content = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<feed xmlns="http://www.w3.org/2005/Atom" xml:lang="ja">\n'
+        f'  <id>{SITE_BASE_URL}/news.html</id>\n'
+        f'  <title>{xml_escape(FEED_TITLE)}</title>\n'
+        f'  <link rel="alternate" type="text/html" href="{SITE_BASE_URL}/news.html"/>\n'
+        f'  <link rel="self" type="application/atom+xml" href="{SITE_BASE_URL}/{FEED_PATH}"/>\n'
+        '  <author><name>東京都練馬区旭丘一丁目町会</name></author>\n'
+        f'  <generator version="{FEED_FORMAT}">news_page_generator</generator>\n'
+        + (f'  <updated>{feed_updated}</updated>\n' if feed_updated else '')
+        + ''.join(line + '\n' for line in lines)
+        + '</feed>\n'
+    )
+    return content, stats
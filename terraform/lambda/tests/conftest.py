@@ -0,0 +1,153 @@
+"""
+Lambda の Python テストの共通の準備
+各 Lambda は同じ名前のモジュール（http_pool, http_retry, metrics, github_commit など）を別々のディレクトリに置くため、
+load で Lambda ごとに分けて読み込む（sys.modules には残さない）
+
+GitHub API・Supabase はローカルの偽のサーバー（fake_github / fake_supabase）に向ける
+テストごとに github.repository と supabase.supabase を作り直す
+"""
+import importlib
+import json
+import os
+import sys
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Dict, Set
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_github import FakeGitHubServer, FakeRepository  # noqa: E402
+from fake_supabase import FakeSupabase, FakeSupabaseServer  # noqa: E402
+
+LAMBDA_ROOT = Path(__file__).resolve().parent.parent
+REPO_ROOT = LAMBDA_ROOT.parent.parent
+TEMPLATE_PATH = 'news/news_template.html'
+
+_github = FakeGitHubServer()
+_supabase = FakeSupabaseServer()
+# Lambda のモジュールは読み込み時に環境変数を読むため、読み込む前に設定する
+os.environ['GITHUB_API_URL'] = _github.url
+os.environ.setdefault('METRICS_ENABLED', 'false')
+
+# Lambda のディレクトリ名 → 読み込んだモジュール
+_loaded: Dict[str, Dict[str, ModuleType]] = {}
+
+
+def load(lambda_name: str, module_name: str) -> ModuleType:
+    """
+    lambda_name のディレクトリのモジュールを読み込む（同じ Lambda のモジュールは同じオブジェクトを返す）
+    """
+    modules = _loaded.setdefault(lambda_name, {})
+    if module_name in modules:
+        return modules[module_name]
+
+    directory = str(LAMBDA_ROOT / lambda_name)
+    names = {path.stem for path in (LAMBDA_ROOT / lambda_name).glob('*.py')}
+    saved = {name: sys.modules.pop(name) for name in names if name in sys.modules}
+    sys.modules.update(modules)
+    sys.path.insert(0, directory)
+    try:
+        return importlib.import_module(module_name)
+    finally:
+        sys.path.remove(directory)
+        for name in names:
+            if name in sys.modules:
+                modules[name] = sys.modules.pop(name)
+        sys.modules.update(saved)
+
+
+@pytest.fixture
+def github() -> FakeGitHubServer:
+    """
+    偽のGitHub（空のリポジトリから始める）
+    """
+    _github.repository = FakeRepository()
+    return _github
+
+
+@pytest.fixture
+def no_retry_wait(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    再試行の待ち時間をなくす
+    """
+    for lambda_name in ('news_page_generator', 'news_detail_page_generator'):
+        monkeypatch.setattr(load(lambda_name, 'github_commit'), 'COMMIT_RETRY_BASE_SECONDS', 0)
+        monkeypatch.setattr(load(lambda_name, 'http_retry'), 'RETRY_BASE_SECONDS', 0)
+
+
+@pytest.fixture
+def supabase(monkeypatch: pytest.MonkeyPatch) -> FakeSupabaseServer:
+    """
+    偽のSupabase（テーブルは空から始める）
+    """
+    _supabase.supabase = FakeSupabase({'articles': [], 'media': []})
+    monkeypatch.setenv('SUPABASE_URL', _supabase.url)
+    monkeypatch.setenv('SUPABASE_ANON_KEY', 'anon-key')
+    return _supabase
+
+
+@pytest.fixture
+def detail(github: FakeGitHubServer, supabase: FakeSupabaseServer, no_retry_wait: None,
+           monkeypatch: pytest.MonkeyPatch) -> ModuleType:
+    """
+    news_detail_page_generator の lambda_function（リポジトリにはテンプレートだけを置く）
+    """
+    module = load('news_detail_page_generator', 'lambda_function')
+    module._TEMPLATE_CACHE.clear()
+    github.repository.commit({TEMPLATE_PATH: (REPO_ROOT / TEMPLATE_PATH).read_text(encoding='utf-8')})
+    monkeypatch.setenv('GITHUB_TOKEN', 'test-token')
+    monkeypatch.setenv('GITHUB_REPO', 'owner/site')
+    monkeypatch.setenv('GITHUB_BRANCH', 'main')
+    return module
+
+
+def article_row(n: int, **overrides: Any) -> Dict[str, Any]:
+    """
+    articles テーブルの行（n から ID と日付を決める。画像・添付ファイルはなし）
+    """
+    row = {
+        'id': f'00000000-0000-0000-0000-{n:012d}',
+        'slug': None,
+        'title': f'防災訓練のお知らせ {n}',
+        'content': f'<p>記事{n}の本文です。地域の皆さまのご参加をお待ちしております。</p>',
+        'category': 'notice',
+        'featured_image_url': None,
+        'published_at': f'2025-11-{1 + n % 28:02d}T01:{n % 60:02d}:00+00:00',
+        'created_at': '2025-11-01T00:00:00+00:00',
+        'updated_at': f'2025-11-{1 + n % 28:02d}T02:00:00+00:00',
+        'event_start_datetime': None,
+        'event_end_datetime': None,
+        'meta_title': None,
+        'meta_description': None,
+        'meta_keywords': '防災,町会',
+        'status': 'published',
+        'deleted_at': None,
+        'show_in_calendar': True,
+        'show_in_news_list': True,
+        'generate_article_page': True,
+        'line_published': False,
+        'x_published': False,
+    }
+    row.update(overrides)
+    return row
+
+
+def search(files: Dict[str, str], word: str) -> Set[str]:
+    """
+    ブラウザ側（js/news-search.js）と同じ手順で、語を含む文書のタイトルを探す
+    """
+    search_index = load('news_detail_page_generator', 'search_index')
+    config = json.loads(files[search_index.SEARCH_CONFIG_PATH])
+    tail, removed = search_index.decode_tail(files.get(search_index.SEARCH_TAIL_PATH))
+    docs = None
+    for gram in search_index.text_bigrams(word):
+        postings = search_index.decode_shard(files.get(search_index.shard_path(search_index.shard_of(gram, config['shards']))))
+        found = (set(postings.get(gram, [])) - removed) | set(tail.get(gram, []))
+        docs = found if docs is None else docs & found
+    titles = set()
+    for doc in docs or ():
+        chunk = search_index.decode_docs_chunk(files.get(search_index.docs_chunk_path(search_index.docs_chunk_of(doc))))
+        titles.add(chunk[str(doc)]['t'])
+    return titles
@@ -0,0 +1,293 @@
+"""
+テスト用のGitHub API（ローカルのHTTPサーバー）
+Lambda が使う Git Data API・Contents API・比較APIだけを実装する
+
+- blob・ツリー・コミットは内容から決まるSHAで保持する（ツリーはパス → blob のSHA の平らな対応）
+- 参照の更新は fast-forward のみ受け付け、それ以外は GitHub と同じく 422 を返す
+- ツリーの作成で base_tree にないパスを削除しようとした場合も GitHub と同じく 422 を返す
+- 受け付けたリクエストは requests に残す（テストで呼び出し回数を確認する）
+"""
+import base64
+import hashlib
+import json
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+RAW_MEDIA_TYPES = ('application/vnd.github.v3.raw', 'application/vnd.github.raw')
+
+
+def blob_sha(data: bytes) -> str:
+    """
+    git の blob のSHA
+    """
+    return hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest()
+
+
+class FakeRepository:
+    """
+    1つのリポジトリの状態
+    """
+
+    def __init__(self, files: Optional[Dict[str, str]] = None, branch: str = 'main'):
+        self.lock = threading.RLock()
+        self.blobs: Dict[str, bytes] = {}
+        self.trees: Dict[str, Dict[str, str]] = {}
+        self.commits: Dict[str, Dict[str, Any]] = {}
+        self.refs: Dict[str, str] = {}
+        self.requests: List[Tuple[str, str]] = []
+        self.conflicts = 0
+        tree = self._tree({path: self._blob(content.encode('utf-8')) for path, content in (files or {}).items()})
+        self.refs[branch] = self._commit(tree, [], 'initial')
+
+    def _blob(self, data: bytes) -> str:
+        sha = blob_sha(data)
+        self.blobs[sha] = data
+        return sha
+
+    def _tree(self, entries: Dict[str, str]) -> str:
+        sha = hashlib.sha1(json.dumps(entries, sort_keys=True).encode('utf-8')).hexdigest()
+        self.trees[sha] = dict(entries)
+        return sha
+
+    def _commit(self, tree: str, parents: List[str], message: str) -> str:
+        sha = hashlib.sha1(json.dumps([tree, parents, message, len(self.commits)]).encode('utf-8')).hexdigest()
+        self.commits[sha] = {'tree': tree, 'parents': list(parents), 'message': message}
+        return sha
+
+    def head(self, branch: str = 'main') -> str:
+        return self.refs[branch]
+
+    def files(self, ref: str = 'main') -> Dict[str, str]:
+        """
+        ブランチ（またはコミット）の全ファイル（パス → 内容）
+        """
+        with self.lock:
+            tree = self.trees[self.commits[self.refs.get(ref, ref)]['tree']]
+            return {path: self.blobs[sha].decode('utf-8') for path, sha in tree.items()}
+
+    def commit(self, files: Dict[str, Optional[str]], message: str = 'test', branch: str = 'main') -> str:
+        """
+        テストの準備用に直接コミットする（内容が None のファイルは削除）
+        """
+        with self.lock:
+            parent = self.refs[branch]
+            entries = dict(self.trees[self.commits[parent]['tree']])
+            for path, content in files.items():
+                if content is None:
+                    entries.pop(path, None)
+                else:
+                    entries[path] = self._blob(content.encode('utf-8'))
+            self.refs[branch] = self._commit(self._tree(entries), [parent], message)
+            return self.refs[branch]
+
+    def history(self, branch: str = 'main') -> List[str]:
+        """
+        先頭から最初のコミットまでのメッセージ（最初の親をたどる）
+        """
+        with self.lock:
+            messages = []
+            sha = self.refs[branch]
+            while sha:
+                commit = self.commits[sha]
+                messages.append(commit['message'])
+                sha = commit['parents'][0] if commit['parents'] else None
+            return messages
+
+    def count(self, method: str, fragment: str) -> int:
+        """
+        パスに fragment を含むリクエストの数
+        """
+        with self.lock:
+            return sum(1 for m, path in self.requests if m == method and fragment in path)
+
+    def _is_ancestor(self, ancestor: str, sha: str) -> bool:
+        pending = [sha]
+        seen = set()
+        while pending:
+            current = pending.pop()
+            if current == ancestor:
+                return True
+            if current in seen or current not in self.commits:
+                continue
+            seen.add(current)
+            pending.extend(self.commits[current]['parents'])
+        return False
+
+    def _resolve_tree(self, rev: str) -> Optional[Dict[str, str]]:
+        """
+        ツリーのSHA、コミットのSHA・ブランチ名、または「リビジョン:ディレクトリ」のツリー
+        """
+        rev, _, directory = rev.partition(':')
+        if rev in self.trees and not directory:
+            return self.trees[rev]
+        commit = self.commits.get(self.refs.get(rev, rev))
+        if commit is None:
+            return None
+        tree = self.trees[commit['tree']]
+        if not directory:
+            return tree
+        prefix = directory.rstrip('/') + '/'
+        entries = {path[len(prefix):]: sha for path, sha in tree.items() if path.startswith(prefix)}
+        return entries or None
+
+    def handle(self, method: str, path: str, query: Dict[str, str], headers: Any,
+               body: Optional[Dict[str, Any]]) -> Tuple[int, Any, Dict[str, str]]:
+        """
+        1リクエストを処理して (ステータス, 本文, ヘッダー) を返す（本文が bytes の場合はそのまま返す）
+        """
+        with self.lock:
+            self.requests.append((method, path))
+            parts = path.split('/', 4)
+            if len(parts) < 5 or parts[1] != 'repos':
+                return 404, {'message': 'Not Found'}, {}
+            rest = parts[4]
+            raw = any(t in (headers.get('Accept') or '') for t in RAW_MEDIA_TYPES)
+
+            if method == 'GET' and rest.startswith('git/ref/heads/'):
+                branch = rest[len('git/ref/heads/'):]
+                if branch not in self.refs:
+                    return 404, {'message': 'Not Found'}, {}
+                return 200, {'object': {'sha': self.refs[branch], 'type': 'commit'}}, {}
+
+            if method == 'GET' and rest.startswith('git/commits/'):
+                commit = self.commits.get(rest[len('git/commits/'):])
+                if commit is None:
+                    return 404, {'message': 'Not Found'}, {}
+                return 200, {
+                    'sha': rest[len('git/commits/'):],
+                    'tree': {'sha': commit['tree']},
+                    'parents': [{'sha': p} for p in commit['parents']],
+                    'message': commit['message'],
+                }, {}
+
+            if method == 'POST' and rest == 'git/trees':
+                base = self.trees.get(body.get('base_tree') or '')
+                if base is None and body.get('base_tree'):
+                    return 422, {'message': 'base_tree is not a valid tree'}, {}
+                entries = dict(base or {})
+                for entry in body['tree']:
+                    if 'content' in entry and entry['content'] is not None:
+                        entries[entry['path']] = self._blob(entry['content'].encode('utf-8'))
+                    elif entry.get('sha') is None:
+                        if entry['path'] not in entries:
+                            return 422, {'message': 'GitRPC::BadObjectState'}, {}
+                        del entries[entry['path']]
+                    elif entry['sha'] in self.blobs:
+                        entries[entry['path']] = entry['sha']
+                    else:
+                        return 422, {'message': 'tree.sha is not a valid blob'}, {}
+                return 201, {'sha': self._tree(entries)}, {}
+
+            if method == 'GET' and rest.startswith('git/trees/'):
+                tree = self._resolve_tree(urllib.parse.unquote(rest[len('git/trees/'):]))
+                if tree is None:
+                    return 404, {'message': 'Not Found'}, {}
+                return 200, {
+                    'tree': [
+                        {'path': p, 'mode': '100644', 'type': 'blob', 'sha': s, 'size': len(self.blobs[s])}
+                        for p, s in sorted(tree.items())
+                    ],
+                    'truncated': False,
+                }, {}
+
+            if method == 'GET' and rest.startswith('git/blobs/'):
+                data = self.blobs.get(rest[len('git/blobs/'):])
+                if data is None:
+                    return 404, {'message': 'Not Found'}, {}
+                if raw:
+                    return 200, data, {}
+                return 200, {'sha': blob_sha(data), 'content': base64.b64encode(data).decode(),
+                             'encoding': 'base64', 'size': len(data)}, {}
+
+            if method == 'POST' and rest == 'git/commits':
+                if body['tree'] not in self.trees or any(p not in self.commits for p in body['parents']):
+                    return 422, {'message': 'Invalid tree or parents'}, {}
+                return 201, {'sha': self._commit(body['tree'], body['parents'], body['message'])}, {}
+
+            if method == 'PATCH' and rest.startswith('git/refs/heads/'):
+                branch = rest[len('git/refs/heads/'):]
+                if body['sha'] not in self.commits:
+                    return 422, {'message': 'Object does not exist'}, {}
+                if not body.get('force') and not self._is_ancestor(self.refs[branch], body['sha']):
+                    self.conflicts += 1
+                    return 422, {'message': 'Update is not a fast forward'}, {}
+                self.refs[branch] = body['sha']
+                return 200, {'object': {'sha': body['sha']}}, {}
+
+            if method == 'GET' and rest.startswith('compare/'):
+                base, _, head = rest[len('compare/'):].partition('...')
+                if base not in self.commits or head not in self.commits:
+                    return 404, {'message': 'Not Found'}, {}
+                before = self.trees[self.commits[base]['tree']]
+                after = self.trees[self.commits[head]['tree']]
+                changed = sorted(p for p in before.keys() | after.keys() if before.get(p) != after.get(p))
+                return 200, {'files': [{'filename': p} for p in changed]}, {}
+
+            if method == 'GET' and rest.startswith('contents/'):
+                file_path = urllib.parse.unquote(rest[len('contents/'):])
+                ref = query.get('ref', 'main')
+                tree = self._resolve_tree(ref)
+                sha = (tree or {}).get(file_path)
+                if sha is None:
+                    return 404, {'message': 'Not Found'}, {}
+                etag = f'"{sha}"'
+                if headers.get('If-None-Match') == etag:
+                    return 304, b'', {'ETag': etag}
+                data = self.blobs[sha]
+                if raw:
+                    return 200, data, {'ETag': etag}
+                return 200, {'sha': sha, 'path': file_path, 'content': base64.b64encode(data).decode(),
+                             'encoding': 'base64', 'size': len(data)}, {'ETag': etag}
+
+            return 404, {'message': f'unhandled {method} {path}'}, {}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _route(self, method: str) -> None:
+        url = urllib.parse.urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        status, payload, headers = self.server.repository.handle(
+            method, url.path, dict(urllib.parse.parse_qsl(url.query)), self.headers, body
+        )
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        self._route('GET')
+
+    def do_POST(self) -> None:
+        self._route('POST')
+
+    def do_PATCH(self) -> None:
+        self._route('PATCH')
+
+
+class FakeGitHubServer(ThreadingHTTPServer):
+    """
+    FakeRepository を HTTP で公開するサーバー（repository を差し替えてテストごとに作り直す）
+    """
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.repository = FakeRepository()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}'
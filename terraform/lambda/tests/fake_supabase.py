@@ -0,0 +1,205 @@
+"""
+テスト用のSupabase（PostgREST の一部をローカルのHTTPサーバーで実装する）
+Lambda が使う絞り込み（eq / neq / in / is / lt / lte / gt / gte / or）・並べ替え・limit / offset・
+media(*) の埋め込み・Prefer: count=exact（Content-Range）と RPC の呼び出しだけを扱う
+
+テーブルは tables（テーブル名 → 行のリスト）に置き、RPC は rpcs（関数名 → 本文を受け取る関数）に登録する
+受け付けたリクエストは requests に残す（テストで問い合わせの内容とキーを確認する。ヘッダー名は小文字）
+"""
+import json
+import re
+import threading
+import urllib.parse
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+RESERVED_PARAMS = {'select', 'order', 'limit', 'offset', 'or'}
+# 埋め込みは子テーブルの <親テーブルの単数形>_id で結ぶ（media.article_id → articles.id）
+EMBED_PATTERN = re.compile(r'(\w+)\(\*\)')
+
+
+def _comparable(value: Any) -> Any:
+    """
+    日時の文字列はタイムゾーンをそろえて比べる
+    """
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            pass
+    return value
+
+
+def _split_list(value: str) -> List[str]:
+    """
+    in.(a,"b,c") の中身を値のリストにする
+    """
+    values = []
+    for match in re.finditer(r'"((?:[^"\\]|\\.)*)"|([^,]+)', value):
+        quoted, plain = match.groups()
+        values.append(re.sub(r'\\(.)', r'\1', quoted) if quoted is not None else plain)
+    return values
+
+
+def matches(row: Dict[str, Any], column: str, condition: str) -> bool:
+    """
+    1つの条件（例: eq.published、in.(a,b)、not.is.null）に行が合うか
+    """
+    if condition.startswith('not.'):
+        return not matches(row, column, condition[4:])
+    op, _, value = condition.partition('.')
+    actual = row.get(column)
+    if op == 'is':
+        return actual is {'null': None, 'true': True, 'false': False}[value]
+    if op == 'in':
+        return actual is not None and str(actual) in _split_list(value[1:-1])
+    if op in ('eq', 'neq'):
+        text = str(actual).lower() if isinstance(actual, bool) else str(actual)
+        equal = actual is not None and text == value
+        return equal if op == 'eq' else not equal
+    if actual is None:
+        return False
+    left, right = _comparable(actual), _comparable(value)
+    return {'lt': left < right, 'lte': left <= right, 'gt': left > right, 'gte': left >= right}[op]
+
+
+def _matches_or(row: Dict[str, Any], expression: str) -> bool:
+    """
+    or=(a.gte.x,b.is.null) の条件
+    """
+    for part in re.split(r',(?![^()]*\))', expression[1:-1]):
+        column, _, condition = part.partition('.')
+        if matches(row, column, condition):
+            return True
+    return False
+
+
+def order_rows(rows: List[Dict[str, Any]], order: str) -> List[Dict[str, Any]]:
+    """
+    order=a.desc.nullsfirst,b.asc の並べ替え（NULL の位置の既定は Postgres と同じ）
+    """
+    rows = list(rows)
+    for term in reversed(order.split(',')):
+        column, *options = term.split('.')
+        descending = 'desc' in options
+        nulls_first = 'nullsfirst' in options or (descending and 'nullslast' not in options)
+        present = [r for r in rows if r.get(column) is not None]
+        missing = [r for r in rows if r.get(column) is None]
+        present.sort(key=lambda r: _comparable(r[column]), reverse=descending)
+        rows = missing + present if nulls_first else present + missing
+    return rows
+
+
+class FakeSupabase:
+    """
+    テーブルと RPC の状態
+    """
+
+    def __init__(self, tables: Optional[Dict[str, List[Dict[str, Any]]]] = None):
+        self.lock = threading.Lock()
+        self.tables: Dict[str, List[Dict[str, Any]]] = tables or {}
+        self.rpcs: Dict[str, Callable[[Any], Any]] = {}
+        self.requests: List[Dict[str, Any]] = []
+
+    def queries(self, table: str) -> List[Dict[str, str]]:
+        """
+        テーブルへの GET の問い合わせ（パラメーター）
+        """
+        return [r['query'] for r in self.requests if r['method'] == 'GET' and r['path'] == f'/rest/v1/{table}']
+
+    def select(self, table: str, query: Dict[str, str]) -> List[Dict[str, Any]]:
+        rows = [
+            row for row in self.tables.get(table, [])
+            if all(
+                matches(row, column, condition) for column, condition in query.items()
+                if column not in RESERVED_PARAMS and '.' not in column
+            )
+            and ('or' not in query or _matches_or(row, query['or']))
+        ]
+        if 'order' in query:
+            rows = order_rows(rows, query['order'])
+
+        embeds = EMBED_PATTERN.findall(query.get('select', ''))
+        result = []
+        for row in rows:
+            row = dict(row)
+            for child in embeds:
+                child_query = {k[len(child) + 1:]: v for k, v in query.items() if k.startswith(f'{child}.')}
+                child_query[f'{table[:-1]}_id'] = f'eq.{row["id"]}'
+                row[child] = self.select(child, child_query)
+            result.append(row)
+        return result
+
+    def handle(self, method: str, path: str, query: Dict[str, str], headers: Dict[str, str],
+               body: Any) -> Tuple[int, Any, Dict[str, str]]:
+        with self.lock:
+            self.requests.append({'method': method, 'path': path, 'query': query, 'headers': headers, 'body': body})
+            if path.startswith('/rest/v1/rpc/') and method == 'POST':
+                name = path[len('/rest/v1/rpc/'):]
+                if name not in self.rpcs:
+                    return 404, {'message': f'function {name} not found'}, {}
+                return 200, self.rpcs[name](body), {}
+            if not path.startswith('/rest/v1/') or method != 'GET':
+                return 404, {'message': f'unhandled {method} {path}'}, {}
+
+            rows = self.select(path[len('/rest/v1/'):], query)
+            total = len(rows)
+            offset = int(query.get('offset', 0))
+            limit = int(query['limit']) if 'limit' in query else total
+            rows = rows[offset:offset + limit]
+            response_headers = {}
+            if 'count=exact' in headers.get('prefer', ''):
+                end = f'{offset}-{offset + len(rows) - 1}' if rows else '*'
+                response_headers['Content-Range'] = f'{end}/{total}'
+            return 200, rows, response_headers
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _route(self, method: str) -> None:
+        url = urllib.parse.urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        status, payload, headers = self.server.supabase.handle(
+            method, url.path, dict(urllib.parse.parse_qsl(url.query)),
+            {name.lower(): value for name, value in self.headers.items()}, body
+        )
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        self._route('GET')
+
+    def do_POST(self) -> None:
+        self._route('POST')
+
+    def do_PATCH(self) -> None:
+        self._route('PATCH')
+
+
+class FakeSupabaseServer(ThreadingHTTPServer):
+    """
+    FakeSupabase を HTTP で公開するサーバー（supabase を差し替えてテストごとに作り直す）
+    """
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.supabase = FakeSupabase()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}'
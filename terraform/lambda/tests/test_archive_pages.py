@@ -0,0 +1,115 @@
+"""
+news_page_generator の過去のお知らせページ（マニフェストの fingerprint による差分の再生成）のテスト
+"""
+import json
+
+import pytest
+
+from conftest import article_row, load
+
+
+@pytest.fixture
+def news(monkeypatch):
+    module = load('news_page_generator', 'lambda_function')
+    monkeypatch.setattr(module, 'ARCHIVE_PAGE_SIZE', 3)
+    return module
+
+
+def articles(news, count, overrides=None):
+    # 一覧と同じ新しい順（overrides は n → 行の変更）
+    return [news.Article(article_row(n, **(overrides or {}).get(n, {}))) for n in range(count, 0, -1)]
+
+
+def build(news, items, manifest=None, images=None):
+    files, summary = news.build_archive_files(items, manifest, images)
+    return files, summary, json.loads(files.get(news.ARCHIVE_MANIFEST_PATH) or json.dumps(manifest))
+
+
+def test_pages_are_filled_from_the_oldest_article(news):
+    files, summary, manifest = build(news, articles(news, 7))
+
+    assert summary == {'pages': 3, 'regenerated': [1, 2, 3], 'removed': []}
+    ids = {page: entry['ids'] for page, entry in manifest['pages'].items()}
+    assert ids['1'] == [article_row(n)['id'] for n in (3, 2, 1)]
+    assert ids['3'] == [article_row(7)['id']]
+    assert [entry['latest'] for entry in manifest['pages'].values()] == [False, False, True]
+    assert manifest['total'] == 7 and manifest['page_size'] == 3
+    assert set(files) == {news.ARCHIVE_MANIFEST_PATH} | {f'news/page/{n}.html' for n in (1, 2, 3)}
+    assert '<base href="../../" />' in files['news/page/2.html']
+
+
+def test_unchanged_pages_are_not_regenerated(news):
+    _, _, manifest = build(news, articles(news, 7))
+
+    files, summary, _ = build(news, articles(news, 7), manifest)
+
+    assert files == {}
+    assert summary['regenerated'] == []
+
+
+def test_title_change_regenerates_only_its_page(news):
+    _, _, manifest = build(news, articles(news, 7))
+
+    files, summary, new_manifest = build(news, articles(news, 7, {2: {'title': '夏祭りのお知らせ'}}), manifest)
+
+    assert summary['regenerated'] == [1]
+    assert set(files) == {'news/page/1.html', news.ARCHIVE_MANIFEST_PATH}
+    assert '夏祭りのお知らせ' in files['news/page/1.html']
+    assert new_manifest['pages']['1']['fingerprint'] != manifest['pages']['1']['fingerprint']
+    assert new_manifest['pages']['2'] == manifest['pages']['2']
+
+
+def test_new_article_touches_only_the_latest_pages(news):
+    _, _, manifest = build(news, articles(news, 8))
+
+    # 新しい記事は最新のページに入る。最新のページだった印が外れたページ（ナビゲーションが変わる）も作り直す
+    files, summary, _ = build(news, articles(news, 9), manifest)
+    assert summary['regenerated'] == [3]
+
+    files, summary, _ = build(news, articles(news, 10), build(news, articles(news, 9))[2])
+    assert summary['regenerated'] == [3, 4]
+
+
+def test_removed_articles_delete_surplus_pages(news):
+    _, _, manifest = build(news, articles(news, 7))
+
+    files, summary, new_manifest = build(news, articles(news, 6), manifest)
+
+    assert summary['removed'] == [3]
+    assert files['news/page/3.html'] is None
+    assert summary['regenerated'] == [2]
+    assert set(new_manifest['pages']) == {'1', '2'}
+
+
+@pytest.mark.parametrize('change', ['template', 'page_size', 'version'])
+def test_layout_change_regenerates_every_page(news, change):
+    _, _, manifest = build(news, articles(news, 7))
+    manifest[change] = 'old'
+
+    _, summary, _ = build(news, articles(news, 7), manifest)
+
+    assert summary['regenerated'] == [1, 2, 3]
+
+
+def test_derived_images_change_the_fingerprint(news):
+    url = 'https://cdn.example.com/festival.jpg'
+    items = articles(news, 3, {2: {'featured_image_url': url}})
+    _, _, manifest = build(news, items)
+    images = load('news_page_generator', 'image_derivatives').DerivedImages(json.dumps({
+        'version': 1,
+        'sources': {url: {'hash': 'a' * 16, 'width': 800, 'height': 600, 'widths': [240, 480, 800]}},
+    }))
+
+    files, summary, _ = build(news, items, manifest, images)
+
+    assert summary['regenerated'] == [1]
+    assert 'srcset=' in files['news/page/1.html']
+
+
+def test_news_page_links_the_page_with_the_first_hidden_article(news, monkeypatch):
+    monkeypatch.setattr(news, 'NEWS_LIST_LIMIT', 3)
+
+    assert news.archive_link_html(3) == ''
+    # 10件のうち news.html に載らない最初の記事（新しい方から4件目）は古い方から7件目 → 3ページ目
+    assert 'news/page/3.html' in news.archive_link_html(10)
+    assert news.archive_page_for_index(10, 9) == 1
@@ -0,0 +1,89 @@
+"""
+article_model（Supabase の行から1回だけ変換する記事・添付ファイルのモデル）のテスト
+"""
+from datetime import date
+
+import pytest
+
+from conftest import LAMBDA_ROOT, article_row, load
+
+
+@pytest.fixture
+def article_model():
+    return load('news_detail_page_generator', 'article_model')
+
+
+def test_parse_jst_normalizes_time_zones(article_model):
+    assert article_model.parse_jst('2025-11-30T16:00:00+00:00').isoformat() == '2025-12-01T01:00:00+09:00'
+    assert article_model.parse_jst('2025-11-30T16:00:00Z').isoformat() == '2025-12-01T01:00:00+09:00'
+    # タイムゾーンのない値（管理画面が保存する形式）はJST
+    assert article_model.parse_jst('2025-12-01 10:30:00').isoformat() == '2025-12-01T10:30:00+09:00'
+    assert article_model.parse_jst('') is None
+    assert article_model.parse_jst('not a date') is None
+
+
+def test_format_date_jp(article_model):
+    assert article_model.format_date_jp(date(2025, 12, 1)) == '2025年12月1日（月）'
+
+
+def test_article_derives_dates_once(article_model):
+    article = article_model.Article(article_row(
+        1, slug='summer-festival', published_at='2025-11-30T16:00:00+00:00',
+        event_start_datetime='2025-12-06T10:00:00+09:00', event_end_datetime='2025-12-07T23:59:00+09:00'
+    ))
+
+    assert article.detail_path == 'news/summer-festival.html'
+    # 元の文字列は比較用にそのまま残す
+    assert article.published_at == '2025-11-30T16:00:00+00:00'
+    assert article.published_date_jp == '2025年12月1日（月）'
+    assert article.event_start_date == date(2025, 12, 6)
+    assert article.event_end_date == date(2025, 12, 7)
+    # 一覧の日付はイベント開始日を優先する
+    assert article.list_date_jp == '2025年12月6日（土）'
+    assert article.has_start_time and not article.has_end_time
+
+
+def test_article_defaults_for_missing_columns(article_model):
+    article = article_model.Article({'id': 'a1', 'created_at': '2025-11-01T00:00:00+00:00'})
+
+    assert article.slug == 'a1' and article.detail_path == 'news/a1.html'
+    assert article.title == '' and article.content == ''
+    assert article.published_at == '2025-11-01T00:00:00+00:00'
+    assert article.event_start is None and article.event_start_date is None
+    assert article.list_date_jp == article.published_date_jp == '2025年11月1日（土）'
+    assert not article.generate_article_page
+    with pytest.raises(AttributeError):
+        article.unknown = 1
+
+
+@pytest.mark.parametrize('start, end, has_start, has_end', [
+    ('2025-12-06T00:00:00+09:00', '2025-12-06T23:59:00+09:00', False, False),
+    ('2025-12-06T09:30:00+09:00', '2025-12-06T12:00:00+09:00', True, True),
+    ('2025-12-06T00:00:00+09:00', '2025-12-07T00:00:00+09:00', False, False),
+])
+def test_event_time_flags_follow_the_midnight_convention(article_model, start, end, has_start, has_end):
+    article = article_model.Article(article_row(1, event_start_datetime=start, event_end_datetime=end))
+
+    assert (article.has_start_time, article.has_end_time) == (has_start, has_end)
+
+
+def test_event_time_flags_from_the_database_win(article_model):
+    article = article_model.Article(article_row(
+        1, event_start_datetime='2025-12-06T00:00:00+09:00', event_end_datetime='2025-12-06T23:59:00+09:00',
+        has_start_time=True, has_end_time=True
+    ))
+
+    assert article.has_start_time and article.has_end_time
+
+
+def test_media_defaults(article_model):
+    media = article_model.Media({'id': 'm1', 'file_url': None, 'file_size': None})
+
+    assert (media.file_name, media.file_url, media.file_size) == ('', '', 0)
+    assert media.mime_type is None and media.probed_at is None
+
+
+def test_every_lambda_has_the_same_article_model():
+    copies = {path.parent.name: path.read_bytes() for path in LAMBDA_ROOT.glob('*/article_model.py')}
+    assert len(copies) == 2
+    assert len(set(copies.values())) == 1, sorted(copies)
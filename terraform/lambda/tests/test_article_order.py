@@ -0,0 +1,80 @@
+"""
+article_order（詳細ページの前後の記事・同じカテゴリの記事）のテスト
+"""
+import pytest
+
+from conftest import article_row, load
+
+
+@pytest.fixture
+def article_order():
+    return load('news_detail_page_generator', 'article_order')
+
+
+def article(article_order, n, **overrides):
+    return article_order.Article(article_row(n, **overrides))
+
+
+def ids(articles):
+    return [a.id if a is not None else None for a in articles]
+
+
+def test_neighbours_follow_published_order_with_id_tiebreak(article_order):
+    same_time = '2025-11-10T00:00:00+00:00'
+    items = [
+        article(article_order, 3, published_at=same_time),
+        article(article_order, 1),
+        article(article_order, 2, published_at=same_time),
+    ]
+    order = article_order.ArticleOrder(items)
+
+    assert len(order) == 3
+    assert ids(order.neighbours(items[1])) == [None, article_row(2)['id']]
+    # 公開日時が同じ記事はIDの順に並ぶ
+    assert ids(order.neighbours(items[2])) == [article_row(1)['id'], article_row(3)['id']]
+    assert ids(order.neighbours(items[0])) == [article_row(2)['id'], None]
+
+
+def test_neighbours_of_an_article_missing_from_the_index(article_order):
+    order = article_order.ArticleOrder([article(article_order, n) for n in (1, 2, 4, 5)])
+
+    # 索引にない記事（公開直後など）も公開日時の位置で前後を引く
+    assert ids(order.neighbours(article(article_order, 3))) == [article_row(2)['id'], article_row(4)['id']]
+    assert ids(article_order.ArticleOrder([]).neighbours(article(article_order, 3))) == [None, None]
+
+
+def test_related_articles_are_nearest_in_the_same_category(article_order, monkeypatch):
+    monkeypatch.setattr(article_order, 'RELATED_ARTICLES_COUNT', 3)
+    categories = {1: 'event', 2: 'notice', 3: 'event', 4: 'event', 5: 'notice', 6: 'event', 7: 'event', 8: 'event'}
+    items = [article(article_order, n, category=c) for n, c in categories.items()]
+    order = article_order.ArticleOrder(items)
+
+    prev_article, next_article, related = order.navigation(items[3])
+
+    assert ids([prev_article, next_article]) == [article_row(3)['id'], article_row(5)['id']]
+    # 前の記事（記事3）を除き、新しい側と古い側から交互に選んで新しい順に並べる
+    assert ids(related) == [article_row(n)['id'] for n in (7, 6, 1)]
+
+
+def test_related_uses_notice_for_articles_without_category(article_order):
+    items = [article(article_order, 1, category=None), article(article_order, 2, category='notice')]
+    order = article_order.ArticleOrder(items)
+
+    assert ids(order.related(items[0])) == [article_row(2)['id']]
+    assert order.related(article(article_order, 3, category='disaster')) == []
+
+
+@pytest.mark.parametrize('count', [1, 3, 6])
+def test_pages_showing_covers_every_page_that_links_the_article(article_order, monkeypatch, count):
+    monkeypatch.setattr(article_order, 'RELATED_ARTICLES_COUNT', count)
+    items = [article(article_order, n, category=('event', 'notice', 'event')[n % 3]) for n in range(1, 21)]
+    order = article_order.ArticleOrder(items)
+
+    for target in items:
+        showing = set()
+        for other in items:
+            prev_article, next_article, related = order.navigation(other)
+            if target.id in ids([prev_article, next_article, *related]):
+                showing.add(other.id)
+        assert showing <= order.pages_showing(target), target.id
+        assert target.id not in order.pages_showing(target)
@@ -0,0 +1,94 @@
+"""
+news_page_generator のカレンダー（記事の日ごとの振り分けと表示）のテスト
+"""
+from datetime import date
+
+import pytest
+
+from conftest import article_row, load
+
+
+@pytest.fixture
+def news():
+    return load('news_page_generator', 'lambda_function')
+
+
+def event(news, n, start, end=None, **overrides):
+    return news.Article(article_row(n, event_start_datetime=start, event_end_datetime=end, **overrides))
+
+
+def days_of(index, ym, article):
+    return [day for day, articles in sorted(index[ym].items()) if article in articles]
+
+
+def test_calendar_months_wrap_the_year(news):
+    assert news.calendar_months(date(2025, 11, 20), 3) == [(2025, 11), (2025, 12), (2026, 1)]
+    assert news.calendar_months(date(2025, 11, 20), 0) == [(2025, 11)]
+
+
+def test_multi_day_event_is_spread_over_months_and_clipped_to_window(news):
+    months = [(2025, 11), (2025, 12)]
+    spanning = event(news, 1, '2025-11-29T10:00:00+09:00', '2025-12-02T17:00:00+09:00')
+    # 表示期間の前から続くイベントは期間内の日だけに入る
+    before = event(news, 2, '2025-10-30T10:00:00+09:00', '2025-11-02T10:00:00+09:00')
+    after = event(news, 3, '2025-12-31T10:00:00+09:00', '2026-01-03T10:00:00+09:00')
+
+    index = news.build_calendar_index([spanning, before, after], months)
+
+    assert set(index) == set(months)
+    assert days_of(index, (2025, 11), spanning) == [29, 30]
+    assert days_of(index, (2025, 12), spanning) == [1, 2]
+    assert days_of(index, (2025, 11), before) == [1, 2]
+    assert days_of(index, (2025, 12), after) == [31]
+
+
+def test_dates_are_in_japan_time_and_bad_ranges_use_the_start_day(news):
+    months = [(2025, 12)]
+    # UTC では 11月30日だが、日本時間では 12月1日
+    late_utc = event(news, 1, '2025-11-30T16:00:00+00:00')
+    reversed_range = event(news, 2, '2025-12-10T10:00:00+09:00', '2025-12-08T10:00:00+09:00')
+    no_date = event(news, 3, None)
+
+    index = news.build_calendar_index([late_utc, reversed_range, no_date], months)
+
+    assert days_of(index, (2025, 12), late_utc) == [1]
+    assert days_of(index, (2025, 12), reversed_range) == [10]
+    assert all(no_date not in articles for articles in index[(2025, 12)].values())
+
+
+def test_same_day_events_are_ordered_by_start_and_overflow_is_counted(news, monkeypatch):
+    monkeypatch.setattr(news, 'CALENDAR_MAX_EVENTS_PER_DAY', 2)
+    evening = event(news, 1, '2025-12-05T18:00:00+09:00', title='夜回り')
+    morning = event(news, 2, '2025-12-05T09:00:00+09:00', title='清掃')
+    noon = event(news, 3, '2025-12-05T12:00:00+09:00', title='餅つき', generate_article_page=False)
+    continued = event(news, 4, '2025-12-04T09:00:00+09:00', '2025-12-05T10:00:00+09:00', title='作品展')
+
+    index = news.build_calendar_index([evening, morning, noon, continued], [(2025, 12)])
+    assert [a.title for a in index[(2025, 12)][5]] == ['作品展', '清掃', '餅つき', '夜回り']
+
+    html = news.generate_calendar_html(2025, 12, date(2025, 12, 5), index[(2025, 12)])
+    cell = html.split('calendar-day-number">5</span>')[1].split('calendar-day-number">6</span>')[0]
+    # 前日から続くイベントの印、表示しきれない分の件数とタイトル
+    assert 'calendar-day-event-continued" onclick' in cell and '作品展' in cell
+    assert '清掃' in cell
+    assert 'title="餅つき、夜回り">+2件' in cell
+    assert 'today has-event multi-event' in html
+
+
+def test_event_without_detail_page_is_not_linked(news):
+    article = event(news, 1, '2025-12-05T09:00:00+09:00', title='<清掃>', generate_article_page=False)
+
+    html = news.calendar_event_html(article, '2025-12-05')
+
+    assert 'calendar-day-event-nolink' in html
+    assert 'onclick' not in html
+    assert '&lt;清掃&gt;' in html
+
+
+def test_calendar_grid_starts_on_sunday(news):
+    html = news.generate_calendar_html(2025, 11, date(2025, 12, 1), {})
+
+    assert html.startswith('<div class="calendar-day-header">日</div>')
+    # 2025年11月1日は土曜日のため前に6日分、30日（日曜日）の後に6日分の空欄が入る
+    assert html.count('calendar-day other-month') == 6 + 6
+    assert 'has-event' not in html
@@ -0,0 +1,113 @@
+"""
+news_detail_page_generator の削除のテスト（偽のGitHub・Supabase に対して実行する）
+"""
+import json
+
+from conftest import article_row, load, search
+
+
+def delete(detail, article_id):
+    response = detail.lambda_handler({'article_id': article_id, 'delete_flag': True}, None)
+    assert response['statusCode'] == 200, response['body']
+    return json.loads(response['body'])
+
+
+def publish(detail, article_id):
+    response = detail.lambda_handler({'article_id': article_id}, None)
+    assert response['statusCode'] == 200, response['body']
+    return json.loads(response['body'])
+
+
+def test_delete_removes_page_manifest_entry_and_search_docs(detail, github, supabase):
+    supabase.supabase.tables['articles'].extend([article_row(1), article_row(2, title='夏祭りのお知らせ')])
+    publish(detail, article_row(1)['id'])
+    publish(detail, article_row(2)['id'])
+    page = f'news/{article_row(2)["id"]}.html'
+    assert page in github.repository.files()
+
+    supabase.supabase.tables['articles'][1]['status'] = 'draft'
+    delete(detail, article_row(2)['id'])
+
+    files = github.repository.files()
+    assert page not in files
+    manifest = json.loads(files['news/manifest.json'])
+    assert list(manifest['articles']) == [article_row(1)['id']]
+    assert '夏祭り' not in ''.join(v for k, v in files.items() if k.startswith('news/search/'))
+
+
+def test_deleting_an_article_without_a_page_does_not_delete_a_missing_path(detail, github, supabase):
+    supabase.supabase.tables['articles'].extend([article_row(1), article_row(2, generate_article_page=False)])
+    publish(detail, article_row(1)['id'])
+    head = github.repository.head()
+
+    delete(detail, article_row(2)['id'])
+
+    # 存在しないパスの削除をツリーに含めない（GitHub は 422 を返す）。変更がなければコミットもしない
+    assert github.repository.head() == head
+
+
+def test_deleting_twice_is_a_no_op(detail, github, supabase):
+    supabase.supabase.tables['articles'].extend([article_row(1), article_row(2)])
+    publish(detail, article_row(1)['id'])
+    publish(detail, article_row(2)['id'])
+    delete(detail, article_row(2)['id'])
+    head = github.repository.head()
+
+    delete(detail, article_row(2)['id'])
+
+    assert github.repository.head() == head
+
+
+def test_delete_of_article_hidden_from_anon_key_uses_manifest(detail, github, supabase):
+    supabase.supabase.tables['articles'].extend([article_row(1), article_row(2, title='夏祭りのお知らせ')])
+    publish(detail, article_row(1)['id'])
+    publish(detail, article_row(2)['id'])
+
+    # 非公開・削除済みの行は RLS により anon キーでは取得できない
+    del supabase.supabase.tables['articles'][1]
+    delete(detail, article_row(2)['id'])
+
+    files = github.repository.files()
+    assert f'news/{article_row(2)["id"]}.html' not in files
+    assert list(json.loads(files['news/manifest.json'])['articles']) == [article_row(1)['id']]
+    assert search(files, '夏祭り') == set()
+
+
+class LambdaClient:
+    def __init__(self):
+        self.payloads = []
+
+    def invoke(self, FunctionName, InvocationType, Payload):
+        assert InvocationType == 'Event'
+        self.payloads.append(json.loads(Payload))
+
+
+def test_sync_deletes_pages_of_articles_no_longer_published(detail, github, supabase, monkeypatch):
+    news_page = load('news_page_generator', 'lambda_function')
+    client = LambdaClient()
+    monkeypatch.setattr(news_page, '_LAMBDA_CLIENT', client)
+    monkeypatch.setattr(news_page, 'DETAIL_PAGE_GENERATOR_FUNCTION', 'news-detail-page-generator')
+    articles = supabase.supabase.tables['articles']
+    articles.extend([article_row(1), article_row(2), article_row(3)])
+    for n in (1, 2, 3):
+        publish(detail, article_row(n)['id'])
+    articles[1]['status'] = 'draft'
+    articles[2]['deleted_at'] = '2025-12-01T00:00:00+00:00'
+
+    result = news_page.sync_detail_pages(supabase.url, 'anon-key', 'test-token', 'owner/site', 'main')
+
+    assert result['orphaned'] == [article_row(2)['id'], article_row(3)['id']]
+    assert client.payloads == [
+        {'article_id': article_row(2)['id'], 'delete_flag': True},
+        {'article_id': article_row(3)['id'], 'delete_flag': True},
+    ]
+    for payload in client.payloads:
+        detail.lambda_handler(payload, None)
+    files = github.repository.files()
+    assert list(json.loads(files['news/manifest.json'])['articles']) == [article_row(1)['id']]
+    assert not any(f'news/{article_row(n)["id"]}.html' in files for n in (2, 3))
+
+    # 次回の差分チェックでは何も依頼しない
+    client.payloads.clear()
+    assert news_page.sync_detail_pages(supabase.url, 'anon-key', 'test-token', 'owner/site', 'main')['orphaned'] == []
+    assert client.payloads == []
@@ -0,0 +1,133 @@
+"""
+news_detail_page_generator の Supabase からの取得（添付ファイルの埋め込み・ページング・ID の分割・件数）のテスト
+"""
+import pytest
+
+from conftest import article_row
+
+
+def media_row(n, article_n, **overrides):
+    row = {
+        'id': f'10000000-0000-0000-0000-{n:012d}',
+        'article_id': article_row(article_n)['id'],
+        'file_name': f'資料{n}.pdf',
+        'file_url': f'https://cdn.example.com/{n}.pdf',
+        'file_size': 1000 * n,
+        'mime_type': 'application/pdf',
+        'deleted_at': None,
+        'created_at': f'2025-11-01T00:00:{60 - n:02d}+00:00',
+    }
+    row.update(overrides)
+    return row
+
+
+def article_queries(supabase):
+    return supabase.supabase.queries('articles')
+
+
+@pytest.fixture
+def small_pages(detail, monkeypatch):
+    monkeypatch.setattr(detail, 'SUPABASE_PAGE_SIZE', 3)
+    return detail
+
+
+def test_attachments_are_embedded_in_the_article_request(detail, supabase):
+    supabase.supabase.tables['articles'].extend([article_row(1), article_row(2), article_row(3, status='draft')])
+    supabase.supabase.tables['media'].extend([
+        media_row(1, 1), media_row(2, 1), media_row(3, 1, deleted_at='2025-11-02T00:00:00+00:00'), media_row(4, 3),
+    ])
+
+    articles, attachments = detail.fetch_published_articles_from_supabase(supabase.url, 'anon-key')
+
+    assert [a.id for a in articles] == [article_row(1)['id'], article_row(2)['id']]
+    # 削除済みを除き、登録の古い順
+    assert [m.id for m in attachments[article_row(1)['id']]] == [media_row(2, 1)['id'], media_row(1, 1)['id']]
+    assert attachments[article_row(1)['id']][0].file_name == '資料2.pdf'
+    # 添付ファイルのない記事はキーを持たない
+    assert set(attachments) == {article_row(1)['id']}
+    assert supabase.supabase.queries('media') == []
+    assert len(article_queries(supabase)) == 1
+
+
+@pytest.mark.parametrize('count, offsets', [
+    (0, ['0']),
+    (2, ['0']),
+    (7, ['0', '3', '6']),
+    # ページの大きさのちょうど倍数の場合は、最後に空のページを取得して終わる
+    (6, ['0', '3', '6']),
+])
+def test_published_articles_are_fetched_page_by_page(small_pages, supabase, count, offsets):
+    supabase.supabase.tables['articles'].extend(article_row(n) for n in range(1, count + 1))
+
+    articles, _ = small_pages.fetch_published_articles_from_supabase(supabase.url, 'anon-key')
+
+    assert [a.id for a in articles] == [article_row(n)['id'] for n in range(1, count + 1)]
+    assert [q['offset'] for q in article_queries(supabase)] == offsets
+    assert {q['limit'] for q in article_queries(supabase)} == {'3'}
+
+
+def test_article_ids_are_split_into_chunks(small_pages, supabase, monkeypatch):
+    monkeypatch.setattr(small_pages, 'SUPABASE_IN_FILTER_CHUNK', 4)
+    supabase.supabase.tables['articles'].extend(article_row(n) for n in range(1, 11))
+    wanted = [article_row(n)['id'] for n in (9, 1, 2, 3, 4, 5, 6)] + ['00000000-0000-0000-0000-999999999999']
+
+    articles, _ = small_pages.fetch_published_articles_from_supabase(supabase.url, 'anon-key', wanted)
+
+    assert sorted(a.id for a in articles) == sorted(wanted[:-1])
+    queries = article_queries(supabase)
+    # 分けたIDごとにページングする（残りの4件のうち1件は存在せず、ちょうど1ページ分のため空のページまで取得する）
+    assert [(q['id'], q['offset']) for q in queries] == [
+        (f'in.({",".join(wanted[:4])})', '0'),
+        (f'in.({",".join(wanted[:4])})', '3'),
+        (f'in.({",".join(wanted[4:])})', '0'),
+        (f'in.({",".join(wanted[4:])})', '3'),
+    ]
+
+
+def test_article_order_is_fetched_page_by_page(small_pages, supabase):
+    supabase.supabase.tables['articles'].extend(article_row(n) for n in (5, 3, 1, 6, 2, 4))
+    supabase.supabase.tables['articles'].append(article_row(7, generate_article_page=False))
+
+    articles = small_pages.fetch_article_order_from_supabase(supabase.url, 'anon-key')
+
+    assert [a.id for a in articles] == [article_row(n)['id'] for n in range(1, 7)]
+    assert [q['offset'] for q in article_queries(supabase)] == ['0', '3', '6']
+
+
+@pytest.mark.parametrize('count, expected_rows, expected_total', [
+    # 該当なしは「*/0」
+    (0, 0, 0),
+    # 一覧の件数に満たない（最後のページ）は「0-1/2」
+    (2, 2, 2),
+    (3, 3, 3),
+    (10, 3, 10),
+])
+def test_news_list_total_comes_from_content_range(detail, supabase, monkeypatch, count, expected_rows, expected_total):
+    monkeypatch.setattr(detail, 'NEWS_LIST_LIMIT', 3)
+    supabase.supabase.tables['articles'].extend(article_row(n) for n in range(1, count + 1))
+
+    articles, total = detail.fetch_news_list_articles_from_supabase(supabase.url, 'anon-key')
+
+    assert (len(articles), total) == (expected_rows, expected_total)
+    assert len(article_queries(supabase)) == 1
+
+
+@pytest.mark.parametrize('content_range', [None, '0-2/*', ''])
+def test_news_list_total_without_an_exact_count_uses_the_rows(detail, supabase, monkeypatch, content_range):
+    monkeypatch.setattr(detail, 'NEWS_LIST_LIMIT', 3)
+    supabase.supabase.tables['articles'].extend(article_row(n) for n in range(1, 11))
+    handle = supabase.supabase.handle
+
+    def without_count(*args):
+        status, rows, headers = handle(*args)
+        headers.pop('Content-Range', None)
+        if content_range is not None:
+            headers['Content-Range'] = content_range
+        return status, rows, headers
+
+    monkeypatch.setattr(supabase.supabase, 'handle', without_count)
+
+    articles, total = detail.fetch_news_list_articles_from_supabase(supabase.url, 'anon-key')
+
+    assert len(articles) == 3
+    assert total == 3
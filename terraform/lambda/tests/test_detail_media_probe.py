@@ -0,0 +1,105 @@
+"""
+news_detail_page_generator が調べた添付ファイルの形式・寸法の記録（record_media_probes）のテスト
+"""
+import json
+import urllib.error
+
+import pytest
+from PIL import Image
+
+from conftest import article_row, load
+
+
+def attachment_row(n, file_url):
+    return {
+        'id': f'10000000-0000-0000-0000-{n:012d}',
+        'article_id': article_row(1)['id'],
+        'file_name': f'photo{n}.jpg',
+        'file_url': file_url,
+        'file_size': 1000,
+        'mime_type': None,
+        'width': None,
+        'height': None,
+        'probed_at': None,
+        'deleted_at': None,
+        'created_at': f'2025-11-01T00:00:0{n}+00:00',
+    }
+
+
+def publish_with_attachment(detail, supabase, tmp_path, event=None):
+    path = tmp_path / 'photo.jpg'
+    Image.new('RGB', (640, 480), (200, 120, 40)).save(path, 'JPEG')
+    supabase.supabase.tables['articles'].append(article_row(1))
+    supabase.supabase.tables['media'].append(attachment_row(1, path.as_uri()))
+    calls = []
+    supabase.supabase.rpcs['record_media_probes'] = lambda body: calls.append(body) or len(body['probes'])
+
+    response = detail.lambda_handler(event or {'article_id': article_row(1)['id']}, None)
+    assert response['statusCode'] == 200, response['body']
+    return calls
+
+
+def rpc_requests(supabase):
+    return [r for r in supabase.supabase.requests if r['path'] == '/rest/v1/rpc/record_media_probes']
+
+
+def test_probes_are_recorded_with_service_role_key(detail, github, supabase, monkeypatch, tmp_path):
+    monkeypatch.setenv('SUPABASE_SERVICE_ROLE_KEY', 'service-role-key')
+
+    calls = publish_with_attachment(detail, supabase, tmp_path)
+
+    assert calls == [{'probes': [
+        {'id': attachment_row(1, '')['id'], 'mime_type': 'image/jpeg', 'width': 640, 'height': 480}
+    ]}]
+    rpc = rpc_requests(supabase)
+    assert rpc[0]['headers']['apikey'] == 'service-role-key'
+    assert rpc[0]['headers']['authorization'] == 'Bearer service-role-key'
+    # 他の問い合わせは anon キーのまま
+    others = [r for r in supabase.supabase.requests if r['method'] == 'GET']
+    assert others and all(r['headers']['apikey'] == 'anon-key' for r in others)
+    # 調べた寸法はこの生成のページにも使う
+    assert 'width="640" height="480"' in github.repository.files()[f'news/{article_row(1)["id"]}.html']
+
+
+def test_probes_are_not_recorded_without_service_role_key(detail, github, supabase, monkeypatch, tmp_path):
+    monkeypatch.delenv('SUPABASE_SERVICE_ROLE_KEY', raising=False)
+
+    calls = publish_with_attachment(detail, supabase, tmp_path)
+
+    assert calls == []
+    assert not any('/rpc/' in r['path'] for r in supabase.supabase.requests)
+    assert json.loads(github.repository.files()['news/manifest.json'])['articles']
+
+
+@pytest.mark.parametrize('rebuild', ['all', [article_row(1)['id']]], ids=['all', 'ids'])
+def test_rebuild_records_probes_with_service_role_key(detail, github, supabase, monkeypatch, tmp_path, rebuild):
+    monkeypatch.setenv('SUPABASE_SERVICE_ROLE_KEY', 'service-role-key')
+
+    calls = publish_with_attachment(detail, supabase, tmp_path, {'rebuild': rebuild})
+
+    assert [p['id'] for p in calls[0]['probes']] == [attachment_row(1, '')['id']]
+    rpc = rpc_requests(supabase)
+    assert len(rpc) == 1
+    assert rpc[0]['headers']['apikey'] == 'service-role-key'
+    assert rpc[0]['headers']['authorization'] == 'Bearer service-role-key'
+
+
+@pytest.mark.parametrize('code, recorded', [(403, False), (500, False), (404, True), (410, True)])
+def test_only_missing_files_are_recorded_as_unknown(code, recorded):
+    media_probe = load('news_detail_page_generator', 'media_probe')
+    media = load('news_detail_page_generator', 'article_model').Media(
+        {'id': 'm1', 'file_name': 'photo.jpg', 'file_url': 'https://cdn.example.com/photo.jpg'}
+    )
+
+    def probe(url):
+        raise urllib.error.HTTPError(url, code, 'error', {}, None)
+
+    records, summary = media_probe.probe_media([media], probe=probe)
+
+    if recorded:
+        assert records == [{'id': 'm1', 'mime_type': None, 'width': None, 'height': None}]
+        assert media.probed_at
+    else:
+        # 一時的なエラーは記録せず、次回の生成で調べ直す
+        assert records == [] and summary['failed'] == 1
+        assert media.probed_at is None
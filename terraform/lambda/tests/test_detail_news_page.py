@@ -0,0 +1,40 @@
+"""
+news_detail_page_generator の news.html の生成のテスト（偽のGitHub・Supabase に対して実行する）
+"""
+from conftest import article_row
+
+
+def test_news_list_fetches_only_first_page_and_links_archive_from_total(detail, github, supabase, monkeypatch):
+    monkeypatch.setattr(detail, 'NEWS_LIST_LIMIT', 3)
+    monkeypatch.setattr(detail, 'ARCHIVE_PAGE_SIZE', 3)
+    supabase.supabase.tables['articles'].extend(article_row(n) for n in range(1, 11))
+
+    today, calendar_articles, news_list_articles, news_list_total = detail.fetch_news_page_articles(
+        supabase.url, 'anon-key'
+    )
+
+    assert len(news_list_articles) == 3
+    assert news_list_total == 10
+    news_list_requests = [
+        r for r in supabase.supabase.requests
+        if r['path'] == '/rest/v1/articles' and r['query'].get('show_in_news_list') == 'is.true'
+    ]
+    assert len(news_list_requests) == 1
+    assert news_list_requests[0]['query']['limit'] == '3'
+    assert 'offset' not in news_list_requests[0]['query']
+    assert news_list_requests[0]['headers']['prefer'] == 'count=exact'
+
+    html = detail.generate_news_page_html(today, calendar_articles, news_list_articles, news_list_total)
+    # 10件のうち news.html に載らない最初の記事（4件目）は古い方から数えて 7件目 → 3件ずつの 3ページ目
+    assert 'news/page/3.html' in html
+    assert 'news/page/' not in detail.generate_news_page_html(today, calendar_articles, news_list_articles)
+
+
+def test_news_list_total_falls_back_to_row_count(detail, supabase, monkeypatch):
+    monkeypatch.setattr(detail, 'NEWS_LIST_LIMIT', 3)
+    supabase.supabase.tables['articles'].extend(article_row(n) for n in range(1, 3))
+
+    articles, total = detail.fetch_news_list_articles_from_supabase(supabase.url, 'anon-key')
+
+    assert [a.id for a in articles] == [article_row(2)['id'], article_row(1)['id']]
+    assert total == 2
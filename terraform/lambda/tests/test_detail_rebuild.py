@@ -0,0 +1,114 @@
+"""
+news_detail_page_generator の一括再生成のテスト（偽のGitHub・Supabase に対して実行する）
+"""
+import json
+
+import pytest
+from PIL import Image
+
+from conftest import article_row, load, search
+
+REPO = 'owner/site'
+BRANCH = 'main'
+TOKEN = 'test-token'
+
+
+def rebuild(detail, supabase, article_ids=None):
+    return detail.rebuild_detail_pages(supabase.url, 'anon-key', None, TOKEN, REPO, BRANCH, article_ids)
+
+
+def write_photo(path):
+    Image.new('RGB', (600, 400), (200, 120, 40)).save(path, 'JPEG')
+    return path.as_uri()
+
+
+@pytest.mark.parametrize('article_ids', [None, ['00000000-0000-0000-0000-000000000001']], ids=['all', 'ids'])
+def test_conflicting_rebuild_regenerates_shared_files_from_new_head(
+    detail, github, supabase, monkeypatch, tmp_path, article_ids
+):
+    publisher = load('news_detail_page_generator', 'publisher').LocalPublisher(str(tmp_path / 'site'))
+    monkeypatch.setattr(detail, '_SITE_PUBLISHER', publisher)
+    articles = supabase.supabase.tables['articles']
+    articles.extend(article_row(n) for n in range(1, 4))
+    rebuild(detail, supabase)
+
+    # 記事1にアイキャッチ画像を付けて再生成する（派生画像のマニフェスト・検索インデックス・ページが変わる）
+    articles[0]['title'] = '夏祭りのお知らせ'
+    articles[0]['featured_image_url'] = write_photo(tmp_path / 'festival.jpg')
+
+    # 再生成がコミットする直前に、他の実行が記事を公開し、派生画像とスタイルシートのマニフェストも更新する
+    other = article_row(9, title='防犯パトロール参加者募集')
+    other_image = write_photo(tmp_path / 'patrol.jpg')
+    commit_files_to_github = detail.commit_files_to_github
+    concurrent = []
+
+    def commit_after_concurrent_publish(*args, **kwargs):
+        if not concurrent:
+            concurrent.append(True)
+            articles.append(other)
+            response = detail.lambda_handler({'article_id': other['id']}, None)
+            assert response['statusCode'] == 200, response['body']
+            files = github.repository.files()
+            images = json.loads(files.get('images/derived/manifest.json', '{"version": 1, "sources": {}}'))
+            images['sources'][other_image] = {'hash': 'f' * 16, 'width': 600, 'height': 400, 'widths': [240, 480, 600]}
+            css = json.loads(files['css/manifest.json'])
+            css['classes'] = sorted(set(css['classes']) | {'text-red-700'})
+            github.repository.commit({
+                'images/derived/manifest.json': json.dumps(images),
+                'css/manifest.json': json.dumps(css),
+            }, 'concurrent')
+        return commit_files_to_github(*args, **kwargs)
+
+    monkeypatch.setattr(detail, 'commit_files_to_github', commit_after_concurrent_publish)
+    result = rebuild(detail, supabase, article_ids)
+
+    assert github.repository.conflicts >= 1
+    assert len(result['commits']) == 1
+    files = github.repository.files()
+
+    # 他の実行が公開した記事のページ・マニフェスト・検索インデックスが残っている
+    manifest = json.loads(files['news/manifest.json'])
+    assert other['id'] in manifest['articles']
+    assert f'news/{other["id"]}.html' in files
+    assert search(files, '防犯パトロール') == {'防犯パトロール参加者募集'}
+    assert search(files, '夏祭り') == {'夏祭りのお知らせ'}
+    docs = [entry['search']['doc'] for entry in manifest['articles'].values()]
+    assert len(docs) == len(set(docs))
+
+    # 派生画像のマニフェストは両方の実行の画像を含む
+    images = json.loads(files['images/derived/manifest.json'])['sources']
+    assert set(images) >= {articles[0]['featured_image_url'], other_image}
+
+    # スタイルシートは両方の実行のクラスを含み、再生成したページは新しいスタイルシートを参照する
+    css = json.loads(files['css/manifest.json'])
+    assert 'text-red-700' in css['classes']
+    assert css['path'] in files
+    assert css['path'] in files[f'news/{articles[0]["id"]}.html']
+
+
+def test_rebuild_all_skips_articles_without_detail_pages(detail, github, supabase):
+    supabase.supabase.tables['articles'].extend([
+        article_row(1), article_row(2, generate_article_page=False), article_row(3)
+    ])
+
+    result = rebuild(detail, supabase)
+
+    assert result['rebuilt_count'] == 2
+    files = github.repository.files()
+    assert f'news/{article_row(2)["id"]}.html' not in files
+    manifest = json.loads(files['news/manifest.json'])
+    assert set(manifest['articles']) == {article_row(1)['id'], article_row(3)['id']}
+    assert all(q.get('generate_article_page') == 'is.true' for q in supabase.supabase.queries('articles'))
+
+
+def test_rebuild_ids_reports_opted_out_and_missing_articles(detail, github, supabase):
+    supabase.supabase.tables['articles'].extend([
+        article_row(1), article_row(2, generate_article_page=False), article_row(3, status='draft')
+    ])
+
+    result = rebuild(detail, supabase, [article_row(n)['id'] for n in (1, 2, 3, 4)])
+
+    assert result['rebuilt_count'] == 1
+    assert result['opted_out_article_ids'] == [article_row(2)['id']]
+    assert result['missing_article_ids'] == [article_row(3)['id'], article_row(4)['id']]
+    assert f'news/{article_row(2)["id"]}.html' not in github.repository.files()
@@ -0,0 +1,143 @@
+"""
+github_commit のテスト（偽のGitHubに対して、同時に書き込む実行の競合と rebase を確認する）
+"""
+import threading
+
+import pytest
+
+from conftest import load
+
+LAMBDAS = ('news_page_generator', 'news_detail_page_generator')
+REPO = 'owner/site'
+BRANCH = 'main'
+TOKEN = 'test-token'
+
+
+@pytest.fixture(params=LAMBDAS)
+def github_commit(request, github, no_retry_wait):
+    return load(request.param, 'github_commit')
+
+
+def test_commits_all_files_in_one_commit(github_commit, github):
+    github.repository.commit({'old.html': 'old', 'keep.html': 'keep'})
+
+    sha = github_commit.commit_files_to_github(
+        TOKEN, REPO, BRANCH, {'a.html': 'A', 'b/c.json': '{}', 'old.html': None}, 'publish'
+    )
+
+    assert sha == github.repository.head()
+    assert github.repository.files() == {'a.html': 'A', 'b/c.json': '{}', 'keep.html': 'keep'}
+    assert github.repository.history()[0] == 'publish'
+    assert github.repository.count('POST', '/git/commits') == 1
+
+
+def test_skips_commit_without_changes(github_commit, github):
+    head = github.repository.commit({'a.html': 'A'})
+
+    assert github_commit.commit_files_to_github(TOKEN, REPO, BRANCH, {'a.html': 'A'}, 'publish') is None
+    assert github.repository.head() == head
+
+
+def test_concurrent_writers_of_different_files_are_all_kept(github_commit, github):
+    # 待ち時間をなくしているため全員が同時に再試行する。最後の1件は試行回数の上限で成功する
+    writers = github_commit.COMMIT_MAX_ATTEMPTS
+    parent = github.repository.head()
+    barrier = threading.Barrier(writers)
+    errors = []
+
+    def publish(n):
+        try:
+            barrier.wait()
+            github_commit.commit_files_to_github(
+                TOKEN, REPO, BRANCH, {f'news/{n}.html': str(n)}, f'publish {n}', parent_sha=parent
+            )
+        except Exception as e:  # pragma: no cover - 失敗の内容をテストの結果に出す
+            errors.append(e)
+
+    threads = [threading.Thread(target=publish, args=(n,)) for n in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert github.repository.files() == {f'news/{n}.html': str(n) for n in range(writers)}
+    assert len(github.repository.history()) == writers + 1
+    # 全員が同じ先頭から始めるため、最初の1件以外は少なくとも1回競合する
+    assert github.repository.conflicts >= writers - 1
+
+
+def test_concurrent_writers_of_same_file_rebase_onto_new_head(github_commit, github):
+    writers = github_commit.COMMIT_MAX_ATTEMPTS
+    github.repository.commit({'counter.json': '0'})
+    barrier = threading.Barrier(writers)
+    errors = []
+
+    def increment():
+        def build_files():
+            content = github.repository.files()['counter.json']
+            return {'counter.json': str(int(content) + 1)}
+
+        try:
+            parent = github_commit.branch_head(TOKEN, REPO, BRANCH)
+            files = build_files()
+            barrier.wait()
+            github_commit.commit_files_to_github(
+                TOKEN, REPO, BRANCH, files, 'increment', rebase=build_files, parent_sha=parent
+            )
+        except Exception as e:  # pragma: no cover
+            errors.append(e)
+
+    threads = [threading.Thread(target=increment) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    # rebase がなければ同じ値を上書きして増分が失われる
+    assert github.repository.files()['counter.json'] == str(writers)
+    assert github.repository.conflicts >= writers - 1
+
+
+def test_same_file_without_rebase_keeps_this_runs_content(github_commit, github):
+    parent = github.repository.commit({'a.html': 'base'})
+    github.repository.commit({'a.html': 'other', 'b.html': 'other'})
+
+    github_commit.commit_files_to_github(TOKEN, REPO, BRANCH, {'a.html': 'mine'}, 'publish', parent_sha=parent)
+
+    assert github.repository.files() == {'a.html': 'mine', 'b.html': 'other'}
+
+
+def test_rebase_is_not_called_when_changes_do_not_overlap(github_commit, github):
+    parent = github.repository.commit({'a.html': 'base'})
+    github.repository.commit({'b.html': 'other'})
+    calls = []
+
+    def rebase():
+        calls.append(1)
+        return {'a.html': 'rebased'}
+
+    github_commit.commit_files_to_github(
+        TOKEN, REPO, BRANCH, {'a.html': 'mine'}, 'publish', rebase=rebase, parent_sha=parent
+    )
+
+    assert calls == []
+    assert github.repository.files() == {'a.html': 'mine', 'b.html': 'other'}
+
+
+def test_gives_up_after_max_attempts(github_commit, github, monkeypatch):
+    parent = github.repository.commit({'a.html': 'base'})
+    monkeypatch.setattr(github_commit, 'COMMIT_MAX_ATTEMPTS', 2)
+
+    def rebase():
+        # 再試行のたびに他の実行が先にコミットする
+        github.repository.commit({'a.html': f'other {len(github.repository.commits)}'})
+        return {'a.html': 'mine'}
+
+    github.repository.commit({'a.html': 'other'})
+    with pytest.raises(github_commit.urllib.error.HTTPError) as error:
+        github_commit.commit_files_to_github(
+            TOKEN, REPO, BRANCH, {'a.html': 'mine'}, 'publish', rebase=rebase, parent_sha=parent
+        )
+    assert error.value.code == 422
@@ -0,0 +1,73 @@
+"""
+html_text（記事本文のHTMLから表示されるテキストを取り出す）のテスト
+"""
+import pytest
+
+from conftest import LAMBDA_ROOT, load
+
+
+@pytest.fixture
+def html_text():
+    return load('news_detail_page_generator', 'html_text')
+
+
+def test_hidden_elements_are_dropped_and_blocks_separate_words(html_text):
+    content = (
+        '<style>p { color: red }</style><h2>夏祭り</h2><p>日時:&nbsp;8月1日<br>場所:&amp;公園</p>'
+        '<script>alert("x")</script><ul><li>盆踊り</li><li>屋台</li></ul><svg><text>図</text></svg>'
+        '<p>お<b>待</b>ち   しています</p>'
+    )
+
+    # &nbsp; も他の空白と同じく1つの空白にまとめる
+    assert html_text.html_to_text(content) == '夏祭り 日時: 8月1日 場所:&公園 盆踊り 屋台 お待ち しています'
+
+
+def test_empty_and_whitespace_only_content(html_text):
+    assert html_text.html_to_text(None) == ''
+    assert html_text.html_to_text('') == ''
+    assert html_text.html_to_text('<p>  \n </p><div></div>') == ''
+
+
+def test_limit_cuts_text_at_the_exact_length(html_text):
+    content = '<p>' + 'あ' * 100 + '</p><p>' + 'い' * 100 + '</p>'
+
+    text = html_text.html_to_text(content, 150)
+
+    assert text == 'あ' * 100 + ' ' + 'い' * 49
+    assert html_text.html_to_text(content) == 'あ' * 100 + ' ' + 'い' * 100
+
+
+def test_limit_stops_parsing_early(html_text, monkeypatch):
+    fed = []
+
+    class CountingExtractor(html_text.TextExtractor):
+        def feed(self, data):
+            fed.append(len(data))
+            super().feed(data)
+
+    monkeypatch.setattr(html_text, 'TextExtractor', CountingExtractor)
+    content = '<p>' + '本文' * 200 + '</p>' + '<table><tr><td>セル</td></tr></table>' * 50000
+
+    assert html_text.html_to_text(content, 100) == '本文' * 50
+    # 先頭の数百文字だけを解析し、残りの大きな表は読まない
+    assert sum(fed) < 2000
+
+
+def test_tags_and_references_split_across_chunks(html_text, monkeypatch):
+    monkeypatch.setattr(html_text, 'INITIAL_CHUNK_SIZE', 4)
+    content = '<p>防災&amp;防犯</p><script>隠す</script><p>パトロール</p>'
+
+    assert html_text.html_to_text(content, 50) == '防災&防犯 パトロール'
+
+
+def test_summarize_adds_ellipsis_only_when_too_long(html_text):
+    assert html_text.summarize_html('<p>短い本文</p>') == '短い本文'
+    assert html_text.summarize_html('<p>' + 'あ' * 10 + '</p>', 10) == 'あ' * 10
+    assert html_text.summarize_html('<p>' + 'あ' * 11 + '</p>', 10) == 'あ' * 7 + '...'
+    assert len(html_text.summarize_html('<p>' + 'あ' * 500 + '</p>')) == html_text.DESCRIPTION_LENGTH
+
+
+def test_every_lambda_has_the_same_html_text_module():
+    copies = {path.parent.name: path.read_bytes() for path in LAMBDA_ROOT.glob('*/html_text.py')}
+    assert len(copies) == 2
+    assert len(set(copies.values())) == 1, sorted(copies)
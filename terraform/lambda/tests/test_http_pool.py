@@ -0,0 +1,208 @@
+"""
+http_pool（ホストごとの keep-alive 接続の再利用）のテスト
+サーバーが保持中の接続を閉じた場合の再接続と、POST を二重に送らないことを、応答の仕方を決められるローカルのサーバーで確かめる
+"""
+import socket
+import struct
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from conftest import LAMBDA_ROOT, load
+
+# 1つの要求への応じ方
+RESPOND = 'respond'                  # 応答して接続を保持する
+RESPOND_AND_CLOSE = 'respond_close'  # keep-alive の応答を返した後に閉じる（保持中にサーバーが閉じた接続）
+RESPOND_AND_RESET = 'respond_reset'  # 応答を返した後に RST で切る（次の送信が失敗する）
+DROP = 'drop'                        # 要求を読んだ後、応答せずに閉じる（閉じかけていた接続に送った場合）
+
+
+class ScriptedServer:
+    """
+    要求ごとに actions の順で応じるHTTPサーバー（actions が尽きたら RESPOND）
+    受け取った要求は (接続の番号, メソッド, パス) で requests に残す
+    """
+
+    def __init__(self, actions=()):
+        self.actions = list(actions)
+        self.requests = []
+        self.connections = 0
+        self.listener = socket.socket()
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen()
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.listener.getsockname()[1]}'
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self._handle, args=(conn, self.connections), daemon=True).start()
+
+    def _handle(self, conn, number):
+        stream = conn.makefile('rb')
+        while True:
+            request_line = stream.readline()
+            if not request_line:
+                conn.close()
+                return
+            method, path, _ = request_line.decode().split(' ', 2)
+            length = 0
+            for line in iter(stream.readline, b'\r\n'):
+                name, _, value = line.decode().partition(':')
+                if name.lower() == 'content-length':
+                    length = int(value)
+            stream.read(length)
+            self.requests.append((number, method, path))
+
+            action = self.actions.pop(0) if self.actions else RESPOND
+            if action == DROP:
+                conn.close()
+                return
+            body = f'{method} {path} #{number}'.encode()
+            conn.sendall(b'HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n%s' % (len(body), body))
+            if action == RESPOND_AND_CLOSE:
+                conn.close()
+                return
+            if action == RESPOND_AND_RESET:
+                conn.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+                conn.close()
+                return
+
+    def close(self):
+        self.listener.close()
+
+
+@pytest.fixture
+def http_pool():
+    module = load('news_detail_page_generator', 'http_pool')
+    module.close_idle()
+    yield module
+    module.close_idle()
+
+
+@pytest.fixture
+def server():
+    servers = []
+
+    def start(*actions):
+        servers.append(ScriptedServer(actions))
+        return servers[-1]
+
+    yield start
+    for s in servers:
+        s.close()
+
+
+def get(http_pool, url, method='GET', data=None):
+    with http_pool.urlopen(urllib.request.Request(url, data=data, method=method), timeout=5) as response:
+        return response.read().decode()
+
+
+def stats_delta(http_pool, before):
+    after = http_pool.pool_stats()
+    return {name: after[name] - before[name] for name in ('requests', 'connections', 'reused', 'retried')}
+
+
+def wait_until_closed(server_requests, count):
+    # サーバーが接続を閉じ終えるまで待つ（FIN / RST がクライアントに届くまで）
+    deadline = time.monotonic() + 2
+    while len(server_requests) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+
+
+def test_keep_alive_connection_is_reused(http_pool, server):
+    s = server()
+    before = http_pool.pool_stats()
+
+    assert get(http_pool, f'{s.url}/a') == 'GET /a #1'
+    assert get(http_pool, f'{s.url}/b?x=1') == 'GET /b?x=1 #1'
+
+    assert stats_delta(http_pool, before) == {'requests': 2, 'connections': 1, 'reused': 1, 'retried': 0}
+    assert http_pool.pool_stats()['idle'] == 1
+    http_pool.close_idle()
+    assert http_pool.pool_stats()['idle'] == 0
+
+
+def test_connection_closed_while_idle_is_discarded_before_use(http_pool, server):
+    s = server(RESPOND_AND_CLOSE)
+    get(http_pool, f'{s.url}/a')
+    wait_until_closed(s.requests, 1)
+    before = http_pool.pool_stats()
+
+    # 閉じられた接続は使う前に捨てるため、送り直しにはならない
+    assert get(http_pool, f'{s.url}/b', method='POST', data=b'{}') == 'POST /b #2'
+
+    assert stats_delta(http_pool, before) == {'requests': 1, 'connections': 1, 'reused': 0, 'retried': 0}
+
+
+def test_idle_connection_past_timeout_is_not_reused(http_pool, server, monkeypatch):
+    s = server()
+    get(http_pool, f'{s.url}/a')
+    monkeypatch.setattr(http_pool, 'IDLE_TIMEOUT_SECONDS', 0)
+
+    assert get(http_pool, f'{s.url}/b') == 'GET /b #2'
+
+
+def test_get_on_stale_connection_is_resent_on_new_connection(http_pool, server, monkeypatch):
+    s = server(RESPOND, DROP)
+    get(http_pool, f'{s.url}/a')
+    before = http_pool.pool_stats()
+
+    assert get(http_pool, f'{s.url}/b') == 'GET /b #2'
+
+    assert stats_delta(http_pool, before) == {'requests': 1, 'connections': 1, 'reused': 1, 'retried': 1}
+    assert s.requests == [(1, 'GET', '/a'), (1, 'GET', '/b'), (2, 'GET', '/b')]
+
+
+def test_post_sent_on_stale_connection_is_not_resent(http_pool, server):
+    s = server(RESPOND, DROP)
+    get(http_pool, f'{s.url}/a')
+    before = http_pool.pool_stats()
+
+    # サーバーが受け取った後に切れた可能性があるため、二重に投稿しない
+    with pytest.raises(urllib.error.URLError):
+        get(http_pool, f'{s.url}/post', method='POST', data=b'{"n": 1}')
+
+    assert stats_delta(http_pool, before)['retried'] == 0
+    assert [r for r in s.requests if r[1] == 'POST'] == [(1, 'POST', '/post')]
+
+
+def test_post_that_fails_before_sending_is_resent(http_pool, server, monkeypatch):
+    s = server(RESPOND_AND_RESET)
+    get(http_pool, f'{s.url}/a')
+    wait_until_closed(s.requests, 1)
+    # 保持中の切断を検出できなかった場合（RST が届くのと使い始めるのが同時だった場合）
+    monkeypatch.setattr(http_pool, '_dropped', lambda conn: False)
+    before = http_pool.pool_stats()
+
+    assert get(http_pool, f'{s.url}/post', method='POST', data=b'{}') == 'POST /post #2'
+
+    assert stats_delta(http_pool, before)['retried'] == 1
+    assert [r for r in s.requests if r[1] == 'POST'] == [(2, 'POST', '/post')]
+
+
+def test_new_connection_failure_is_url_error(http_pool):
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    port = listener.getsockname()[1]
+    listener.close()
+
+    with pytest.raises(urllib.error.URLError):
+        get(http_pool, f'http://127.0.0.1:{port}/')
+
+
+def test_every_lambda_has_the_same_http_pool_module():
+    copies = {path.parent.name: path.read_bytes() for path in LAMBDA_ROOT.glob('*/http_pool.py')}
+    assert len(copies) == 7
+    assert len(set(copies.values())) == 1, sorted(copies)
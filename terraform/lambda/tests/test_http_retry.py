@@ -0,0 +1,270 @@
+"""
+http_retry（一時的なエラーとレート制限の再試行）のテスト
+応答を順に決められるローカルのサーバーに対して呼び出し、待ち時間は実際には待たずに記録する
+"""
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import LAMBDA_ROOT, load
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        self.server.requests.append((self.command, self.path))
+        status, headers, body = self.server.responses.pop(0) if self.server.responses else (200, {}, b'ok')
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PATCH = _respond
+
+
+class ScriptedServer(ThreadingHTTPServer):
+    """
+    responses の順に (ステータス, ヘッダー, 本文) を返すサーバー（尽きたら 200）
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.responses = []
+        self.requests = []
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def url(self, path='/'):
+        return f'http://127.0.0.1:{self.server_address[1]}{path}'
+
+
+@pytest.fixture(scope='module')
+def server():
+    s = ScriptedServer()
+    yield s
+    s.shutdown()
+
+
+@pytest.fixture
+def http_retry(server, monkeypatch):
+    module = load('news_detail_page_generator', 'http_retry')
+    server.responses.clear()
+    server.requests.clear()
+    module.set_deadline(None)
+    # 待ち時間は記録するだけにし、バックオフのジッターはなくす
+    module.slept = []
+    monkeypatch.setattr(module, 'time', SimpleNamespace(
+        sleep=module.slept.append, monotonic=time.monotonic, time=time.time
+    ))
+    monkeypatch.setattr(module, 'backoff_seconds', lambda attempt: 0.25)
+    yield module
+    module.set_deadline(None)
+
+
+def http_date(seconds):
+    return format_datetime(datetime.now(timezone.utc) + timedelta(seconds=seconds), usegmt=True)
+
+
+def call(http_retry, server, method='GET', idempotent=None, timeout=30):
+    req = urllib.request.Request(server.url('/api'), data=b'{}' if method != 'GET' else None, method=method)
+    with http_retry.urlopen(req, timeout=timeout, idempotent=idempotent) as response:
+        return response.read()
+
+
+def test_server_delay_reads_retry_after_seconds_and_http_date(http_retry):
+    assert http_retry.server_delay({'Retry-After': '7'}) == 7
+    assert 28 <= http_retry.server_delay({'Retry-After': http_date(30)}) <= 30
+    assert http_retry.server_delay({'Retry-After': http_date(-30)}) == 0
+    assert http_retry.server_delay({'Retry-After': 'soon'}) is None
+    reset = str(int(time.time()) + 20)
+    assert 18 <= http_retry.server_delay({'X-RateLimit-Reset': reset, 'X-RateLimit-Remaining': '0'}) <= 20
+    # 残り回数がある場合の X-RateLimit-Reset は待つ理由にならない
+    assert http_retry.server_delay({'X-RateLimit-Reset': reset, 'X-RateLimit-Remaining': '12'}) is None
+    assert http_retry.server_delay(None) is None
+
+
+@pytest.mark.parametrize('retry_after, expected', [('3', 3), ('http-date', 5)], ids=['seconds', 'http-date'])
+def test_retry_after_is_waited_before_retrying(http_retry, server, retry_after, expected):
+    if retry_after == 'http-date':
+        retry_after = http_date(5)
+    server.responses[:] = [(503, {'Retry-After': retry_after}, b'busy'), (200, {}, b'done')]
+
+    assert call(http_retry, server) == b'done'
+
+    assert len(server.requests) == 2
+    assert len(http_retry.slept) == 1 and expected - 2 <= http_retry.slept[0] <= expected
+    assert http_retry.retry_stats() == {'retried': 1, 'gave_up': 0}
+
+
+def test_backoff_is_used_without_retry_after(http_retry, server):
+    server.responses[:] = [(502, {}, b''), (500, {}, b''), (200, {}, b'done')]
+
+    assert call(http_retry, server) == b'done'
+
+    assert http_retry.slept == [0.25, 0.25]
+
+
+@pytest.mark.parametrize('headers, body', [
+    ({'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(int(time.time()) + 1)}, b'{}'),
+    ({}, b'{"message": "You have exceeded a secondary rate limit."}'),
+    ({'Retry-After': '1'}, b'{}'),
+], ids=['remaining-zero', 'secondary-limit-body', 'retry-after'])
+def test_rate_limit_403_is_retried(http_retry, server, headers, body):
+    server.responses[:] = [(403, headers, body), (200, {}, b'done')]
+
+    assert call(http_retry, server) == b'done'
+
+    assert len(server.requests) == 2
+
+
+def test_permission_403_is_not_retried_and_body_stays_readable(http_retry, server):
+    body = json.dumps({'message': 'Resource not accessible by integration'}).encode()
+    server.responses[:] = [(403, {'X-RateLimit-Remaining': '4999'}, body)]
+
+    with pytest.raises(urllib.error.HTTPError) as raised:
+        call(http_retry, server)
+
+    assert raised.value.code == 403
+    assert raised.value.read() == body
+    assert len(server.requests) == 1 and http_retry.slept == []
+
+
+def test_non_idempotent_request_is_retried_only_when_marked(http_retry, server):
+    server.responses[:] = [(503, {}, b'')]
+    with pytest.raises(urllib.error.HTTPError):
+        call(http_retry, server, method='POST')
+    assert len(server.requests) == 1
+
+    server.responses[:] = [(503, {}, b''), (201, {}, b'created')]
+    assert call(http_retry, server, method='POST', idempotent=True) == b'created'
+    assert len(server.requests) == 3
+
+
+def test_client_errors_are_not_retried(http_retry, server):
+    server.responses[:] = [(422, {}, b'invalid')]
+
+    with pytest.raises(urllib.error.HTTPError) as raised:
+        call(http_retry, server)
+
+    assert raised.value.code == 422
+    assert len(server.requests) == 1
+
+
+def test_gives_up_after_max_attempts(http_retry, server):
+    server.responses[:] = [(503, {}, b'')] * (http_retry.RETRY_MAX_ATTEMPTS + 1)
+
+    with pytest.raises(urllib.error.HTTPError):
+        call(http_retry, server)
+
+    assert len(server.requests) == http_retry.RETRY_MAX_ATTEMPTS
+    assert len(http_retry.slept) == http_retry.RETRY_MAX_ATTEMPTS - 1
+
+
+def test_retry_after_longer_than_limit_fails_without_waiting(http_retry, server):
+    server.responses[:] = [(429, {'Retry-After': str(http_retry.RETRY_AFTER_MAX_SECONDS + 1)}, b'')]
+
+    with pytest.raises(urllib.error.HTTPError) as raised:
+        call(http_retry, server)
+
+    assert raised.value.code == 429
+    assert http_retry.slept == []
+    assert http_retry.retry_stats() == {'retried': 0, 'gave_up': 1}
+
+
+def lambda_context(remaining_seconds):
+    return SimpleNamespace(get_remaining_time_in_millis=lambda: int(remaining_seconds * 1000))
+
+
+def test_wait_past_deadline_fails_without_waiting(http_retry, server):
+    # 残り 5 秒のうち DEADLINE_MARGIN_SECONDS を除いた 2 秒が期限
+    http_retry.set_deadline(lambda_context(http_retry.DEADLINE_MARGIN_SECONDS + 2))
+    server.responses[:] = [(503, {'Retry-After': '10'}, b'')]
+
+    with pytest.raises(urllib.error.HTTPError):
+        call(http_retry, server)
+
+    assert http_retry.slept == []
+    assert http_retry.retry_stats()['gave_up'] == 1
+    assert not http_retry.sleep_before_retry(10)
+    assert http_retry.within_deadline(1)
+
+
+def test_timeout_is_clipped_to_deadline(http_retry, server, monkeypatch):
+    http_pool = load('news_detail_page_generator', 'http_pool')
+    timeouts = []
+    urlopen = http_pool.urlopen
+    monkeypatch.setattr(http_pool, 'urlopen', lambda req, timeout: timeouts.append(timeout) or urlopen(req, timeout=timeout))
+
+    http_retry.set_deadline(lambda_context(http_retry.DEADLINE_MARGIN_SECONDS + 5))
+    call(http_retry, server, timeout=30)
+    # 期限が近くても 1 秒は待つ
+    http_retry.set_deadline(lambda_context(http_retry.DEADLINE_MARGIN_SECONDS + 0.2))
+    call(http_retry, server, timeout=30)
+    http_retry.set_deadline(None)
+    call(http_retry, server, timeout=30)
+
+    assert 4 <= timeouts[0] <= 5
+    assert timeouts[1] == 1.0
+    assert timeouts[2] == 30
+
+
+def test_deadline_already_passed_does_not_send(http_retry, server):
+    http_retry.set_deadline(lambda_context(http_retry.DEADLINE_MARGIN_SECONDS - 1))
+
+    with pytest.raises(urllib.error.URLError):
+        call(http_retry, server)
+
+    assert server.requests == []
+
+
+def test_connection_errors_are_retried_for_idempotent_requests(http_retry, monkeypatch):
+    http_pool = load('news_detail_page_generator', 'http_pool')
+    attempts = []
+
+    def refuse(req, timeout):
+        attempts.append(req.get_method())
+        raise urllib.error.URLError(ConnectionRefusedError('refused'))
+
+    monkeypatch.setattr(http_pool, 'urlopen', refuse)
+    req = urllib.request.Request('http://127.0.0.1:9/api')
+
+    with pytest.raises(urllib.error.URLError):
+        http_retry.urlopen(req)
+    assert len(attempts) == http_retry.RETRY_MAX_ATTEMPTS
+
+    attempts.clear()
+    with pytest.raises(urllib.error.URLError):
+        http_retry.urlopen(urllib.request.Request('http://127.0.0.1:9/api', data=b'{}', method='POST'))
+    assert attempts == ['POST']
+
+
+def test_request_phase_names(http_retry):
+    def phase(url, method='GET'):
+        return http_retry.request_phase(urllib.request.Request(url, method=method))
+
+    assert phase('https://x.supabase.co/rest/v1/articles') == 'supabase_fetch'
+    assert phase('https://x.supabase.co/rest/v1/rpc/record_media_probes', 'POST') == 'supabase_write'
+    assert phase('https://api.github.com/repos/o/r/contents/a') == 'github_get'
+    assert phase('https://api.github.com/repos/o/r/git/trees', 'POST') == 'github_write'
+
+
+def test_every_lambda_has_the_same_http_retry_module():
+    copies = {path.parent.name: path.read_bytes() for path in LAMBDA_ROOT.glob('*/http_retry.py')}
+    assert len(copies) == 2
+    assert len(set(copies.values())) == 1, sorted(copies)
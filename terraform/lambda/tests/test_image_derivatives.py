@@ -0,0 +1,141 @@
+"""
+image_derivatives の DerivedImages.ensure のテスト（パブリッシャーは local: のバケット代わりのディレクトリ）
+"""
+import io
+import json
+import urllib.error
+
+import pytest
+from PIL import Image
+
+from conftest import load
+
+LAMBDAS = ['news_page_generator', 'news_detail_page_generator']
+
+
+@pytest.fixture(params=LAMBDAS)
+def image_derivatives(request):
+    return load(request.param, 'image_derivatives')
+
+
+@pytest.fixture
+def publisher():
+    return load('news_detail_page_generator', 'publisher')
+
+
+@pytest.fixture
+def bucket(publisher, tmp_path):
+    return publisher.create_publisher(f'local:{tmp_path / "bucket"}', None)
+
+
+def write_image(path, size, mode='RGB', format_name='JPEG', color=(200, 120, 40), exif=None):
+    image = Image.new(mode, size, color)
+    if exif is not None:
+        image.save(path, format_name, exif=exif)
+    else:
+        image.save(path, format_name)
+    return path.as_uri()
+
+
+def stored(bucket, path):
+    with open(f'{bucket.root_dir}/{path}', 'rb') as f:
+        return Image.open(io.BytesIO(f.read()))
+
+
+def test_ensure_writes_renditions_and_records_them(image_derivatives, publisher, bucket, tmp_path):
+    url = write_image(tmp_path / 'festival.jpg', (1600, 900))
+    images = image_derivatives.DerivedImages(None)
+
+    summary = images.ensure([url, None, url], bucket, limit=5)
+
+    assert summary == {'created': 1, 'reused': 0, 'skipped': 0, 'failed': 0, 'pending': 0}
+    entry = images.get(url)
+    assert entry['width'] == 1600 and entry['height'] == 900
+    assert entry['widths'] == [240, 480, 960, 1440]
+    for width in entry['widths']:
+        for extension, (format_name, _) in image_derivatives.RENDITION_FORMATS.items():
+            path = image_derivatives.rendition_path(entry['hash'], width, extension)
+            rendition = stored(bucket, path)
+            assert rendition.format == format_name
+            assert rendition.size == (width, round(width * 900 / 1600))
+            assert bucket.metadata[path]['CacheControl'] == publisher.ASSET_CACHE_CONTROL
+    assert images.changed
+    assert url in json.loads(images.serialize())['sources']
+    assert '<picture>' in image_derivatives.responsive_image_html(url, images, '', '100vw')
+
+
+def test_ensure_reuses_same_content_and_existing_files(image_derivatives, bucket, tmp_path):
+    first = write_image(tmp_path / 'a.jpg', (500, 400))
+    copy = tmp_path / 'b.jpg'
+    copy.write_bytes((tmp_path / 'a.jpg').read_bytes())
+
+    images = image_derivatives.DerivedImages(None)
+    assert images.ensure([first, copy.as_uri()], bucket, limit=5)['reused'] == 1
+    assert images.get(copy.as_uri()) == images.get(first)
+    assert images.get(first)['widths'] == [240, 480, 500]
+
+    # マニフェストのコミット前に失敗した場合も、バケットにある派生ファイルは作り直さない
+    retried = image_derivatives.DerivedImages(None)
+    assert retried.ensure([first], bucket, limit=5) == {
+        'created': 0, 'reused': 1, 'skipped': 0, 'failed': 0, 'pending': 0
+    }
+    # マニフェストにある画像は何もしない
+    assert image_derivatives.DerivedImages(images.serialize()).ensure([first], bucket, limit=5)['reused'] == 0
+
+
+def test_ensure_flattens_transparency_and_applies_orientation(image_derivatives, bucket, tmp_path):
+    transparent = write_image(tmp_path / 'logo.png', (300, 200), 'RGBA', 'PNG', (0, 0, 0, 0))
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    rotated = write_image(tmp_path / 'portrait.jpg', (400, 300), exif=exif.tobytes())
+    images = image_derivatives.DerivedImages(None)
+
+    assert images.ensure([transparent, rotated], bucket, limit=5)['created'] == 2
+
+    logo = images.get(transparent)
+    flattened = stored(bucket, image_derivatives.rendition_path(logo['hash'], 300, 'jpg')).convert('RGB')
+    assert flattened.getpixel((10, 10)) == (255, 255, 255)
+    portrait = images.get(rotated)
+    assert (portrait['width'], portrait['height']) == (300, 400)
+    assert stored(bucket, image_derivatives.rendition_path(portrait['hash'], 300, 'webp')).size == (300, 400)
+
+
+def test_ensure_skips_unsupported_and_missing_sources_and_honours_limit(image_derivatives, bucket, tmp_path):
+    gif = write_image(tmp_path / 'anim.gif', (100, 100), 'P', 'GIF', 1)
+    missing = (tmp_path / 'missing.jpg').as_uri()
+    photos = [write_image(tmp_path / f'{n}.jpg', (300, 200), color=(n, n, n)) for n in range(3)]
+    images = image_derivatives.DerivedImages(None)
+
+    summary = images.ensure([gif, missing] + photos, bucket, limit=3)
+
+    assert summary == {'created': 1, 'reused': 0, 'skipped': 1, 'failed': 1, 'pending': 2}
+    assert 'skipped' in images.sources[gif]
+    # 取得できなかった画像と上限を超えた画像は次回に作る
+    assert images.has_pending([missing]) and images.has_pending(photos[1:])
+
+
+def test_ensure_without_publisher_leaves_everything_pending(image_derivatives, tmp_path):
+    url = write_image(tmp_path / 'a.jpg', (300, 200))
+    images = image_derivatives.DerivedImages(None)
+
+    assert images.ensure([url], None, limit=5)['pending'] == 1
+    assert not images.changed
+
+
+@pytest.mark.parametrize('code, skipped', [(403, False), (503, False), (404, True), (410, True)])
+def test_ensure_skips_only_missing_sources(image_derivatives, bucket, code, skipped):
+    url = 'https://cdn.example.com/photo.jpg'
+
+    def fetch(source):
+        raise urllib.error.HTTPError(source, code, 'error', {}, None)
+
+    images = image_derivatives.DerivedImages(None)
+    summary = images.ensure([url], bucket, limit=5, fetch=fetch)
+
+    if skipped:
+        assert summary['skipped'] == 1
+        assert images.sources[url] == {'skipped': f'HTTP {code}'}
+    else:
+        # 一時的なエラー（403 を含む）は記録せず、次回作り直す
+        assert summary['failed'] == 1
+        assert images.has_pending([url])
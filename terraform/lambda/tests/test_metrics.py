@@ -0,0 +1,156 @@
+"""
+metrics（Embedded Metric Format の出力）のテスト
+"""
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import LAMBDA_ROOT, load
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    module = load('news_page_generator', 'metrics')
+    monkeypatch.setattr(module, 'METRICS_ENABLED', True)
+    monkeypatch.setattr(module, '_cold_start', True)
+    module.reset()
+    yield module
+    module.reset()
+
+
+class Response:
+    def __init__(self, body):
+        self.body = body
+
+    def read(self):
+        return self.body
+
+
+def emitted(capsys):
+    """
+    標準出力に書かれた EMF の行
+    """
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines() if line.startswith('{')]
+
+
+def test_phases_are_summed_in_snapshot(metrics):
+    with metrics.phase('github_get', 10) as phase:
+        assert phase.read(Response(b'abcd')) == b'abcd'
+    with metrics.phase('github_get') as phase:
+        pass
+    phase.add_bytes(6)
+
+    @metrics.timed('render')
+    def render(value):
+        return value * 2
+
+    assert render(21) == 42
+    values = metrics.snapshot()
+    assert values['github_get']['count'] == 2
+    assert values['github_get']['bytes'] == 20
+    assert values['github_get']['duration_ms'] >= 0
+    assert values['render']['count'] == 1
+    assert values['render']['bytes'] == 0
+
+
+def test_flush_writes_one_emf_line_and_resets(metrics, capsys):
+    with metrics.phase('supabase_fetch', 100):
+        pass
+    with metrics.phase('render'):
+        pass
+    metrics.set_property('ArticleId', 'a1')
+
+    document = metrics.flush('news_page_generator', cold_start=True)
+
+    assert emitted(capsys) == [document]
+    assert document['Service'] == 'news_page_generator'
+    assert document['StartType'] == 'cold' and document['ColdStart'] == 1
+    assert document['ArticleId'] == 'a1'
+    assert document['supabase_fetch.count'] == 1
+    assert document['supabase_fetch.bytes'] == 100
+    assert 'render.bytes' not in document
+    directive = document['_aws']['CloudWatchMetrics'][0]
+    assert directive['Namespace'] == metrics.METRICS_NAMESPACE
+    assert directive['Dimensions'] == [['Service'], ['Service', 'StartType']]
+    # 出力する値はすべてメトリクスとして宣言され、単位を持つ
+    units = {m['Name']: m['Unit'] for m in directive['Metrics']}
+    assert units == {
+        'ColdStart': 'Count',
+        'render.count': 'Count', 'render.duration_ms': 'Milliseconds',
+        'supabase_fetch.count': 'Count', 'supabase_fetch.duration_ms': 'Milliseconds', 'supabase_fetch.bytes': 'Bytes',
+    }
+    assert all(name in document for name in units)
+    assert isinstance(document['_aws']['Timestamp'], int)
+
+    assert metrics.snapshot() == {}
+    assert 'ArticleId' not in metrics.flush('news_page_generator', cold_start=False)
+
+
+def test_flush_drops_phases_beyond_metric_limit(metrics, capsys, monkeypatch):
+    monkeypatch.setattr(metrics, 'MAX_METRICS', 7)
+    for name in ('a', 'b', 'c'):
+        with metrics.phase(name):
+            pass
+
+    document = metrics.flush('svc', cold_start=False)
+
+    # 段階ごとに3つ（count / duration_ms / bytes）分の空きを見込むため、ColdStart と2段階の後の3つ目は上限の7を超える
+    assert len(document['_aws']['CloudWatchMetrics'][0]['Metrics']) == 5
+    assert 'c.count' not in document
+    assert 'c' in capsys.readouterr().out
+
+
+def test_handler_flushes_each_invocation_with_cold_then_warm_start(metrics, capsys):
+    @metrics.handler('svc')
+    def lambda_handler(event, context):
+        with metrics.phase('work'):
+            pass
+        return {'statusCode': 200}
+
+    context = SimpleNamespace(aws_request_id='req-1')
+    assert lambda_handler({}, context) == {'statusCode': 200}
+    assert lambda_handler({}, None) == {'statusCode': 200}
+
+    first, second = emitted(capsys)
+    assert (first['StartType'], second['StartType']) == ('cold', 'warm')
+    assert first['RequestId'] == 'req-1' and 'RequestId' not in second
+    assert first['StatusCode'] == 200
+    assert first['invocation.count'] == 1 and first['work.count'] == 1
+    # 前回の実行の値は持ち越さない
+    assert second['work.count'] == 1
+
+
+def test_handler_flushes_when_handler_raises(metrics, capsys):
+    @metrics.handler('svc')
+    def lambda_handler(event, context):
+        raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError):
+        lambda_handler({}, None)
+
+    (document,) = emitted(capsys)
+    assert document['StatusCode'] == 'exception'
+    assert document['invocation.count'] == 1
+
+
+def test_disabled_metrics_record_and_print_nothing(metrics, capsys, monkeypatch):
+    monkeypatch.setattr(metrics, 'METRICS_ENABLED', False)
+
+    @metrics.handler('svc')
+    def lambda_handler(event, context):
+        with metrics.phase('work') as phase:
+            assert phase.read(Response(b'xy')) == b'xy'
+        metrics.set_property('Key', 'value')
+        return {'statusCode': 200}
+
+    assert lambda_handler({}, None) == {'statusCode': 200}
+    assert metrics.snapshot() == {}
+    assert metrics.flush('svc', cold_start=False) is None
+    assert capsys.readouterr().out == ''
+
+
+def test_every_lambda_has_the_same_metrics_module():
+    copies = {path.parent.name: path.read_bytes() for path in LAMBDA_ROOT.glob('*/metrics.py')}
+    assert len(copies) == 7
+    assert len(set(copies.values())) == 1, sorted(copies)
@@ -0,0 +1,96 @@
+"""
+refresh_queue と、news_detail_page_generator のメモリ上のキュー（NEWS_REFRESH_QUEUE_URL=local）のテスト
+"""
+import json
+
+import pytest
+
+from conftest import article_row, load
+
+
+@pytest.fixture
+def refresh_queue():
+    return load('news_detail_page_generator', 'refresh_queue')
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_local_queue_coalesces_requests_until_quiet(refresh_queue):
+    clock = Clock()
+    queue = refresh_queue.LocalRefreshQueue(quiet_seconds=30, clock=clock)
+    handled = []
+
+    assert queue.mark_dirty('news.html', 'publish a') == {'queued': True, 'pending': 1}
+    clock.now += 20
+    assert queue.mark_dirty('news.html', 'publish b') == {'queued': True, 'pending': 2}
+    clock.now += 20
+    # 最後のリクエストから 30 秒たっていない
+    assert queue.run_due(lambda target, reasons: handled.append((target, reasons))) == 0
+    assert queue.pending() == ['news.html']
+
+    clock.now += 10
+    assert queue.run_due(lambda target, reasons: handled.append((target, reasons))) == 1
+    assert handled == [('news.html', ['publish a', 'publish b'])]
+    assert queue.pending() == []
+
+
+def test_local_queue_force_runs_everything(refresh_queue):
+    queue = refresh_queue.LocalRefreshQueue(quiet_seconds=30, clock=Clock())
+    queue.mark_dirty('news.html', 'publish')
+    handled = []
+
+    assert queue.run_due(lambda target, reasons: handled.append(target), force=True) == 1
+    assert handled == ['news.html']
+
+
+def test_create_refresh_queue(refresh_queue):
+    assert refresh_queue.create_refresh_queue(None, 30) is None
+    local = refresh_queue.create_refresh_queue('local', 15)
+    assert isinstance(local, refresh_queue.LocalRefreshQueue)
+    assert local.quiet_seconds == 15
+    sqs = refresh_queue.create_refresh_queue('https://sqs.example/queue', 3600)
+    assert isinstance(sqs, refresh_queue.SqsRefreshQueue)
+    assert sqs.delay_seconds == 900
+
+
+def publish(detail, article_id):
+    response = detail.lambda_handler({'article_id': article_id}, None)
+    assert response['statusCode'] == 200, response['body']
+    return json.loads(response['body'])
+
+
+def test_local_mode_refreshes_news_page_once_quiet(detail, github, supabase, refresh_queue, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(detail, '_NEWS_REFRESH_QUEUE', refresh_queue.LocalRefreshQueue(quiet_seconds=30, clock=clock))
+    supabase.supabase.tables['articles'].extend([article_row(1), article_row(2, title='夏祭りのお知らせ')])
+
+    body = publish(detail, article_row(1)['id'])
+    assert body['news_page_refresh'] == 'queued'
+    assert 'news.html' not in github.repository.files()
+
+    # 静かな時間が過ぎた後の次の実行で、キューに残っていた更新を行う
+    clock.now += 31
+    body = publish(detail, article_row(2)['id'])
+    news = github.repository.files()['news.html']
+    assert '夏祭りのお知らせ' in news
+    # この実行の要求は次の実行まで残る
+    assert body['news_page_refresh'] == 'queued'
+    assert detail._NEWS_REFRESH_QUEUE.pending() == ['news.html']
+
+
+def test_local_mode_without_delay_refreshes_immediately(detail, github, supabase, refresh_queue, monkeypatch):
+    monkeypatch.setattr(detail, '_NEWS_REFRESH_QUEUE', refresh_queue.LocalRefreshQueue(quiet_seconds=0))
+    supabase.supabase.tables['articles'].append(article_row(1, title='夏祭りのお知らせ'))
+
+    body = publish(detail, article_row(1)['id'])
+
+    assert body['news_page_refresh'] == 'local'
+    assert body['news_page_updated'] is True
+    assert '夏祭りのお知らせ' in github.repository.files()['news.html']
+    assert detail._NEWS_REFRESH_QUEUE.pending() == []
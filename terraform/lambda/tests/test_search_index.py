@@ -0,0 +1,98 @@
+"""
+検索インデックス（search_index）の tail.json への追記とシャードへの取り込みのテスト
+"""
+import json
+
+import pytest
+
+from conftest import article_row, load, search
+
+SHARDS = 64
+
+
+@pytest.fixture
+def search_index():
+    return load('news_detail_page_generator', 'search_index')
+
+
+def document(search_index, doc, n, **overrides):
+    article = load('news_detail_page_generator', 'article_model').Article(article_row(n, **overrides))
+    return search_index.SearchDocument(doc, article, SHARDS)
+
+
+def update(search_index, files, updates, tail_max_docs=32):
+    changed = search_index.update_index(
+        updates, lambda paths: {path: files.get(path) for path in paths}, SHARDS, tail_max_docs
+    )
+    files.update(changed)
+    return changed
+
+
+def test_publish_touches_only_tail_and_docs_chunk(search_index):
+    files = search_index.build_index([document(search_index, doc, doc + 1) for doc in range(3)], SHARDS)
+
+    changed = update(search_index, files, [(None, document(search_index, 3, 4, title='夏祭りのお知らせ'))])
+
+    assert set(changed) == {search_index.SEARCH_TAIL_PATH, search_index.docs_chunk_path(0)}
+    assert search(files, '夏祭り') == {'夏祭りのお知らせ'}
+    assert search(files, '防災訓練') == {f'防災訓練のお知らせ {n}' for n in range(1, 4)}
+
+
+def test_update_and_delete_hide_stale_shard_postings(search_index):
+    documents = [document(search_index, doc, doc + 1) for doc in range(3)]
+    files = search_index.build_index(documents, SHARDS)
+
+    updated = document(search_index, 0, 1, title='夏祭りのお知らせ', content='<p>盆踊り</p>')
+    changed = update(search_index, files, [(documents[0].manifest_entry(), updated)])
+    changed.update(update(search_index, files, [(documents[1].manifest_entry(), None)]))
+
+    assert not any('/shards/' in path for path in changed)
+    assert search(files, '夏祭り') == {'夏祭りのお知らせ'}
+    assert search(files, '防災訓練') == {'防災訓練のお知らせ 3'}
+    _, removed = search_index.decode_tail(files[search_index.SEARCH_TAIL_PATH])
+    assert removed == {0, 1}
+
+
+def test_unchanged_document_does_not_touch_tail(search_index):
+    documents = [document(search_index, 0, 1)]
+    files = search_index.build_index(documents, SHARDS)
+
+    assert update(search_index, files, [(documents[0].manifest_entry(), document(search_index, 0, 1))]) == {}
+
+
+def test_tail_is_merged_into_shards_when_full(search_index):
+    documents = [document(search_index, doc, doc + 1) for doc in range(3)]
+    files = search_index.build_index(documents, SHARDS)
+
+    update(search_index, files, [(None, document(search_index, 3, 4, title='夏祭りのお知らせ'))], tail_max_docs=2)
+    update(search_index, files, [(documents[0].manifest_entry(), None)], tail_max_docs=2)
+    changed = update(search_index, files, [(None, document(search_index, 4, 5, title='防犯パトロール参加者募集'))],
+                     tail_max_docs=2)
+
+    assert json.loads(files[search_index.SEARCH_TAIL_PATH]) == {'version': 1, 'postings': {}, 'removed': []}
+    assert any('/shards/' in path for path in changed)
+    # 取り込んだ後のシャードは、同じ文書から作り直したインデックスと同じ
+    expected = search_index.build_index(
+        documents[1:] + [document(search_index, 3, 4, title='夏祭りのお知らせ'),
+                         document(search_index, 4, 5, title='防犯パトロール参加者募集')],
+        SHARDS
+    )
+    for shard in range(SHARDS):
+        path = search_index.shard_path(shard)
+        assert search_index.decode_shard(files[path]) == search_index.decode_shard(expected[path])
+    assert search(files, '防災訓練') == {'防災訓練のお知らせ 2', '防災訓練のお知らせ 3'}
+    assert search(files, '夏祭り') == {'夏祭りのお知らせ'}
+
+
+def test_publish_reads_search_index_from_tree_and_blobs(detail, github, supabase):
+    supabase.supabase.tables['articles'].extend([article_row(1), article_row(2, title='夏祭りのお知らせ')])
+    for n in (1, 2):
+        response = detail.lambda_handler({'article_id': article_row(n)['id']}, None)
+        assert response['statusCode'] == 200, response['body']
+
+    files = github.repository.files()
+    assert search(files, '夏祭り') == {'夏祭りのお知らせ'}
+    assert github.repository.count('GET', 'contents/news/search') == 0
+    # 検索インデックスはブランチ名ではなく、取得済みの先頭（parent_sha）のツリーから読む
+    assert github.repository.count('GET', ':news/search') >= 2
+    assert github.repository.count('GET', 'main:news/search') == 0
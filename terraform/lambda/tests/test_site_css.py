@@ -0,0 +1,117 @@
+"""
+site_css（使われたクラスだけのスタイルシートと、ハッシュ付きのファイル名への差し替え）のテスト
+"""
+import json
+
+import pytest
+
+from conftest import LAMBDA_ROOT, load
+
+
+@pytest.fixture
+def site_css():
+    return load('news_page_generator', 'site_css')
+
+
+def page(classes, script=''):
+    return f'<html><head><link rel="stylesheet" href="__SITE_STYLESHEET__"></head><body class="{classes}">{script}</body></html>'
+
+
+def test_utility_rules_with_variants_and_escaping(site_css):
+    assert site_css.utility_rule('hidden')[2] == '.hidden { display: none }'
+    key, media, rule = site_css.utility_rule('md:w-1/2')
+    assert media == '@media (min-width: 768px)'
+    assert rule.startswith('.md\\:w-1\\/2 {')
+    assert site_css.utility_rule('-mt-2')[2] == '.-mt-2 { margin-top: -0.5rem }'
+    # ページ独自のクラス・表にない値・知らないバリアントは出力しない
+    assert site_css.utility_rule('news-card') is None
+    assert site_css.utility_rule('w-13') is None
+    assert site_css.utility_rule('foo:flex') is None
+    # 画面幅のバリアントは後ろ（上書きする側）に並ぶ
+    assert site_css.utility_rule('flex')[0] < key
+
+
+def test_used_classes_include_script_toggled_classes(site_css):
+    html = page('flex  md:hidden', '<script>menu.classList.toggle("hidden"); el.classList.add(\'open\')</script>')
+
+    assert site_css.used_classes(html) == {'flex', 'md:hidden', 'hidden', 'open'}
+
+
+def test_stylesheet_contains_only_used_utilities_and_is_minified(site_css):
+    css = site_css.build_stylesheet(['flex', 'md:hidden', 'w-13'])
+
+    assert '.flex{display:flex}' in css
+    assert '@media (min-width:768px){.md\\:hidden{display:none}}' in css
+    assert 'w-13' not in css
+    assert '/*' not in css
+    assert site_css.build_stylesheet(['md:hidden', 'flex']) == css
+
+
+def test_stylesheet_path_is_the_content_hash(site_css):
+    path = site_css.stylesheet_path('body{}')
+
+    assert path.startswith('css/site.') and path.endswith('.css')
+    assert path == site_css.stylesheet_path('body{}')
+    assert path != site_css.stylesheet_path('body{margin:0}')
+
+
+def test_manifest_swaps_the_stylesheet_only_when_classes_are_added(site_css):
+    first = site_css.SiteStylesheet(None)
+    first.add(page('flex p-4'))
+    files = first.files()
+    assert set(files) == {first.path, site_css.CSS_MANIFEST_PATH}
+    assert '.p-4{' in files[first.path]
+
+    # 同じクラスだけのページでは何もコミットせず、同じスタイルシートにリンクする
+    same = site_css.SiteStylesheet(files[site_css.CSS_MANIFEST_PATH])
+    same.add(page('p-4 flex news-card'))
+    assert same.files() == {}
+    assert same.path == first.path
+
+    # 新しいクラスが使われたら別の名前のスタイルシートを作る。以前のクラスも残す
+    grown = site_css.SiteStylesheet(files[site_css.CSS_MANIFEST_PATH])
+    grown.add(page('flex text-center'))
+    new_files = grown.files()
+    assert grown.path != first.path
+    assert '.p-4{' in new_files[grown.path] and '.text-center{' in new_files[grown.path]
+    assert json.loads(new_files[site_css.CSS_MANIFEST_PATH])['classes'] == ['flex', 'p-4', 'text-center']
+
+
+@pytest.mark.parametrize('manifest', [
+    'not json',
+    json.dumps({'version': 0, 'classes': ['flex'], 'path': 'css/site.old.css'}),
+    json.dumps({'version': 1, 'build': 'old', 'classes': ['flex'], 'path': 'css/site.old.css'}),
+])
+def test_stale_manifest_rebuilds_the_stylesheet(site_css, manifest):
+    stylesheet = site_css.SiteStylesheet(manifest)
+
+    files = stylesheet.files()
+
+    assert stylesheet.path in files and stylesheet.path != 'css/site.old.css'
+    assert json.loads(files[site_css.CSS_MANIFEST_PATH])['build'] == site_css.stylesheet_build_version()
+
+
+@pytest.mark.parametrize('lambda_name', ['news_page_generator', 'news_detail_page_generator'])
+def test_pages_are_linked_to_the_hashed_stylesheet(github, lambda_name):
+    module = load(lambda_name, 'lambda_function')
+    pages = {'news.html': page('flex'), 'news/page/1.html': page('grid'), 'news/page/2.html': None}
+
+    linked, css_files = module.link_site_stylesheet(pages, 'test-token', 'owner/site', 'main')
+
+    path = json.loads(css_files[module.CSS_MANIFEST_PATH])['path']
+    assert path in css_files and '.grid{' in css_files[path]
+    assert linked['news.html'] == page('flex').replace(module.STYLESHEET_PLACEHOLDER, path)
+    assert module.STYLESHEET_PLACEHOLDER not in linked['news/page/1.html']
+    assert linked['news/page/2.html'] is None
+    github.repository.commit(css_files)
+
+    # マニフェストにあるクラスだけなら、コミット済みのスタイルシートにそのままリンクする
+    linked, css_files = module.link_site_stylesheet({'news.html': page('grid')}, 'test-token', 'owner/site', 'main')
+    assert css_files == {}
+    assert path in linked['news.html']
+
+
+def test_every_lambda_has_the_same_site_css_module():
+    copies = {path.parent.name: path.read_bytes() for path in LAMBDA_ROOT.glob('*/site_css.py')}
+    assert len(copies) == 2
+    assert len(set(copies.values())) == 1, sorted(copies)
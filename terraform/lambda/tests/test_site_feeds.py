@@ -0,0 +1,130 @@
+"""
+site_feeds（sitemap.xml と Atom フィードの差分生成）のテスト
+"""
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from conftest import article_row, load
+
+SITEMAP_NS = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+ATOM_NS = '{http://www.w3.org/2005/Atom}'
+
+
+@pytest.fixture
+def site_feeds():
+    return load('news_page_generator', 'site_feeds')
+
+
+def articles(site_feeds, count, overrides=None):
+    return [site_feeds.Article(article_row(n, **(overrides or {}).get(n, {}))) for n in range(1, count + 1)]
+
+
+def sitemap_urls(content):
+    root = ET.fromstring(content)
+    return {
+        url.find(f'{SITEMAP_NS}loc').text: getattr(url.find(f'{SITEMAP_NS}lastmod'), 'text', None)
+        for url in root.iter(f'{SITEMAP_NS}url')
+    }
+
+
+def feed_entries(content):
+    return ET.fromstring(content).findall(f'{ATOM_NS}entry')
+
+
+def test_sitemap_lists_static_pages_news_and_detail_pages(site_feeds):
+    items = articles(site_feeds, 3, {2: {'generate_article_page': False}, 3: {'slug': 'summer-festival'}})
+
+    content, stats = site_feeds.build_sitemap(items, None)
+
+    urls = sitemap_urls(content)
+    base = site_feeds.SITE_BASE_URL
+    assert urls[f'{base}/'] is None and urls[f'{base}/contact.html'] is None
+    assert urls[f'{base}/news/{article_row(1)["id"]}.html'] == '2025-11-02T11:00:00+09:00'
+    assert urls[f'{base}/news/summer-festival.html'] == '2025-11-04T11:00:00+09:00'
+    assert f'{base}/news/{article_row(2)["id"]}.html' not in urls
+    # news.html の更新日時は記事の最新の更新日時
+    assert urls[f'{base}/news.html'] == '2025-11-04T11:00:00+09:00'
+    assert stats['rendered'] == len(urls) and stats['reused'] == 0
+
+
+def test_sitemap_reuses_unchanged_lines_and_is_byte_stable(site_feeds):
+    previous, _ = site_feeds.build_sitemap(articles(site_feeds, 3), None)
+
+    same, stats = site_feeds.build_sitemap(articles(site_feeds, 3), previous)
+    assert same == previous
+    assert stats['rendered'] == 0
+
+    updated = {2: {'updated_at': '2025-12-01T00:00:00+00:00'}}
+    content, stats = site_feeds.build_sitemap(articles(site_feeds, 2, updated), previous)
+    # 記事2の行と news.html の行だけを書き直し、削除された記事3の行は消える
+    assert stats['rendered'] == 2 and stats['removed'] == 1
+    assert sitemap_urls(content)[f'{site_feeds.SITE_BASE_URL}/news/{article_row(2)["id"]}.html'] == (
+        '2025-12-01T09:00:00+09:00'
+    )
+
+
+def test_sitemap_of_another_format_is_not_reused(site_feeds):
+    previous, _ = site_feeds.build_sitemap(articles(site_feeds, 2), None)
+
+    _, stats = site_feeds.build_sitemap(articles(site_feeds, 2), previous.replace(site_feeds.SITEMAP_FORMAT, 'old'))
+
+    assert stats['reused'] == 0
+
+
+def test_feed_has_latest_entries_with_escaped_fields(site_feeds, monkeypatch):
+    monkeypatch.setattr(site_feeds, 'FEED_ENTRY_LIMIT', 2)
+    items = articles(site_feeds, 3, {3: {'title': '<夏祭り> & 盆踊り', 'category': 'event'}})
+
+    content, _ = site_feeds.build_feed(items, None, lambda article: f'要約 "{article.id[-1]}"')
+
+    entries = feed_entries(content)
+    assert [e.find(f'{ATOM_NS}id').text for e in entries] == [
+        f'urn:uuid:{article_row(n)["id"]}' for n in (3, 2)
+    ]
+    first = entries[0]
+    assert first.find(f'{ATOM_NS}title').text == '<夏祭り> & 盆踊り'
+    assert first.find(f'{ATOM_NS}summary').text == '要約 "3"'
+    assert first.find(f'{ATOM_NS}category').get('label') == 'イベント'
+    assert first.find(f'{ATOM_NS}link').get('href').endswith(f'/news/{article_row(3)["id"]}.html')
+    assert ET.fromstring(content).find(f'{ATOM_NS}updated').text == '2025-11-04T11:00:00+09:00'
+
+
+def test_feed_summary_is_fetched_only_for_rewritten_entries(site_feeds):
+    calls = []
+
+    def summary(article):
+        calls.append(article.id)
+        return '要約'
+
+    previous, _ = site_feeds.build_feed(articles(site_feeds, 3), None, summary)
+    calls.clear()
+
+    content, stats = site_feeds.build_feed(
+        articles(site_feeds, 3, {1: {'updated_at': '2025-12-01T00:00:00+00:00'}}), previous, summary
+    )
+
+    assert calls == [article_row(1)['id']]
+    assert stats == {'reused': 2, 'rendered': 1, 'removed': 0}
+    assert len(feed_entries(content)) == 3
+
+
+def test_feed_without_articles_is_valid(site_feeds):
+    content, _ = site_feeds.build_feed([], None)
+
+    root = ET.fromstring(content)
+    assert feed_entries(content) == []
+    assert root.find(f'{ATOM_NS}updated') is None
+
+
+def test_feed_files_are_committed_only_when_changed(github):
+    news = load('news_page_generator', 'lambda_function')
+    items = articles(news, 2)
+
+    files, summary = news.build_feed_files(items, 'test-token', 'owner/site', 'main')
+    assert set(files) == {news.SITEMAP_PATH, news.FEED_PATH}
+    github.repository.commit(files)
+
+    files, summary = news.build_feed_files(items, 'test-token', 'owner/site', 'main')
+    assert files == {}
+    assert summary[news.FEED_PATH]['reused'] == 2
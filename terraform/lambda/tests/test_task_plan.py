@@ -0,0 +1,82 @@
+"""
+task_plan（依存関係つきの処理の並行実行）のテスト
+"""
+import threading
+
+import pytest
+
+from conftest import load
+
+
+@pytest.fixture
+def task_plan():
+    return load('news_detail_page_generator', 'task_plan')
+
+
+def test_dependencies_finish_first_and_results_are_passed_in_order(task_plan):
+    order = []
+
+    def step(name, value):
+        def run(*args):
+            order.append(name)
+            return (value, args)
+        return run
+
+    plan = task_plan.TaskPlan('test')
+    plan.add('a', step('a', 1))
+    plan.add('b', step('b', 2))
+    plan.add('c', step('c', 3), 'b', 'a')
+    plan.add('d', step('d', 4), 'c')
+
+    results = plan.run()
+
+    assert results['c'] == (3, ((2, ()), (1, ())))
+    assert results['d'] == (4, ((3, ((2, ()), (1, ()))),))
+    assert set(order[:2]) == {'a', 'b'} and order[2:] == ['c', 'd']
+    assert set(plan.timings) == {'a', 'b', 'c', 'd'}
+
+
+def test_independent_tasks_run_concurrently(task_plan):
+    # 3つが同時に実行されていなければ Barrier が時間切れになる
+    barrier = threading.Barrier(3, timeout=5)
+    plan = task_plan.TaskPlan('test', max_workers=3)
+    for name in ('a', 'b', 'c'):
+        plan.add(name, barrier.wait)
+
+    assert sorted(plan.run().values()) == [0, 1, 2]
+
+
+def test_failure_cancels_dependents_and_raises(task_plan):
+    release = threading.Event()
+    called = []
+
+    def fail():
+        raise RuntimeError('boom')
+
+    def slow():
+        release.wait(5)
+        called.append('slow')
+
+    plan = task_plan.TaskPlan('test', max_workers=2)
+    plan.add('fail', fail)
+    plan.add('slow', slow)
+    plan.add('after_fail', lambda _: called.append('after_fail'), 'fail')
+    plan.add('after_slow', lambda _: called.append('after_slow'), 'slow')
+
+    # 実行中の処理の終了は待たずに送出する
+    with pytest.raises(RuntimeError, match='boom'):
+        plan.run()
+    assert called == []
+
+    release.set()
+    assert 'fail' in plan.timings
+    assert 'after_fail' not in plan.timings and 'after_slow' not in plan.timings
+
+
+def test_unknown_dependency_is_rejected(task_plan):
+    plan = task_plan.TaskPlan('test')
+    plan.add('a', lambda: 1)
+
+    with pytest.raises(ValueError):
+        plan.add('b', lambda a, c: a, 'a', 'c')
+    assert plan.run() == {'a': 1}
@@ -0,0 +1,94 @@
+"""
+template_engine（記事詳細テンプレートのコンパイル・レンダリング）のテスト
+"""
+import re
+
+import pytest
+
+from conftest import REPO_ROOT, TEMPLATE_PATH, article_row, load
+
+
+@pytest.fixture
+def template_engine():
+    return load('news_detail_page_generator', 'template_engine')
+
+
+def render(template_engine, source, **context):
+    return template_engine.compile_template(source).render(context)
+
+
+def test_slots_are_filled_and_missing_values_render_empty(template_engine):
+    source = '<h1>{{title}}</h1><p>{{ prev_article.title }}</p><span>{{count}}</span><i>{{missing}}</i>'
+
+    html = render(template_engine, source, title='夏祭り', prev_article={'title': '防災訓練'}, count=3)
+
+    assert html == '<h1>夏祭り</h1><p>防災訓練</p><span>3</span><i></i>'
+    # 値はエスケープしない（呼び出し側でエスケープする）
+    assert render(template_engine, '{{body}}', body='<b>太字</b>') == '<b>太字</b>'
+    assert template_engine.compile_template(source).slot_names == {'title', 'prev_article.title', 'count', 'missing'}
+
+
+def test_if_else_blocks_strip_marker_whitespace(template_engine):
+    source = (
+        '<div>\n'
+        '  <!-- {{#if image}} -->\n'
+        '  <img src="{{image}}">\n'
+        '  <!-- {{else}} -->\n'
+        '  <p>画像なし</p>\n'
+        '  <!-- {{/if image}} -->\n'
+        '</div>'
+    )
+
+    assert render(template_engine, source, image='a.jpg') == '<div>\n  <img src="a.jpg">\n</div>'
+    assert render(template_engine, source, image='') == '<div>\n  <p>画像なし</p>\n</div>'
+    assert render(template_engine, source) == '<div>\n  <p>画像なし</p>\n</div>'
+
+
+def test_nested_if_uses_dotted_names(template_engine):
+    source = '<!-- {{#if next_article}} --><a href="{{next_article.url}}">次へ</a><!-- {{/if next_article}} -->'
+
+    assert render(template_engine, source, next_article={'url': 'b.html'}) == '<a href="b.html">次へ</a>'
+    assert render(template_engine, source, next_article=None) == ''
+
+
+def test_each_repeats_body_with_item_context_and_keeps_indent(template_engine):
+    source = (
+        '<ul>\n'
+        '<!-- {{#each items}} -->\n'
+        '  <li>{{name}} - {{site}}</li>\n'
+        '<!-- {{/each}} -->\n'
+        '</ul>'
+    )
+
+    html = render(template_engine, source, site='旭丘', items=[{'name': 'a'}, {'name': 'b'}])
+
+    assert html == '<ul>\n\n  <li>a - 旭丘</li><li>b - 旭丘</li>\n\n</ul>'
+    assert render(template_engine, source, items=[]) == '<ul>\n\n</ul>'
+    # レンダリング済みのHTMLを渡した場合は本体の代わりに埋め込む
+    assert render(template_engine, source, items='<li>済</li>') == '<ul>\n\n  <li>済</li>\n\n</ul>'
+
+
+def test_unbalanced_markers_do_not_break_compilation(template_engine):
+    # 対応する開始がない終了マーカーは読み捨て、閉じられていないブロックは末尾で閉じる
+    assert render(template_engine, 'a<!-- {{/if x}} -->b') == 'ab'
+    assert render(template_engine, 'a<!-- {{#if x}} -->b', x=True) == 'ab'
+    assert render(template_engine, 'a<!-- {{#if x}} -->b', x=False) == 'a'
+
+
+def test_compiled_template_is_cached(template_engine):
+    source = '<p>{{title}}</p>'
+    assert template_engine.compile_template(source) is template_engine.compile_template(source)
+
+
+def test_site_template_renders_without_leftover_markers(detail, github, supabase):
+    source = (REPO_ROOT / TEMPLATE_PATH).read_text(encoding='utf-8')
+    compiled = load('news_detail_page_generator', 'template_engine').compile_template(source)
+    assert {'title', 'content'} <= compiled.slot_names
+
+    supabase.supabase.tables['articles'].append(article_row(1, title='夏祭りのお知らせ'))
+    response = detail.lambda_handler({'article_id': article_row(1)['id']}, None)
+    assert response['statusCode'] == 200, response['body']
+
+    html = github.repository.files()[f'news/{article_row(1)["id"]}.html']
+    assert '夏祭りのお知らせ' in html
+    assert not re.search(r'\{\{[#/]?\w', html)
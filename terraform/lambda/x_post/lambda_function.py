@@ -11,6 +11,9 @@ import urllib.parse
 import urllib.request
 from typing import Dict, List, Optional
 
+import http_pool
+import metrics
+
 LOGGER = logging.getLogger()
 LOGGER.setLevel(logging.INFO)
 
@@ -90,8 +93,8 @@ def _post_to_x(message: str) -> Dict[str, str]:
     request = urllib.request.Request(API_URL, data=payload, headers=headers, method="POST")
 
     try:
-        with urllib.request.urlopen(request, timeout=10) as response:
-            response_body = response.read().decode("utf-8")
+        with metrics.phase("x_post", len(payload)) as phase, http_pool.urlopen(request, timeout=10) as response:
+            response_body = phase.read(response).decode("utf-8")
             return {
                 "status_code": str(response.getcode()),
                 "body": response_body,
@@ -144,8 +147,8 @@ def _check_duplicate(article_id: str) -> bool:
     req = urllib.request.Request(url, headers=headers, method='GET')
 
     try:
-        with urllib.request.urlopen(req, timeout=10) as response:
-            data = json.loads(response.read().decode('utf-8'))
+        with metrics.phase('supabase_fetch') as phase, http_pool.urlopen(req, timeout=10) as response:
+            data = json.loads(phase.read(response).decode('utf-8'))
             if data and len(data) > 0:
                 LOGGER.info(f"X post already sent for article {article_id}")
                 return True
@@ -188,7 +191,7 @@ def _record_notification(article_id: str, message: str, response_data: Dict) ->
     req = urllib.request.Request(endpoint, data=payload, headers=headers, method='POST')
 
     try:
-        with urllib.request.urlopen(req, timeout=10) as response:
+        with metrics.phase('supabase_write', len(payload)), http_pool.urlopen(req, timeout=10) as response:
             LOGGER.info(f"X post notification recorded for article {article_id}")
     except urllib.error.HTTPError as e:
         error_body = e.read().decode('utf-8')
@@ -278,6 +281,7 @@ def _extract_request_data(event: Dict) -> Dict:
     }
 
 
+@metrics.handler('x_post')
 def lambda_handler(event, context):
     LOGGER.info("Received event: %s", json.dumps(event))
 
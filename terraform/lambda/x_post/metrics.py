@@ -0,0 +1,223 @@
+"""
+処理の段階ごとの所要時間・データ量を CloudWatch の Embedded Metric Format（EMF）で出力する
+1回の実行の計測を1行のJSONにまとめて標準出力に書くと、CloudWatch Logs がメトリクスとして取り込む
+（PutMetricData などのAPI呼び出しは行わない）
+
+- handler: lambda_handler に付けるデコレーター。実行ごとに計測をリセットし、終了時（例外の場合も）に出力する
+- phase: 段階（supabase_fetch, github_get, dify_call など）の所要時間を計る with 文
+  送る本文の量は引数で、受け取った本文の量は read（応答を読む）または add_bytes で足す
+- timed: 関数の呼び出しを phase で計るデコレーター
+同じ段階を複数回（並列を含む）計った場合は、回数・所要時間の合計・データ量の合計を出力する
+コールドスタート（プロセスで最初の実行）かどうかは StartType のディメンションで分ける
+
+METRICS_ENABLED=false の場合は何も計測・出力しない
+テストでは snapshot で計測中の値を、flush の戻り値で出力した内容を確認できる
+
+dify_proxy, dify_proxy_image, line_broadcast, line_webhook, news_page_generator, news_detail_page_generator,
+x_post に同じファイルを置いている（変更時は全てを更新）
+"""
+import functools
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'Asahigaoka')
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+# EMF の1つのディレクティブに含められるメトリクス数の上限
+MAX_METRICS = 100
+
+_lock = threading.Lock()
+# 段階名 → {'count': 回数, 'duration_ms': 所要時間の合計, 'bytes': データ量の合計}
+_phases: Dict[str, Dict[str, float]] = {}
+_properties: Dict[str, Any] = {}
+_cold_start = True
+
+
+class Phase:
+    """
+    1回の段階の計測（with 文で使う）
+    """
+
+    def __init__(self, name: str, size: int = 0):
+        self.name = name
+        self.size = size
+        self.duration_ms = 0.0
+        self._started = 0.0
+
+    def __enter__(self) -> 'Phase':
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+        _record(self.name, duration_ms=self.duration_ms, count=1, size=self.size)
+
+    def read(self, response: Any) -> bytes:
+        """
+        応答の本文を読み、そのデータ量を足す
+        """
+        data = response.read()
+        self.add_bytes(len(data))
+        return data
+
+    def add_bytes(self, size: int) -> None:
+        """
+        この段階で送受信したデータ量（バイト）を足す（with 文を抜けた後でもよい）
+        """
+        _record(self.name, size=size)
+
+
+class _NoopPhase:
+    """
+    計測しない場合の Phase（同じインスタンスを使い回す）
+    """
+    name = ''
+    duration_ms = 0.0
+
+    def __enter__(self) -> '_NoopPhase':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+    def read(self, response: Any) -> bytes:
+        return response.read()
+
+    def add_bytes(self, size: int) -> None:
+        pass
+
+
+_NOOP_PHASE = _NoopPhase()
+
+
+def _record(name: str, duration_ms: float = 0.0, count: int = 0, size: int = 0) -> None:
+    with _lock:
+        values = _phases.setdefault(name, {'count': 0, 'duration_ms': 0.0, 'bytes': 0})
+        values['count'] += count
+        values['duration_ms'] += duration_ms
+        values['bytes'] += size
+
+
+def phase(name: str, size: int = 0) -> Any:
+    """
+    段階の所要時間を計る with 文（size は送る本文の量）
+    例: with metrics.phase('dify_call', len(data)) as phase, http_pool.urlopen(req) as response:
+            body = phase.read(response)
+    """
+    return Phase(name, size) if METRICS_ENABLED else _NOOP_PHASE
+
+
+def timed(name: str) -> Callable:
+    """
+    関数の呼び出しを段階 name として計るデコレーター
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def set_property(name: str, value: Any) -> None:
+    """
+    出力する行に含める値（メトリクスにはしない。ログの検索用）
+    """
+    if METRICS_ENABLED:
+        with _lock:
+            _properties[name] = value
+
+
+def snapshot() -> Dict[str, Dict[str, float]]:
+    """
+    この実行でこれまでに計測した段階の値
+    """
+    with _lock:
+        return {name: dict(values) for name, values in _phases.items()}
+
+
+def reset() -> None:
+    """
+    計測をリセットする
+    """
+    with _lock:
+        _phases.clear()
+        _properties.clear()
+
+
+def flush(service: str, cold_start: bool) -> Optional[Dict[str, Any]]:
+    """
+    計測した値を EMF の1行として標準出力に書き、計測をリセットする。戻り値は出力した内容（計測しない場合は None）
+    LOGGER の書式（レベルや日時の前置き）が付くと CloudWatch が EMF として読めないため print で書く
+    """
+    if not METRICS_ENABLED:
+        return None
+    with _lock:
+        phases = {name: dict(values) for name, values in _phases.items()}
+        properties = dict(_properties)
+        _phases.clear()
+        _properties.clear()
+
+    document: Dict[str, Any] = {
+        'Service': service,
+        'StartType': 'cold' if cold_start else 'warm',
+        'ColdStart': 1 if cold_start else 0,
+        **properties,
+    }
+    metrics = [{'Name': 'ColdStart', 'Unit': 'Count'}]
+    for name, values in sorted(phases.items()):
+        if len(metrics) + 3 > MAX_METRICS:
+            print(f'メトリクスの上限を超えたため出力しない段階: {name}')
+            continue
+        document[f'{name}.count'] = values['count']
+        document[f'{name}.duration_ms'] = round(values['duration_ms'], 3)
+        metrics.append({'Name': f'{name}.count', 'Unit': 'Count'})
+        metrics.append({'Name': f'{name}.duration_ms', 'Unit': 'Milliseconds'})
+        if values['bytes']:
+            document[f'{name}.bytes'] = values['bytes']
+            metrics.append({'Name': f'{name}.bytes', 'Unit': 'Bytes'})
+
+    document['_aws'] = {
+        'Timestamp': int(time.time() * 1000),
+        'CloudWatchMetrics': [{
+            'Namespace': METRICS_NAMESPACE,
+            'Dimensions': [['Service'], ['Service', 'StartType']],
+            'Metrics': metrics,
+        }],
+    }
+    print(json.dumps(document, ensure_ascii=False, default=str))
+    return document
+
+
+def handler(service: str) -> Callable:
+    """
+    lambda_handler に付けるデコレーター
+    実行全体を段階 invocation として計り、終了時に計測した値を出力する（service はディメンションの値）
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(event: Any, context: Any) -> Any:
+            global _cold_start
+            if not METRICS_ENABLED:
+                return func(event, context)
+            cold_start, _cold_start = _cold_start, False
+            reset()
+            request_id = getattr(context, 'aws_request_id', None)
+            if request_id:
+                set_property('RequestId', request_id)
+            try:
+                with phase('invocation'):
+                    result = func(event, context)
+                if isinstance(result, dict) and 'statusCode' in result:
+                    set_property('StatusCode', result['statusCode'])
+                return result
+            except Exception:
+                set_property('StatusCode', 'exception')
+                raise
+            finally:
+                flush(service, cold_start)
+        return wrapper
+    return decorator
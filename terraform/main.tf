@@ -1,5 +1,5 @@
 terraform {
-  required_version = ">= 1.0"
+  required_version = ">= 1.4"
   required_providers {
     aws = {
       source  = "hashicorp/aws"
@@ -542,6 +542,13 @@ variable "supabase_anon_key" {
   sensitive   = true
 }
 
+variable "supabase_service_role_key" {
+  description = "Supabase Service Role Key（news-detail-page-generator が media の形式・寸法を記録する RPC にだけ使う。空の場合は記録せず、毎回ファイルの先頭を読んで調べる）"
+  type        = string
+  default     = ""
+  sensitive   = true
+}
+
 variable "github_token" {
   description = "GitHub Personal Access Token for pushing news.html"
   type        = string
@@ -584,6 +591,35 @@ resource "aws_iam_role_policy_attachment" "news_page_generator_lambda_logs" {
   policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
 }
 
+# Pillow のレイヤー（派生画像の作成に使う。Lambda ランタイムに含まれないため）
+# requirements.txt が変わったときに build.sh でホイールを取得し直す
+resource "terraform_data" "pillow_layer_build" {
+  triggers_replace = [
+    filesha256("${path.module}/lambda/layers/pillow/requirements.txt"),
+    filesha256("${path.module}/lambda/layers/pillow/build.sh"),
+  ]
+
+  provisioner "local-exec" {
+    command = "sh ${path.module}/lambda/layers/pillow/build.sh"
+  }
+}
+
+data "archive_file" "pillow_layer" {
+  type        = "zip"
+  source_dir  = "${path.module}/lambda/layers/pillow/build"
+  output_path = "${path.module}/lambda/layers/pillow.zip"
+
+  depends_on = [terraform_data.pillow_layer_build]
+}
+
+resource "aws_lambda_layer_version" "pillow" {
+  layer_name               = "pillow"
+  filename                 = data.archive_file.pillow_layer.output_path
+  source_code_hash         = data.archive_file.pillow_layer.output_base64sha256
+  compatible_runtimes      = ["python3.11"]
+  compatible_architectures = ["x86_64"]
+}
+
 # Lambda関数用のZIPファイルを作成
 data "archive_file" "news_page_generator_lambda" {
   type        = "zip"
@@ -601,6 +637,7 @@ resource "aws_lambda_function" "news_page_generator" {
   runtime          = "python3.11"
   timeout          = 60
   memory_size      = 256
+  layers           = [aws_lambda_layer_version.pillow.arn]
 
   environment {
     variables = {
@@ -609,6 +646,13 @@ resource "aws_lambda_function" "news_page_generator" {
       GITHUB_TOKEN      = var.github_token
       GITHUB_REPO       = var.github_repo
       GITHUB_BRANCH     = var.github_branch
+
+      # 定期実行時に古くなった詳細ページの再生成を依頼する先
+      DETAIL_PAGE_GENERATOR_FUNCTION = aws_lambda_function.news_detail_page_generator.function_name
+
+      # 生成したページをサイトのバケットへ直接公開
+      SITE_BUCKET                = aws_s3_bucket.website.id
+      CLOUDFRONT_DISTRIBUTION_ID = aws_cloudfront_distribution.website.id
     }
   }
 }
@@ -642,6 +686,102 @@ resource "aws_lambda_permission" "news_page_generator_eventbridge" {
   source_arn    = aws_cloudwatch_event_rule.news_page_generator_schedule.arn
 }
 
+# news.html 更新リクエストキュー
+# 記事詳細ページ生成Lambdaが公開/削除のたびに送信し、news page generator がまとめて処理する
+resource "aws_sqs_queue" "news_page_refresh" {
+  name                       = "news-page-refresh"
+  visibility_timeout_seconds = 360 # Lambdaタイムアウトの6倍
+  message_retention_seconds  = 86400
+}
+
+# SQS送受信権限（news page generator / news detail page generator 共通ロール）
+resource "aws_iam_role_policy" "news_page_generator_lambda_sqs" {
+  name = "news-page-generator-lambda-sqs-policy"
+  role = aws_iam_role.news_page_generator_lambda.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "sqs:SendMessage",
+          "sqs:ReceiveMessage",
+          "sqs:DeleteMessage",
+          "sqs:GetQueueAttributes"
+        ]
+        Resource = aws_sqs_queue.news_page_refresh.arn
+      }
+    ]
+  })
+}
+
+# SQS → news page generator（バッチウィンドウ内のリクエストを1回の再生成にまとめる）
+resource "aws_lambda_event_source_mapping" "news_page_refresh" {
+  event_source_arn                   = aws_sqs_queue.news_page_refresh.arn
+  function_name                      = aws_lambda_function.news_page_generator.arn
+  batch_size                         = 100
+  maximum_batching_window_in_seconds = 30
+
+  scaling_config {
+    maximum_concurrency = 2
+  }
+}
+
+# 詳細ページ生成Lambdaの呼び出し権限（定期実行時の差分再生成用）
+resource "aws_iam_role_policy" "news_page_generator_lambda_invoke" {
+  name = "news-page-generator-lambda-invoke-policy"
+  role = aws_iam_role.news_page_generator_lambda.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect   = "Allow"
+        Action   = "lambda:InvokeFunction"
+        Resource = aws_lambda_function.news_detail_page_generator.arn
+      }
+    ]
+  })
+}
+
+# サイトのバケットへの直接公開とCloudFront無効化の権限（news page generator / news detail page generator 共通ロール）
+resource "aws_iam_role_policy" "news_page_generator_lambda_site_publish" {
+  name = "news-page-generator-lambda-site-publish-policy"
+  role = aws_iam_role.news_page_generator_lambda.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "s3:PutObject",
+          "s3:DeleteObject"
+        ]
+        Resource = [
+          "${aws_s3_bucket.website.arn}/news.html",
+          "${aws_s3_bucket.website.arn}/news/*",
+          "${aws_s3_bucket.website.arn}/sitemap.xml",
+          "${aws_s3_bucket.website.arn}/images/derived/*",
+          "${aws_s3_bucket.website.arn}/css/site.*.css"
+        ]
+      },
+      {
+        # 派生画像が作成済みかの確認（HeadObject）
+        Effect   = "Allow"
+        Action   = "s3:GetObject"
+        Resource = "${aws_s3_bucket.website.arn}/images/derived/*"
+      },
+      {
+        Effect   = "Allow"
+        Action   = "cloudfront:CreateInvalidation"
+        Resource = aws_cloudfront_distribution.website.arn
+      }
+    ]
+  })
+}
+
 # 出力：Lambda関数ARN
 output "news_page_generator_lambda_arn" {
   value       = aws_lambda_function.news_page_generator.arn
@@ -676,14 +816,21 @@ resource "aws_lambda_function" "news_detail_page_generator" {
   runtime          = "python3.11"
   timeout          = 60
   memory_size      = 256
+  layers           = [aws_lambda_layer_version.pillow.arn]
 
   environment {
     variables = {
-      SUPABASE_URL      = var.supabase_url
-      SUPABASE_ANON_KEY = var.supabase_anon_key
-      GITHUB_TOKEN      = var.github_token
-      GITHUB_REPO       = var.github_repo
-      GITHUB_BRANCH     = var.github_branch
+      SUPABASE_URL               = var.supabase_url
+      SUPABASE_ANON_KEY          = var.supabase_anon_key
+      SUPABASE_SERVICE_ROLE_KEY  = var.supabase_service_role_key
+      GITHUB_TOKEN               = var.github_token
+      GITHUB_REPO                = var.github_repo
+      GITHUB_BRANCH              = var.github_branch
+      TEMPLATE_CACHE_TTL_SECONDS = "300"
+      NEWS_REFRESH_QUEUE_URL     = aws_sqs_queue.news_page_refresh.url
+      NEWS_REFRESH_DELAY_SECONDS = "30"
+      SITE_BUCKET                = aws_s3_bucket.website.id
+      CLOUDFRONT_DISTRIBUTION_ID = aws_cloudfront_distribution.website.id
     }
   }
 }